@@ -4,16 +4,21 @@
 
 from .database import DatabaseManager
 from .user import User
+from .role import Role, PermissionMatrix
 from .product import Product, Category
-from .sale import Sale, SaleItem
+from .sale import Sale, Customer
 from .repair import RepairTicket
+from .cart import Cart
 
 __all__ = [
     'DatabaseManager',
     'User', 
+    'Role',
+    'PermissionMatrix',
     'Product',
     'Category',
     'Sale',
-    'SaleItem', 
-    'RepairTicket'
+    'Customer',
+    'RepairTicket',
+    'Cart'
 ]
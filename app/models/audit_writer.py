@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+كاتب سجل النشاط - Asynchronous Audit Writer
+
+أحداث سجل النشاط تُوضع في طابور داخل الذاكرة ويكتبها خيط خلفي دفعة واحدة
+(executemany داخل معاملة واحدة) كل audit_flush_interval_ms أو عند تجمع
+audit_flush_batch حدث، فلا ينتظر البيع أو تعديل المنتج كتابة السجل.
+وقت الحدث يُسجل لحظة وضعه في الطابور لا لحظة كتابته.
+
+إذا امتلأ الطابور (audit_queue_max) ينتظر المستدعي حتى يفرغ الخيط مساحة،
+ثم يكتب بنفسه إن طال الانتظار. إذا فشلت الدفعة لسبب غير قفل قاعدة البيانات
+تُعاد كتابتها صفاً صفاً ويُسقط الحدث الذي لا يمكن كتابته أبداً (مع تسجيله في
+السجل)، فلا يوقف حدث واحد الطابور كله. الطابور يُفرغ كاملاً عند الإيقاف
+(DatabaseManager.shutdown و atexit) وعند إشارات الإنهاء.
+"""
+
+import atexit
+import os
+import signal
+import sqlite3
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Deque, Dict, Iterator, List, Optional, Tuple
+import logging
+
+from config.settings import DATABASE_CONFIG
+
+logger = logging.getLogger(__name__)
+
+_INSERT_SQL = """
+    INSERT INTO audit_logs (user_id, action, table_name, record_id, old_values, new_values, created_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+
+AuditEvent = Tuple[Optional[int], str, Optional[str], Optional[int], Optional[str], Optional[str], str]
+
+
+class AuditWriter:
+    """طابور أحداث سجل النشاط لملف قاعدة بيانات واحد مع خيط كتابة خلفي"""
+
+    _writers: Dict[str, 'AuditWriter'] = {}
+    _writers_lock = threading.Lock()
+
+    def __init__(self, db, flush_interval_ms: int = None, batch_size: int = None,
+                 max_queue: int = None):
+        self.db = db
+        self.flush_interval = (flush_interval_ms if flush_interval_ms is not None
+                               else DATABASE_CONFIG.get('audit_flush_interval_ms', 200)) / 1000
+        self.batch_size = batch_size or DATABASE_CONFIG.get('audit_flush_batch', 500)
+        self.max_queue = max_queue or DATABASE_CONFIG.get('audit_queue_max', 10000)
+
+        self._queue: Deque[AuditEvent] = deque()
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        self._paused = False
+        self._written = 0
+        self._failures = 0
+        self._dropped = 0
+
+    @classmethod
+    def for_db(cls, db) -> 'AuditWriter':
+        """الحصول على الكاتب المشترك لملف قاعدة البيانات"""
+        key = os.path.abspath(db.db_path)
+        with cls._writers_lock:
+            writer = cls._writers.get(key)
+            if writer is None:
+                writer = cls(db)
+                cls._writers[key] = writer
+            return writer
+
+    # ------------------------------------------------------------------
+    # الإضافة إلى الطابور
+    # ------------------------------------------------------------------
+
+    def log(self, user_id: Optional[int], action: str, table_name: str = None,
+            record_id: int = None, new_values: str = None, old_values: str = None):
+        """وضع حدث في الطابور دون انتظار كتابته"""
+        created_at = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+        event = (user_id, action, table_name, record_id, old_values, new_values, created_at)
+
+        with self._cond:
+            if len(self._queue) >= self.max_queue and not self._paused and not self._wait_for_space():
+                # الخيط الخلفي متأخر كثيراً (قاعدة مقفلة مثلاً): يكتب المستدعي بنفسه
+                self._cond.release()
+                try:
+                    self.flush()
+                finally:
+                    self._cond.acquire()
+
+            self._queue.append(event)
+            self._ensure_thread()
+            if len(self._queue) >= self.batch_size:
+                self._cond.notify_all()
+
+    def _wait_for_space(self) -> bool:
+        """انتظار إفراغ مساحة في الطابور (مع قفل الشرط ممسوكاً)"""
+        deadline = time.monotonic() + max(self.flush_interval * 10, 1.0)
+        self._cond.notify_all()
+        while len(self._queue) >= self.max_queue:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or self._thread is None:
+                logger.warning(f"طابور سجل النشاط ممتلئ ({len(self._queue)} حدث)")
+                return False
+            self._cond.wait(remaining)
+        return True
+
+    def _ensure_thread(self):
+        if self._thread is None and not self._stopping:
+            self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+            self._thread.start()
+
+    # ------------------------------------------------------------------
+    # الكتابة
+    # ------------------------------------------------------------------
+
+    def _run(self):
+        """حلقة الخيط الخلفي: كتابة دفعة كل فترة أو عند امتلاء الدفعة"""
+        while True:
+            with self._cond:
+                if not self._stopping and len(self._queue) < self.batch_size:
+                    self._cond.wait(self.flush_interval)
+                if self._stopping:
+                    self._thread = None
+                    self._cond.notify_all()
+                    return
+            if not self._write_batch():
+                # قاعدة البيانات مشغولة: محاولة لاحقة دون استهلاك المعالج
+                time.sleep(self.flush_interval)
+
+    def _write_batch(self) -> bool:
+        """كتابة ما في الطابور في معاملة واحدة (تبقى الأحداث فيه إن فشلت الكتابة)"""
+        with self._flush_lock:
+            with self._cond:
+                batch = list(self._queue)
+            if not batch:
+                return True
+
+            dropped = 0
+            try:
+                with self.db.transaction() as conn:
+                    conn.executemany(_INSERT_SQL, batch)
+            except Exception as e:
+                if _is_transient(e):
+                    self._failures += 1
+                    logger.error(f"خطأ في كتابة سجل النشاط ({len(batch)} حدث): {str(e)}")
+                    return False
+                try:
+                    dropped = self._write_rows(batch)
+                except Exception as e:
+                    self._failures += 1
+                    logger.error(f"خطأ في كتابة سجل النشاط ({len(batch)} حدث): {str(e)}")
+                    return False
+
+            with self._cond:
+                for _ in range(len(batch)):
+                    self._queue.popleft()
+                self._written += len(batch) - dropped
+                self._dropped += dropped
+                self._cond.notify_all()
+            return True
+
+    def _write_rows(self, batch: List[AuditEvent]) -> int:
+        """كتابة الدفعة صفاً صفاً وإسقاط الأحداث المرفوضة (يعيد عددها)"""
+        dropped = 0
+        with self.db.transaction() as conn:
+            for event in batch:
+                try:
+                    conn.execute(_INSERT_SQL, event)
+                except (sqlite3.IntegrityError, sqlite3.InterfaceError, sqlite3.ProgrammingError) as e:
+                    dropped += 1
+                    logger.error(f"أُسقط حدث سجل نشاط لا يمكن كتابته ({str(e)}): {event!r}")
+        return dropped
+
+    def flush(self) -> bool:
+        """كتابة كل الأحداث المعلقة الآن في الخيط الحالي"""
+        return self._write_batch()
+
+    def shutdown(self, timeout: float = 5.0) -> bool:
+        """إيقاف الخيط الخلفي وكتابة ما تبقى في الطابور"""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+
+        flushed = self.flush()
+        with self._cond:
+            self._stopping = False
+        if not flushed:
+            logger.error(f"تعذر كتابة {self.pending()} حدث من سجل النشاط عند الإيقاف")
+        return flushed
+
+    @contextmanager
+    def paused(self, timeout: float = 5.0) -> Iterator[None]:
+        """إيقاف الكتابة مؤقتاً أثناء استبدال ملف قاعدة البيانات (الأحداث الجديدة تُكتب بعد الكتلة)"""
+        with self._cond:
+            self._stopping = True
+            self._paused = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+
+        try:
+            self.flush()
+            yield
+        finally:
+            with self._cond:
+                self._stopping = False
+                self._paused = False
+                if self._queue:
+                    self._ensure_thread()
+
+    @classmethod
+    def shutdown_all(cls):
+        """إفراغ طوابير كل الكتّاب (عند إيقاف التطبيق)"""
+        with cls._writers_lock:
+            writers = list(cls._writers.values())
+        for writer in writers:
+            writer.shutdown()
+
+    @classmethod
+    def flush_all(cls):
+        with cls._writers_lock:
+            writers = list(cls._writers.values())
+        for writer in writers:
+            writer.flush()
+
+    def pending(self) -> int:
+        with self._cond:
+            return len(self._queue)
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._cond:
+            return {'pending': len(self._queue), 'written': self._written,
+                    'failures': self._failures, 'dropped': self._dropped}
+
+
+def _is_transient(error: Exception) -> bool:
+    """قاعدة البيانات مقفلة أو مشغولة: تُعاد الدفعة كاملة لاحقاً"""
+    if not isinstance(error, sqlite3.OperationalError):
+        return False
+    # SQLITE_BUSY=5 و SQLITE_LOCKED=6 (مع رموزهما الموسعة مثل SQLITE_BUSY_SNAPSHOT)
+    if getattr(error, 'sqlite_errorcode', 0) & 0xff in (5, 6):
+        return True
+    message = str(error).lower()
+    return 'locked' in message or 'busy' in message
+
+
+def install_crash_handlers():
+    """إفراغ طوابير سجل النشاط عند SIGTERM/SIGHUP أو استثناء غير معالج (من الخيط الرئيسي)"""
+    previous_excepthook = sys.excepthook
+
+    def excepthook(exc_type, exc, traceback):
+        AuditWriter.flush_all()
+        previous_excepthook(exc_type, exc, traceback)
+
+    sys.excepthook = excepthook
+
+    for name in ('SIGTERM', 'SIGHUP'):
+        signum = getattr(signal, name, None)
+        if signum is None:
+            continue
+        previous_handler = signal.getsignal(signum)
+
+        def handler(received, frame, previous_handler=previous_handler):
+            AuditWriter.flush_all()
+            if callable(previous_handler):
+                previous_handler(received, frame)
+            elif previous_handler != signal.SIG_IGN:
+                signal.signal(received, signal.SIG_DFL)
+                os.kill(os.getpid(), received)
+
+        signal.signal(signum, handler)
+
+
+atexit.register(AuditWriter.shutdown_all)
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+سلة المشتريات - Shopping Cart
+
+كائن مستقل عن الواجهة: البنود مفهرسة بمعرف المنتج، والمجموع الفرعي يُحدث
+بالفرق عند كل تغيير (Decimal)، ومعدل الضريبة يُمرر مرة واحدة ويُحفظ.
+المستمعون يُبلغون برقم الصف المتغير فقط حتى تعيد الواجهة رسمه وحده.
+"""
+
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Callable, Dict, List, Optional
+
+CENT = Decimal("0.01")
+
+# أحداث السلة (يُستدعى المستمع بالحدث ورقم الصف أو None)
+ABOUT_TO_ADD = 'about_to_add'
+ADDED = 'added'
+UPDATED = 'updated'
+ABOUT_TO_REMOVE = 'about_to_remove'
+REMOVED = 'removed'
+ABOUT_TO_RESET = 'about_to_reset'
+RESET = 'reset'
+TOTALS_CHANGED = 'totals_changed'
+
+
+def to_decimal(value) -> Decimal:
+    """تحويل رقم أو نص إلى Decimal دون أخطاء الفاصلة العائمة"""
+    if isinstance(value, Decimal):
+        return value
+    return Decimal(str(value or 0))
+
+
+class CartLine:
+    """بند في السلة"""
+
+    __slots__ = ('product_id', 'name', 'unit_price', 'quantity', 'max_quantity')
+
+    def __init__(self, product_id: int, name: str, unit_price: Decimal,
+                 quantity: int, max_quantity: int):
+        self.product_id = product_id
+        self.name = name
+        self.unit_price = unit_price
+        self.quantity = quantity
+        self.max_quantity = max_quantity
+
+    @property
+    def total(self) -> Decimal:
+        """مجموع البند"""
+        return self.unit_price * self.quantity
+
+    def to_sale_item(self) -> Dict:
+        """بند بصيغة POSService.create_sale"""
+        return {
+            'product_id': self.product_id,
+            'quantity': self.quantity,
+            'price': float(self.unit_price)
+        }
+
+
+class Cart:
+    """سلة مشتريات بمجاميع متراكمة"""
+
+    def __init__(self, tax_rate=0):
+        """tax_rate: النسبة المئوية (مثلاً 15)"""
+        self._lines: List[CartLine] = []
+        self._row_of: Dict[int, int] = {}
+        self._subtotal = Decimal(0)
+        self._discount = Decimal(0)
+        self._tax_rate = to_decimal(tax_rate) / 100
+        self._listeners: List[Callable[[str, Optional[int]], None]] = []
+
+    # ---- المستمعون ----
+
+    def add_listener(self, callback: Callable[[str, Optional[int]], None]):
+        """تسجيل مستمع لأحداث السلة"""
+        self._listeners.append(callback)
+
+    def _notify(self, event: str, row: Optional[int] = None):
+        for callback in self._listeners:
+            callback(event, row)
+
+    # ---- القراءة ----
+
+    def __len__(self) -> int:
+        return len(self._lines)
+
+    def __bool__(self) -> bool:
+        return bool(self._lines)
+
+    def line_at(self, row: int) -> CartLine:
+        """البند في الصف"""
+        return self._lines[row]
+
+    def row_of(self, product_id: int) -> Optional[int]:
+        """رقم صف المنتج في السلة"""
+        return self._row_of.get(product_id)
+
+    def sale_items(self) -> List[Dict]:
+        """البنود بصيغة إنشاء الفاتورة"""
+        return [line.to_sale_item() for line in self._lines]
+
+    def product_ids(self) -> List[int]:
+        """معرفات المنتجات في السلة"""
+        return [line.product_id for line in self._lines]
+
+    @property
+    def tax_rate(self) -> Decimal:
+        """معدل الضريبة كنسبة مئوية"""
+        return self._tax_rate * 100
+
+    @property
+    def discount(self) -> Decimal:
+        return self._discount
+
+    def totals(self) -> Dict[str, Decimal]:
+        """المجاميع مقربة لأقرب هللة (بدون إعادة حساب البنود)"""
+        taxable_amount = self._subtotal - self._discount
+        tax_amount = (taxable_amount * self._tax_rate).quantize(CENT, ROUND_HALF_UP)
+        return {
+            'subtotal': self._subtotal.quantize(CENT, ROUND_HALF_UP),
+            'discount_amount': self._discount.quantize(CENT, ROUND_HALF_UP),
+            'tax_amount': tax_amount,
+            'final_amount': (taxable_amount + tax_amount).quantize(CENT, ROUND_HALF_UP)
+        }
+
+    # ---- التعديل ----
+
+    def add_product(self, product: Dict, quantity: int = 1) -> int:
+        """إضافة منتج أو زيادة كميته وإرجاع رقم صفه"""
+        product_id = product['id']
+        row = self._row_of.get(product_id)
+
+        if row is not None:
+            line = self._lines[row]
+            self.set_quantity(product_id, line.quantity + quantity)
+            return row
+
+        max_quantity = product.get('quantity_in_stock', 0)
+        if quantity > max_quantity:
+            raise ValueError("الكمية المطلوبة تتجاوز المخزون المتاح")
+
+        line = CartLine(product_id, product['name'], to_decimal(product['selling_price']),
+                        quantity, max_quantity)
+        row = len(self._lines)
+
+        self._notify(ABOUT_TO_ADD, row)
+        self._lines.append(line)
+        self._row_of[product_id] = row
+        self._subtotal += line.total
+        self._notify(ADDED, row)
+        self._notify(TOTALS_CHANGED)
+        return row
+
+    def set_quantity(self, product_id: int, quantity: int):
+        """تغيير كمية بند موجود"""
+        row = self._row_of.get(product_id)
+        if row is None:
+            raise KeyError(product_id)
+
+        line = self._lines[row]
+        if quantity > line.max_quantity:
+            raise ValueError("الكمية المطلوبة تتجاوز المخزون المتاح")
+        if quantity < 1:
+            raise ValueError("الكمية يجب أن تكون 1 على الأقل")
+        if quantity == line.quantity:
+            return
+
+        self._subtotal += line.unit_price * (quantity - line.quantity)
+        line.quantity = quantity
+        self._notify(UPDATED, row)
+        self._notify(TOTALS_CHANGED)
+
+    def remove(self, product_id: int):
+        """حذف بند من السلة"""
+        row = self._row_of.get(product_id)
+        if row is None:
+            return
+
+        self._notify(ABOUT_TO_REMOVE, row)
+        line = self._lines.pop(row)
+        del self._row_of[product_id]
+        for shifted_row in range(row, len(self._lines)):
+            self._row_of[self._lines[shifted_row].product_id] = shifted_row
+        self._subtotal -= line.total
+        self._notify(REMOVED, row)
+        self._notify(TOTALS_CHANGED)
+
+    def set_discount(self, amount):
+        """تعيين مبلغ الخصم"""
+        self._discount = to_decimal(amount)
+        self._notify(TOTALS_CHANGED)
+
+    def set_tax_rate(self, tax_rate):
+        """تحديث معدل الضريبة (نسبة مئوية) عند تغير الإعدادات"""
+        self._tax_rate = to_decimal(tax_rate) / 100
+        self._notify(TOTALS_CHANGED)
+
+    def clear(self):
+        """تفريغ السلة والخصم"""
+        self._notify(ABOUT_TO_RESET)
+        self._lines = []
+        self._row_of = {}
+        self._subtotal = Decimal(0)
+        self._discount = Decimal(0)
+        self._notify(RESET)
+        self._notify(TOTALS_CHANGED)
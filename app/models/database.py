@@ -5,21 +5,139 @@
 """
 
 import sqlite3
+import itertools
 import os
-import bcrypt
+import threading
+import weakref
+from contextlib import contextmanager
 from pathlib import Path
 from datetime import datetime
-from typing import Dict, List, Optional, Any
+from typing import Dict, Iterable, Iterator, List, Optional, Any, Tuple
 import logging
 
+from config.settings import DATABASE_CONFIG, DEBUG_CONFIG
+from .audit_writer import AuditWriter
+from .migrations import run_migrations
+from .query_stats import InstrumentedConnection, query_stats
+
 logger = logging.getLogger(__name__)
 
+# أرقام تسلسلية للاتصالات (id() قد يُعاد استخدامه بعد إغلاق اتصال)
+_slot_serials = itertools.count(1)
+
+
+def _query_stats_active() -> bool:
+    """هل تُغلف الاتصالات: القياس مفعل وهناك عينة أو حد للاستعلامات البطيئة"""
+    return (DEBUG_CONFIG.get('query_stats_enabled', False)
+            and (query_stats.sample_rate > 0 or query_stats.slow_query_ms > 0))
+
+
+class _ThreadSlot:
+    """حاوية اتصال خيط واحد (تُحرر تلقائياً مع انتهاء الخيط)"""
+
+    __slots__ = ('conn', 'generation', 'depth', 'serial', '__weakref__')
+
+    def __init__(self, conn: sqlite3.Connection, generation: int):
+        self.conn = conn
+        self.generation = generation
+        self.depth = 0  # عمق المعاملات المتداخلة المفتوحة على هذا الاتصال
+        self.serial = next(_slot_serials)
+
+
+class ConnectionPool:
+    """مجمع اتصالات دائمة: اتصال واحد لكل خيط لكل ملف قاعدة بيانات"""
+
+    _pools: Dict[str, 'ConnectionPool'] = {}
+    _pools_lock = threading.Lock()
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._slots: 'weakref.WeakSet[_ThreadSlot]' = weakref.WeakSet()
+        self._lock = threading.Lock()
+        self._generation = 0
+
+    @classmethod
+    def for_path(cls, db_path: str) -> 'ConnectionPool':
+        """الحصول على المجمع المشترك لمسار قاعدة البيانات"""
+        key = os.path.abspath(db_path)
+        with cls._pools_lock:
+            pool = cls._pools.get(key)
+            if pool is None:
+                pool = cls(db_path)
+                cls._pools[key] = pool
+            return pool
+
+    def get_connection(self) -> sqlite3.Connection:
+        """الحصول على اتصال الخيط الحالي (يُنشأ مرة واحدة فقط)"""
+        return self.current_slot().conn
+
+    def current_slot(self) -> _ThreadSlot:
+        """الحصول على حاوية اتصال الخيط الحالي"""
+        slot = getattr(self._local, 'slot', None)
+        if slot is not None and slot.generation == self._generation:
+            return slot
+
+        conn = self._open_connection()
+        slot = _ThreadSlot(conn, self._generation)
+        self._local.slot = slot
+        with self._lock:
+            self._slots.add(slot)
+        return slot
+
+    def _open_connection(self) -> sqlite3.Connection:
+        """فتح اتصال جديد وضبط إعدادات PRAGMA مرة واحدة"""
+        timeout = DATABASE_CONFIG.get('busy_timeout_ms', 5000) / 1000
+        # check_same_thread=False يسمح بإغلاق الاتصال من خيط الإيقاف فقط؛
+        # كل اتصال يُستخدم داخل خيطه
+        # InstrumentedConnection يقيس عينة من العبارات والبطيء منها (انظر query_stats)
+        factory = (InstrumentedConnection if _query_stats_active() else sqlite3.Connection)
+        conn = sqlite3.connect(self.db_path, timeout=timeout,
+                               check_same_thread=False, factory=factory)
+        conn.row_factory = sqlite3.Row  # للحصول على النتائج كقاموس
+        conn.execute("PRAGMA foreign_keys = ON")  # تفعيل المفاتيح الأجنبية
+        conn.execute(f"PRAGMA journal_mode = {DATABASE_CONFIG.get('journal_mode', 'WAL')}")
+        conn.execute(f"PRAGMA synchronous = {DATABASE_CONFIG.get('synchronous', 'NORMAL')}")
+        conn.execute(f"PRAGMA cache_size = -{int(DATABASE_CONFIG.get('cache_size_kb', 20000))}")
+        conn.execute(f"PRAGMA mmap_size = {int(DATABASE_CONFIG.get('mmap_size_mb', 256)) * 1024 * 1024}")
+        conn.execute("PRAGMA temp_store = MEMORY")
+        return conn
+
+    def close_all(self) -> bool:
+        """إغلاق جميع اتصالات المجمع (يعيد False إن بقي اتصال مفتوحاً أو فُتح اتصال جديد أثناء الإغلاق)"""
+        with self._lock:
+            self._generation += 1
+            slots = list(self._slots)
+            self._slots = weakref.WeakSet()
+
+        closed = True
+        for slot in slots:
+            try:
+                slot.conn.close()
+            except Exception as e:
+                closed = False
+                logger.warning(f"خطأ في إغلاق اتصال قاعدة البيانات: {str(e)}")
+
+        self._local = threading.local()
+        with self._lock:
+            return closed and not len(self._slots)
+
+    @classmethod
+    def close_all_pools(cls):
+        """إغلاق جميع المجمعات المفتوحة"""
+        with cls._pools_lock:
+            pools = list(cls._pools.values())
+        for pool in pools:
+            pool.close_all()
+
+
 class DatabaseManager:
     """مدير قاعدة البيانات الرئيسي"""
     
     def __init__(self, db_path: str = "data/shop.db"):
         self.db_path = db_path
         self.ensure_db_directory()
+        self.pool = ConnectionPool.for_path(db_path)
     
     def ensure_db_directory(self):
         """التأكد من وجود مجلد قاعدة البيانات"""
@@ -27,387 +145,117 @@ class DatabaseManager:
         db_dir.mkdir(parents=True, exist_ok=True)
     
     def get_connection(self) -> sqlite3.Connection:
-        """الحصول على اتصال بقاعدة البيانات"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row  # للحصول على النتائج كقاموس
-        conn.execute("PRAGMA foreign_keys = ON")  # تفعيل المفاتيح الأجنبية
-        return conn
+        """الحصول على اتصال الخيط الحالي من المجمع"""
+        return self.pool.get_connection()
+    
+    @contextmanager
+    def transaction(self, write: bool = True) -> Iterator[sqlite3.Connection]:
+        """وحدة عمل ذرية: تنفيذ عدة عمليات مع تثبيت واحد في النهاية
+        
+        المعاملات المتداخلة تستخدم SAVEPOINT، فيُلغى الجزء الداخلي فقط عند فشله
+        ويبقى التثبيت الفعلي للمعاملة الخارجية. write=False يبدأ معاملة قراءة
+        (BEGIN DEFERRED) لا تحجز قفل الكتابة.
+        """
+        slot = self.pool.current_slot()
+        conn = slot.conn
+        
+        if slot.depth == 0:
+            conn.execute("BEGIN IMMEDIATE" if write else "BEGIN DEFERRED")
+        else:
+            conn.execute(f"SAVEPOINT sp_{slot.depth}")
+        slot.depth += 1
+        
+        try:
+            yield conn
+        except BaseException:
+            slot.depth -= 1
+            if slot.depth == 0:
+                conn.rollback()
+            else:
+                conn.execute(f"ROLLBACK TO sp_{slot.depth}")
+                conn.execute(f"RELEASE sp_{slot.depth}")
+            raise
+        else:
+            slot.depth -= 1
+            if slot.depth == 0:
+                conn.commit()
+            else:
+                conn.execute(f"RELEASE sp_{slot.depth}")
+    
+    def read_transaction(self):
+        """لقطة قراءة متسقة: كل الاستعلامات داخلها ترى نفس حالة قاعدة البيانات"""
+        return self.transaction(write=False)
+    
+    def in_transaction(self) -> bool:
+        """هل توجد معاملة مفتوحة عبر transaction() في الخيط الحالي"""
+        return self.pool.current_slot().depth > 0
+    
+    @contextmanager
+    def _statement(self) -> Iterator[sqlite3.Connection]:
+        """تنفيذ عبارة منفردة: تثبيت فوري خارج المعاملات، وبدونه داخلها"""
+        conn = self.get_connection()
+        if self.in_transaction():
+            yield conn
+        else:
+            with conn:
+                yield conn
+    
+    def data_version(self) -> Tuple[int, int]:
+        """PRAGMA data_version لاتصال الخيط الحالي مع رقمه التسلسلي
+        (القيمة خاصة بكل اتصال ولا تتغير بكتابات الاتصال نفسه)"""
+        slot = self.pool.current_slot()
+        return slot.serial, slot.conn.execute("PRAGMA data_version").fetchone()[0]
+    
+    def close_connections(self) -> bool:
+        """إغلاق جميع اتصالات قاعدة البيانات المفتوحة لهذا الملف"""
+        return self.pool.close_all()
+    
+    def checkpoint(self):
+        """دمج سجل WAL في ملف قاعدة البيانات الرئيسي"""
+        try:
+            self.get_connection().execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        except Exception as e:
+            logger.warning(f"خطأ في دمج سجل WAL: {str(e)}")
+    
+    @staticmethod
+    def shutdown():
+        """إغلاق جميع الاتصالات عند إيقاف التطبيق وحفظ إحصائيات الاستعلامات"""
+        # أحداث سجل النشاط المعلقة تُكتب قبل إغلاق الاتصالات
+        AuditWriter.shutdown_all()
+        ConnectionPool.close_all_pools()
+        if _query_stats_active():
+            query_stats.dump()
+    
+    @staticmethod
+    def get_query_stats() -> Dict[str, Any]:
+        """إحصائيات الاستعلامات لكل بصمة وآخر الاستعلامات البطيئة"""
+        return {
+            'enabled': _query_stats_active(),
+            'slow_query_ms': query_stats.slow_query_ms,
+            'sample_rate': query_stats.sample_rate,
+            'queries': query_stats.snapshot(),
+            'slow_queries': query_stats.slow_queries()
+        }
+    
+    @staticmethod
+    def reset_query_stats():
+        """تصفير إحصائيات الاستعلامات"""
+        query_stats.reset()
     
     def initialize_database(self):
-        """إنشاء جداول قاعدة البيانات والبيانات الأولية"""
+        """إنشاء جداول قاعدة البيانات أو ترقيتها عبر الترحيلات المرقمة"""
         try:
-            with self.get_connection() as conn:
-                # إنشاء الجداول
-                self._create_tables(conn)
-                # إدراج البيانات الأولية
-                self._insert_initial_data(conn)
-                logger.info("تم إعداد قاعدة البيانات بنجاح")
+            # تنفيذ الترحيلات المعلقة فقط (لا DDL إذا كان المخطط محدثاً)
+            version = run_migrations(self)
+            logger.info(f"تم إعداد قاعدة البيانات بنجاح (إصدار المخطط {version})")
         except Exception as e:
             logger.error(f"خطأ في إعداد قاعدة البيانات: {str(e)}")
             raise
     
-    def _create_tables(self, conn: sqlite3.Connection):
-        """إنشاء جداول قاعدة البيانات"""
-        
-        # جدول المستخدمين
-        conn.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username VARCHAR(50) UNIQUE NOT NULL,
-                password_hash VARCHAR(128) NOT NULL,
-                full_name VARCHAR(100) NOT NULL,
-                role VARCHAR(20) NOT NULL DEFAULT 'Cashier',
-                is_active BOOLEAN DEFAULT 1,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # جدول الفئات
-        conn.execute('''
-            CREATE TABLE IF NOT EXISTS categories (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name VARCHAR(100) NOT NULL,
-                description TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # جدول الموردين
-        conn.execute('''
-            CREATE TABLE IF NOT EXISTS suppliers (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name VARCHAR(100) NOT NULL,
-                contact_person VARCHAR(100),
-                phone VARCHAR(20),
-                email VARCHAR(100),
-                address TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # جدول المنتجات
-        conn.execute('''
-            CREATE TABLE IF NOT EXISTS products (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name VARCHAR(200) NOT NULL,
-                barcode VARCHAR(50),
-                category_id INTEGER,
-                cost_price DECIMAL(10,2) DEFAULT 0,
-                selling_price DECIMAL(10,2) NOT NULL,
-                quantity_in_stock INTEGER DEFAULT 0,
-                minimum_stock INTEGER DEFAULT 5,
-                description TEXT,
-                is_active BOOLEAN DEFAULT 1,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (category_id) REFERENCES categories (id)
-            )
-        ''')
-        
-        # جدول حركة المخزون
-        conn.execute('''
-            CREATE TABLE IF NOT EXISTS stock_movements (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                product_id INTEGER NOT NULL,
-                movement_type VARCHAR(20) NOT NULL,
-                quantity INTEGER NOT NULL,
-                cost_price DECIMAL(10,2),
-                reference_id INTEGER,
-                reference_type VARCHAR(50),
-                notes TEXT,
-                user_id INTEGER,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (product_id) REFERENCES products (id),
-                FOREIGN KEY (user_id) REFERENCES users (id)
-            )
-        ''')
-        
-        # جدول العملاء
-        conn.execute('''
-            CREATE TABLE IF NOT EXISTS customers (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name VARCHAR(100),
-                phone VARCHAR(20),
-                email VARCHAR(100),
-                address TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # جدول المبيعات
-        conn.execute('''
-            CREATE TABLE IF NOT EXISTS sales (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                customer_id INTEGER,
-                total_amount DECIMAL(10,2) NOT NULL,
-                discount_amount DECIMAL(10,2) DEFAULT 0,
-                tax_amount DECIMAL(10,2) DEFAULT 0,
-                final_amount DECIMAL(10,2) NOT NULL,
-                payment_method VARCHAR(50) NOT NULL,
-                status VARCHAR(20) DEFAULT 'completed',
-                notes TEXT,
-                user_id INTEGER,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (customer_id) REFERENCES customers (id),
-                FOREIGN KEY (user_id) REFERENCES users (id)
-            )
-        ''')
-        
-        # جدول عناصر المبيعات
-        conn.execute('''
-            CREATE TABLE IF NOT EXISTS sale_items (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                sale_id INTEGER NOT NULL,
-                product_id INTEGER NOT NULL,
-                quantity INTEGER NOT NULL,
-                unit_price DECIMAL(10,2) NOT NULL,
-                discount_amount DECIMAL(10,2) DEFAULT 0,
-                total_amount DECIMAL(10,2) NOT NULL,
-                FOREIGN KEY (sale_id) REFERENCES sales (id) ON DELETE CASCADE,
-                FOREIGN KEY (product_id) REFERENCES products (id)
-            )
-        ''')
-        
-        # جدول المشتريات
-        conn.execute('''
-            CREATE TABLE IF NOT EXISTS purchases (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                supplier_id INTEGER,
-                total_amount DECIMAL(10,2) NOT NULL,
-                status VARCHAR(20) DEFAULT 'completed',
-                notes TEXT,
-                user_id INTEGER,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (supplier_id) REFERENCES suppliers (id),
-                FOREIGN KEY (user_id) REFERENCES users (id)
-            )
-        ''')
-        
-        # جدول عناصر المشتريات
-        conn.execute('''
-            CREATE TABLE IF NOT EXISTS purchase_items (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                purchase_id INTEGER NOT NULL,
-                product_id INTEGER NOT NULL,
-                quantity INTEGER NOT NULL,
-                unit_cost DECIMAL(10,2) NOT NULL,
-                total_cost DECIMAL(10,2) NOT NULL,
-                FOREIGN KEY (purchase_id) REFERENCES purchases (id) ON DELETE CASCADE,
-                FOREIGN KEY (product_id) REFERENCES products (id)
-            )
-        ''')
-        
-        # جدول تذاكر الصيانة
-        conn.execute('''
-            CREATE TABLE IF NOT EXISTS repair_tickets (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                customer_id INTEGER,
-                device_info VARCHAR(200) NOT NULL,
-                imei VARCHAR(20),
-                problem_description TEXT NOT NULL,
-                repair_type VARCHAR(20) NOT NULL,
-                estimated_cost DECIMAL(10,2),
-                final_cost DECIMAL(10,2),
-                status VARCHAR(20) DEFAULT 'received',
-                technician_id INTEGER,
-                received_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                completed_date TIMESTAMP,
-                notes TEXT,
-                user_id INTEGER,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (customer_id) REFERENCES customers (id),
-                FOREIGN KEY (technician_id) REFERENCES users (id),
-                FOREIGN KEY (user_id) REFERENCES users (id)
-            )
-        ''')
-        
-        # جدول قطع الغيار المستخدمة في الصيانة
-        conn.execute('''
-            CREATE TABLE IF NOT EXISTS repair_parts (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                repair_id INTEGER NOT NULL,
-                product_id INTEGER NOT NULL,
-                quantity INTEGER NOT NULL,
-                unit_price DECIMAL(10,2) NOT NULL,
-                total_price DECIMAL(10,2) NOT NULL,
-                FOREIGN KEY (repair_id) REFERENCES repair_tickets (id) ON DELETE CASCADE,
-                FOREIGN KEY (product_id) REFERENCES products (id)
-            )
-        ''')
-        
-        # جدول المرتجعات
-        conn.execute('''
-            CREATE TABLE IF NOT EXISTS returns (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                sale_id INTEGER,
-                total_amount DECIMAL(10,2) NOT NULL,
-                reason TEXT,
-                status VARCHAR(20) DEFAULT 'processed',
-                user_id INTEGER,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (sale_id) REFERENCES sales (id),
-                FOREIGN KEY (user_id) REFERENCES users (id)
-            )
-        ''')
-        
-        # جدول عناصر المرتجعات
-        conn.execute('''
-            CREATE TABLE IF NOT EXISTS return_items (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                return_id INTEGER NOT NULL,
-                product_id INTEGER NOT NULL,
-                quantity INTEGER NOT NULL,
-                unit_price DECIMAL(10,2) NOT NULL,
-                total_amount DECIMAL(10,2) NOT NULL,
-                condition_status VARCHAR(50) DEFAULT 'good',
-                FOREIGN KEY (return_id) REFERENCES returns (id) ON DELETE CASCADE,
-                FOREIGN KEY (product_id) REFERENCES products (id)
-            )
-        ''')
-        
-        # جدول التحويلات والرصيد
-        conn.execute('''
-            CREATE TABLE IF NOT EXISTS wallet_transfers (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                transfer_type VARCHAR(50) NOT NULL,
-                wallet_type VARCHAR(50) NOT NULL,
-                amount DECIMAL(10,2) NOT NULL,
-                from_account VARCHAR(100),
-                to_account VARCHAR(100),
-                reference_number VARCHAR(100),
-                notes TEXT,
-                user_id INTEGER,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users (id)
-            )
-        ''')
-        
-        # جدول التقفيل اليومي
-        conn.execute('''
-            CREATE TABLE IF NOT EXISTS daily_closes (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                close_date DATE NOT NULL,
-                cash_sales DECIMAL(10,2) DEFAULT 0,
-                card_sales DECIMAL(10,2) DEFAULT 0,
-                wallet_sales DECIMAL(10,2) DEFAULT 0,
-                total_sales DECIMAL(10,2) DEFAULT 0,
-                expenses DECIMAL(10,2) DEFAULT 0,
-                purchases DECIMAL(10,2) DEFAULT 0,
-                returns DECIMAL(10,2) DEFAULT 0,
-                net_profit DECIMAL(10,2) DEFAULT 0,
-                opening_balance DECIMAL(10,2) DEFAULT 0,
-                closing_balance DECIMAL(10,2) DEFAULT 0,
-                notes TEXT,
-                user_id INTEGER,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users (id)
-            )
-        ''')
-        
-        # جدول سجل النشاط
-        conn.execute('''
-            CREATE TABLE IF NOT EXISTS audit_logs (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER,
-                action VARCHAR(100) NOT NULL,
-                table_name VARCHAR(50),
-                record_id INTEGER,
-                old_values TEXT,
-                new_values TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users (id)
-            )
-        ''')
-        
-        # جدول الإعدادات
-        conn.execute('''
-            CREATE TABLE IF NOT EXISTS settings (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                key VARCHAR(100) UNIQUE NOT NULL,
-                value TEXT,
-                description TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-    
-    def _insert_initial_data(self, conn: sqlite3.Connection):
-        """إدراج البيانات الأولية"""
-        
-        # التحقق من وجود مستخدمين
-        cursor = conn.execute("SELECT COUNT(*) FROM users")
-        user_count = cursor.fetchone()[0]
-        
-        if user_count == 0:
-            # إنشاء المستخدم الإداري الافتراضي
-            password_hash = bcrypt.hashpw("admin123".encode('utf-8'), bcrypt.gensalt())
-            conn.execute('''
-                INSERT INTO users (username, password_hash, full_name, role)
-                VALUES (?, ?, ?, ?)
-            ''', ("admin", password_hash.decode('utf-8'), "مدير النظام", "Admin"))
-            
-            # إنشاء مستخدم كاشير للتجربة
-            cashier_password = bcrypt.hashpw("cashier123".encode('utf-8'), bcrypt.gensalt())
-            conn.execute('''
-                INSERT INTO users (username, password_hash, full_name, role)
-                VALUES (?, ?, ?, ?)
-            ''', ("cashier", cashier_password.decode('utf-8'), "كاشير", "Cashier"))
-        
-        # إدراج فئات المنتجات الأولية
-        cursor = conn.execute("SELECT COUNT(*) FROM categories")
-        category_count = cursor.fetchone()[0]
-        
-        if category_count == 0:
-            categories = [
-                ("شاشات", "شاشات الهواتف المحمولة"),
-                ("جرابات", "جرابات وحافظات الهواتف"),
-                ("سماعات", "سماعات الأذن السلكية واللاسلكية"),
-                ("ايربودز", "سماعات البلوتوث اللاسلكية"),
-                ("اكسسوارات", "اكسسوارات الهواتف المتنوعة"),
-                ("شواحن", "شواحن الهواتف والكابلات"),
-                ("وصلات", "كابلات USB ووصلات البيانات"),
-                ("هواتف مستعملة", "هواتف محمولة مستعملة"),
-                ("قطع غيار", "قطع غيار للصيانة")
-            ]
-            
-            for name, desc in categories:
-                conn.execute('''
-                    INSERT INTO categories (name, description)
-                    VALUES (?, ?)
-                ''', (name, desc))
-        
-        # إدراج إعدادات النظام الأولية
-        cursor = conn.execute("SELECT COUNT(*) FROM settings")
-        settings_count = cursor.fetchone()[0]
-        
-        if settings_count == 0:
-            settings = [
-                ("shop_name", "محل الموبايلات", "اسم المحل"),
-                ("shop_address", "الرياض، المملكة العربية السعودية", "عنوان المحل"),
-                ("shop_phone", "+966-XX-XXX-XXXX", "هاتف المحل"),
-                ("currency", "SAR", "العملة المستخدمة"),
-                ("tax_rate", "15", "معدل الضريبة المضافة (%)"),
-                ("receipt_footer", "شكراً لزيارتكم", "نص أسفل الفاتورة"),
-                ("auto_backup", "1", "النسخ الاحتياطي التلقائي (1=مفعل, 0=معطل)")
-            ]
-            
-            for key, value, desc in settings:
-                conn.execute('''
-                    INSERT INTO settings (key, value, description)
-                    VALUES (?, ?, ?)
-                ''', (key, value, desc))
-        
-        conn.commit()
-    
     def execute_query(self, query: str, params: tuple = ()) -> List[sqlite3.Row]:
         """تنفيذ استعلام SELECT وإرجاع النتائج"""
         try:
-            with self.get_connection() as conn:
+            with self._statement() as conn:
                 cursor = conn.execute(query, params)
                 return cursor.fetchall()
         except Exception as e:
@@ -417,9 +265,8 @@ class DatabaseManager:
     def execute_insert(self, query: str, params: tuple = ()) -> int:
         """تنفيذ استعلام INSERT وإرجاع معرف السجل الجديد"""
         try:
-            with self.get_connection() as conn:
+            with self._statement() as conn:
                 cursor = conn.execute(query, params)
-                conn.commit()
                 return cursor.lastrowid
         except Exception as e:
             logger.error(f"خطأ في إدراج البيانات: {str(e)}")
@@ -428,14 +275,23 @@ class DatabaseManager:
     def execute_update(self, query: str, params: tuple = ()) -> int:
         """تنفيذ استعلام UPDATE وإرجاع عدد الصفوف المتأثرة"""
         try:
-            with self.get_connection() as conn:
+            with self._statement() as conn:
                 cursor = conn.execute(query, params)
-                conn.commit()
                 return cursor.rowcount
         except Exception as e:
             logger.error(f"خطأ في تحديث البيانات: {str(e)}")
             raise
     
+    def execute_many(self, query: str, params_seq: Iterable[tuple]) -> int:
+        """تنفيذ استعلام واحد لعدة صفوف دفعة واحدة وإرجاع عدد الصفوف المتأثرة"""
+        try:
+            with self._statement() as conn:
+                cursor = conn.executemany(query, params_seq)
+                return cursor.rowcount
+        except Exception as e:
+            logger.error(f"خطأ في التنفيذ الجماعي: {str(e)}")
+            raise
+    
     def get_setting(self, key: str) -> Optional[str]:
         """الحصول على قيمة إعداد معين"""
         try:
@@ -448,13 +304,20 @@ class DatabaseManager:
             logger.error(f"خطأ في الحصول على الإعداد {key}: {str(e)}")
             return None
     
-    def set_setting(self, key: str, value: str) -> bool:
-        """تعديل قيمة إعداد معين"""
+    def set_setting(self, key: str, value: str, description: str = None) -> bool:
+        """تعديل قيمة إعداد عبر خدمة الإعدادات (تحديث ذاكرتها وإبلاغ مشتركيها)"""
+        from app.services.settings_service import SettingsService
+        return SettingsService.for_db(self).set(key, value, description)
+    
+    def _write_setting(self, key: str, value: str, description: str = None) -> bool:
+        """كتابة صف الإعداد في الجدول مباشرة (تستدعيها SettingsService فقط)"""
         try:
-            updated = self.execute_update(
-                "UPDATE settings SET value = ?, updated_at = CURRENT_TIMESTAMP WHERE key = ?",
-                (value, key)
-            )
+            updated = self.execute_update("""
+                INSERT INTO settings (key, value, description) VALUES (?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET
+                    value = excluded.value,
+                    updated_at = CURRENT_TIMESTAMP
+            """, (key, value, description))
             return updated > 0
         except Exception as e:
             logger.error(f"خطأ في تعديل الإعداد {key}: {str(e)}")
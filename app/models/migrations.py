@@ -0,0 +1,772 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ترحيلات مخطط قاعدة البيانات - Schema Migrations
+
+كل ترحيل خطوة مرقمة تُنفذ مرة واحدة داخل معاملة، ويُحفظ رقم آخر ترحيل
+منفذ في PRAGMA user_version. عند تطابق الإصدار لا يُنفذ أي DDL عند التشغيل.
+"""
+
+import sqlite3
+import bcrypt
+from typing import Callable, List, Tuple
+import logging
+from app.utils.arabic_text import normalize_sql
+
+logger = logging.getLogger(__name__)
+
+
+def _migration_001_base_schema(conn: sqlite3.Connection):
+    """إنشاء الجداول الأساسية والبيانات الأولية"""
+    _create_tables(conn)
+    _insert_initial_data(conn)
+
+
+def _create_tables(conn: sqlite3.Connection):
+    """إنشاء جداول قاعدة البيانات"""
+    
+    # جدول المستخدمين
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username VARCHAR(50) UNIQUE NOT NULL,
+            password_hash VARCHAR(128) NOT NULL,
+            full_name VARCHAR(100) NOT NULL,
+            role VARCHAR(20) NOT NULL DEFAULT 'Cashier',
+            is_active BOOLEAN DEFAULT 1,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    
+    # جدول الفئات
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS categories (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name VARCHAR(100) NOT NULL,
+            description TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    
+    # جدول الموردين
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS suppliers (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name VARCHAR(100) NOT NULL,
+            contact_person VARCHAR(100),
+            phone VARCHAR(20),
+            email VARCHAR(100),
+            address TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    
+    # جدول المنتجات
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS products (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name VARCHAR(200) NOT NULL,
+            barcode VARCHAR(50),
+            category_id INTEGER,
+            cost_price DECIMAL(10,2) DEFAULT 0,
+            selling_price DECIMAL(10,2) NOT NULL,
+            quantity_in_stock INTEGER DEFAULT 0,
+            minimum_stock INTEGER DEFAULT 5,
+            description TEXT,
+            is_active BOOLEAN DEFAULT 1,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (category_id) REFERENCES categories (id)
+        )
+    ''')
+    
+    # جدول حركة المخزون
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS stock_movements (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            product_id INTEGER NOT NULL,
+            movement_type VARCHAR(20) NOT NULL,
+            quantity INTEGER NOT NULL,
+            cost_price DECIMAL(10,2),
+            reference_id INTEGER,
+            reference_type VARCHAR(50),
+            notes TEXT,
+            user_id INTEGER,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (product_id) REFERENCES products (id),
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+    ''')
+    
+    # جدول العملاء
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS customers (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name VARCHAR(100),
+            phone VARCHAR(20),
+            email VARCHAR(100),
+            address TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    
+    # جدول المبيعات
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS sales (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            customer_id INTEGER,
+            total_amount DECIMAL(10,2) NOT NULL,
+            discount_amount DECIMAL(10,2) DEFAULT 0,
+            tax_amount DECIMAL(10,2) DEFAULT 0,
+            final_amount DECIMAL(10,2) NOT NULL,
+            payment_method VARCHAR(50) NOT NULL,
+            status VARCHAR(20) DEFAULT 'completed',
+            notes TEXT,
+            user_id INTEGER,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (customer_id) REFERENCES customers (id),
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+    ''')
+    
+    # جدول عناصر المبيعات
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS sale_items (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            sale_id INTEGER NOT NULL,
+            product_id INTEGER NOT NULL,
+            quantity INTEGER NOT NULL,
+            unit_price DECIMAL(10,2) NOT NULL,
+            discount_amount DECIMAL(10,2) DEFAULT 0,
+            total_amount DECIMAL(10,2) NOT NULL,
+            FOREIGN KEY (sale_id) REFERENCES sales (id) ON DELETE CASCADE,
+            FOREIGN KEY (product_id) REFERENCES products (id)
+        )
+    ''')
+    
+    # جدول المشتريات
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS purchases (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            supplier_id INTEGER,
+            total_amount DECIMAL(10,2) NOT NULL,
+            status VARCHAR(20) DEFAULT 'completed',
+            notes TEXT,
+            user_id INTEGER,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (supplier_id) REFERENCES suppliers (id),
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+    ''')
+    
+    # جدول عناصر المشتريات
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS purchase_items (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            purchase_id INTEGER NOT NULL,
+            product_id INTEGER NOT NULL,
+            quantity INTEGER NOT NULL,
+            unit_cost DECIMAL(10,2) NOT NULL,
+            total_cost DECIMAL(10,2) NOT NULL,
+            FOREIGN KEY (purchase_id) REFERENCES purchases (id) ON DELETE CASCADE,
+            FOREIGN KEY (product_id) REFERENCES products (id)
+        )
+    ''')
+    
+    # جدول تذاكر الصيانة
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS repair_tickets (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            customer_id INTEGER,
+            device_info VARCHAR(200) NOT NULL,
+            imei VARCHAR(20),
+            problem_description TEXT NOT NULL,
+            repair_type VARCHAR(20) NOT NULL,
+            estimated_cost DECIMAL(10,2),
+            final_cost DECIMAL(10,2),
+            status VARCHAR(20) DEFAULT 'received',
+            technician_id INTEGER,
+            received_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            completed_date TIMESTAMP,
+            notes TEXT,
+            user_id INTEGER,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (customer_id) REFERENCES customers (id),
+            FOREIGN KEY (technician_id) REFERENCES users (id),
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+    ''')
+    
+    # جدول قطع الغيار المستخدمة في الصيانة
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS repair_parts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            repair_id INTEGER NOT NULL,
+            product_id INTEGER NOT NULL,
+            quantity INTEGER NOT NULL,
+            unit_price DECIMAL(10,2) NOT NULL,
+            total_price DECIMAL(10,2) NOT NULL,
+            FOREIGN KEY (repair_id) REFERENCES repair_tickets (id) ON DELETE CASCADE,
+            FOREIGN KEY (product_id) REFERENCES products (id)
+        )
+    ''')
+    
+    # جدول المرتجعات
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS returns (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            sale_id INTEGER,
+            total_amount DECIMAL(10,2) NOT NULL,
+            reason TEXT,
+            status VARCHAR(20) DEFAULT 'processed',
+            user_id INTEGER,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (sale_id) REFERENCES sales (id),
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+    ''')
+    
+    # جدول عناصر المرتجعات
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS return_items (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            return_id INTEGER NOT NULL,
+            product_id INTEGER NOT NULL,
+            quantity INTEGER NOT NULL,
+            unit_price DECIMAL(10,2) NOT NULL,
+            total_amount DECIMAL(10,2) NOT NULL,
+            condition_status VARCHAR(50) DEFAULT 'good',
+            FOREIGN KEY (return_id) REFERENCES returns (id) ON DELETE CASCADE,
+            FOREIGN KEY (product_id) REFERENCES products (id)
+        )
+    ''')
+    
+    # جدول التحويلات والرصيد
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS wallet_transfers (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            transfer_type VARCHAR(50) NOT NULL,
+            wallet_type VARCHAR(50) NOT NULL,
+            amount DECIMAL(10,2) NOT NULL,
+            from_account VARCHAR(100),
+            to_account VARCHAR(100),
+            reference_number VARCHAR(100),
+            notes TEXT,
+            user_id INTEGER,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+    ''')
+    
+    # جدول التقفيل اليومي
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS daily_closes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            close_date DATE NOT NULL,
+            cash_sales DECIMAL(10,2) DEFAULT 0,
+            card_sales DECIMAL(10,2) DEFAULT 0,
+            wallet_sales DECIMAL(10,2) DEFAULT 0,
+            total_sales DECIMAL(10,2) DEFAULT 0,
+            expenses DECIMAL(10,2) DEFAULT 0,
+            purchases DECIMAL(10,2) DEFAULT 0,
+            returns DECIMAL(10,2) DEFAULT 0,
+            net_profit DECIMAL(10,2) DEFAULT 0,
+            opening_balance DECIMAL(10,2) DEFAULT 0,
+            closing_balance DECIMAL(10,2) DEFAULT 0,
+            notes TEXT,
+            user_id INTEGER,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+    ''')
+    
+    # جدول سجل النشاط
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS audit_logs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            action VARCHAR(100) NOT NULL,
+            table_name VARCHAR(50),
+            record_id INTEGER,
+            old_values TEXT,
+            new_values TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+    ''')
+    
+    # جدول الإعدادات
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS settings (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            key VARCHAR(100) UNIQUE NOT NULL,
+            value TEXT,
+            description TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+
+def _insert_initial_data(conn: sqlite3.Connection):
+    """إدراج البيانات الأولية"""
+    
+    # التحقق من وجود مستخدمين
+    cursor = conn.execute("SELECT COUNT(*) FROM users")
+    user_count = cursor.fetchone()[0]
+    
+    if user_count == 0:
+        # إنشاء المستخدم الإداري الافتراضي
+        password_hash = bcrypt.hashpw("admin123".encode('utf-8'), bcrypt.gensalt())
+        conn.execute('''
+            INSERT INTO users (username, password_hash, full_name, role)
+            VALUES (?, ?, ?, ?)
+        ''', ("admin", password_hash.decode('utf-8'), "مدير النظام", "Admin"))
+        
+        # إنشاء مستخدم كاشير للتجربة
+        cashier_password = bcrypt.hashpw("cashier123".encode('utf-8'), bcrypt.gensalt())
+        conn.execute('''
+            INSERT INTO users (username, password_hash, full_name, role)
+            VALUES (?, ?, ?, ?)
+        ''', ("cashier", cashier_password.decode('utf-8'), "كاشير", "Cashier"))
+    
+    # إدراج فئات المنتجات الأولية
+    cursor = conn.execute("SELECT COUNT(*) FROM categories")
+    category_count = cursor.fetchone()[0]
+    
+    if category_count == 0:
+        categories = [
+            ("شاشات", "شاشات الهواتف المحمولة"),
+            ("جرابات", "جرابات وحافظات الهواتف"),
+            ("سماعات", "سماعات الأذن السلكية واللاسلكية"),
+            ("ايربودز", "سماعات البلوتوث اللاسلكية"),
+            ("اكسسوارات", "اكسسوارات الهواتف المتنوعة"),
+            ("شواحن", "شواحن الهواتف والكابلات"),
+            ("وصلات", "كابلات USB ووصلات البيانات"),
+            ("هواتف مستعملة", "هواتف محمولة مستعملة"),
+            ("قطع غيار", "قطع غيار للصيانة")
+        ]
+        
+        for name, desc in categories:
+            conn.execute('''
+                INSERT INTO categories (name, description)
+                VALUES (?, ?)
+            ''', (name, desc))
+    
+    # إدراج إعدادات النظام الأولية
+    cursor = conn.execute("SELECT COUNT(*) FROM settings")
+    settings_count = cursor.fetchone()[0]
+    
+    if settings_count == 0:
+        settings = [
+            ("shop_name", "محل الموبايلات", "اسم المحل"),
+            ("shop_address", "الرياض، المملكة العربية السعودية", "عنوان المحل"),
+            ("shop_phone", "+966-XX-XXX-XXXX", "هاتف المحل"),
+            ("currency", "SAR", "العملة المستخدمة"),
+            ("tax_rate", "15", "معدل الضريبة المضافة (%)"),
+            ("receipt_footer", "شكراً لزيارتكم", "نص أسفل الفاتورة"),
+            ("auto_backup", "1", "النسخ الاحتياطي التلقائي (1=مفعل, 0=معطل)")
+        ]
+        
+        for key, value, desc in settings:
+            conn.execute('''
+                INSERT INTO settings (key, value, description)
+                VALUES (?, ?, ?)
+            ''', (key, value, desc))
+
+
+def _migration_002_hot_path_indexes(conn: sqlite3.Connection):
+    """فهارس مسارات الوصول الأكثر استخداماً"""
+    indexes = [
+        ("idx_sales_status_created_at", "sales (status, created_at)"),
+        ("idx_sale_items_sale_id", "sale_items (sale_id)"),
+        ("idx_sale_items_product_id", "sale_items (product_id)"),
+        ("idx_stock_movements_product_created_at", "stock_movements (product_id, created_at)"),
+        ("idx_products_barcode", "products (barcode)"),
+        ("idx_customers_phone", "customers (phone)"),
+        ("idx_repair_tickets_status_received_date", "repair_tickets (status, received_date)"),
+        ("idx_repair_tickets_technician_id", "repair_tickets (technician_id)"),
+        ("idx_audit_logs_created_at", "audit_logs (created_at)"),
+    ]
+    
+    for name, target in indexes:
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {target}")
+
+
+def _migration_003_date_range_indexes(conn: sqlite3.Connection):
+    """فهارس أعمدة التاريخ المستخدمة في التصفية بالنطاقات دون شرط حالة"""
+    indexes = [
+        ("idx_repair_tickets_received_date", "repair_tickets (received_date)"),
+        ("idx_returns_created_at", "returns (created_at)"),
+        ("idx_stock_movements_created_at", "stock_movements (created_at)"),
+    ]
+    
+    for name, target in indexes:
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {target}")
+
+
+def _migration_004_products_fts(conn: sqlite3.Connection):
+    """فهرس بحث نصي FTS5 للمنتجات بنص عربي موحد، مع مشغلات المزامنة"""
+    conn.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+            name, barcode, category, description,
+            tokenize = 'unicode61 remove_diacritics 2'
+        )
+    """)
+    
+    # الصف في الفهرس يحمل نفس معرف المنتج (rowid = products.id)
+    def index_select(alias: str) -> str:
+        return f"""
+            SELECT {alias}.id,
+                   {normalize_sql(f"{alias}.name")},
+                   {normalize_sql(f"{alias}.barcode")},
+                   {normalize_sql(f"(SELECT name FROM categories WHERE id = {alias}.category_id)")},
+                   {normalize_sql(f"{alias}.description")}
+        """
+    
+    insert_sql = "INSERT INTO products_fts (rowid, name, barcode, category, description)"
+    
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_products_fts_insert AFTER INSERT ON products
+        BEGIN
+            {insert_sql} {index_select("new")};
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_products_fts_update
+        AFTER UPDATE OF name, barcode, category_id, description ON products
+        BEGIN
+            DELETE FROM products_fts WHERE rowid = old.id;
+            {insert_sql} {index_select("new")};
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_products_fts_delete AFTER DELETE ON products
+        BEGIN
+            DELETE FROM products_fts WHERE rowid = old.id;
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_categories_fts_update AFTER UPDATE OF name ON categories
+        BEGIN
+            DELETE FROM products_fts
+            WHERE rowid IN (SELECT id FROM products WHERE category_id = new.id);
+            {insert_sql} {index_select("p")} FROM products p WHERE p.category_id = new.id;
+        END
+    """)
+    
+    # تعبئة الفهرس بالمنتجات الموجودة
+    conn.execute("DELETE FROM products_fts")
+    conn.execute(f"{insert_sql} {index_select('p')} FROM products p")
+
+
+def _migration_005_sales_rollups(conn: sqlite3.Connection):
+    """جداول تجميع المبيعات اليومية (تُعبأ من البيانات الحالية في الترحيل 11)"""
+    # تكلفة الوحدة وقت البيع حتى لا تتغير الأرباح السابقة بتغير سعر التكلفة
+    conn.execute("ALTER TABLE sale_items ADD COLUMN unit_cost DECIMAL(10,2)")
+    conn.execute("""
+        UPDATE sale_items
+        SET unit_cost = (SELECT cost_price FROM products WHERE products.id = sale_items.product_id)
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_return_items_return_id ON return_items (return_id)")
+    
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS sales_daily_rollup (
+            day TEXT PRIMARY KEY,
+            transactions INTEGER NOT NULL DEFAULT 0,
+            subtotal REAL NOT NULL DEFAULT 0,
+            discount_amount REAL NOT NULL DEFAULT 0,
+            tax_amount REAL NOT NULL DEFAULT 0,
+            final_amount REAL NOT NULL DEFAULT 0,
+            cogs REAL NOT NULL DEFAULT 0,
+            items_sold INTEGER NOT NULL DEFAULT 0,
+            returns_count INTEGER NOT NULL DEFAULT 0,
+            returns_amount REAL NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS sales_payment_rollup (
+            day TEXT NOT NULL,
+            payment_method VARCHAR(20) NOT NULL,
+            user_id INTEGER NOT NULL,
+            transactions INTEGER NOT NULL DEFAULT 0,
+            subtotal REAL NOT NULL DEFAULT 0,
+            discount_amount REAL NOT NULL DEFAULT 0,
+            tax_amount REAL NOT NULL DEFAULT 0,
+            final_amount REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, payment_method, user_id)
+        ) WITHOUT ROWID
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS sales_item_rollup (
+            day TEXT NOT NULL,
+            payment_method VARCHAR(20) NOT NULL,
+            product_id INTEGER NOT NULL,
+            category_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            quantity INTEGER NOT NULL DEFAULT 0,
+            revenue REAL NOT NULL DEFAULT 0,
+            cogs REAL NOT NULL DEFAULT 0,
+            returned_quantity INTEGER NOT NULL DEFAULT 0,
+            returned_amount REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, payment_method, product_id, category_id, user_id)
+        ) WITHOUT ROWID
+    """)
+
+
+def _migration_006_change_generations(conn: sqlite3.Connection):
+    """عدادات تغيير لكل جدول تزيدها المشغلات مع كل كتابة"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS change_generations (
+            table_name TEXT PRIMARY KEY,
+            generation INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+    """)
+    
+    for table in ('sales', 'returns', 'repair_tickets', 'products', 'customers', 'daily_closes'):
+        conn.execute(
+            "INSERT OR IGNORE INTO change_generations (table_name, generation) VALUES (?, 0)",
+            (table,)
+        )
+        for operation in ('INSERT', 'UPDATE', 'DELETE'):
+            conn.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS {table}_generation_{operation.lower()}
+                AFTER {operation} ON {table} BEGIN
+                    UPDATE change_generations SET generation = generation + 1
+                    WHERE table_name = '{table}';
+                END
+            """)
+
+
+def _migration_007_audit_log_user_index(conn: sqlite3.Connection):
+    """فهرس سجل النشاط لكل مستخدم (ترقيم الصفحات بالمؤشر created_at, id)"""
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_audit_logs_user_created_at ON audit_logs (user_id, created_at)")
+
+
+def _migration_008_roles_permissions(conn: sqlite3.Connection):
+    """جداول الأدوار والصلاحيات مع الصلاحيات الافتراضية لكل دور"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS roles (
+            name VARCHAR(20) PRIMARY KEY,
+            display_name VARCHAR(100) NOT NULL,
+            all_permissions BOOLEAN NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS permissions (
+            name VARCHAR(50) PRIMARY KEY,
+            description VARCHAR(200)
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS role_permissions (
+            role VARCHAR(20) NOT NULL REFERENCES roles (name) ON UPDATE CASCADE ON DELETE CASCADE,
+            permission VARCHAR(50) NOT NULL REFERENCES permissions (name) ON UPDATE CASCADE ON DELETE CASCADE,
+            PRIMARY KEY (role, permission)
+        ) WITHOUT ROWID
+    """)
+    
+    conn.executemany("INSERT OR IGNORE INTO permissions (name, description) VALUES (?, ?)", [
+        ('create_sale', 'إنشاء فاتورة بيع'),
+        ('view_sales', 'عرض المبيعات'),
+        ('void_sale', 'إلغاء فاتورة'),
+        ('create_return', 'إنشاء مرتجع'),
+        ('create_customer', 'إضافة عميل'),
+        ('view_products', 'عرض المنتجات'),
+        ('manage_products', 'إدارة المنتجات'),
+        ('manage_categories', 'إدارة الفئات'),
+        ('update_stock', 'تعديل المخزون'),
+        ('create_repair', 'إنشاء تذكرة صيانة'),
+        ('update_repair', 'تحديث تذكرة صيانة'),
+        ('view_repairs', 'عرض تذاكر الصيانة'),
+        ('use_parts', 'صرف قطع الغيار'),
+        ('view_reports_basic', 'عرض التقارير'),
+        ('daily_close', 'التقفيل اليومي'),
+        ('view_audit_log', 'عرض سجل النشاط'),
+        ('manage_users', 'إدارة المستخدمين'),
+        ('view_diagnostics', 'شاشة تشخيص الأداء'),
+    ])
+    
+    conn.executemany(
+        "INSERT OR IGNORE INTO roles (name, display_name, all_permissions) VALUES (?, ?, ?)", [
+            ('Admin', 'مدير النظام', 1),
+            ('Manager', 'مدير', 0),
+            ('Cashier', 'كاشير', 0),
+            ('Technician', 'فني صيانة', 0),
+            ('Viewer', 'مشاهد', 0),
+        ]
+    )
+    
+    cashier = ['create_sale', 'view_sales', 'create_return', 'view_products',
+               'update_stock', 'create_customer', 'view_reports_basic']
+    technician = ['create_repair', 'update_repair', 'view_repairs', 'view_products', 'use_parts']
+    defaults = {
+        'Cashier': cashier,
+        'Technician': technician,
+        'Manager': sorted(set(cashier + technician) | {
+            'void_sale', 'manage_products', 'manage_categories', 'daily_close', 'view_audit_log'
+        }),
+        'Viewer': ['view_sales', 'view_products', 'view_repairs', 'view_reports_basic'],
+    }
+    conn.executemany(
+        "INSERT OR IGNORE INTO role_permissions (role, permission) VALUES (?, ?)",
+        [(role, permission) for role, permissions in defaults.items() for permission in permissions]
+    )
+    
+    # تعديل الأدوار من أي عملية يظهر لبقية العمليات عبر عداد التغيير
+    conn.execute("INSERT OR IGNORE INTO change_generations (table_name, generation) VALUES ('roles', 0)")
+    for table in ('roles', 'role_permissions'):
+        for operation in ('INSERT', 'UPDATE', 'DELETE'):
+            conn.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS {table}_generation_{operation.lower()}
+                AFTER {operation} ON {table} BEGIN
+                    UPDATE change_generations SET generation = generation + 1
+                    WHERE table_name = 'roles';
+                END
+            """)
+
+
+def _migration_009_change_log(conn: sqlite3.Connection):
+    """سجل تغييرات خفيف تكتبه المشغلات لتلتقطه النوافذ المفتوحة في العمليات الأخرى"""
+    # AUTOINCREMENT حتى لا تُعاد المعرفات بعد حذف السجلات القديمة (مؤشر القراءة يعتمد عليها)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS change_log (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            event VARCHAR(30) NOT NULL,
+            entity_id INTEGER,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    
+    triggers = [
+        ('sales_change_log_insert', "AFTER INSERT ON sales", "'sale.created'"),
+        ('sales_change_log_status', "AFTER UPDATE OF status ON sales "
+                                    "WHEN OLD.status IS NOT NEW.status", "'sale.updated'"),
+        ('products_change_log_insert', "AFTER INSERT ON products", "'product.updated'"),
+        ('products_change_log_update', "AFTER UPDATE ON products", """
+            CASE WHEN OLD.quantity_in_stock IS NOT NEW.quantity_in_stock
+                 THEN 'stock.changed' ELSE 'product.updated' END"""),
+        ('repair_tickets_change_log_insert', "AFTER INSERT ON repair_tickets", "'repair.created'"),
+        ('repair_tickets_change_log_update', "AFTER UPDATE ON repair_tickets", """
+            CASE WHEN OLD.status IS NOT NEW.status
+                 THEN 'repair.status_changed' ELSE 'repair.updated' END"""),
+    ]
+    for name, timing, event in triggers:
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {name}
+            {timing} BEGIN
+                INSERT INTO change_log (event, entity_id) VALUES ({event}, NEW.id);
+            END
+        """)
+
+
+def _migration_010_closed_day_generations(conn: sqlite3.Connection):
+    """عدادات تعديل الفترات المقفلة: تزيد فقط عند كتابة صف يقع يومه المحلي في تقفيل يومي"""
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_daily_closes_close_date ON daily_closes (close_date)")
+    
+    day_columns = {'sales': 'created_at', 'returns': 'created_at', 'repair_tickets': 'received_date'}
+    for table, column in day_columns.items():
+        conn.execute(
+            "INSERT OR IGNORE INTO change_generations (table_name, generation) VALUES (?, 0)",
+            (f"{table}_closed",)
+        )
+        days = {
+            'INSERT': f"DATE(NEW.{column}, 'localtime')",
+            'UPDATE': f"DATE(OLD.{column}, 'localtime'), DATE(NEW.{column}, 'localtime')",
+            'DELETE': f"DATE(OLD.{column}, 'localtime')",
+        }
+        for operation, day in days.items():
+            conn.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS {table}_closed_generation_{operation.lower()}
+                AFTER {operation} ON {table}
+                WHEN EXISTS (SELECT 1 FROM daily_closes WHERE close_date IN ({day})) BEGIN
+                    UPDATE change_generations SET generation = generation + 1
+                    WHERE table_name = '{table}_closed';
+                END
+            """)
+    
+    # تقارير الفترات المقفلة تعرض أسماء المنتجات فقط (تغير المخزون لا يمسها)
+    conn.execute("INSERT OR IGNORE INTO change_generations (table_name, generation) VALUES ('products_closed', 0)")
+    for name, timing in (('products_closed_generation_name', "AFTER UPDATE OF name ON products "
+                                                            "WHEN OLD.name IS NOT NEW.name"),
+                         ('products_closed_generation_delete', "AFTER DELETE ON products")):
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {name}
+            {timing} BEGIN
+                UPDATE change_generations SET generation = generation + 1
+                WHERE table_name = 'products_closed';
+            END
+        """)
+
+
+def _migration_011_sale_items_category(conn: sqlite3.Connection):
+    """تصنيف المنتج وقت البيع حتى لا تنحرف تجميعات الأصناف عند تغيير التصنيف ثم الإلغاء"""
+    from .sales_rollup import rebuild
+    
+    conn.execute("ALTER TABLE sale_items ADD COLUMN category_id INTEGER")
+    conn.execute("""
+        UPDATE sale_items
+        SET category_id = (SELECT category_id FROM products WHERE products.id = sale_items.product_id)
+    """)
+    
+    # التجميعات السابقة مفتاحها تصنيف المنتج الحالي وقت الكتابة؛ تُبنى من جديد على اللقطة
+    rebuild(conn)
+
+# قائمة الترحيلات المرقمة (يجب أن تكون الأرقام متزايدة ولا تُعدل بعد النشر)
+MIGRATIONS: List[Tuple[int, str, Callable[[sqlite3.Connection], None]]] = [
+    (1, "الجداول الأساسية والبيانات الأولية", _migration_001_base_schema),
+    (2, "فهارس مسارات الوصول الأساسية", _migration_002_hot_path_indexes),
+    (3, "فهارس نطاقات التاريخ", _migration_003_date_range_indexes),
+    (4, "فهرس البحث النصي للمنتجات", _migration_004_products_fts),
+    (5, "جداول تجميع المبيعات اليومية", _migration_005_sales_rollups),
+    (6, "عدادات تغيير الجداول", _migration_006_change_generations),
+    (7, "فهرس سجل النشاط لكل مستخدم", _migration_007_audit_log_user_index),
+    (8, "جداول الأدوار والصلاحيات", _migration_008_roles_permissions),
+    (9, "سجل التغييرات للإشعارات بين العمليات", _migration_009_change_log),
+    (10, "عدادات تعديل الفترات المقفلة", _migration_010_closed_day_generations),
+    (11, "تصنيف المنتج في عناصر الفاتورة وقت البيع", _migration_011_sale_items_category),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    """قراءة إصدار المخطط الحالي من PRAGMA user_version"""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def run_migrations(db) -> int:
+    """تنفيذ الترحيلات المعلقة وإرجاع إصدار المخطط بعد التنفيذ"""
+    current_version = get_schema_version(db.get_connection())
+    
+    if current_version > SCHEMA_VERSION:
+        logger.warning(
+            f"إصدار مخطط قاعدة البيانات ({current_version}) أحدث من إصدار التطبيق ({SCHEMA_VERSION})"
+        )
+        return current_version
+    
+    if current_version == SCHEMA_VERSION:
+        return current_version
+    
+    for version, description, migrate in MIGRATIONS:
+        if version <= current_version:
+            continue
+        
+        with db.transaction() as conn:
+            # إعادة التحقق بعد الحصول على قفل الكتابة (قد يكون تطبيق آخر سبقنا)
+            if get_schema_version(conn) >= version:
+                continue
+            
+            migrate(conn)
+            conn.execute(f"PRAGMA user_version = {version}")
+        
+        logger.info(f"تم تنفيذ الترحيل {version}: {description}")
+        current_version = version
+    
+    return current_version
@@ -7,6 +7,8 @@
 from datetime import datetime
 from typing import Dict, List, Optional
 from .database import DatabaseManager
+from app.utils.date_range import date_range_clause
+from app.utils.arabic_text import fts_prefix_query
 
 class Category:
     """فئة التصنيف"""
@@ -71,40 +73,45 @@ class Product:
             print(f"خطأ في الحصول على المنتج: {str(e)}")
             return None
     
-    def search_products(self, search_term: str) -> List[Dict]:
-        """البحث عن المنتجات"""
+    def get_products_by_ids(self, product_ids: List[int]) -> List[Dict]:
+        """الحصول على عدة منتجات نشطة باستعلام واحد"""
         try:
-            search_pattern = f"%{search_term}%"
-            result = self.db.execute_query("""
+            unique_ids = list(dict.fromkeys(product_ids))
+            if not unique_ids:
+                return []
+            
+            placeholders = ", ".join("?" * len(unique_ids))
+            result = self.db.execute_query(f"""
                 SELECT p.*, c.name as category_name 
                 FROM products p 
                 LEFT JOIN categories c ON p.category_id = c.id
-                WHERE (p.name LIKE ? OR p.barcode LIKE ? OR p.model LIKE ?) 
-                AND p.is_active = 1
-                ORDER BY p.name
-                LIMIT 50
-            """, (search_pattern, search_pattern, search_pattern))
-            
+                WHERE p.id IN ({placeholders}) AND p.is_active = 1
+            """, tuple(unique_ids))
             return [dict(row) for row in result]
-            
         except Exception as e:
-            print(f"خطأ في البحث عن المنتجات: {str(e)}")
+            print(f"خطأ في الحصول على المنتجات: {str(e)}")
             return []
-        """البحث عن المنتجات"""
+    
+    def search_products(self, search_term: str, limit: int = 50) -> List[Dict]:
+        """البحث عن المنتجات عبر فهرس FTS5 بمطابقة البادئة وترتيب bm25"""
         try:
-            search_pattern = f"%{search_term}%"
+            match_query = fts_prefix_query(search_term)
+            if not match_query:
+                return []
+            
+            # الأوزان: الاسم، الباركود، الفئة، الوصف
             result = self.db.execute_query("""
                 SELECT p.*, c.name as category_name 
-                FROM products p 
+                FROM products_fts f
+                JOIN products p ON p.id = f.rowid
                 LEFT JOIN categories c ON p.category_id = c.id
-                WHERE p.is_active = 1 AND (
-                    p.name LIKE ? OR 
-                    p.barcode LIKE ? OR 
-                    c.name LIKE ?
-                )
-                ORDER BY p.name
-            """, (search_pattern, search_pattern, search_pattern))
+                WHERE products_fts MATCH ? AND p.is_active = 1
+                ORDER BY bm25(products_fts, 10.0, 8.0, 3.0, 1.0), p.name
+                LIMIT ?
+            """, (match_query, limit))
+            
             return [dict(row) for row in result]
+            
         except Exception as e:
             print(f"خطأ في البحث عن المنتجات: {str(e)}")
             return []
@@ -247,13 +254,9 @@ class Product:
                 query += " AND sm.product_id = ?"
                 params.append(product_id)
             
-            if start_date:
-                query += " AND DATE(sm.created_at) >= ?"
-                params.append(start_date)
-            
-            if end_date:
-                query += " AND DATE(sm.created_at) <= ?"
-                params.append(end_date)
+            date_clause, date_params = date_range_clause('sm.created_at', start_date, end_date)
+            query += date_clause
+            params.extend(date_params)
             
             query += " ORDER BY sm.created_at DESC"
             
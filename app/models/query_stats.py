@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+إحصائيات الاستعلامات - Query Statistics
+
+كل اتصال من المجمع يُفتح بصنف InstrumentedConnection. عينة من العبارات
+(query_stats_sample_rate) يُقاس زمنها كاملاً (التنفيذ مع جلب الصفوف) ويُسجل
+تحت بصمة الاستعلام (النص بعد استبدال القيم الثابتة بـ ?)، وبقية العبارات
+يُقاس تنفيذها فقط. العبارات التي تتجاوز الحد تُكتب في سجل الاستعلامات
+البطيئة مع خطة EXPLAIN QUERY PLAN الخاصة بها سواء وقعت في العينة أم لا.
+"""
+
+import json
+import math
+import random
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional
+import logging
+
+from config.settings import DEBUG_CONFIG
+
+logger = logging.getLogger(__name__)
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+_FINGERPRINT_CACHE_SIZE = 4096
+
+
+def fingerprint(sql: str) -> str:
+    """بصمة الاستعلام: القيم الثابتة وقوائم IN تُستبدل بعلامات موحدة"""
+    text = _STRING_LITERAL.sub('?', sql)
+    text = _NUMBER_LITERAL.sub('?', text)
+    text = _WHITESPACE.sub(' ', text).strip()
+    return _IN_LIST.sub('(?, ...)', text)
+
+
+def _percentile(sorted_values: List[float], fraction: float) -> float:
+    """النسبة المئوية بطريقة أقرب رتبة"""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+class _QueryHistogram:
+    """إحصائيات بصمة واحدة: العدد والمجاميع وآخر الأزمنة"""
+
+    __slots__ = ('count', 'total_ms', 'max_ms', 'rows', 'samples', 'plan')
+
+    def __init__(self, samples: int):
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.rows = 0
+        self.samples: Deque[float] = deque(maxlen=samples)
+        self.plan: Optional[List[str]] = None
+
+
+class QueryStats:
+    """مجمّع إحصائيات الاستعلامات المشترك بين كل الاتصالات"""
+
+    def __init__(self, slow_query_ms: float = 100, samples: int = 1000,
+                 capture_all_plans: bool = False, log_queries: bool = False,
+                 sample_rate: float = 1.0):
+        self.slow_query_ms = slow_query_ms
+        self.sample_rate = sample_rate
+        self.samples = samples
+        self.capture_all_plans = capture_all_plans
+        self.log_queries = log_queries
+        self._lock = threading.Lock()
+        self._histograms: Dict[str, _QueryHistogram] = {}
+        self._slow_queries: Deque[Dict[str, Any]] = deque(maxlen=200)
+        self._fingerprints: Dict[str, str] = {}
+        self._started_at = datetime.now()
+        self._slow_logger: Optional[logging.Logger] = None
+
+    def _fingerprint(self, sql: str) -> str:
+        key = self._fingerprints.get(sql)
+        if key is None:
+            if len(self._fingerprints) >= _FINGERPRINT_CACHE_SIZE:
+                self._fingerprints.clear()
+            key = self._fingerprints[sql] = fingerprint(sql)
+        return key
+
+    def sampled(self) -> bool:
+        """هل تُقاس العبارة التالية كاملة (تقع في العينة)"""
+        return self.sample_rate >= 1 or random.random() < self.sample_rate
+
+    def record(self, conn: sqlite3.Connection, sql: str, params, elapsed: float, rows: int):
+        """تسجيل تنفيذ عبارة (elapsed بالثواني)"""
+        elapsed_ms = elapsed * 1000
+        key = self._fingerprint(sql)
+
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = _QueryHistogram(self.samples)
+            histogram.count += 1
+            histogram.total_ms += elapsed_ms
+            histogram.rows += rows
+            histogram.samples.append(elapsed_ms)
+            if elapsed_ms > histogram.max_ms:
+                histogram.max_ms = elapsed_ms
+            needs_plan = histogram.plan is None
+
+        if self.log_queries:
+            logger.info(f"SQL ({elapsed_ms:.2f} ms, {rows} صف): {key}")
+
+        is_slow = 0 < self.slow_query_ms <= elapsed_ms
+        if needs_plan and (is_slow or self.capture_all_plans):
+            histogram.plan = self._explain(conn, sql, params)
+
+        if is_slow:
+            self._log_slow_query(key, elapsed_ms, rows, histogram.plan)
+
+    def record_slow(self, conn: sqlite3.Connection, sql: str, params, elapsed: float, rows: int):
+        """تسجيل عبارة خارج العينة في سجل البطيئة فقط إن تجاوزت الحد"""
+        elapsed_ms = elapsed * 1000
+        if self.slow_query_ms <= 0 or elapsed_ms < self.slow_query_ms:
+            return
+
+        key = self._fingerprint(sql)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            plan = histogram.plan if histogram is not None else None
+        if plan is None:
+            plan = self._explain(conn, sql, params)
+        self._log_slow_query(key, elapsed_ms, rows, plan)
+
+    @staticmethod
+    def _explain(conn: sqlite3.Connection, sql: str, params) -> List[str]:
+        """خطة EXPLAIN QUERY PLAN للعبارة (قائمة فارغة إن تعذرت)"""
+        try:
+            cursor = sqlite3.Connection.execute(conn, f"EXPLAIN QUERY PLAN {sql}", params or ())
+            return [row[-1] for row in cursor.fetchall()]
+        except sqlite3.Error:
+            return []
+
+    def _log_slow_query(self, key: str, elapsed_ms: float, rows: int, plan: Optional[List[str]]):
+        entry = {
+            'time': datetime.now().isoformat(timespec='seconds'),
+            'query': key,
+            'duration_ms': round(elapsed_ms, 2),
+            'rows': rows,
+            'plan': plan or []
+        }
+        with self._lock:
+            self._slow_queries.append(entry)
+
+        if self._slow_logger is None:
+            from app.utils.logger import setup_slow_query_logger
+            self._slow_logger = setup_slow_query_logger()
+
+        plan_text = ' | '.join(entry['plan'])
+        self._slow_logger.warning(f"{elapsed_ms:.1f} ms, {rows} صف: {key} -- الخطة: {plan_text}")
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """إحصائيات كل بصمة مرتبة حسب إجمالي الزمن"""
+        with self._lock:
+            items = [(key, h.count, h.total_ms, h.max_ms, h.rows, sorted(h.samples), h.plan)
+                     for key, h in self._histograms.items()]
+
+        stats = []
+        for key, count, total_ms, max_ms, rows, samples, plan in items:
+            stats.append({
+                'query': key,
+                'count': count,
+                'total_ms': round(total_ms, 3),
+                'avg_ms': round(total_ms / count, 3) if count else 0,
+                'p50_ms': round(_percentile(samples, 0.50), 3),
+                'p95_ms': round(_percentile(samples, 0.95), 3),
+                'p99_ms': round(_percentile(samples, 0.99), 3),
+                'max_ms': round(max_ms, 3),
+                'rows': rows,
+                'avg_rows': round(rows / count, 1) if count else 0,
+                'plan': plan or []
+            })
+
+        stats.sort(key=lambda item: item['total_ms'], reverse=True)
+        return stats
+
+    def slow_queries(self) -> List[Dict[str, Any]]:
+        """آخر الاستعلامات البطيئة (الأحدث أولاً)"""
+        with self._lock:
+            return list(reversed(self._slow_queries))
+
+    def reset(self):
+        """تصفير الإحصائيات"""
+        with self._lock:
+            self._histograms = {}
+            self._slow_queries.clear()
+            self._started_at = datetime.now()
+
+    def dump(self, path=None) -> Optional[Path]:
+        """حفظ الإحصائيات في ملف JSON"""
+        path = Path(path or DEBUG_CONFIG.get('query_stats_file', 'logs/query_stats.json'))
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            report = {
+                'since': self._started_at.isoformat(timespec='seconds'),
+                'until': datetime.now().isoformat(timespec='seconds'),
+                'slow_query_ms': self.slow_query_ms,
+                'sample_rate': self.sample_rate,
+                'queries': self.snapshot(),
+                'slow_queries': self.slow_queries()
+            }
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+            return path
+        except Exception as e:
+            logger.error(f"خطأ في حفظ إحصائيات الاستعلامات: {str(e)}")
+            return None
+
+
+query_stats = QueryStats(
+    slow_query_ms=DEBUG_CONFIG.get('slow_query_ms', 100),
+    samples=DEBUG_CONFIG.get('query_stats_samples', 1000),
+    capture_all_plans=DEBUG_CONFIG.get('enable_profiling', False),
+    log_queries=DEBUG_CONFIG.get('show_sql_queries', False),
+    sample_rate=DEBUG_CONFIG.get('query_stats_sample_rate', 1.0)
+)
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """مؤشر يقيس زمن العبارة حتى اكتمال جلب صفوفها"""
+
+    _pending = None  # [sql, params, elapsed, rows] لعبارة SELECT لم يكتمل جلبها
+
+    def execute(self, sql, parameters=()):
+        self._finish()
+        started = time.perf_counter()
+        super().execute(sql, parameters)
+        elapsed = time.perf_counter() - started
+
+        if self.description is None:
+            query_stats.record(self.connection, sql, parameters, elapsed, max(self.rowcount, 0))
+        else:
+            self._pending = [sql, parameters, elapsed, 0]
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        self._finish()
+        started = time.perf_counter()
+        super().executemany(sql, seq_of_parameters)
+        query_stats.record(self.connection, sql, None,
+                           time.perf_counter() - started, max(self.rowcount, 0))
+        return self
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = super().fetchone()
+        self._add_fetch(time.perf_counter() - started, 0 if row is None else 1)
+        if row is None:
+            self._finish()
+        return row
+
+    def fetchmany(self, size=None):
+        started = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._add_fetch(time.perf_counter() - started, len(rows))
+        if not rows:
+            self._finish()
+        return rows
+
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = super().fetchall()
+        self._add_fetch(time.perf_counter() - started, len(rows))
+        self._finish()
+        return rows
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        # for row in conn.execute(...) يجلب صفاً صفاً دون fetch*
+        started = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._add_fetch(time.perf_counter() - started, 0)
+            self._finish()
+            raise
+        self._add_fetch(time.perf_counter() - started, 1)
+        return row
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        self._finish()
+
+    def _add_fetch(self, elapsed: float, rows: int):
+        pending = self._pending
+        if pending is not None:
+            pending[2] += elapsed
+            pending[3] += rows
+
+    def _finish(self):
+        pending = self._pending
+        if pending is not None:
+            self._pending = None
+            sql, params, elapsed, rows = pending
+            query_stats.record(self.connection, sql, params, elapsed, rows)
+
+
+class SlowQueryCursor(sqlite3.Cursor):
+    """مؤشر خارج العينة: يقيس التنفيذ فقط ويسجل العبارة إن كانت بطيئة"""
+
+    def execute(self, sql, parameters=()):
+        started = time.perf_counter()
+        super().execute(sql, parameters)
+        elapsed = time.perf_counter() - started
+        if elapsed * 1000 >= query_stats.slow_query_ms:
+            query_stats.record_slow(self.connection, sql, parameters, elapsed, max(self.rowcount, 0))
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        started = time.perf_counter()
+        super().executemany(sql, seq_of_parameters)
+        elapsed = time.perf_counter() - started
+        if elapsed * 1000 >= query_stats.slow_query_ms:
+            query_stats.record_slow(self.connection, sql, None, elapsed, max(self.rowcount, 0))
+        return self
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """اتصال تمر عباراته عبر InstrumentedCursor (العينة) أو SlowQueryCursor"""
+
+    def cursor(self, factory=None):
+        if factory is None:
+            factory = InstrumentedCursor if query_stats.sampled() else SlowQueryCursor
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
@@ -7,6 +7,7 @@
 from datetime import datetime
 from typing import Dict, List, Optional
 from .database import DatabaseManager
+from app.utils.date_range import date_range_clause
 
 class RepairTicket:
     """فئة تذكرة الصيانة"""
@@ -95,13 +96,9 @@ class RepairTicket:
                 query += " AND rt.technician_id = ?"
                 params.append(technician_id)
             
-            if start_date:
-                query += " AND DATE(rt.received_date) >= ?"
-                params.append(start_date)
-            
-            if end_date:
-                query += " AND DATE(rt.received_date) <= ?"
-                params.append(end_date)
+            date_clause, date_params = date_range_clause('rt.received_date', start_date, end_date)
+            query += date_clause
+            params.extend(date_params)
             
             query += " ORDER BY rt.received_date DESC LIMIT ?"
             params.append(limit)
@@ -242,13 +239,9 @@ class RepairTicket:
             """
             params = [technician_id]
             
-            if start_date:
-                query += " AND DATE(received_date) >= ?"
-                params.append(start_date)
-            
-            if end_date:
-                query += " AND DATE(received_date) <= ?"
-                params.append(end_date)
+            date_clause, date_params = date_range_clause('received_date', start_date, end_date)
+            query += date_clause
+            params.extend(date_params)
             
             result = self.db.execute_query(query, tuple(params))
             
@@ -286,13 +279,9 @@ class RepairTicket:
             """
             params = []
             
-            if start_date:
-                query += " AND DATE(received_date) >= ?"
-                params.append(start_date)
-            
-            if end_date:
-                query += " AND DATE(received_date) <= ?"
-                params.append(end_date)
+            date_clause, date_params = date_range_clause('received_date', start_date, end_date)
+            query += date_clause
+            params.extend(date_params)
             
             result = self.db.execute_query(query, tuple(params))
             
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+نموذج الأدوار والصلاحيات - Role Model
+
+صلاحيات كل دور مخزنة في جدولي roles و role_permissions، وتُجمع عند تسجيل
+الدخول إلى frozenset محفوظة في الذاكرة لكل دور، فيصبح التحقق من صلاحية
+بحثاً واحداً في مجموعة. تعديل الأدوار من هذا النموذج يبطل المجموعات فوراً،
+وتعديلها من عملية أخرى يظهر عبر عداد التغيير (change_generations) عند
+تسجيل الدخول أو التبديل التالي.
+"""
+
+import os
+import threading
+from typing import Dict, FrozenSet, Iterable, List, Optional
+import logging
+
+from .database import DatabaseManager
+
+logger = logging.getLogger(__name__)
+
+# علامة الدور الذي يملك كل الصلاحيات (all_permissions)
+ALL_PERMISSIONS = '*'
+
+NO_PERMISSIONS: FrozenSet[str] = frozenset()
+
+
+class PermissionMatrix:
+    """مجموعات الصلاحيات المجمعة لكل دور لملف قاعدة بيانات واحد"""
+
+    _matrices: Dict[str, 'PermissionMatrix'] = {}
+    _matrices_lock = threading.Lock()
+
+    def __init__(self, db: DatabaseManager):
+        self.db = db
+        self._lock = threading.Lock()
+        self._compiled: Dict[str, FrozenSet[str]] = {}
+        self._generation: Optional[int] = None
+        self.version = 0
+
+    @classmethod
+    def for_db(cls, db: DatabaseManager = None) -> 'PermissionMatrix':
+        """الحصول على مصفوفة الصلاحيات المشتركة لملف قاعدة البيانات"""
+        db = db if db else DatabaseManager()
+        key = os.path.abspath(db.db_path)
+        with cls._matrices_lock:
+            matrix = cls._matrices.get(key)
+            if matrix is None:
+                matrix = cls(db)
+                cls._matrices[key] = matrix
+            return matrix
+
+    def _roles_generation(self) -> Optional[int]:
+        result = self.db.execute_query(
+            "SELECT generation FROM change_generations WHERE table_name = 'roles'"
+        )
+        return result[0][0] if result else None
+
+    def refresh(self):
+        """إبطال المجموعات إن عُدلت الأدوار من عملية أخرى (عند الدخول أو التبديل)"""
+        generation = self._roles_generation()
+        with self._lock:
+            if generation != self._generation:
+                self._generation = generation
+                self._invalidate()
+
+    def invalidate(self):
+        """إبطال كل المجموعات المجمعة (بعد تعديل الأدوار)"""
+        with self._lock:
+            self._invalidate()
+
+    def _invalidate(self):
+        self._compiled = {}
+        self.version += 1
+
+    def compile(self, role: str) -> FrozenSet[str]:
+        """مجموعة صلاحيات الدور (تحتوي ALL_PERMISSIONS إن كان يملك كل الصلاحيات)"""
+        permissions = self._compiled.get(role)
+        if permissions is not None:
+            return permissions
+
+        version = self.version
+        try:
+            result = self.db.execute_query(
+                "SELECT all_permissions FROM roles WHERE name = ?", (role,)
+            )
+            if not result:
+                permissions = NO_PERMISSIONS
+            elif result[0][0]:
+                permissions = frozenset((ALL_PERMISSIONS,))
+            else:
+                permissions = frozenset(row[0] for row in self.db.execute_query(
+                    "SELECT permission FROM role_permissions WHERE role = ?", (role,)
+                ))
+        except Exception as e:
+            logger.error(f"خطأ في تحميل صلاحيات الدور {role}: {str(e)}")
+            return NO_PERMISSIONS
+
+        with self._lock:
+            # لا تُحفظ مجموعة قُرئت قبل إبطال حدث أثناء القراءة
+            if version == self.version:
+                self._compiled[role] = permissions
+        return permissions
+
+
+class Role:
+    """فئة الأدوار والصلاحيات"""
+
+    def __init__(self, db: DatabaseManager = None):
+        self.db = db if db else DatabaseManager()
+        self.matrix = PermissionMatrix.for_db(self.db)
+
+    def get_all_roles(self) -> List[Dict]:
+        """الحصول على جميع الأدوار مع صلاحياتها"""
+        try:
+            roles = [dict(row) for row in self.db.execute_query(
+                "SELECT name, display_name, all_permissions FROM roles ORDER BY name"
+            )]
+            for role in roles:
+                role['permissions'] = sorted(self.matrix.compile(role['name']))
+            return roles
+        except Exception as e:
+            logger.error(f"خطأ في الحصول على الأدوار: {str(e)}")
+            return []
+
+    def get_all_permissions(self) -> List[Dict]:
+        """الحصول على قائمة الصلاحيات المعرفة"""
+        try:
+            return [dict(row) for row in self.db.execute_query(
+                "SELECT name, description FROM permissions ORDER BY name"
+            )]
+        except Exception as e:
+            logger.error(f"خطأ في الحصول على الصلاحيات: {str(e)}")
+            return []
+
+    def save_role(self, name: str, display_name: str, permissions: Iterable[str],
+                  all_permissions: bool = False) -> bool:
+        """إنشاء دور أو استبدال صلاحياته"""
+        try:
+            with self.db.transaction() as conn:
+                conn.execute("""
+                    INSERT INTO roles (name, display_name, all_permissions) VALUES (?, ?, ?)
+                    ON CONFLICT (name) DO UPDATE SET
+                        display_name = excluded.display_name,
+                        all_permissions = excluded.all_permissions,
+                        updated_at = CURRENT_TIMESTAMP
+                """, (name, display_name, int(all_permissions)))
+                conn.execute("DELETE FROM role_permissions WHERE role = ?", (name,))
+                conn.executemany(
+                    "INSERT INTO role_permissions (role, permission) VALUES (?, ?)",
+                    [(name, permission) for permission in set(permissions)]
+                )
+            self.matrix.invalidate()
+            return True
+        except Exception as e:
+            logger.error(f"خطأ في حفظ الدور {name}: {str(e)}")
+            return False
+
+    def delete_role(self, name: str) -> bool:
+        """حذف دور غير مستخدم"""
+        try:
+            with self.db.transaction() as conn:
+                in_use = conn.execute(
+                    "SELECT 1 FROM users WHERE role = ? AND is_active = 1 LIMIT 1", (name,)
+                ).fetchone()
+                if in_use:
+                    return False
+                conn.execute("DELETE FROM roles WHERE name = ?", (name,))
+            self.matrix.invalidate()
+            return True
+        except Exception as e:
+            logger.error(f"خطأ في حذف الدور {name}: {str(e)}")
+            return False
@@ -5,62 +5,77 @@
 """
 
 from datetime import datetime
+from decimal import Decimal, ROUND_HALF_UP
 from typing import Dict, List, Optional, Tuple
 from .database import DatabaseManager
+from .cart import CENT, to_decimal
+from .sales_rollup import SalesRollup, apply_sale, apply_return
+from app.utils.date_range import date_range_clause, day_range
 
 class Sale:
     """فئة المبيعات"""
     
     def __init__(self, db: DatabaseManager = None):
         self.db = db if db else DatabaseManager()
+        # استيراد متأخر: حزمة الخدمات تستورد النماذج
+        from app.services.settings_service import SettingsService
+        self.settings = SettingsService.for_db(self.db)
     
     def create_sale(self, customer_id: Optional[int], items: List[Dict],
                    payment_method: str, discount_amount: float = 0,
-                   notes: str = "", user_id: int = None) -> Optional[int]:
-        """إنشاء فاتورة مبيعات"""
+                   notes: str = "", user_id: int = None,
+                   tax_rate: Decimal = None) -> Optional[int]:
+        """إنشاء فاتورة مبيعات (tax_rate نسبة مئوية، تُقرأ من الإعدادات إن لم تُمرر)"""
         try:
-            # حساب إجمالي المبلغ
-            total_amount = sum(item['quantity'] * item['price'] for item in items)
+            # حساب إجمالي المبلغ (Decimal بنفس تقريب السلة)
+            line_totals = [(to_decimal(item['price']) * item['quantity']).quantize(CENT, ROUND_HALF_UP)
+                           for item in items]
+            subtotal = sum(line_totals, Decimal(0))
+            discount = to_decimal(discount_amount)
             
             # حساب الضريبة
-            tax_rate = float(self.db.get_setting('tax_rate') or 0) / 100
-            tax_amount = (total_amount - discount_amount) * tax_rate
+            if tax_rate is None:
+                tax_rate = self.settings.get('tax_rate', 0)
+            tax = ((subtotal - discount) * to_decimal(tax_rate) / 100).quantize(CENT, ROUND_HALF_UP)
             
             # المبلغ النهائي
-            final_amount = total_amount - discount_amount + tax_amount
+            total_amount = float(subtotal)
+            tax_amount = float(tax)
+            final_amount = float(subtotal - discount + tax)
             
-            # إنشاء فاتورة المبيعات
-            sale_id = self.db.execute_insert("""
-                INSERT INTO sales 
-                (customer_id, total_amount, discount_amount, tax_amount, 
-                 final_amount, payment_method, notes, user_id)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            """, (customer_id, total_amount, discount_amount, tax_amount,
-                  final_amount, payment_method, notes, user_id))
-            
-            if not sale_id:
-                return None
-            
-            # إضافة عناصر الفاتورة
-            for item in items:
-                item_total = item['quantity'] * item['price']
+            with self.db.transaction() as conn:
+                # إنشاء فاتورة المبيعات
+                cursor = conn.execute("""
+                    INSERT INTO sales 
+                    (customer_id, total_amount, discount_amount, tax_amount, 
+                     final_amount, payment_method, notes, user_id)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """, (customer_id, total_amount, discount_amount, tax_amount,
+                      final_amount, payment_method, notes, user_id))
+                sale_id = cursor.lastrowid
                 
-                # إضافة عنصر الفاتورة
-                self.db.execute_insert("""
+                # إضافة عناصر الفاتورة دفعة واحدة
+                conn.executemany("""
                     INSERT INTO sale_items 
-                    (sale_id, product_id, quantity, unit_price, total_amount)
-                    VALUES (?, ?, ?, ?, ?)
-                """, (sale_id, item['product_id'], item['quantity'],
-                      item['price'], item_total))
+                    (sale_id, product_id, quantity, unit_price, total_amount, unit_cost, category_id)
+                    VALUES (?, ?, ?, ?, ?, (SELECT cost_price FROM products WHERE id = ?),
+                            (SELECT category_id FROM products WHERE id = ?))
+                """, [(sale_id, item['product_id'], item['quantity'],
+                       item['price'], float(line_total), item['product_id'], item['product_id'])
+                      for item, line_total in zip(items, line_totals)])
                 
-                # تحديث المخزون
-                self._update_product_stock(item['product_id'], -item['quantity'])
-                
-                # تسجيل حركة المخزون
-                self._add_stock_movement(
-                    item['product_id'], 'out', item['quantity'],
+                # تحديث المخزون وتسجيل حركاته
+                self._update_products_stock(
+                    conn, [(item['product_id'], -item['quantity']) for item in items]
+                )
+                self._add_stock_movements(
+                    conn, [(item['product_id'], 'out', item['quantity'])
+                           for item in items],
                     sale_id, 'sale', user_id
                 )
+                
+                # تحديث التجميعات اليومية في نفس المعاملة
+                apply_sale(conn, sale_id)
             
             return sale_id
             
@@ -115,13 +130,9 @@ class Sale:
             """
             params = []
             
-            if start_date:
-                query += " AND DATE(s.created_at) >= ?"
-                params.append(start_date)
-            
-            if end_date:
-                query += " AND DATE(s.created_at) <= ?"
-                params.append(end_date)
+            date_clause, date_params = date_range_clause('s.created_at', start_date, end_date)
+            query += date_clause
+            params.extend(date_params)
             
             if customer_id:
                 query += " AND s.customer_id = ?"
@@ -138,29 +149,20 @@ class Sale:
             return []
     
     def get_daily_sales_summary(self, date: str) -> Dict:
-        """الحصول على ملخص مبيعات اليوم"""
+        """الحصول على ملخص مبيعات اليوم (من التجميعات اليومية)"""
         try:
-            result = self.db.execute_query("""
-                SELECT 
-                    COUNT(*) as total_transactions,
-                    SUM(final_amount) as total_amount,
-                    SUM(CASE WHEN payment_method = 'cash' THEN final_amount ELSE 0 END) as cash_sales,
-                    SUM(CASE WHEN payment_method = 'card' THEN final_amount ELSE 0 END) as card_sales,
-                    SUM(CASE WHEN payment_method LIKE '%wallet%' THEN final_amount ELSE 0 END) as wallet_sales
-                FROM sales 
-                WHERE DATE(created_at) = ? AND status = 'completed'
-            """, (date,))
+            by_method = SalesRollup(self.db).get_daily_payment_totals(date)
+            
+            def method_total(matches) -> float:
+                return sum(row['total_amount'] for method, row in by_method.items() if matches(method))
             
-            if result:
-                return dict(result[0])
-            else:
-                return {
-                    'total_transactions': 0,
-                    'total_amount': 0,
-                    'cash_sales': 0,
-                    'card_sales': 0,
-                    'wallet_sales': 0
-                }
+            return {
+                'total_transactions': sum(row['transactions'] for row in by_method.values()),
+                'total_amount': method_total(lambda method: True),
+                'cash_sales': method_total(lambda method: method == 'cash'),
+                'card_sales': method_total(lambda method: method == 'card'),
+                'wallet_sales': method_total(lambda method: 'wallet' in method)
+            }
                 
         except Exception as e:
             print(f"خطأ في الحصول على ملخص المبيعات: {str(e)}")
@@ -176,35 +178,37 @@ class Sale:
                 for item in return_items
             )
             
-            # إنشاء المرتجع
-            return_id = self.db.execute_insert("""
-                INSERT INTO returns (sale_id, total_amount, reason, user_id)
-                VALUES (?, ?, ?, ?)
-            """, (sale_id, total_return_amount, reason, user_id))
-            
-            if not return_id:
-                return None
-            
-            # إضافة عناصر المرتجع
-            for item in return_items:
-                # إضافة عنصر المرتجع
-                self.db.execute_insert("""
+            with self.db.transaction() as conn:
+                # إنشاء المرتجع
+                cursor = conn.execute("""
+                    INSERT INTO returns (sale_id, total_amount, reason, user_id)
+                    VALUES (?, ?, ?, ?)
+                """, (sale_id, total_return_amount, reason, user_id))
+                return_id = cursor.lastrowid
+                
+                # إضافة عناصر المرتجع
+                conn.executemany("""
                     INSERT INTO return_items 
                     (return_id, product_id, quantity, unit_price, total_amount, condition_status)
                     VALUES (?, ?, ?, ?, ?, ?)
-                """, (return_id, item['product_id'], item['quantity'],
-                      item['unit_price'], item['quantity'] * item['unit_price'],
-                      item.get('condition_status', 'good')))
+                """, [(return_id, item['product_id'], item['quantity'],
+                       item['unit_price'], item['quantity'] * item['unit_price'],
+                       item.get('condition_status', 'good'))
+                      for item in return_items])
+                
+                # إعادة المنتجات للمخزون إذا كانت بحالة جيدة
+                restocked = [item for item in return_items
+                             if item.get('condition_status', 'good') == 'good']
+                self._update_products_stock(
+                    conn, [(item['product_id'], item['quantity']) for item in restocked]
+                )
+                self._add_stock_movements(
+                    conn, [(item['product_id'], 'in', item['quantity'])
+                           for item in restocked],
+                    return_id, 'return', user_id
+                )
                 
-                # إعادة المنتج للمخزون إذا كان بحالة جيدة
-                if item.get('condition_status', 'good') == 'good':
-                    self._update_product_stock(item['product_id'], item['quantity'])
-                    
-                    # تسجيل حركة المخزون
-                    self._add_stock_movement(
-                        item['product_id'], 'in', item['quantity'],
-                        return_id, 'return', user_id
-                    )
+                apply_return(conn, return_id)
             
             return return_id
             
@@ -212,26 +216,26 @@ class Sale:
             print(f"خطأ في إنشاء المرتجع: {str(e)}")
             return None
     
-    def _update_product_stock(self, product_id: int, quantity_change: int):
-        """تحديث مخزون المنتج"""
-        self.db.execute_update("""
+    def _update_products_stock(self, conn, changes: List[Tuple[int, int]]):
+        """تحديث مخزون عدة منتجات دفعة واحدة (معرف المنتج، مقدار التغيير)"""
+        conn.executemany("""
             UPDATE products 
             SET quantity_in_stock = quantity_in_stock + ?,
                 updated_at = CURRENT_TIMESTAMP
             WHERE id = ?
-        """, (quantity_change, product_id))
+        """, [(quantity_change, product_id) for product_id, quantity_change in changes])
     
-    def _add_stock_movement(self, product_id: int, movement_type: str, 
-                          quantity: int, reference_id: int, 
-                          reference_type: str, user_id: int):
-        """إضافة حركة مخزون"""
-        self.db.execute_insert("""
+    def _add_stock_movements(self, conn, movements: List[Tuple[int, str, int]],
+                           reference_id: int, reference_type: str, user_id: int):
+        """إضافة حركات مخزون دفعة واحدة (معرف المنتج، النوع، الكمية)"""
+        conn.executemany("""
             INSERT INTO stock_movements 
             (product_id, movement_type, quantity, reference_id, 
              reference_type, user_id)
             VALUES (?, ?, ?, ?, ?, ?)
-        """, (product_id, movement_type, quantity, reference_id,
-              reference_type, user_id))
+        """, [(product_id, movement_type, quantity, reference_id,
+               reference_type, user_id)
+              for product_id, movement_type, quantity in movements])
 
 
 class Customer:
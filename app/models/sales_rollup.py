@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+تجميعات المبيعات اليومية - Daily Sales Rollups
+
+ثلاثة جداول مجمعة باليوم المحلي تُحدث داخل معاملة كل بيع وإلغاء ومرتجع:
+    sales_daily_rollup    اليوم
+    sales_payment_rollup  اليوم × وسيلة الدفع × الكاشير (مبالغ الفواتير)
+    sales_item_rollup     اليوم × وسيلة الدفع × المنتج × الفئة × الكاشير (البنود)
+التقارير على نطاقات طويلة تقرأ من هذه الجداول بدلاً من مسح بنود المبيعات.
+
+إعادة البناء من سطر الأوامر:
+    python -m app.models.sales_rollup [--from YYYY-MM-DD] [--to YYYY-MM-DD]
+"""
+
+import argparse
+import sqlite3
+from typing import Dict, List, Optional, Tuple
+import logging
+
+from app.utils.date_range import day_range
+
+logger = logging.getLogger(__name__)
+
+# الكاشير والفئة غير المعروفين يُخزنان 0 (NULL لا يصلح في المفتاح الأساسي)
+_SALE_DAILY_SQL = """
+    INSERT INTO sales_daily_rollup
+        (day, transactions, subtotal, discount_amount, tax_amount, final_amount, cogs, items_sold)
+    SELECT
+        DATE(s.created_at, 'localtime') AS rollup_day,
+        :sign * COUNT(*),
+        :sign * SUM(s.total_amount),
+        :sign * SUM(s.discount_amount),
+        :sign * SUM(s.tax_amount),
+        :sign * SUM(s.final_amount),
+        :sign * SUM(COALESCE((SELECT SUM(si.quantity * COALESCE(si.unit_cost, 0))
+                              FROM sale_items si WHERE si.sale_id = s.id), 0)),
+        :sign * SUM(COALESCE((SELECT SUM(si.quantity)
+                              FROM sale_items si WHERE si.sale_id = s.id), 0))
+    FROM sales s
+    WHERE {where}
+    GROUP BY rollup_day
+    ON CONFLICT(day) DO UPDATE SET
+        transactions = transactions + excluded.transactions,
+        subtotal = subtotal + excluded.subtotal,
+        discount_amount = discount_amount + excluded.discount_amount,
+        tax_amount = tax_amount + excluded.tax_amount,
+        final_amount = final_amount + excluded.final_amount,
+        cogs = cogs + excluded.cogs,
+        items_sold = items_sold + excluded.items_sold
+"""
+
+_SALE_PAYMENT_SQL = """
+    INSERT INTO sales_payment_rollup
+        (day, payment_method, user_id, transactions, subtotal, discount_amount,
+         tax_amount, final_amount)
+    SELECT
+        DATE(s.created_at, 'localtime') AS rollup_day,
+        s.payment_method,
+        COALESCE(s.user_id, 0) AS cashier_id,
+        :sign * COUNT(*),
+        :sign * SUM(s.total_amount),
+        :sign * SUM(s.discount_amount),
+        :sign * SUM(s.tax_amount),
+        :sign * SUM(s.final_amount)
+    FROM sales s
+    WHERE {where}
+    GROUP BY rollup_day, s.payment_method, cashier_id
+    ON CONFLICT(day, payment_method, user_id) DO UPDATE SET
+        transactions = transactions + excluded.transactions,
+        subtotal = subtotal + excluded.subtotal,
+        discount_amount = discount_amount + excluded.discount_amount,
+        tax_amount = tax_amount + excluded.tax_amount,
+        final_amount = final_amount + excluded.final_amount
+"""
+
+_SALE_ITEMS_SQL = """
+    INSERT INTO sales_item_rollup
+        (day, payment_method, product_id, category_id, user_id, quantity, revenue, cogs)
+    SELECT
+        DATE(s.created_at, 'localtime') AS rollup_day,
+        s.payment_method,
+        si.product_id,
+        COALESCE(si.category_id, 0) AS rollup_category_id,
+        COALESCE(s.user_id, 0) AS cashier_id,
+        :sign * SUM(si.quantity),
+        :sign * SUM(si.total_amount),
+        :sign * SUM(si.quantity * COALESCE(si.unit_cost, 0))
+    FROM sales s
+    JOIN sale_items si ON si.sale_id = s.id
+    WHERE {where}
+    GROUP BY rollup_day, s.payment_method, si.product_id, rollup_category_id, cashier_id
+    ON CONFLICT(day, payment_method, product_id, category_id, user_id) DO UPDATE SET
+        quantity = quantity + excluded.quantity,
+        revenue = revenue + excluded.revenue,
+        cogs = cogs + excluded.cogs
+"""
+
+_RETURN_DAILY_SQL = """
+    INSERT INTO sales_daily_rollup (day, returns_count, returns_amount)
+    SELECT
+        DATE(r.created_at, 'localtime') AS rollup_day,
+        COUNT(*),
+        SUM(r.total_amount)
+    FROM returns r
+    WHERE {where}
+    GROUP BY rollup_day
+    ON CONFLICT(day) DO UPDATE SET
+        returns_count = returns_count + excluded.returns_count,
+        returns_amount = returns_amount + excluded.returns_amount
+"""
+
+_RETURN_ITEMS_SQL = """
+    INSERT INTO sales_item_rollup
+        (day, payment_method, product_id, category_id, user_id,
+         returned_quantity, returned_amount)
+    SELECT
+        DATE(r.created_at, 'localtime') AS rollup_day,
+        COALESCE(s.payment_method, '') AS rollup_payment_method,
+        ri.product_id,
+        -- تصنيف عنصر الفاتورة الأصلية وقت البيع (المنتج الحالي للمرتجع بلا فاتورة)
+        COALESCE((SELECT COALESCE(si.category_id, 0) FROM sale_items si
+                  WHERE si.sale_id = r.sale_id AND si.product_id = ri.product_id LIMIT 1),
+                 p.category_id, 0) AS rollup_category_id,
+        COALESCE(r.user_id, 0) AS cashier_id,
+        SUM(ri.quantity),
+        SUM(ri.total_amount)
+    FROM returns r
+    JOIN return_items ri ON ri.return_id = r.id
+    LEFT JOIN sales s ON s.id = r.sale_id
+    LEFT JOIN products p ON p.id = ri.product_id
+    WHERE {where}
+    GROUP BY rollup_day, rollup_payment_method, ri.product_id, rollup_category_id, cashier_id
+    ON CONFLICT(day, payment_method, product_id, category_id, user_id) DO UPDATE SET
+        returned_quantity = returned_quantity + excluded.returned_quantity,
+        returned_amount = returned_amount + excluded.returned_amount
+"""
+
+ROLLUP_TABLES = ('sales_daily_rollup', 'sales_payment_rollup', 'sales_item_rollup')
+
+
+def apply_sale(conn: sqlite3.Connection, sale_id: int, sign: int = 1):
+    """إضافة فاتورة إلى التجميعات (sign=-1 لطرحها عند الإلغاء)"""
+    params = {'sign': sign, 'sale_id': sale_id}
+    for sql in (_SALE_DAILY_SQL, _SALE_PAYMENT_SQL, _SALE_ITEMS_SQL):
+        conn.execute(sql.format(where="s.id = :sale_id"), params)
+
+
+def apply_return(conn: sqlite3.Connection, return_id: int):
+    """إضافة مرتجع إلى التجميعات"""
+    params = {'return_id': return_id}
+    for sql in (_RETURN_DAILY_SQL, _RETURN_ITEMS_SQL):
+        conn.execute(sql.format(where="r.id = :return_id"), params)
+
+
+def rebuild(conn: sqlite3.Connection, start_date: str = None, end_date: str = None):
+    """إعادة بناء التجميعات من البيانات الخام (كل الأيام أو نطاق أيام محلية)"""
+    params = {'sign': 1}
+    day_where = ["1 = 1"]
+    sale_where = ["s.status = 'completed'"]
+    return_where = ["1 = 1"]
+
+    if start_date:
+        params['start_day'] = start_date
+        params['start'] = day_range(start_date)[0]
+        day_where.append("day >= :start_day")
+        sale_where.append("s.created_at >= :start")
+        return_where.append("r.created_at >= :start")
+
+    if end_date:
+        params['end_day'] = end_date
+        params['end'] = day_range(end_date)[1]
+        day_where.append("day <= :end_day")
+        sale_where.append("s.created_at < :end")
+        return_where.append("r.created_at < :end")
+
+    for table in ROLLUP_TABLES:
+        conn.execute(f"DELETE FROM {table} WHERE {' AND '.join(day_where)}", params)
+    for sql in (_SALE_DAILY_SQL, _SALE_PAYMENT_SQL, _SALE_ITEMS_SQL):
+        conn.execute(sql.format(where=' AND '.join(sale_where)), params)
+    for sql in (_RETURN_DAILY_SQL, _RETURN_ITEMS_SQL):
+        conn.execute(sql.format(where=' AND '.join(return_where)), params)
+
+
+class SalesRollup:
+    """قراءة تجميعات المبيعات بنطاق أيام محلية (شاملة)"""
+
+    def __init__(self, db=None):
+        if db is None:
+            from .database import DatabaseManager
+            db = DatabaseManager()
+        self.db = db
+
+    def rebuild(self, start_date: str = None, end_date: str = None) -> bool:
+        """إعادة بناء التجميعات داخل معاملة واحدة"""
+        try:
+            with self.db.transaction() as conn:
+                rebuild(conn, start_date, end_date)
+            return True
+        except Exception as e:
+            logger.error(f"خطأ في إعادة بناء تجميعات المبيعات: {str(e)}")
+            return False
+
+    def get_summary(self, start_date: str, end_date: str) -> Dict:
+        """إجماليات النطاق من جدول الأيام"""
+        result = self.db.execute_query("""
+            SELECT
+                COALESCE(SUM(transactions), 0) as total_transactions,
+                COALESCE(SUM(subtotal), 0) as subtotal,
+                COALESCE(SUM(final_amount), 0) as total_sales,
+                COALESCE(SUM(discount_amount), 0) as total_discounts,
+                COALESCE(SUM(tax_amount), 0) as total_tax,
+                COALESCE(SUM(cogs), 0) as total_cogs,
+                COALESCE(SUM(items_sold), 0) as items_sold,
+                COALESCE(SUM(returns_count), 0) as returns_count,
+                COALESCE(SUM(returns_amount), 0) as total_returns
+            FROM sales_daily_rollup
+            WHERE day >= ? AND day <= ?
+        """, (start_date, end_date))
+
+        summary = dict(result[0])
+        transactions = summary['total_transactions']
+        summary['avg_transaction'] = summary['total_sales'] / transactions if transactions else None
+        return summary
+
+    def get_sales_breakdown(self, start_date: str, end_date: str, group_by: str = 'day',
+                            top_limit: int = 10) -> Dict:
+        """الإجماليات والتوزيع حسب الفترة ووسيلة الدفع وأفضل المنتجات في استعلام واحد
+        
+        كل جدول تجميع يُقرأ مرة واحدة: أيام النطاق تُجمع في CTE يُستخدم للإجمالي
+        وللفترات، ثم تُضم الأقسام بـ UNION ALL وتُفرز في بايثون.
+        """
+        period = "substr(day, 1, 7)" if group_by == 'month' else "day"
+        result = self.db.execute_query(f"""
+            WITH days AS MATERIALIZED (
+                SELECT day, transactions, final_amount, discount_amount, tax_amount
+                FROM sales_daily_rollup
+                WHERE day >= :start AND day <= :end
+            )
+            SELECT 'summary' as section, NULL as label,
+                   COALESCE(SUM(transactions), 0) as transactions,
+                   COALESCE(SUM(final_amount), 0) as amount,
+                   COALESCE(SUM(discount_amount), 0) as discounts,
+                   COALESCE(SUM(tax_amount), 0) as tax,
+                   NULL as quantity
+            FROM days
+            UNION ALL
+            SELECT 'period', {period}, SUM(transactions), SUM(final_amount),
+                   SUM(discount_amount), NULL, NULL
+            FROM days
+            GROUP BY {period}
+            HAVING SUM(transactions) > 0
+            UNION ALL
+            SELECT 'payment', payment_method, SUM(transactions), SUM(final_amount),
+                   NULL, NULL, NULL
+            FROM sales_payment_rollup
+            WHERE day >= :start AND day <= :end
+            GROUP BY payment_method
+            HAVING SUM(transactions) > 0
+            UNION ALL
+            SELECT 'product', p.name, NULL, top.revenue, NULL, NULL, top.quantity
+            FROM (
+                SELECT product_id, SUM(quantity) as quantity, SUM(revenue) as revenue
+                FROM sales_item_rollup
+                WHERE day >= :start AND day <= :end
+                GROUP BY product_id
+                HAVING SUM(quantity) > 0
+                ORDER BY quantity DESC
+                LIMIT :top_limit
+            ) top
+            JOIN products p ON p.id = top.product_id
+        """, {'start': start_date, 'end': end_date, 'top_limit': top_limit})
+
+        breakdown = {'summary': {}, 'by_payment_method': [], 'by_period': [], 'top_products': []}
+        for row in result:
+            section = row['section']
+            if section == 'summary':
+                transactions = row['transactions']
+                breakdown['summary'] = {
+                    'total_transactions': transactions,
+                    'total_sales': row['amount'],
+                    'total_discounts': row['discounts'],
+                    'total_tax': row['tax'],
+                    'avg_transaction': row['amount'] / transactions if transactions else None
+                }
+            elif section == 'period':
+                breakdown['by_period'].append({
+                    'period': row['label'], 'transactions': row['transactions'],
+                    'total_sales': row['amount'], 'discounts': row['discounts']
+                })
+            elif section == 'payment':
+                breakdown['by_payment_method'].append({
+                    'payment_method': row['label'], 'transaction_count': row['transactions'],
+                    'total_amount': row['amount']
+                })
+            else:
+                breakdown['top_products'].append({
+                    'name': row['label'], 'total_sold': row['quantity'],
+                    'total_revenue': row['amount'], 'avg_price': row['amount'] / row['quantity']
+                })
+
+        breakdown['by_period'].sort(key=lambda item: item['period'])
+        breakdown['by_payment_method'].sort(key=lambda item: item['total_amount'], reverse=True)
+        breakdown['top_products'].sort(key=lambda item: item['total_sold'], reverse=True)
+        return breakdown
+
+    def get_daily_payment_totals(self, day: str) -> Dict:
+        """مبيعات يوم واحد مقسمة حسب وسيلة الدفع"""
+        result = self.db.execute_query("""
+            SELECT payment_method, SUM(transactions) as transactions,
+                   SUM(final_amount) as total_amount
+            FROM sales_payment_rollup
+            WHERE day = ?
+            GROUP BY payment_method
+        """, (day,))
+        return {row['payment_method']: dict(row) for row in result}
+
+
+def _parse_args(argv=None) -> Tuple[str, Optional[str], Optional[str]]:
+    parser = argparse.ArgumentParser(description="إعادة بناء تجميعات المبيعات اليومية")
+    parser.add_argument('--from', dest='start_date', help="أول يوم (YYYY-MM-DD)")
+    parser.add_argument('--to', dest='end_date', help="آخر يوم (YYYY-MM-DD)")
+    parser.add_argument('--db', dest='db_path', default="data/shop.db", help="مسار قاعدة البيانات")
+    args = parser.parse_args(argv)
+    return args.db_path, args.start_date, args.end_date
+
+
+def main(argv=None) -> int:
+    """نقطة دخول سطر الأوامر لإعادة البناء"""
+    from .database import DatabaseManager
+
+    db_path, start_date, end_date = _parse_args(argv)
+    db = DatabaseManager(db_path)
+    db.initialize_database()
+    if not SalesRollup(db).rebuild(start_date, end_date):
+        return 1
+    print(f"تمت إعادة بناء تجميعات المبيعات ({start_date or 'البداية'} - {end_date or 'النهاية'})")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -7,8 +7,30 @@
 import bcrypt
 from datetime import datetime
 from typing import Dict, List, Optional
+from config.settings import SECURITY_CONFIG
 from .database import DatabaseManager
 
+
+def hash_password(password: str, rounds: int = None) -> str:
+    """تشفير كلمة المرور بتكلفة bcrypt المحددة في الإعدادات"""
+    rounds = rounds or SECURITY_CONFIG.get('bcrypt_rounds', 12)
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds)).decode('utf-8')
+
+
+def password_rounds(stored_hash: str) -> int:
+    """تكلفة bcrypt المخزنة في التشفير ($2b$12$...)"""
+    try:
+        return int(stored_hash.split('$')[2])
+    except (IndexError, ValueError):
+        return 0
+
+
+def needs_rehash(stored_hash: str, rounds: int = None) -> bool:
+    """هل تكلفة التشفير المخزن تختلف عن التكلفة الحالية في الإعدادات؟"""
+    rounds = rounds or SECURITY_CONFIG.get('bcrypt_rounds', 12)
+    return password_rounds(stored_hash) != rounds
+
+
 class User:
     """فئة المستخدم"""
     
@@ -30,6 +52,10 @@ class User:
                 
                 # التحقق من كلمة المرور
                 if bcrypt.checkpw(password.encode('utf-8'), stored_hash.encode('utf-8')):
+                    # إعادة التشفير بالتكلفة الحالية إن تغيرت منذ حفظ كلمة المرور
+                    if needs_rehash(stored_hash):
+                        self._rehash_password(user['id'], stored_hash, password)
+                    
                     # إزالة كلمة المرور من النتيجة
                     del user['password_hash']
                     return user
@@ -40,17 +66,27 @@ class User:
             print(f"خطأ في المصادقة: {str(e)}")
             return None
     
+    def _rehash_password(self, user_id: int, stored_hash: str, password: str):
+        """تحديث التشفير ما لم تتغير كلمة المرور في هذه الأثناء"""
+        try:
+            self.db.execute_update(
+                "UPDATE users SET password_hash = ? WHERE id = ? AND password_hash = ?",
+                (hash_password(password), user_id, stored_hash)
+            )
+        except Exception as e:
+            print(f"خطأ في إعادة تشفير كلمة المرور: {str(e)}")
+    
     def create_user(self, username: str, password: str, full_name: str, 
                    role: str = "Cashier") -> bool:
         """إنشاء مستخدم جديد"""
         try:
             # تشفير كلمة المرور
-            password_hash = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
+            password_hash = hash_password(password)
             
             self.db.execute_insert(
                 """INSERT INTO users (username, password_hash, full_name, role)
                    VALUES (?, ?, ?, ?)""",
-                (username, password_hash.decode('utf-8'), full_name, role)
+                (username, password_hash, full_name, role)
             )
             return True
             
@@ -80,9 +116,8 @@ class User:
             for field, value in kwargs.items():
                 if field == 'password':
                     # تشفير كلمة المرور الجديدة
-                    password_hash = bcrypt.hashpw(value.encode('utf-8'), bcrypt.gensalt())
                     update_fields.append("password_hash = ?")
-                    params.append(password_hash.decode('utf-8'))
+                    params.append(hash_password(value))
                 elif field in ['username', 'full_name', 'role', 'is_active']:
                     update_fields.append(f"{field} = ?")
                     params.append(value)
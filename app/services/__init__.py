@@ -3,17 +3,33 @@
 """
 
 from .auth_service import AuthService
+from .audit_archive import AuditArchive
+from .session_manager import SessionManager
 from .inventory_service import InventoryService
 from .pos_service import POSService
 from .repair_service import RepairService
 from .report_service import ReportService
+from .report_cache import ReportCache
 from .backup_service import BackupService
+from .backup_catalog import BackupCatalog
+from .dashboard_service import DashboardService
+from .event_bus import EventBus
+from .export_service import ExportService
+from .settings_service import SettingsService
 
 __all__ = [
     'AuthService',
+    'AuditArchive',
+    'SessionManager',
     'InventoryService',
     'POSService',
     'RepairService',
     'ReportService',
-    'BackupService'
+    'ReportCache',
+    'BackupService',
+    'BackupCatalog',
+    'DashboardService',
+    'EventBus',
+    'ExportService',
+    'SettingsService'
 ]
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+أرشيف سجل النشاط - Audit Log Archive
+
+قاعدة البيانات الرئيسية تحتفظ بسجل النشاط لآخر audit_retention_days يوماً
+فقط، وما هو أقدم يُنقل على دفعات إلى قاعدة أرشيف لكل شهر (audit_YYYY_MM.db
+حسب شهر created_at بتوقيت UTC) في مجلد audit_archive بجانب قاعدة البيانات.
+ملفات الأرشيف تُربط (ATTACH) عند الحاجة فقط: عند النقل، أو عندما تتجاوز
+صفحة من السجل أقدم صف في قاعدة البيانات الرئيسية.
+
+ترقيم الصفحات بالمؤشر (created_at, id): كل صفحة تبدأ بعد آخر صف في الصفحة
+السابقة عبر الفهرس، فزمن الصفحة لا يتغير مع حجم السجل.
+"""
+
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+
+from app.models.audit_writer import AuditWriter
+from app.models.database import DatabaseManager
+from app.utils.date_range import date_range_clause
+from config.settings import DATABASE_CONFIG
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_SCHEMA = "audit_archive"
+
+_COLUMNS = "id, user_id, action, table_name, record_id, old_values, new_values, created_at"
+
+ActivityCursor = Tuple[str, int]
+
+
+def _month_bounds(month: str) -> Tuple[str, str]:
+    """بداية الشهر وبداية الشهر التالي كنص UTC ('YYYY_MM')"""
+    year, month_number = int(month[:4]), int(month[5:7])
+    start = datetime(year, month_number, 1)
+    end = datetime(year + month_number // 12, month_number % 12 + 1, 1)
+    return start.strftime("%Y-%m-%d %H:%M:%S"), end.strftime("%Y-%m-%d %H:%M:%S")
+
+
+class AuditArchive:
+    """نقل سجل النشاط القديم إلى أرشيف شهري وقراءته بصفحات"""
+
+    _archives: Dict[str, 'AuditArchive'] = {}
+    _archives_lock = threading.Lock()
+
+    def __init__(self, db: DatabaseManager = None, archive_dir: Path = None):
+        self.db = db if db else DatabaseManager()
+        self.archive_dir = Path(archive_dir) if archive_dir else Path(self.db.db_path).parent / "audit_archive"
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_db(cls, db: DatabaseManager = None) -> 'AuditArchive':
+        """الحصول على الأرشيف المشترك لملف قاعدة البيانات"""
+        db = db if db else DatabaseManager()
+        key = os.path.abspath(db.db_path)
+        with cls._archives_lock:
+            archive = cls._archives.get(key)
+            if archive is None:
+                archive = cls(db)
+                cls._archives[key] = archive
+            return archive
+
+    # ------------------------------------------------------------------
+    # ملفات الأرشيف
+    # ------------------------------------------------------------------
+
+    def archive_path(self, month: str) -> Path:
+        return self.archive_dir / f"audit_{month}.db"
+
+    def list_months(self) -> List[str]:
+        """أشهر الأرشيف الموجودة ('YYYY_MM') من الأحدث إلى الأقدم"""
+        if not self.archive_dir.exists():
+            return []
+        return sorted((path.stem[len("audit_"):] for path in self.archive_dir.glob("audit_????_??.db")),
+                      reverse=True)
+
+    def _attach(self, month: str, create: bool = False) -> bool:
+        """ربط أرشيف شهر باتصال الخيط الحالي (خارج أي معاملة)"""
+        path = self.archive_path(month)
+        if not path.exists() and not create:
+            return False
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        conn = self.db.get_connection()
+        conn.execute(f"ATTACH DATABASE ? AS {ARCHIVE_SCHEMA}", (str(path),))
+        if create:
+            conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS {ARCHIVE_SCHEMA}.audit_logs (
+                    id INTEGER PRIMARY KEY,
+                    user_id INTEGER,
+                    action VARCHAR(100) NOT NULL,
+                    table_name VARCHAR(50),
+                    record_id INTEGER,
+                    old_values TEXT,
+                    new_values TEXT,
+                    created_at TIMESTAMP
+                )
+            """)
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {ARCHIVE_SCHEMA}.idx_audit_logs_created_at "
+                         f"ON audit_logs (created_at)")
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {ARCHIVE_SCHEMA}.idx_audit_logs_user_created_at "
+                         f"ON audit_logs (user_id, created_at)")
+        return True
+
+    def _detach(self):
+        self.db.get_connection().execute(f"DETACH DATABASE {ARCHIVE_SCHEMA}")
+
+    # ------------------------------------------------------------------
+    # الاحتفاظ والنقل
+    # ------------------------------------------------------------------
+
+    def archive_before(self, cutoff: str, batch_size: int = None) -> int:
+        """نقل الصفوف الأقدم من cutoff (نص UTC) إلى أرشيف أشهرها وإرجاع عددها"""
+        batch_size = batch_size or DATABASE_CONFIG.get('audit_archive_batch', 5000)
+        moved = 0
+
+        # الأحداث المعلقة في الطابور تُكتب أولاً حتى لا يسبقها النقل
+        AuditWriter.for_db(self.db).flush()
+
+        with self._lock:
+            while True:
+                oldest = self.db.execute_query(
+                    "SELECT created_at FROM audit_logs WHERE created_at < ? ORDER BY created_at LIMIT 1",
+                    (cutoff,)
+                )
+                if not oldest:
+                    break
+
+                month = str(oldest[0][0])[:7].replace('-', '_')
+                upper = min(_month_bounds(month)[1], cutoff)
+                self._attach(month, create=True)
+                try:
+                    moved += self._move_month(upper, batch_size)
+                finally:
+                    self._detach()
+
+        if moved:
+            logger.info(f"تم نقل {moved} صف من سجل النشاط إلى الأرشيف الشهري")
+        return moved
+
+    def _move_month(self, upper: str, batch_size: int) -> int:
+        """نقل صفوف شهر واحد (الأقدم من upper) على دفعات بالمؤشر (created_at, id)"""
+        moved = 0
+        while True:
+            boundary = self.db.execute_query("""
+                SELECT created_at, id FROM main.audit_logs WHERE created_at < ?
+                ORDER BY created_at, id LIMIT 1 OFFSET ?
+            """, (upper, batch_size - 1))
+
+            if boundary:
+                condition, params = "created_at < ? AND (created_at, id) <= (?, ?)", (upper, *boundary[0])
+            else:
+                condition, params = "created_at < ?", (upper,)
+
+            # النسخ إلى الأرشيف ثم الحذف في معاملتين: انقطاع بينهما يترك الصفوف
+            # في الرئيسية فقط ويُعاد نسخها لاحقاً دون تكرار (INSERT OR IGNORE بالمعرف)
+            with self.db.transaction() as conn:
+                conn.execute(f"""
+                    INSERT OR IGNORE INTO {ARCHIVE_SCHEMA}.audit_logs ({_COLUMNS})
+                    SELECT {_COLUMNS} FROM main.audit_logs WHERE {condition}
+                """, params)
+            with self.db.transaction() as conn:
+                moved += conn.execute(f"DELETE FROM main.audit_logs WHERE {condition}", params).rowcount
+
+            if not boundary:
+                return moved
+
+    def prune_archives(self, keep_months: int = None) -> int:
+        """حذف ملفات الأرشيف الأقدم من keep_months شهراً (0 = الاحتفاظ دائماً)"""
+        keep_months = DATABASE_CONFIG.get('audit_archive_keep_months', 0) if keep_months is None else keep_months
+        if keep_months <= 0:
+            return 0
+
+        today = datetime.now(timezone.utc)
+        total_months = today.year * 12 + today.month - 1 - keep_months
+        oldest_kept = f"{total_months // 12:04d}_{total_months % 12 + 1:02d}"
+
+        removed = 0
+        for month in self.list_months():
+            if month < oldest_kept:
+                self.archive_path(month).unlink(missing_ok=True)
+                removed += 1
+        if removed:
+            logger.info(f"تم حذف {removed} ملف أرشيف لسجل النشاط")
+        return removed
+
+    def compact(self, free_ratio: float = None) -> bool:
+        """ضغط قاعدة البيانات (VACUUM) إذا تجاوزت الصفحات الفارغة النسبة المحددة"""
+        free_ratio = DATABASE_CONFIG.get('audit_compact_free_ratio', 0.25) if free_ratio is None else free_ratio
+        conn = self.db.get_connection()
+        page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+        freelist_count = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        if not page_count or freelist_count / page_count < free_ratio:
+            return False
+
+        conn.execute("VACUUM")
+        self.db.checkpoint()
+        logger.info(f"تم ضغط قاعدة البيانات ({freelist_count} صفحة فارغة من {page_count})")
+        return True
+
+    def run_retention(self, retention_days: int = None) -> Dict[str, Any]:
+        """مهمة الاحتفاظ: نقل القديم إلى الأرشيف وحذف الأرشيف المنتهي والضغط عند الحاجة"""
+        retention_days = retention_days or DATABASE_CONFIG.get('audit_retention_days', 180)
+        cutoff = (datetime.now(timezone.utc) - timedelta(days=retention_days)).strftime("%Y-%m-%d %H:%M:%S")
+        result = {'archived': 0, 'archives_removed': 0, 'compacted': False}
+        try:
+            result['archived'] = self.archive_before(cutoff)
+            result['archives_removed'] = self.prune_archives()
+            if result['archived']:
+                result['compacted'] = self.compact()
+        except Exception as e:
+            logger.error(f"خطأ في مهمة الاحتفاظ بسجل النشاط: {str(e)}")
+        return result
+
+    # ------------------------------------------------------------------
+    # القراءة بصفحات
+    # ------------------------------------------------------------------
+
+    def _query_page(self, schema: str, user_id: Optional[int], start_date, end_date,
+                    before: Optional[ActivityCursor], limit: int) -> List[Dict]:
+        query = f"""
+            SELECT al.*, u.full_name as user_name, u.username
+            FROM {schema}.audit_logs al
+            LEFT JOIN main.users u ON al.user_id = u.id
+            WHERE 1=1
+        """
+        params: List[Any] = []
+
+        if user_id:
+            query += " AND al.user_id = ?"
+            params.append(user_id)
+
+        date_clause, date_params = date_range_clause('al.created_at', start_date, end_date)
+        query += date_clause
+        params.extend(date_params)
+
+        if before:
+            query += " AND (al.created_at, al.id) < (?, ?)"
+            params.extend(before)
+
+        query += " ORDER BY al.created_at DESC, al.id DESC LIMIT ?"
+        params.append(limit)
+
+        return [dict(row) for row in self.db.execute_query(query, tuple(params))]
+
+    def get_page(self, user_id: int = None, start_date=None, end_date=None,
+                 limit: int = 100, before: ActivityCursor = None) -> Dict[str, Any]:
+        """صفحة من سجل النشاط (الأحدث أولاً) مع مؤشر الصفحة التالية أو None"""
+        rows = self._query_page('main', user_id, start_date, end_date, before, limit)
+
+        if len(rows) < limit:
+            # الصفحة تتجاوز أقدم صف في قاعدة البيانات الرئيسية: الأرشيف الشهري بالترتيب
+            lower = date_range_clause('created_at', start_date, None)[1]
+            upper = date_range_clause('created_at', None, end_date)[1]
+            with self._lock:
+                for month in self.list_months():
+                    month_start, month_end = _month_bounds(month)
+                    if lower and month_end <= lower[0]:
+                        break
+                    if upper and month_start >= upper[0]:
+                        continue
+                    cursor = (rows[-1]['created_at'], rows[-1]['id']) if rows else before
+                    if cursor and str(cursor[0]) < month_start:
+                        continue
+                    if not self._attach(month):
+                        continue
+                    try:
+                        rows.extend(self._query_page(ARCHIVE_SCHEMA, user_id, start_date, end_date,
+                                                     cursor, limit - len(rows)))
+                    finally:
+                        self._detach()
+                    if len(rows) >= limit:
+                        break
+
+        next_cursor = (rows[-1]['created_at'], rows[-1]['id']) if len(rows) >= limit else None
+        return {'rows': rows, 'next_cursor': next_cursor}
@@ -4,9 +4,14 @@
 خدمة المصادقة - Authentication Service
 """
 
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
+from app.models.audit_writer import AuditWriter
 from app.models.database import DatabaseManager
+from app.models.role import ALL_PERMISSIONS, NO_PERMISSIONS, Role
 from app.models.user import User
+from app.services.audit_archive import AuditArchive
+from app.services.session_manager import SessionManager
+from config.settings import SYSTEM_CONFIG
 import logging
 
 logger = logging.getLogger(__name__)
@@ -17,14 +22,34 @@ class AuthService:
     def __init__(self):
         self.db = DatabaseManager()
         self.user_model = User(self.db)
+        self.audit = AuditWriter.for_db(self.db)
+        self.sessions = SessionManager.for_db(self.db)
+        self.role_model = Role(self.db)
+        self.permissions = self.role_model.matrix
         self._current_user = None
+        self._session_id = None
+        self._permissions = NO_PERMISSIONS
+        self._permissions_user = None
+        self._permissions_version = None
     
-    def login(self, username: str, password: str) -> Optional[Dict]:
-        """تسجيل دخول المستخدم"""
+    def login(self, username: str, password: str, pin: str = None) -> Optional[Dict]:
+        """تسجيل دخول المستخدم وفتح جلسة له (مع رمز PIN اختياري للتبديل السريع)"""
         try:
+            locked_for = self.sessions.login_locked_for(username)
+            if locked_for:
+                logger.warning(f"محاولة دخول لحساب مقفل مؤقتاً: {username} ({locked_for:.0f} ثانية)")
+                return None
+
             user = self.user_model.authenticate(username, password)
+            self.sessions.record_login(username, bool(user))
             if user:
+                self.permissions.refresh()
+                if pin and not self.is_valid_pin(pin):
+                    pin = None
+                user['session_id'] = self.sessions.open_session(user, pin)
                 self._current_user = user
+                self._session_id = user['session_id']
+                self._compile_permissions(user)
                 self.log_user_activity(user['id'], 'login', 'users', user['id'])
                 logger.info(f"تم تسجيل دخول المستخدم: {username}")
             return user
@@ -33,7 +58,7 @@ class AuthService:
             return None
     
     def logout(self):
-        """تسجيل خروج المستخدم"""
+        """تسجيل خروج المستخدم وإغلاق جلسته"""
         if self._current_user:
             self.log_user_activity(
                 self._current_user['id'], 'logout', 
@@ -41,40 +66,116 @@ class AuthService:
             )
             logger.info(f"تم تسجيل خروج المستخدم: {self._current_user['username']}")
             self._current_user = None
+        if self._session_id:
+            self.sessions.close_session(self._session_id)
+            self._session_id = None
     
     def get_current_user(self) -> Optional[Dict]:
         """الحصول على المستخدم الحالي"""
         return self._current_user
+
+    @staticmethod
+    def is_valid_pin(pin: str) -> bool:
+        """رمز PIN أرقام فقط بطول pin_min_length على الأقل"""
+        return bool(pin) and pin.isdigit() and len(pin) >= SYSTEM_CONFIG.get('pin_min_length', 4)
+
+    def _reload_session_user(self, user: Dict) -> Optional[Dict]:
+        """إعادة قراءة حالة مستخدم الجلسة ودوره (قد يكون عُطل أو تغير دوره بعد فتحها)"""
+        result = self.db.execute_query(
+            "SELECT username, full_name, role, is_active FROM users WHERE id = ?",
+            (user['id'],)
+        )
+        if not result or not result[0]['is_active']:
+            self.sessions.close_user_sessions(user['id'])
+            logger.warning(f"أُغلقت جلسات المستخدم المعطل: {user['username']}")
+            return None
+        account = result[0]
+        return dict(user, username=account['username'], full_name=account['full_name'],
+                    role=account['role'])
+
+    def resume_session(self, session_id: str) -> Optional[Dict]:
+        """استخدام جلسة مفتوحة (من نافذة تسجيل الدخول مثلاً) في هذه الخدمة"""
+        user = self.sessions.session_user(session_id) if session_id else None
+        if user:
+            try:
+                user = self._reload_session_user(user)
+            except Exception as e:
+                logger.error(f"خطأ في قراءة مستخدم الجلسة: {str(e)}")
+                user = None
+        if user:
+            self.permissions.refresh()
+            self._current_user = user
+            self._session_id = session_id
+            self._compile_permissions(user)
+        return user
+
+    def switch_user(self, session_id: str, pin: str) -> Optional[Dict]:
+        """التبديل إلى جلسة مفتوحة برمز PIN دون إعادة إدخال كلمة المرور"""
+        try:
+            user = self.sessions.verify_pin(session_id, pin)
+            if user:
+                user = self._reload_session_user(user)
+            if not user:
+                logger.warning("فشل التبديل إلى جلسة برمز PIN")
+                return None
+
+            self.permissions.refresh()
+            previous = self._current_user
+            self._current_user = user
+            self._session_id = session_id
+            self._compile_permissions(user)
+            self.log_user_activity(
+                user['id'], 'switch_user', 'users', user['id'],
+                f"تبديل من {previous['username']}" if previous else None
+            )
+            logger.info(f"تم التبديل إلى المستخدم: {user['username']}")
+            return user
+        except Exception as e:
+            logger.error(f"خطأ في تبديل المستخدم: {str(e)}")
+            return None
+
+    def get_open_sessions(self) -> List[Dict]:
+        """الجلسات المفتوحة على هذا الجهاز"""
+        return self.sessions.get_sessions()
+
+    def touch_session(self):
+        """تسجيل نشاط للمستخدم الحالي (يؤخر انتهاء الجلسة)"""
+        if self._session_id:
+            self.sessions.touch(self._session_id)
+
+    def is_session_expired(self) -> bool:
+        """هل انتهت جلسة المستخدم الحالي لعدم النشاط"""
+        if not self._session_id:
+            return False
+        if self.sessions.is_active(self._session_id):
+            return False
+
+        if self._current_user:
+            self.log_user_activity(self._current_user['id'], 'session_expired',
+                                   'users', self._current_user['id'])
+        self._current_user = None
+        self._session_id = None
+        return True
     
     def has_permission(self, permission: str) -> bool:
-        """التحقق من صلاحية المستخدم"""
-        if not self._current_user:
+        """التحقق من صلاحية المستخدم (بحث في مجموعة صلاحيات دوره المجمعة)"""
+        user = self._current_user
+        if not user:
             return False
         
-        role = self._current_user['role']
-        
-        # صلاحيات المدير الكاملة
-        if role == 'Admin':
-            return True
-        
-        # صلاحيات الكاشير
-        if role == 'Cashier':
-            cashier_permissions = [
-                'create_sale', 'view_sales', 'create_return',
-                'view_products', 'update_stock', 'create_customer',
-                'view_reports_basic'
-            ]
-            return permission in cashier_permissions
-        
-        # صلاحيات الفني
-        if role == 'Technician':
-            technician_permissions = [
-                'create_repair', 'update_repair', 'view_repairs',
-                'view_products', 'use_parts'
-            ]
-            return permission in technician_permissions
+        permissions = self._permissions
+        if user is not self._permissions_user or self._permissions_version != self.permissions.version:
+            permissions = self._compile_permissions(user)
         
-        return False
+        return permission in permissions or ALL_PERMISSIONS in permissions
+    
+    def _compile_permissions(self, user: Dict):
+        """تجميع صلاحيات دور المستخدم الحالي (عند أول تحقق بعد الدخول أو تعديل الأدوار)"""
+        version = self.permissions.version
+        self._permissions = self.permissions.compile(user['role'])
+        self._permissions_user = user
+        self._permissions_version = version
+        return self._permissions
     
     def create_user(self, username: str, password: str, full_name: str, 
                    role: str = "Cashier") -> bool:
@@ -101,6 +202,44 @@ class AuthService:
         
         return self.user_model.get_all_users()
     
+    def get_roles(self) -> List[Dict]:
+        """الحصول على الأدوار وصلاحياتها"""
+        if not self.has_permission('manage_users'):
+            return []
+        
+        return self.role_model.get_all_roles()
+    
+    def get_available_permissions(self) -> List[Dict]:
+        """الحصول على قائمة الصلاحيات المعرفة"""
+        return self.role_model.get_all_permissions()
+    
+    def save_role(self, name: str, display_name: str, permissions: List[str],
+                  all_permissions: bool = False) -> bool:
+        """إنشاء دور أو تعديل صلاحياته (يسري فوراً على المستخدمين المسجلين)"""
+        if not self.has_permission('manage_users'):
+            return False
+        
+        success = self.role_model.save_role(name, display_name, permissions, all_permissions)
+        if success:
+            self.log_user_activity(
+                self._current_user['id'], 'save_role', 'roles', None,
+                f"تعديل صلاحيات الدور: {name}"
+            )
+        return success
+    
+    def delete_role(self, name: str) -> bool:
+        """حذف دور غير مسند لأي مستخدم نشط"""
+        if not self.has_permission('manage_users'):
+            return False
+        
+        success = self.role_model.delete_role(name)
+        if success:
+            self.log_user_activity(
+                self._current_user['id'], 'delete_role', 'roles', None,
+                f"حذف الدور: {name}"
+            )
+        return success
+    
     def update_user(self, user_id: int, **kwargs) -> bool:
         """تحديث بيانات المستخدم"""
         if not self.has_permission('manage_users'):
@@ -108,6 +247,9 @@ class AuthService:
         
         try:
             success = self.user_model.update_user(user_id, **kwargs)
+            if success and {'role', 'is_active', 'password'} & kwargs.keys():
+                # الجلسات المفتوحة تحمل الدور وحالة الحساب وقت الدخول
+                self.sessions.close_user_sessions(user_id)
             if success:
                 self.log_user_activity(
                     self._current_user['id'], 'update_user', 
@@ -130,6 +272,7 @@ class AuthService:
         try:
             success = self.user_model.delete_user(user_id)
             if success:
+                self.sessions.close_user_sessions(user_id)
                 self.log_user_activity(
                     self._current_user['id'], 'delete_user', 
                     'users', user_id, f"تعطيل المستخدم"
@@ -141,49 +284,31 @@ class AuthService:
     
     def log_user_activity(self, user_id: int, action: str, table_name: str = None,
                          record_id: int = None, notes: str = None):
-        """تسجيل نشاط المستخدم"""
+        """تسجيل نشاط المستخدم (يُكتب على دفعات في الخلفية)"""
         try:
-            self.db.execute_insert("""
-                INSERT INTO audit_logs (user_id, action, table_name, record_id, new_values)
-                VALUES (?, ?, ?, ?, ?)
-            """, (user_id, action, table_name, record_id, notes))
+            self.audit.log(user_id, action, table_name, record_id, notes)
         except Exception as e:
             logger.error(f"خطأ في تسجيل نشاط المستخدم: {str(e)}")
     
     def get_user_activity_log(self, user_id: int = None, 
                             start_date: str = None, end_date: str = None,
-                            limit: int = 100) -> List[Dict]:
-        """الحصول على سجل نشاط المستخدمين"""
+                            limit: int = 100, before: Tuple[str, int] = None) -> List[Dict]:
+        """الحصول على سجل نشاط المستخدمين (before: مؤشر آخر صف في الصفحة السابقة)"""
+        return self.get_user_activity_page(user_id, start_date, end_date, limit, before)['rows']
+    
+    def get_user_activity_page(self, user_id: int = None,
+                               start_date: str = None, end_date: str = None,
+                               limit: int = 100, before: Tuple[str, int] = None) -> Dict:
+        """صفحة من سجل النشاط مع مؤشر الصفحة التالية (created_at, id) أو None"""
         if not self.has_permission('view_audit_log'):
-            return []
+            return {'rows': [], 'next_cursor': None}
         
         try:
-            query = """
-                SELECT al.*, u.full_name as user_name, u.username
-                FROM audit_logs al
-                LEFT JOIN users u ON al.user_id = u.id
-                WHERE 1=1
-            """
-            params = []
-            
-            if user_id:
-                query += " AND al.user_id = ?"
-                params.append(user_id)
-            
-            if start_date:
-                query += " AND DATE(al.created_at) >= ?"
-                params.append(start_date)
+            # الأحداث التي ما زالت في الطابور تظهر في السجل أيضاً
+            self.audit.flush()
             
-            if end_date:
-                query += " AND DATE(al.created_at) <= ?"
-                params.append(end_date)
-            
-            query += " ORDER BY al.created_at DESC LIMIT ?"
-            params.append(limit)
-            
-            result = self.db.execute_query(query, tuple(params))
-            return [dict(row) for row in result]
+            return AuditArchive.for_db(self.db).get_page(user_id, start_date, end_date, limit, before)
             
         except Exception as e:
             logger.error(f"خطأ في الحصول على سجل النشاط: {str(e)}")
-            return []
+            return {'rows': [], 'next_cursor': None}
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+فهرس النسخ الاحتياطية - Backup Catalog
+
+ملف catalog.json في مجلد النسخ يسجل لكل نسخة حجمها وبصمتها ونوعها
+(full للأرشيفات، auto للنسخ الأساسية في سلسلة النسخ، incremental للفروق)
+وحلقتها السابقة ومنشئها لحظة إنشائها. العرض والاحتفاظ والتحقق تقرأ
+الفهرس وحده، والمطابقة مع المجلد تعتمد على الحجم ووقت التعديل فقط فلا
+يُفتح أرشيف إلا إذا ظهر ملف جديد لا يعرفه الفهرس.
+
+الفهرس يُحفظ خارج قاعدة البيانات حتى لا تمحوه استعادة نسخة قديمة.
+"""
+
+import json
+import os
+import threading
+import zipfile
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+import logging
+
+from app.services.backup_chain import file_sha256
+
+logger = logging.getLogger(__name__)
+
+CATALOG_FILE = "catalog.json"
+CHAIN_DIR = "chain"
+
+
+class BackupCatalog:
+    """فهرس النسخ الاحتياطية المشترك لمجلد نسخ واحد"""
+
+    _catalogs: Dict[str, 'BackupCatalog'] = {}
+    _catalogs_lock = threading.Lock()
+
+    def __init__(self, backup_dir: Path):
+        self.backup_dir = Path(backup_dir)
+        self.catalog_path = self.backup_dir / CATALOG_FILE
+        self.manifest_path = self.backup_dir / CHAIN_DIR / "manifest.json"
+        self._lock = threading.RLock()
+        self._data: Optional[Dict[str, Any]] = None
+
+    @classmethod
+    def for_dir(cls, backup_dir: Path) -> 'BackupCatalog':
+        """الحصول على الفهرس المشترك لمجلد النسخ"""
+        key = os.path.abspath(backup_dir)
+        with cls._catalogs_lock:
+            catalog = cls._catalogs.get(key)
+            if catalog is None:
+                catalog = cls(Path(backup_dir))
+                cls._catalogs[key] = catalog
+            return catalog
+
+    # ------------------------------------------------------------------
+    # التخزين
+    # ------------------------------------------------------------------
+
+    def _load(self) -> Dict[str, Any]:
+        if self._data is None:
+            try:
+                with open(self.catalog_path, 'r', encoding='utf-8') as f:
+                    self._data = json.load(f)
+            except FileNotFoundError:
+                self._data = {'version': 1, 'manifest_mtime': None, 'entries': {}}
+            except Exception as e:
+                logger.warning(f"فهرس النسخ الاحتياطية تالف وسيعاد بناؤه: {str(e)}")
+                self._data = {'version': 1, 'manifest_mtime': None, 'entries': {}}
+        return self._data
+
+    def _save(self):
+        """حفظ الفهرس بكتابة ملف مؤقت ثم استبداله"""
+        self.backup_dir.mkdir(parents=True, exist_ok=True)
+        temp_path = self.catalog_path.with_suffix(".json.tmp")
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._data, f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, self.catalog_path)
+
+    @staticmethod
+    def _file_state(path: Path) -> Dict[str, Any]:
+        stat = path.stat()
+        return {'size': stat.st_size, 'mtime': stat.st_mtime}
+
+    # ------------------------------------------------------------------
+    # التسجيل لحظة الإنشاء
+    # ------------------------------------------------------------------
+
+    def record_archive(self, archive_path: Path, backup_info: Dict[str, Any],
+                       sha256: str = None) -> Dict[str, Any]:
+        """تسجيل أرشيف نسخة كاملة بعد اكتماله"""
+        archive_path = Path(archive_path)
+        entry = {
+            'name': archive_path.stem,
+            'file': archive_path.name,
+            'type': 'full',
+            'parent': None,
+            'base': None,
+            'created_at': backup_info.get('created_at'),
+            'created_by': backup_info.get('created_by'),
+            'includes_reports': backup_info.get('includes_reports', False),
+            'sha256': sha256,
+            'db_sha256': backup_info.get('db_sha256'),
+            **self._file_state(archive_path)
+        }
+        with self._lock:
+            self._load()['entries'][entry['file']] = entry
+            self._save()
+        return entry
+
+    def record_chain_point(self, point: Dict[str, Any], created_by: str = None) -> Dict[str, Any]:
+        """تسجيل نقطة من سلسلة النسخ التلقائية"""
+        path = self.backup_dir / CHAIN_DIR / point['file']
+        entry = self._chain_entry(point, path)
+        entry['created_by'] = created_by
+        with self._lock:
+            data = self._load()
+            data['entries'][entry['file']] = entry
+            self._sync_chain(data)
+            self._save()
+        return entry
+
+    @staticmethod
+    def _chain_entry(point: Dict[str, Any], path: Path) -> Dict[str, Any]:
+        stat = path.stat()
+        return {
+            'name': point['name'],
+            'file': f"{CHAIN_DIR}/{point['file']}",
+            'type': 'auto' if point['type'] == 'full' else 'incremental',
+            'parent': point['parent'],
+            'base': point['base'],
+            'created_at': point['created_at'],
+            'created_by': None,
+            'includes_reports': False,
+            'sha256': point['file_sha256'],
+            'db_sha256': point['db_sha256'],
+            'size': stat.st_size,
+            'mtime': stat.st_mtime
+        }
+
+    def remove(self, file_path: Path):
+        """حذف مدخل ملف محذوف من الفهرس"""
+        with self._lock:
+            data = self._load()
+            if data['entries'].pop(self._relative(file_path), None) is not None:
+                self._save()
+
+    def _relative(self, file_path: Path) -> str:
+        path = Path(file_path)
+        try:
+            return path.resolve().relative_to(self.backup_dir.resolve()).as_posix()
+        except ValueError:
+            return path.name
+
+    # ------------------------------------------------------------------
+    # المطابقة مع المجلد
+    # ------------------------------------------------------------------
+
+    def _sync_chain(self, data: Dict[str, Any]) -> bool:
+        """مطابقة نقاط السلسلة مع بيانها إن تغير منذ آخر مطابقة"""
+        try:
+            manifest_mtime = self.manifest_path.stat().st_mtime
+        except FileNotFoundError:
+            manifest_mtime = None
+        if manifest_mtime == data.get('manifest_mtime'):
+            return False
+
+        points = {}
+        if manifest_mtime is not None:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                for point in json.load(f)['entries']:
+                    points[f"{CHAIN_DIR}/{point['file']}"] = point
+
+        entries = data['entries']
+        for key in [key for key in entries if key.startswith(f"{CHAIN_DIR}/") and key not in points]:
+            del entries[key]
+        for key, point in points.items():
+            path = self.backup_dir / key
+            if key not in entries and path.exists():
+                entries[key] = self._chain_entry(point, path)
+
+        data['manifest_mtime'] = manifest_mtime
+        return True
+
+    def _describe_archive(self, archive_path: Path) -> Dict[str, Any]:
+        """مدخل لأرشيف لا يعرفه الفهرس (يُفتح مرة واحدة فقط)"""
+        backup_info = {}
+        try:
+            with zipfile.ZipFile(archive_path, 'r') as zipf:
+                if "backup_info.json" in zipf.namelist():
+                    backup_info = json.loads(zipf.read("backup_info.json").decode('utf-8'))
+        except Exception as e:
+            logger.warning(f"خطأ في قراءة معلومات النسخة الاحتياطية {archive_path}: {str(e)}")
+
+        state = self._file_state(archive_path)
+        backup_info.setdefault('created_at', datetime.fromtimestamp(state['mtime']).isoformat())
+        return {
+            'name': archive_path.stem,
+            'file': archive_path.name,
+            'type': 'full',
+            'parent': None,
+            'base': None,
+            'created_at': backup_info['created_at'],
+            'created_by': backup_info.get('created_by'),
+            'includes_reports': backup_info.get('includes_reports', False),
+            'sha256': None,
+            'db_sha256': backup_info.get('db_sha256'),
+            **state
+        }
+
+    def reconcile(self) -> Dict[str, Dict[str, Any]]:
+        """مطابقة الفهرس مع المجلد بالحجم ووقت التعديل وإرجاع المدخلات"""
+        with self._lock:
+            data = self._load()
+            entries = data['entries']
+            changed = self._sync_chain(data)
+
+            archives = {}
+            if self.backup_dir.exists():
+                with os.scandir(self.backup_dir) as it:
+                    for item in it:
+                        if item.is_file() and item.name.endswith(".zip"):
+                            archives[item.name] = item.stat()
+
+            for key in [key for key, entry in entries.items()
+                        if entry['type'] == 'full' and key not in archives]:
+                del entries[key]
+                changed = True
+
+            for name, stat in archives.items():
+                entry = entries.get(name)
+                if entry is None or entry['size'] != stat.st_size or entry['mtime'] != stat.st_mtime:
+                    entries[name] = self._describe_archive(self.backup_dir / name)
+                    changed = True
+
+            if changed:
+                self._save()
+            return entries
+
+    # ------------------------------------------------------------------
+    # الاستعلام والتحقق
+    # ------------------------------------------------------------------
+
+    def list_entries(self, backup_type: str = None) -> List[Dict[str, Any]]:
+        """مدخلات الفهرس (الأحدث أولاً) مع مسار كل ملف"""
+        entries = [
+            {**entry, 'file_path': str(self.backup_dir / entry['file'])}
+            for entry in self.reconcile().values()
+            if backup_type is None or entry['type'] == backup_type
+        ]
+        entries.sort(key=lambda entry: entry['created_at'] or '', reverse=True)
+        return entries
+
+    def get_entry(self, file_path: Path) -> Optional[Dict[str, Any]]:
+        return self.reconcile().get(self._relative(file_path))
+
+    def verify(self, file_path: Path) -> bool:
+        """مقارنة بصمة الملف بالمسجلة في الفهرس (تُسجل أول مرة إن لم تكن معروفة)"""
+        with self._lock:
+            key = self._relative(file_path)
+            entry = self.reconcile().get(key)
+            path = self.backup_dir / key
+            if entry is None or not path.exists():
+                return False
+
+            actual = file_sha256(path)
+            if entry['sha256'] is None:
+                entry['sha256'] = actual
+                self._save()
+                return True
+            return actual == entry['sha256']
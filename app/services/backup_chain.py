@@ -0,0 +1,373 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+سلسلة النسخ التزايدية - Incremental Backup Chain
+
+كل سلسلة تبدأ بنسخة كاملة (base) تليها نسخ تزايدية لا تحفظ إلا صفحات
+SQLite التي تغيرت منذ النسخة السابقة. بصمات صفحات آخر حالة محفوظة في
+page_hashes.bin فتُعرف الصفحات المتغيرة بمقارنة لقطة اليوم بها دون قراءة
+النسخ السابقة. ملف manifest.json يصف كل نقاط السلسلة، ويمكن إعادة بناء
+قاعدة البيانات عند أي نقطة بفك النسخة الكاملة وتطبيق الفروق بالترتيب.
+
+صيغة ملف الفرق (gzip):
+    DELTA_MAGIC | page_size:u32 | 0:u32 | 0:u32
+    ثم لكل صفحة متغيرة: pgno:u32 | بيانات الصفحة
+    ثم 0:u32 | page_size:u32 | page_count:u32 | changed:u32
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import struct
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+DELTA_MAGIC = b"SQLDELTA1"
+_DELTA_HEADER = struct.Struct("<III")
+_PAGE_NUMBER = struct.Struct("<I")
+
+# حجم بصمة الصفحة بالبايت
+PAGE_HASH_SIZE = 16
+
+_COPY_CHUNK_SIZE = 1024 * 1024
+
+
+class ChainError(Exception):
+    """سلسلة النسخ تالفة أو ناقصة"""
+
+
+class BackupCancelled(Exception):
+    """أُلغي النسخ الاحتياطي بطلب من المستخدم"""
+
+
+def file_sha256(path: Path) -> str:
+    """بصمة SHA-256 لملف بقراءته على دفعات"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_COPY_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def read_page_size(db_path: Path) -> int:
+    """حجم الصفحة من ترويسة ملف SQLite (القيمة 1 تعني 65536)"""
+    with open(db_path, 'rb') as f:
+        header = f.read(100)
+    if len(header) < 100 or not header.startswith(b"SQLite format 3\x00"):
+        raise ChainError(f"ليس ملف قاعدة بيانات SQLite: {db_path}")
+    page_size = struct.unpack(">H", header[16:18])[0]
+    return 65536 if page_size == 1 else page_size
+
+
+class BackupChain:
+    """إدارة سلسلة نسخ كاملة وتزايدية في مجلد واحد"""
+
+    def __init__(self, chain_dir: Path, full_every: int = 7):
+        self.chain_dir = Path(chain_dir)
+        self.full_every = max(1, full_every)
+        self.manifest_path = self.chain_dir / "manifest.json"
+        self.hashes_path = self.chain_dir / "page_hashes.bin"
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # البيان
+    # ------------------------------------------------------------------
+
+    def load_manifest(self) -> Dict[str, Any]:
+        """قراءة البيان (بيان فارغ إن لم توجد سلسلة بعد)"""
+        if not self.manifest_path.exists():
+            return {'version': 1, 'entries': []}
+        with open(self.manifest_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _save_manifest(self, manifest: Dict[str, Any]):
+        """حفظ البيان بكتابة ملف مؤقت ثم استبداله"""
+        temp_path = self.manifest_path.with_suffix(".json.tmp")
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, self.manifest_path)
+
+    def get_points(self) -> List[Dict[str, Any]]:
+        """كل نقاط الاستعادة بالترتيب الزمني"""
+        return self.load_manifest()['entries']
+
+    def latest_point(self) -> Optional[Dict[str, Any]]:
+        entries = self.get_points()
+        return entries[-1] if entries else None
+
+    # ------------------------------------------------------------------
+    # الإنشاء
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _scan_pages(snapshot_path: Path, page_size: int, file_digest,
+                    progress: Callable[[int, int], None] = None,
+                    cancelled: Callable[[], bool] = None):
+        """مرور واحد على صفحات اللقطة: بصمة كل صفحة مع تحديث بصمة الملف كاملاً"""
+        total = snapshot_path.stat().st_size
+        with open(snapshot_path, 'rb') as f:
+            pgno = 0
+            while True:
+                page = f.read(page_size)
+                if not page:
+                    break
+                pgno += 1
+                if cancelled and pgno % 256 == 0 and cancelled():
+                    raise BackupCancelled()
+                file_digest.update(page)
+                if progress and pgno % 256 == 0:
+                    progress(pgno * page_size, total)
+                yield pgno, page, hashlib.blake2b(page, digest_size=PAGE_HASH_SIZE).digest()
+
+    def add_snapshot(self, snapshot_path: Path, name: str = None,
+                     progress: Callable[[int, int], None] = None,
+                     cancelled: Callable[[], bool] = None,
+                     force_full: bool = False) -> Dict[str, Any]:
+        """إضافة لقطة إلى السلسلة (كاملة أو تزايدية) وإرجاع مدخل البيان"""
+        with self._lock:
+            self.chain_dir.mkdir(parents=True, exist_ok=True)
+            manifest = self.load_manifest()
+            entries = manifest['entries']
+            page_size = read_page_size(snapshot_path)
+            name = self._unique_name(name or datetime.now().strftime("%Y%m%d_%H%M%S"), entries)
+
+            previous = entries[-1] if entries else None
+            since_full = 0
+            for entry in reversed(entries):
+                if entry['type'] == 'full':
+                    break
+                since_full += 1
+
+            make_full = (force_full or previous is None or not self.hashes_path.exists()
+                         or previous['page_size'] != page_size or since_full + 1 >= self.full_every)
+
+            if make_full:
+                entry = self._write_full(snapshot_path, name, page_size, progress, cancelled)
+            else:
+                entry = self._write_delta(snapshot_path, name, page_size, previous, progress, cancelled)
+
+            entries.append(entry)
+            self._save_manifest(manifest)
+            logger.info(
+                f"نقطة نسخ {entry['type']}: {entry['name']} "
+                f"({entry['changed_pages']} صفحة متغيرة من {entry['page_count']})"
+            )
+            return entry
+
+    @staticmethod
+    def _unique_name(name: str, entries: List[Dict[str, Any]]) -> str:
+        """اسم نقطة غير مستخدم في البيان (نقطتان في الثانية نفسها تأخذان لاحقة _2، _3 ...)"""
+        used = {entry['name'] for entry in entries}
+        candidate = name
+        sequence = 1
+        while candidate in used:
+            sequence += 1
+            candidate = f"{name}_{sequence}"
+        return candidate
+
+    def _write_full(self, snapshot_path: Path, name: str, page_size: int,
+                    progress, cancelled) -> Dict[str, Any]:
+        """نسخة أساسية: الملف كاملاً مضغوطاً مع بصمات كل صفحاته"""
+        file_name = f"full_{name}.db.gz"
+        target = self.chain_dir / file_name
+        temp_target = target.with_suffix(".gz.part")
+        hashes = bytearray()
+        db_digest = hashlib.sha256()
+        page_count = 0
+
+        try:
+            with gzip.open(temp_target, 'wb', compresslevel=6) as out:
+                for pgno, page, page_hash in self._scan_pages(snapshot_path, page_size, db_digest,
+                                                              progress, cancelled):
+                    out.write(page)
+                    hashes += page_hash
+                    page_count = pgno
+            os.replace(temp_target, target)
+        finally:
+            temp_target.unlink(missing_ok=True)
+
+        self._save_hashes(hashes)
+        return {
+            'name': name,
+            'type': 'full',
+            'base': name,
+            'parent': None,
+            'created_at': datetime.now().isoformat(),
+            'file': file_name,
+            'file_sha256': file_sha256(target),
+            'file_size': target.stat().st_size,
+            'page_size': page_size,
+            'page_count': page_count,
+            'changed_pages': page_count,
+            'db_sha256': db_digest.hexdigest()
+        }
+
+    def _write_delta(self, snapshot_path: Path, name: str, page_size: int,
+                     previous: Dict[str, Any], progress, cancelled) -> Dict[str, Any]:
+        """نسخة تزايدية: الصفحات التي تغيرت بصمتها فقط"""
+        file_name = f"inc_{name}.delta.gz"
+        target = self.chain_dir / file_name
+        temp_target = target.with_suffix(".gz.part")
+        old_hashes = self.hashes_path.read_bytes()
+        old_count = len(old_hashes) // PAGE_HASH_SIZE
+        hashes = bytearray()
+        db_digest = hashlib.sha256()
+        changed = 0
+        page_count = 0
+
+        try:
+            with gzip.open(temp_target, 'wb', compresslevel=6) as out:
+                out.write(DELTA_MAGIC)
+                out.write(_DELTA_HEADER.pack(page_size, 0, 0))
+                for pgno, page, page_hash in self._scan_pages(snapshot_path, page_size, db_digest,
+                                                              progress, cancelled):
+                    hashes += page_hash
+                    page_count = pgno
+                    offset = (pgno - 1) * PAGE_HASH_SIZE
+                    if pgno > old_count or old_hashes[offset:offset + PAGE_HASH_SIZE] != page_hash:
+                        out.write(_PAGE_NUMBER.pack(pgno))
+                        out.write(page)
+                        changed += 1
+                # سجل ختامي: عدد الصفحات النهائي (لاقتطاع الملف إن صغر) وعدد الصفحات المتغيرة
+                out.write(_PAGE_NUMBER.pack(0))
+                out.write(_DELTA_HEADER.pack(page_size, page_count, changed))
+            os.replace(temp_target, target)
+        finally:
+            temp_target.unlink(missing_ok=True)
+
+        self._save_hashes(hashes)
+        return {
+            'name': name,
+            'type': 'incremental',
+            'base': previous['base'],
+            'parent': previous['name'],
+            'created_at': datetime.now().isoformat(),
+            'file': file_name,
+            'file_sha256': file_sha256(target),
+            'file_size': target.stat().st_size,
+            'page_size': page_size,
+            'page_count': page_count,
+            'changed_pages': changed,
+            'db_sha256': db_digest.hexdigest()
+        }
+
+    def _save_hashes(self, hashes: bytearray):
+        temp_path = self.hashes_path.with_suffix(".bin.tmp")
+        temp_path.write_bytes(bytes(hashes))
+        os.replace(temp_path, self.hashes_path)
+
+    # ------------------------------------------------------------------
+    # الاستعادة
+    # ------------------------------------------------------------------
+
+    def chain_to(self, point: str) -> List[Dict[str, Any]]:
+        """النسخة الكاملة وكل الفروق حتى النقطة المطلوبة (بالترتيب)"""
+        entries = {entry['name']: entry for entry in self.get_points()}
+        if point not in entries:
+            raise ChainError(f"نقطة الاستعادة غير موجودة: {point}")
+
+        chain = []
+        visited = set()
+        entry = entries[point]
+        while entry is not None:
+            if entry['name'] in visited:
+                raise ChainError(f"دورة في سلسلة النسخ عند: {entry['name']}")
+            visited.add(entry['name'])
+            chain.append(entry)
+            if entry['type'] == 'full':
+                break
+            entry = entries.get(entry['parent'])
+            if entry is None:
+                raise ChainError(f"حلقة مفقودة في سلسلة النسخ قبل: {chain[-1]['name']}")
+        chain.reverse()
+        return chain
+
+    def verify(self, point: str = None) -> bool:
+        """التحقق من بصمات ملفات السلسلة حتى نقطة (أو كل النقاط)"""
+        entries = self.chain_to(point) if point else self.get_points()
+        for entry in entries:
+            path = self.chain_dir / entry['file']
+            if not path.exists() or file_sha256(path) != entry['file_sha256']:
+                logger.error(f"ملف تالف أو مفقود في سلسلة النسخ: {entry['file']}")
+                return False
+        return True
+
+    def materialize(self, point: str, target_path: Path,
+                    progress: Callable[[int, int], None] = None,
+                    cancelled: Callable[[], bool] = None) -> Path:
+        """إعادة بناء قاعدة البيانات كما كانت عند النقطة المطلوبة"""
+        chain = self.chain_to(point)
+        target_path = Path(target_path)
+        total_steps = len(chain)
+
+        base = chain[0]
+        with gzip.open(self.chain_dir / base['file'], 'rb') as src, open(target_path, 'wb') as dst:
+            shutil.copyfileobj(src, dst, _COPY_CHUNK_SIZE)
+        if progress:
+            progress(1, total_steps)
+
+        for step, entry in enumerate(chain[1:], 2):
+            if cancelled and cancelled():
+                raise BackupCancelled()
+            self._apply_delta(self.chain_dir / entry['file'], target_path, entry)
+            if progress:
+                progress(step, total_steps)
+
+        if file_sha256(target_path) != chain[-1]['db_sha256']:
+            raise ChainError(f"بصمة قاعدة البيانات المعاد بناؤها لا تطابق النقطة: {point}")
+        return target_path
+
+    @staticmethod
+    def _apply_delta(delta_path: Path, target_path: Path, entry: Dict[str, Any]):
+        """كتابة صفحات ملف فرق فوق قاعدة البيانات المعاد بناؤها"""
+        with gzip.open(delta_path, 'rb') as src, open(target_path, 'r+b') as dst:
+            if src.read(len(DELTA_MAGIC)) != DELTA_MAGIC:
+                raise ChainError(f"ملف فرق غير صالح: {delta_path.name}")
+            page_size = _DELTA_HEADER.unpack(src.read(_DELTA_HEADER.size))[0]
+
+            while True:
+                pgno = _PAGE_NUMBER.unpack(src.read(_PAGE_NUMBER.size))[0]
+                if pgno == 0:
+                    break
+                page = src.read(page_size)
+                if len(page) != page_size:
+                    raise ChainError(f"ملف فرق مقطوع: {delta_path.name}")
+                dst.seek((pgno - 1) * page_size)
+                dst.write(page)
+
+            _, page_count, changed = _DELTA_HEADER.unpack(src.read(_DELTA_HEADER.size))
+            if page_count != entry['page_count'] or changed != entry['changed_pages']:
+                raise ChainError(f"ترويسة ملف الفرق لا تطابق البيان: {delta_path.name}")
+            dst.truncate(page_count * page_size)
+
+    # ------------------------------------------------------------------
+    # الاحتفاظ
+    # ------------------------------------------------------------------
+
+    def prune(self, keep_chains: int = 2) -> int:
+        """حذف السلاسل الأقدم كاملة (نسخة أساسية مع فروقها) والإبقاء على آخر keep_chains"""
+        with self._lock:
+            manifest = self.load_manifest()
+            bases = [entry['name'] for entry in manifest['entries'] if entry['type'] == 'full']
+            expired = set(bases[:-keep_chains]) if keep_chains > 0 else set()
+            if not expired:
+                return 0
+
+            kept, removed = [], 0
+            for entry in manifest['entries']:
+                if entry['base'] in expired:
+                    (self.chain_dir / entry['file']).unlink(missing_ok=True)
+                    removed += 1
+                else:
+                    kept.append(entry)
+            manifest['entries'] = kept
+            self._save_manifest(manifest)
+            logger.info(f"تم حذف {removed} ملف من سلاسل النسخ القديمة")
+            return removed
@@ -4,18 +4,38 @@
 خدمة النسخ الاحتياطي - Backup Service
 """
 
+import hashlib
+import json
 import os
 import shutil
 import zipfile
 import sqlite3
-from datetime import datetime
+from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional
+from app.models.audit_writer import AuditWriter
 from app.models.database import DatabaseManager
+from app.models.migrations import SCHEMA_VERSION, get_schema_version
+from app.models.role import PermissionMatrix
+from app.services.backup_catalog import BackupCatalog
+from app.services.backup_chain import BackupCancelled, BackupChain, ChainError, file_sha256
+from app.services.barcode_index import BarcodeIndex
+from app.services.event_bus import EventBus
+from app.services.export_service import ExportService
+from app.services.report_cache import ReportCache
+from app.services.settings_service import SettingsService
+from config.settings import DATABASE_CONFIG
 import logging
 
 logger = logging.getLogger(__name__)
 
+# اسم ملف قاعدة البيانات داخل أرشيف النسخة الاحتياطية
+BACKUP_DB_ENTRY = "data/shop.db"
+
+# حجم دفعة القراءة عند ضغط الملفات
+BACKUP_CHUNK_SIZE = 1024 * 1024
+
+
 class BackupService:
     """خدمة النسخ الاحتياطي والاستعادة"""
     
@@ -24,21 +44,35 @@ class BackupService:
         self.auth_service = auth_service
         self.backup_dir = Path("backup")
         self.backup_dir.mkdir(exist_ok=True)
+        self.catalog = BackupCatalog.for_dir(self.backup_dir)
     
-    def create_backup(self, backup_name: str = None, include_reports: bool = True) -> Optional[str]:
-        """إنشاء نسخة احتياطية"""
+    def create_backup(self, backup_name: str = None, include_reports: bool = True,
+                      progress: Callable[[int, int], None] = None,
+                      cancelled: Callable[[], bool] = None) -> Optional[str]:
+        """إنشاء نسخة احتياطية متسقة دون إيقاف العمل (SQLite backup API)"""
+        if not backup_name:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            backup_name = f"backup_{timestamp}"
+        
+        backup_path = self.backup_dir / f"{backup_name}.zip"
+        partial_path = self.backup_dir / f"{backup_name}.zip.part"
+        snapshot_path = self.backup_dir / f"{backup_name}.snapshot.db"
+        
         try:
-            if not backup_name:
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                backup_name = f"backup_{timestamp}"
-            
-            backup_path = self.backup_dir / f"{backup_name}.zip"
+            # لقطة متسقة من قاعدة البيانات الحية (80% من التقدم)
+            page_count = self._snapshot_database(
+                snapshot_path,
+                lambda done, total: progress and progress(done * 80 // max(total, 1), 100),
+                cancelled
+            )
             
-            with zipfile.ZipFile(backup_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                # نسخ قاعدة البيانات
-                db_path = Path(self.db.db_path)
-                if db_path.exists():
-                    zipf.write(db_path, "data/shop.db")
+            with zipfile.ZipFile(partial_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
+                # ضغط اللقطة وحساب بصمتها في قراءة واحدة (20% الباقية)
+                db_sha256 = self._write_file_entry(
+                    zipf, snapshot_path, BACKUP_DB_ENTRY,
+                    lambda done, total: progress and progress(80 + done * 20 // max(total, 1), 100),
+                    cancelled
+                )
                 
                 # نسخ ملفات التقارير إذا طُلب ذلك
                 if include_reports:
@@ -59,17 +93,25 @@ class BackupService:
                 backup_info = {
                     'created_at': datetime.now().isoformat(),
                     'version': '1.0.0',
-                    'includes_reports': include_reports
+                    'includes_reports': include_reports,
+                    'db_sha256': db_sha256,
+                    'db_size': snapshot_path.stat().st_size,
+                    'db_pages': page_count
                 }
                 
-                if self.auth_service:
-                    current_user = self.auth_service.get_current_user()
-                    if current_user:
-                        backup_info['created_by'] = current_user['username']
+                created_by = self._current_username()
+                if created_by:
+                    backup_info['created_by'] = created_by
                 
-                import json
                 zipf.writestr("backup_info.json", json.dumps(backup_info, indent=2))
             
+            # النسخة لا تظهر باسمها النهائي إلا بعد اكتمالها
+            os.replace(partial_path, backup_path)
+            self.catalog.record_archive(backup_path, backup_info, file_sha256(backup_path))
+            
+            if progress:
+                progress(100, 100)
+            
             # تسجيل النشاط
             if self.auth_service:
                 current_user = self.auth_service.get_current_user()
@@ -82,49 +124,125 @@ class BackupService:
             logger.info(f"تم إنشاء النسخة الاحتياطية: {backup_path}")
             return str(backup_path)
             
+        except BackupCancelled:
+            logger.info(f"تم إلغاء النسخة الاحتياطية: {backup_name}")
+            return None
         except Exception as e:
             logger.error(f"خطأ في إنشاء النسخة الاحتياطية: {str(e)}")
             return None
+        finally:
+            for temp_file in (snapshot_path, partial_path):
+                temp_file.unlink(missing_ok=True)
+    
+    def _current_username(self) -> Optional[str]:
+        if self.auth_service:
+            current_user = self.auth_service.get_current_user()
+            if current_user:
+                return current_user['username']
+        return None
     
-    def restore_backup(self, backup_path: str, restore_reports: bool = True) -> bool:
-        """استعادة نسخة احتياطية"""
+    def _snapshot_database(self, snapshot_path: Path,
+                           progress: Callable[[int, int], None] = None,
+                           cancelled: Callable[[], bool] = None) -> int:
+        """نسخ قاعدة البيانات صفحة بصفحة إلى ملف مؤقت وإرجاع عدد الصفحات"""
+        snapshot_path.unlink(missing_ok=True)
+        pages_done = [0]
+        
+        def on_step(status, remaining, total):
+            # الاستثناء هنا يوقف sqlite3 backup ويصل إلى المستدعي
+            if cancelled and cancelled():
+                raise BackupCancelled()
+            pages_done[0] = total
+            if progress:
+                progress(total - remaining, total)
+        
+        target = sqlite3.connect(snapshot_path)
+        try:
+            # معاملة قراءة مفتوحة طوال النسخ تثبت لقطة WAL واحدة: كتابات المبيعات
+            # تستمر دون أن تجبر النسخ على البدء من جديد بعد كل خطوة
+            with self.db.read_transaction() as source:
+                # BEGIN DEFERRED لا يثبت اللقطة إلا بأول قراءة
+                source.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+                source.backup(
+                    target,
+                    pages=DATABASE_CONFIG.get('backup_step_pages', 1024),
+                    progress=on_step,
+                    sleep=DATABASE_CONFIG.get('backup_step_sleep_ms', 5) / 1000
+                )
+            result = target.execute("PRAGMA quick_check").fetchone()[0]
+            if result != 'ok':
+                raise sqlite3.DatabaseError(f"فشل فحص سلامة اللقطة: {result}")
+        finally:
+            target.close()
+        
+        return pages_done[0]
+    
+    @staticmethod
+    def _write_file_entry(zipf: zipfile.ZipFile, source: Path, arcname: str,
+                          progress: Callable[[int, int], None] = None,
+                          cancelled: Callable[[], bool] = None) -> str:
+        """ضغط ملف داخل الأرشيف على دفعات مع حساب SHA-256 له"""
+        total = source.stat().st_size
+        digest = hashlib.sha256()
+        done = 0
+        
+        with open(source, 'rb') as src, zipf.open(arcname, 'w', force_zip64=True) as dst:
+            while True:
+                if cancelled and cancelled():
+                    raise BackupCancelled()
+                chunk = src.read(BACKUP_CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                dst.write(chunk)
+                done += len(chunk)
+                if progress:
+                    progress(done, total)
+        
+        return digest.hexdigest()
+    
+    def restore_backup(self, backup_path: str, restore_reports: bool = True,
+                       progress: Callable[[int, int], None] = None,
+                       cancelled: Callable[[], bool] = None) -> bool:
+        """استعادة نسخة احتياطية: فك متدفق إلى ملف جانبي ثم تحقق ثم استبدال ذري"""
+        restored_path = Path(f"{self.db.db_path}.restore")
         try:
             backup_file = Path(backup_path)
             if not backup_file.exists():
                 raise FileNotFoundError("ملف النسخة الاحتياطية غير موجود")
             
-            # إنشاء نسخة احتياطية من البيانات الحالية قبل الاستعادة
-            current_backup = self.create_backup("pre_restore_backup")
-            if not current_backup:
-                logger.warning("فشل في إنشاء نسخة احتياطية من البيانات الحالية")
-            
             with zipfile.ZipFile(backup_file, 'r') as zipf:
                 # قراءة معلومات النسخة الاحتياطية
+                backup_info = {}
                 try:
-                    backup_info_str = zipf.read("backup_info.json").decode('utf-8')
-                    import json
-                    backup_info = json.loads(backup_info_str)
+                    backup_info = json.loads(zipf.read("backup_info.json").decode('utf-8'))
                     logger.info(f"استعادة النسخة الاحتياطية المنشأة في: {backup_info.get('created_at')}")
                 except Exception:
                     logger.warning("لا يمكن قراءة معلومات النسخة الاحتياطية")
                 
-                # استعادة قاعدة البيانات
+                # فك قاعدة البيانات على دفعات إلى ملف بجانب الملف الحالي (90% من التقدم)
                 try:
-                    # إغلاق جميع اتصالات قاعدة البيانات
-                    db_content = zipf.read("data/shop.db")
-                    
-                    # إنشاء مجلد البيانات إذا لم يكن موجوداً
-                    Path("data").mkdir(exist_ok=True)
-                    
-                    # كتابة قاعدة البيانات الجديدة
-                    with open(self.db.db_path, 'wb') as f:
-                        f.write(db_content)
-                    
-                    logger.info("تم استعادة قاعدة البيانات")
-                    
+                    db_sha256 = self._extract_file_entry(
+                        zipf, BACKUP_DB_ENTRY, restored_path,
+                        lambda done, total: progress and progress(done * 90 // max(total, 1), 100),
+                        cancelled
+                    )
                 except KeyError:
                     raise Exception("ملف قاعدة البيانات غير موجود في النسخة الاحتياطية")
                 
+                expected_sha256 = backup_info.get('db_sha256')
+                if expected_sha256 and expected_sha256 != db_sha256:
+                    raise Exception("بصمة قاعدة البيانات لا تطابق معلومات النسخة الاحتياطية")
+                self._validate_database_file(restored_path)
+                
+                # إنشاء نسخة احتياطية من البيانات الحالية قبل الاستبدال
+                current_backup = self.create_backup("pre_restore_backup", include_reports=False)
+                if not current_backup:
+                    logger.warning("فشل في إنشاء نسخة احتياطية من البيانات الحالية")
+                
+                self._swap_database(restored_path)
+                logger.info("تم استعادة قاعدة البيانات")
+                
                 # استعادة التقارير
                 if restore_reports:
                     reports_files = [f for f in zipf.namelist() if f.startswith("reports/")]
@@ -142,6 +260,9 @@ class BackupService:
                 if assets_files:
                     logger.info(f"تم استعادة {len(assets_files)} ملف أصول")
             
+            if progress:
+                progress(100, 100)
+            
             # تسجيل النشاط
             if self.auth_service:
                 current_user = self.auth_service.get_current_user()
@@ -154,55 +275,121 @@ class BackupService:
             logger.info(f"تم استعادة النسخة الاحتياطية بنجاح من: {backup_path}")
             return True
             
+        except BackupCancelled:
+            logger.info("تم إلغاء استعادة النسخة الاحتياطية")
+            return False
         except Exception as e:
             logger.error(f"خطأ في استعادة النسخة الاحتياطية: {str(e)}")
             return False
+        finally:
+            restored_path.unlink(missing_ok=True)
+    
+    @staticmethod
+    def _extract_file_entry(zipf: zipfile.ZipFile, arcname: str, target: Path,
+                            progress: Callable[[int, int], None] = None,
+                            cancelled: Callable[[], bool] = None) -> str:
+        """فك ملف من الأرشيف على دفعات وإرجاع بصمته SHA-256"""
+        total = zipf.getinfo(arcname).file_size
+        digest = hashlib.sha256()
+        done = 0
+        
+        with zipf.open(arcname, 'r') as src, open(target, 'wb') as dst:
+            for chunk in iter(lambda: src.read(BACKUP_CHUNK_SIZE), b''):
+                if cancelled and cancelled():
+                    raise BackupCancelled()
+                dst.write(chunk)
+                digest.update(chunk)
+                done += len(chunk)
+                if progress:
+                    progress(done, total)
+            dst.flush()
+            os.fsync(dst.fileno())
+        
+        return digest.hexdigest()
     
-    def get_backup_list(self) -> List[Dict]:
-        """الحصول على قائمة النسخ الاحتياطية"""
+    @staticmethod
+    def _validate_database_file(db_path: Path):
+        """فحص سلامة ملف قاعدة بيانات مستعاد وتوافق إصدار مخططه قبل اعتماده"""
+        # الملف خاص بالاستعادة فلا حاجة لأقفال أو ملفات WAL بجانبه
+        conn = sqlite3.connect(f"file:{db_path}?mode=ro&immutable=1", uri=True)
         try:
-            backups = []
+            result = conn.execute("PRAGMA integrity_check").fetchone()[0]
+            if result != 'ok':
+                raise Exception(f"فشل فحص سلامة قاعدة البيانات المستعادة: {result}")
             
-            for backup_file in self.backup_dir.glob("*.zip"):
-                try:
-                    backup_info = {
-                        'name': backup_file.stem,
-                        'file_path': str(backup_file),
-                        'size': backup_file.stat().st_size,
-                        'created_at': datetime.fromtimestamp(backup_file.stat().st_mtime).isoformat()
-                    }
-                    
-                    # محاولة قراءة معلومات إضافية من ملف النسخة الاحتياطية
-                    try:
-                        with zipfile.ZipFile(backup_file, 'r') as zipf:
-                            if "backup_info.json" in zipf.namelist():
-                                import json
-                                info_str = zipf.read("backup_info.json").decode('utf-8')
-                                extra_info = json.loads(info_str)
-                                backup_info.update(extra_info)
-                    except Exception:
-                        pass  # تجاهل الأخطاء في قراءة المعلومات الإضافية
-                    
-                    backups.append(backup_info)
-                    
-                except Exception as e:
-                    logger.warning(f"خطأ في قراءة معلومات النسخة الاحتياطية {backup_file}: {str(e)}")
-            
-            # ترتيب حسب تاريخ الإنشاء (الأحدث أولاً)
-            backups.sort(key=lambda x: x['created_at'], reverse=True)
+            version = get_schema_version(conn)
+            if version > SCHEMA_VERSION:
+                raise Exception(
+                    f"إصدار مخطط النسخة ({version}) أحدث من إصدار التطبيق ({SCHEMA_VERSION})"
+                )
+        finally:
+            conn.close()
+    
+    def _swap_database(self, restored_path: Path):
+        """إيقاف كاتب سجل النشاط وإغلاق اتصالات المجمع واستبدال ملف قاعدة البيانات ذرياً ثم ترقية مخططه"""
+        with AuditWriter.for_db(self.db).paused():
+            self.db.checkpoint()
+            if not self.db.close_connections():
+                raise Exception("تعذر إغلاق كل اتصالات قاعدة البيانات قبل الاستبدال")
             
-            return backups
+            # سجل WAL القديم لا يجوز أن يُطبق على الملف الجديد
+            for suffix in ("-wal", "-shm"):
+                Path(f"{self.db.db_path}{suffix}").unlink(missing_ok=True)
+            os.replace(restored_path, self.db.db_path)
             
+            # نسخة من إصدار أقدم تُرقى بالترحيلات المعلقة
+            self.db.initialize_database()
+        
+        self._reset_shared_state()
+    
+    def _reset_shared_state(self):
+        """إبطال الذاكرات المشتركة لملف قاعدة البيانات (تحمل بيانات الملف القديم)"""
+        SettingsService.for_db(self.db).invalidate()
+        ReportCache.for_db(self.db).invalidate()
+        BarcodeIndex.for_db(self.db).invalidate_products(None)
+        PermissionMatrix.for_db(self.db).invalidate()
+        EventBus.for_db(self.db).reset()
+    
+    def get_backup_list(self, backup_type: str = None) -> List[Dict]:
+        """قائمة النسخ الاحتياطية من الفهرس (الأحدث أولاً) دون فتح الأرشيفات"""
+        try:
+            return self.catalog.list_entries(backup_type)
         except Exception as e:
             logger.error(f"خطأ في الحصول على قائمة النسخ الاحتياطية: {str(e)}")
             return []
     
+    def verify_backup(self, backup_path: str) -> bool:
+        """التحقق من بصمة ملف نسخة احتياطية مقابل الفهرس"""
+        try:
+            return self.catalog.verify(Path(backup_path))
+        except Exception as e:
+            logger.error(f"خطأ في التحقق من النسخة الاحتياطية: {str(e)}")
+            return False
+    
+    def cleanup_expired_backups(self, retention_days: int = None) -> int:
+        """حذف الأرشيفات الكاملة الأقدم من مدة الاحتفاظ مع إبقاء أحدثها دائماً"""
+        retention_days = retention_days or DATABASE_CONFIG.get('backup_retention_days', 30)
+        cutoff = (datetime.now() - timedelta(days=retention_days)).isoformat()
+        removed = 0
+        try:
+            archives = self.catalog.list_entries('full')
+            for entry in archives[1:]:
+                if entry['created_at'] and entry['created_at'] < cutoff:
+                    Path(entry['file_path']).unlink(missing_ok=True)
+                    self.catalog.remove(Path(entry['file_path']))
+                    logger.info(f"تم حذف النسخة الاحتياطية القديمة: {entry['file']}")
+                    removed += 1
+        except Exception as e:
+            logger.error(f"خطأ في حذف النسخ القديمة: {str(e)}")
+        return removed
+    
     def delete_backup(self, backup_path: str) -> bool:
         """حذف نسخة احتياطية"""
         try:
             backup_file = Path(backup_path)
             if backup_file.exists():
                 backup_file.unlink()
+                self.catalog.remove(backup_file)
                 
                 # تسجيل النشاط
                 if self.auth_service:
@@ -223,132 +410,149 @@ class BackupService:
             logger.error(f"خطأ في حذف النسخة الاحتياطية: {str(e)}")
             return False
     
-    def auto_backup(self) -> bool:
-        """النسخ الاحتياطي التلقائي"""
+    def _backup_chain(self) -> BackupChain:
+        return BackupChain(self.backup_dir / "chain", DATABASE_CONFIG.get('backup_full_every', 7))
+    
+    def needs_auto_backup(self) -> bool:
+        """هل النسخ التلقائي مفعل ولم تُضف نقطة إلى سلسلة النسخ اليوم؟"""
+        if not SettingsService.for_db(self.db).get('auto_backup'):
+            return False
+        
         try:
-            # التحقق من تفعيل النسخ التلقائي
-            auto_backup_enabled = self.db.get_setting('auto_backup')
-            if auto_backup_enabled != '1':
-                return True  # النسخ التلقائي معطل
-            
-            # التحقق من وجود نسخة احتياطية لليوم الحالي
-            today = datetime.now().strftime("%Y%m%d")
-            existing_backup = None
-            
-            for backup_file in self.backup_dir.glob(f"auto_backup_{today}_*.zip"):
-                existing_backup = backup_file
-                break
-            
-            if existing_backup:
-                logger.info(f"النسخة الاحتياطية التلقائية موجودة لليوم: {existing_backup}")
+            latest = self._backup_chain().latest_point()
+        except Exception as e:
+            logger.warning(f"تعذرت قراءة بيان سلسلة النسخ: {str(e)}")
+            return True
+        
+        if latest and latest['created_at'][:10] == datetime.now().date().isoformat():
+            logger.info(f"النسخة الاحتياطية التلقائية موجودة لليوم: {latest['name']}")
+            return False
+        return True
+    
+    def auto_backup(self, progress: Callable[[int, int], None] = None,
+                    cancelled: Callable[[], bool] = None) -> bool:
+        """النسخ الاحتياطي التلقائي: نقطة تزايدية في سلسلة النسخ (الصفحات المتغيرة فقط)"""
+        snapshot_path = None
+        try:
+            # النسخ التلقائي معطل أو توجد نسخة لليوم الحالي
+            if not self.needs_auto_backup():
                 return True
             
-            # إنشاء نسخة احتياطية تلقائية
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            backup_name = f"auto_backup_{timestamp}"
+            name = datetime.now().strftime("%Y%m%d_%H%M%S")
+            snapshot_path = self.backup_dir / f"auto_{name}.snapshot.db"
             
-            backup_path = self.create_backup(backup_name, include_reports=False)
+            # لقطة متسقة (50% من التقدم) ثم مقارنة صفحاتها بآخر نقطة (50%)
+            self._snapshot_database(
+                snapshot_path,
+                lambda done, total: progress and progress(done * 50 // max(total, 1), 100),
+                cancelled
+            )
+            chain = self._backup_chain()
+            entry = chain.add_snapshot(
+                snapshot_path, name,
+                lambda done, total: progress and progress(50 + done * 50 // max(total, 1), 100),
+                cancelled
+            )
+            chain.prune(DATABASE_CONFIG.get('backup_chains_kept', 2))
+            self.catalog.record_chain_point(entry, self._current_username())
+            self.cleanup_expired_backups()
             
-            if backup_path:
-                logger.info(f"تم إنشاء النسخة الاحتياطية التلقائية: {backup_path}")
-                
-                # حذف النسخ التلقائية القديمة (الاحتفاظ بآخر 7 نسخ)
-                self._cleanup_old_auto_backups()
-                
-                return True
-            else:
-                logger.error("فشل في إنشاء النسخة الاحتياطية التلقائية")
-                return False
-                
+            if progress:
+                progress(100, 100)
+            logger.info(
+                f"تم إنشاء النسخة الاحتياطية التلقائية: {entry['file']} "
+                f"({entry['file_size']} بايت)"
+            )
+            return True
+            
+        except BackupCancelled:
+            logger.info("تم إلغاء النسخ الاحتياطي التلقائي")
+            return False
         except Exception as e:
             logger.error(f"خطأ في النسخ الاحتياطي التلقائي: {str(e)}")
             return False
+        finally:
+            if snapshot_path:
+                snapshot_path.unlink(missing_ok=True)
     
-    def _cleanup_old_auto_backups(self, keep_count: int = 7):
-        """حذف النسخ التلقائية القديمة"""
+    def get_restore_points(self) -> List[Dict]:
+        """نقاط الاستعادة في سلسلة النسخ التلقائية (الأحدث أولاً)"""
         try:
-            auto_backups = []
+            return list(reversed(self._backup_chain().get_points()))
+        except Exception as e:
+            logger.error(f"خطأ في قراءة نقاط الاستعادة: {str(e)}")
+            return []
+    
+    def restore_chain_point(self, point: str, progress: Callable[[int, int], None] = None) -> bool:
+        """استعادة قاعدة البيانات كما كانت عند نقطة في سلسلة النسخ"""
+        chain = self._backup_chain()
+        rebuilt_path = Path(f"{self.db.db_path}.restore")
+        try:
+            if not chain.verify(point):
+                raise ChainError(f"سلسلة النسخ حتى {point} تالفة")
             
-            for backup_file in self.backup_dir.glob("auto_backup_*.zip"):
-                auto_backups.append({
-                    'file': backup_file,
-                    'mtime': backup_file.stat().st_mtime
-                })
+            # إعادة البناء في ملف جانبي والتحقق منه قبل لمس قاعدة البيانات الحالية
+            chain.materialize(point, rebuilt_path, progress)
+            self._validate_database_file(rebuilt_path)
             
-            # ترتيب حسب تاريخ التعديل (الأقدم أولاً)
-            auto_backups.sort(key=lambda x: x['mtime'])
+            current_backup = self.create_backup("pre_restore_backup", include_reports=False)
+            if not current_backup:
+                logger.warning("فشل في إنشاء نسخة احتياطية من البيانات الحالية")
+            
+            self._swap_database(rebuilt_path)
+            
+            if self.auth_service:
+                current_user = self.auth_service.get_current_user()
+                if current_user:
+                    self.auth_service.log_user_activity(
+                        current_user['id'], 'restore_backup', None, None,
+                        f"استعادة نقطة من سلسلة النسخ: {point}"
+                    )
+            
+            logger.info(f"تم استعادة قاعدة البيانات عند النقطة: {point}")
+            return True
             
-            # حذف النسخ الزائدة
-            while len(auto_backups) > keep_count:
-                old_backup = auto_backups.pop(0)
-                old_backup['file'].unlink()
-                logger.info(f"تم حذف النسخة الاحتياطية القديمة: {old_backup['file'].name}")
-                
         except Exception as e:
-            logger.error(f"خطأ في حذف النسخ القديمة: {str(e)}")
+            logger.error(f"خطأ في استعادة نقطة النسخ {point}: {str(e)}")
+            return False
+        finally:
+            rebuilt_path.unlink(missing_ok=True)
     
     def export_data(self, export_type: str, start_date: str = None, 
-                   end_date: str = None) -> Optional[str]:
-        """تصدير البيانات بصيغ مختلفة"""
+                   end_date: str = None, tables: List[str] = None,
+                   progress: Callable[[int, int], None] = None,
+                   cancelled: Callable[[], bool] = None,
+                   include_restricted: bool = False) -> Optional[str]:
+        """تصدير البيانات بصيغ مختلفة (csv/jsonl في أرشيف ZIP، xlsx، sql)"""
         try:
+            # المستخدمون والإعدادات والجداول الداخلية (وتفريغ SQL الكامل) لمدير المستخدمين فقط
+            if (include_restricted or export_type == 'sql') and not self._can_export_restricted():
+                raise PermissionError("تصدير الجداول المقيدة يتطلب صلاحية إدارة المستخدمين")
+            
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             export_dir = Path("backup") / "exports"
-            export_dir.mkdir(exist_ok=True)
+            export_dir.mkdir(parents=True, exist_ok=True)
             
-            if export_type == 'csv':
-                return self._export_to_csv(export_dir, timestamp, start_date, end_date)
+            if export_type in ('csv', 'jsonl'):
+                export_file = export_dir / f"data_export_{timestamp}.zip"
+            elif export_type == 'xlsx':
+                export_file = export_dir / f"data_export_{timestamp}.xlsx"
             elif export_type == 'sql':
                 return self._export_to_sql(export_dir, timestamp)
             else:
                 raise ValueError(f"نوع التصدير غير مدعوم: {export_type}")
+            
+            return ExportService(self.db).export_tables(
+                str(export_file), export_type, tables, start_date, end_date,
+                progress=progress, cancelled=cancelled, include_restricted=include_restricted
+            )
                 
         except Exception as e:
             logger.error(f"خطأ في تصدير البيانات: {str(e)}")
             return None
     
-    def _export_to_csv(self, export_dir: Path, timestamp: str, 
-                      start_date: str = None, end_date: str = None) -> str:
-        """تصدير البيانات إلى ملفات CSV"""
-        import csv
-        
-        export_file = export_dir / f"data_export_{timestamp}.zip"
-        
-        with zipfile.ZipFile(export_file, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            # تصدير المبيعات
-            sales_query = "SELECT * FROM sales"
-            params = []
-            
-            if start_date and end_date:
-                sales_query += " WHERE DATE(created_at) BETWEEN ? AND ?"
-                params = [start_date, end_date]
-            
-            sales_data = self.db.execute_query(sales_query, tuple(params))
-            
-            if sales_data:
-                sales_csv = "sales.csv"
-                with zipf.open(sales_csv, 'w') as csvfile:
-                    import io
-                    text_stream = io.TextIOWrapper(csvfile, encoding='utf-8')
-                    writer = csv.DictWriter(text_stream, fieldnames=sales_data[0].keys())
-                    writer.writeheader()
-                    for row in sales_data:
-                        writer.writerow(dict(row))
-                    text_stream.detach()
-            
-            # تصدير المنتجات
-            products_data = self.db.execute_query("SELECT * FROM products")
-            if products_data:
-                products_csv = "products.csv"
-                with zipf.open(products_csv, 'w') as csvfile:
-                    import io
-                    text_stream = io.TextIOWrapper(csvfile, encoding='utf-8')
-                    writer = csv.DictWriter(text_stream, fieldnames=products_data[0].keys())
-                    writer.writeheader()
-                    for row in products_data:
-                        writer.writerow(dict(row))
-                    text_stream.detach()
-        
-        return str(export_file)
+    def _can_export_restricted(self) -> bool:
+        return bool(self.auth_service and self.auth_service.has_permission('manage_users'))
     
     def _export_to_sql(self, export_dir: Path, timestamp: str) -> str:
         """تصدير البيانات إلى ملف SQL"""
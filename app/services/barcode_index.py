@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+فهرس الباركود في الذاكرة - In-Memory Barcode Index
+
+يحمل جدول الباركود ← سجل منتج مختصر مرة واحدة، ثم يُحدث جزئياً عند تعديل
+المنتجات أو المخزون من داخل التطبيق. عند تغير PRAGMA data_version (كتابة من
+اتصال آخر) تُقرأ أحداث المنتجات الجديدة من change_log وتُحدث منتجاتها فقط،
+فدفعات سجل النشاط وغيرها من الكتابات لا تعيد تحميل الفهرس. يُعاد التحميل
+كاملاً فقط إن حُذفت سجلات تغيير لم تُقرأ بعد.
+"""
+
+import os
+import threading
+from typing import Dict, Iterable, NamedTuple, Optional, Set
+import logging
+
+from app.models.database import DatabaseManager
+
+logger = logging.getLogger(__name__)
+
+# حد SQLite لعدد المعاملات في الاستعلام الواحد
+_IN_CHUNK_SIZE = 900
+
+_SELECT_COLUMNS = "SELECT id, name, barcode, selling_price, quantity_in_stock, is_active FROM products"
+
+# أحداث change_log التي تخص سجلات الفهرس
+_PRODUCT_EVENTS = ('product.updated', 'stock.changed')
+
+
+class ProductRecord(NamedTuple):
+    """سجل منتج مختصر لإضافة سريعة إلى السلة"""
+    id: int
+    name: str
+    barcode: str
+    selling_price: float
+    quantity_in_stock: int
+
+
+class BarcodeIndex:
+    """فهرس باركود مشترك لكل قاعدة بيانات"""
+
+    _indexes: Dict[str, 'BarcodeIndex'] = {}
+    _indexes_lock = threading.Lock()
+
+    def __init__(self, db: DatabaseManager):
+        self.db = db
+        self._lock = threading.RLock()
+        self._by_barcode: Dict[str, ProductRecord] = {}
+        self._barcode_by_id: Dict[int, str] = {}
+        self._dirty_ids: Set[int] = set()
+        self._loaded = False
+        self._data_version = None
+        self._cursor = 0  # آخر معرف مقروء من change_log
+
+    @classmethod
+    def for_db(cls, db: DatabaseManager) -> 'BarcodeIndex':
+        """الحصول على الفهرس المشترك لملف قاعدة البيانات"""
+        key = os.path.abspath(db.db_path)
+        with cls._indexes_lock:
+            index = cls._indexes.get(key)
+            if index is None:
+                index = cls(db)
+                cls._indexes[key] = index
+            return index
+
+    def lookup(self, barcode: str) -> Optional[ProductRecord]:
+        """البحث عن منتج نشط بالباركود المطابق تماماً"""
+        barcode = (barcode or "").strip()
+        if not barcode:
+            return None
+
+        with self._lock:
+            self._sync()
+            return self._by_barcode.get(barcode)
+
+    def invalidate_products(self, product_ids: Optional[Iterable[int]] = None):
+        """تعليم منتجات كمتغيرة لتُقرأ من جديد عند البحث التالي (None = إعادة تحميل كاملة)"""
+        with self._lock:
+            if product_ids is None:
+                self._loaded = False
+            else:
+                self._dirty_ids.update(int(product_id) for product_id in product_ids if product_id)
+
+    def _sync(self):
+        """مزامنة الفهرس مع قاعدة البيانات قبل البحث"""
+        data_version = self.db.data_version()
+        conn = self.db.get_connection()
+
+        if self._loaded and data_version != self._data_version:
+            changed = self._read_changes(conn)
+            if changed is None:
+                self._loaded = False
+            else:
+                self._dirty_ids.update(changed)
+
+        if not self._loaded:
+            self._reload(conn)
+        elif self._dirty_ids:
+            self._refresh(conn, self._dirty_ids)
+
+        self._data_version = data_version
+        self._dirty_ids = set()
+
+    def _last_change_id(self, conn) -> int:
+        """آخر معرف أُسند في change_log (AUTOINCREMENT: بلا فجوات إلا بالحذف)"""
+        row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'change_log'").fetchone()
+        return row[0] if row else 0
+
+    def _read_changes(self, conn) -> Optional[Set[int]]:
+        """معرفات المنتجات المتغيرة منذ المؤشر (None إن حُذفت سجلات لم تُقرأ)"""
+        rows = conn.execute(
+            "SELECT id, event, entity_id FROM change_log WHERE id > ? ORDER BY id",
+            (self._cursor,)
+        ).fetchall()
+        if not rows:
+            if self._last_change_id(conn) > self._cursor:
+                return None
+            return set()
+        if rows[0][0] != self._cursor + 1:
+            return None
+
+        self._cursor = rows[-1][0]
+        return {entity_id for _, event, entity_id in rows if event in _PRODUCT_EVENTS}
+
+    def _reload(self, conn):
+        """تحميل الفهرس بالكامل"""
+        by_barcode: Dict[str, ProductRecord] = {}
+        barcode_by_id: Dict[int, str] = {}
+        # المؤشر يُقرأ قبل المنتجات: ما يُكتب بعده يُقرأ في المزامنة التالية
+        self._cursor = self._last_change_id(conn)
+
+        cursor = conn.execute(
+            f"{_SELECT_COLUMNS} WHERE is_active = 1 AND barcode IS NOT NULL AND barcode != '' ORDER BY id"
+        )
+        for row in cursor:
+            record = ProductRecord(row[0], row[1], row[2].strip(), row[3], row[4])
+            if record.barcode and record.barcode not in by_barcode:
+                by_barcode[record.barcode] = record
+                barcode_by_id[record.id] = record.barcode
+
+        self._by_barcode = by_barcode
+        self._barcode_by_id = barcode_by_id
+        self._loaded = True
+        logger.debug(f"تم تحميل فهرس الباركود: {len(by_barcode)} منتج")
+
+    def _refresh(self, conn, product_ids: Set[int]):
+        """إعادة قراءة منتجات محددة فقط"""
+        ids = sorted(product_ids)
+
+        for product_id in ids:
+            old_barcode = self._barcode_by_id.pop(product_id, None)
+            if old_barcode is not None and self._by_barcode.get(old_barcode, (None,))[0] == product_id:
+                del self._by_barcode[old_barcode]
+
+        for start in range(0, len(ids), _IN_CHUNK_SIZE):
+            chunk = ids[start:start + _IN_CHUNK_SIZE]
+            placeholders = ",".join("?" * len(chunk))
+            cursor = conn.execute(f"{_SELECT_COLUMNS} WHERE id IN ({placeholders})", chunk)
+
+            for row in cursor:
+                barcode = (row[2] or "").strip()
+                if not row[5] or not barcode or barcode in self._by_barcode:
+                    continue
+                self._by_barcode[barcode] = ProductRecord(row[0], row[1], barcode, row[3], row[4])
+                self._barcode_by_id[row[0]] = barcode
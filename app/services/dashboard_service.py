@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+خدمة لوحة التحكم - Dashboard Service
+
+لقطة اللوحة (مؤشرات اليوم، أعداد التنبيهات، آخر الأنشطة) تُقرأ في معاملة
+قراءة واحدة: استعلام تجميعي واحد بأعداد COUNT بدلاً من جلب القوائم، ثم
+استعلام محدود لآخر الأنشطة. قبل القراءة يُفحص PRAGMA data_version ثم عدادات
+تغيير الجداول (change_generations): إن لم يتغير شيء يخص اللوحة تُعاد None
+ويُتخطى التحديث بالكامل.
+"""
+
+from datetime import date, timedelta
+from typing import Any, Dict, Optional, Tuple
+import logging
+
+from app.models.database import DatabaseManager
+from app.utils.date_range import day_range, local_midnight_utc
+
+logger = logging.getLogger(__name__)
+
+# الجداول التي تقرأ منها اللقطة (تجميعات المبيعات تتغير مع جدول المبيعات)
+SNAPSHOT_TABLES = ('products', 'repair_tickets', 'sales')
+
+# تذكرة الصيانة قيد العمل تعد متأخرة بعد هذا العدد من الأيام
+LATE_REPAIR_DAYS = 7
+
+# آخر المبيعات وآخر تذاكر الصيانة (من كل نوع)
+RECENT_PER_TYPE = 5
+
+
+class DashboardService:
+    """لقطة بيانات لوحة التحكم"""
+
+    def __init__(self, auth_service=None):
+        self.db = DatabaseManager()
+        self.auth_service = auth_service
+        self._data_version: Optional[Tuple[str, Tuple[int, int]]] = None
+        self._state: Optional[Tuple[str, Tuple]] = None
+
+    def snapshot(self, force: bool = False) -> Optional[Dict[str, Any]]:
+        """لقطة اللوحة، أو None إن لم يتغير شيء منذ اللقطة السابقة (ما لم تُفرض)"""
+        today = date.today()
+        # التاريخ جزء من المفتاح: مؤشرات اليوم تتغير بعد منتصف الليل دون أي كتابة
+        data_version = (today.isoformat(), self.db.data_version())
+        if not force and data_version == self._data_version:
+            return None
+
+        try:
+            with self.db.read_transaction() as conn:
+                generations = tuple(row[0] for row in conn.execute(f"""
+                    SELECT generation FROM change_generations
+                    WHERE table_name IN ({', '.join('?' * len(SNAPSHOT_TABLES))})
+                    ORDER BY table_name
+                """, SNAPSHOT_TABLES))
+                state = (today.isoformat(), generations)
+                if not force and state == self._state:
+                    # تغيرت جداول أخرى فقط (سجل النشاط مثلاً)
+                    self._data_version = data_version
+                    return None
+
+                snapshot = self._read_snapshot(conn, today)
+        except Exception as e:
+            logger.error(f"خطأ في قراءة لقطة لوحة التحكم: {str(e)}")
+            return None
+
+        self._data_version = data_version
+        self._state = state
+        return snapshot
+
+    def _read_snapshot(self, conn, today: date) -> Dict[str, Any]:
+        """قراءة المؤشرات والأنشطة (داخل معاملة القراءة)"""
+        today_start, today_end = day_range(today)
+        late_before = local_midnight_utc(today - timedelta(days=LATE_REPAIR_DAYS))
+
+        stats = conn.execute("""
+            SELECT
+                COALESCE((SELECT transactions FROM sales_daily_rollup WHERE day = ?), 0)
+                    AS total_transactions,
+                COALESCE((SELECT final_amount FROM sales_daily_rollup WHERE day = ?), 0)
+                    AS total_sales,
+                (SELECT COUNT(*) FROM repair_tickets
+                 WHERE status IN ('received', 'in_progress')
+                   AND received_date >= ? AND received_date < ?) AS open_repairs,
+                (SELECT COUNT(*) FROM products
+                 WHERE is_active = 1 AND quantity_in_stock <= minimum_stock) AS low_stock_count,
+                (SELECT COUNT(*) FROM repair_tickets
+                 WHERE status = 'in_progress' AND received_date < ?) AS late_repairs_count
+        """, (today.isoformat(), today.isoformat(), today_start, today_end, late_before)).fetchone()
+
+        activities = conn.execute("""
+            SELECT * FROM (
+                SELECT created_at AS time, 'sale' AS type, id, final_amount AS amount, NULL AS details
+                FROM sales WHERE status = 'completed'
+                ORDER BY created_at DESC LIMIT ?
+            )
+            UNION ALL
+            SELECT * FROM (
+                SELECT received_date, 'repair', id, NULL, device_info
+                FROM repair_tickets
+                ORDER BY received_date DESC LIMIT ?
+            )
+            ORDER BY time DESC
+        """, (RECENT_PER_TYPE, RECENT_PER_TYPE)).fetchall()
+
+        snapshot = dict(stats)
+        snapshot['recent_activities'] = [dict(row) for row in activities]
+        return snapshot
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ناقل أحداث التغيير - Change Event Bus
+
+الخدمات تنشر الأحداث (sale.created، stock.changed، product.updated،
+repair.status_changed ...) مع معرفات السجلات المتأثرة بعد إتمام المعاملة،
+فتصل إلى النوافذ المشتركة فوراً لتحدث الصفوف المتأثرة فقط.
+
+التغييرات من العمليات الأخرى (أو من اتصالات الخيوط الأخرى) تكتبها المشغلات في
+جدول change_log داخل معاملة الكتابة نفسها. poll() يفحص PRAGMA data_version
+أولاً، ثم آخر معرف في السجل، ولا يقرأ السجل إلا إذا تجاوز المؤشر، فالشاشة
+الخاملة لا تقرأ أي صفحة من قاعدة البيانات ودفعات سجل النشاط لا تقرأ السجل. الأحداث المنشورة محلياً تُتخطى عند ظهورها في السجل حتى لا
+تُسلم مرتين: كل حدث يُحفظ مع آخر معرف في السجل وقت نشره (بعد التثبيت، فسجله
+لا يتجاوزه)، ويُهمل حين يتجاوز المؤشر ذلك المعرف دون أن يظهر.
+"""
+
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+import logging
+
+from app.models.database import DatabaseManager
+from config.settings import DATABASE_CONFIG
+
+logger = logging.getLogger(__name__)
+
+EventCallback = Callable[[str, FrozenSet[int]], None]
+
+
+class EventBus:
+    """ناقل أحداث التغيير المشترك لملف قاعدة بيانات واحد"""
+
+    _buses: Dict[str, 'EventBus'] = {}
+    _buses_lock = threading.Lock()
+
+    def __init__(self, db: DatabaseManager):
+        self.db = db
+        self._lock = threading.Lock()
+        self._subscribers: List[Tuple[Optional[str], EventCallback]] = []
+        # أحداث نُشرت من خيوط غير خيط التسليم وتنتظر poll() التالي
+        self._queued: Dict[str, Set[int]] = {}
+        # أحداث نُشرت محلياً وستظهر أيضاً في change_log: (الحدث، المعرف) ← آخر معرف في السجل وقت النشر
+        self._published: Dict[Tuple[str, int], List[int]] = {}
+        self._dispatch_thread: Optional[int] = None
+        self._data_version = None
+        self._cursor = self._last_change_id()
+
+    @classmethod
+    def for_db(cls, db: DatabaseManager = None) -> 'EventBus':
+        """الحصول على ناقل الأحداث المشترك لملف قاعدة البيانات"""
+        db = db if db else DatabaseManager()
+        key = os.path.abspath(db.db_path)
+        with cls._buses_lock:
+            bus = cls._buses.get(key)
+            if bus is None:
+                bus = cls(db)
+                cls._buses[key] = bus
+            return bus
+
+    def _last_change_id(self) -> int:
+        try:
+            result = self.db.execute_query("SELECT COALESCE(MAX(id), 0) FROM change_log")
+            return result[0][0]
+        except Exception as e:
+            logger.error(f"خطأ في قراءة سجل التغييرات: {str(e)}")
+            return 0
+
+    def reset(self):
+        """بدء القراءة من نهاية سجل التغييرات وإهمال الأحداث المعلقة (بعد استبدال ملف قاعدة البيانات)"""
+        cursor = self._last_change_id()
+        with self._lock:
+            self._queued = {}
+            self._published.clear()
+            self._data_version = None
+            self._cursor = cursor
+
+    def subscribe(self, callback: EventCallback, event: str = None):
+        """الاشتراك في حدث ('stock.changed')، أو مجموعة أحداث ('repair.')، أو كل الأحداث (None)"""
+        self._subscribers.append((event, callback))
+
+    def unsubscribe(self, callback: EventCallback):
+        """إلغاء الاشتراك"""
+        self._subscribers = [(event, cb) for event, cb in self._subscribers if cb is not callback]
+
+    def publish(self, event: str, entity_ids: Iterable[int]):
+        """نشر حدث بعد إتمام المعاملة (يُسلم فوراً في خيط التسليم، وإلا في poll() التالي)"""
+        ids = {int(entity_id) for entity_id in entity_ids if entity_id}
+        if not ids:
+            return
+
+        mark = self._last_change_id()
+        with self._lock:
+            for entity_id in ids:
+                self._published.setdefault((event, entity_id), []).append(mark)
+            if self._dispatch_thread not in (None, threading.get_ident()):
+                self._queued.setdefault(event, set()).update(ids)
+                return
+
+        self._dispatch({event: ids})
+
+    def poll(self) -> bool:
+        """تسليم الأحداث المعلقة وتغييرات العمليات الأخرى (يعيد True إن وُجدت أحداث)"""
+        with self._lock:
+            self._dispatch_thread = threading.get_ident()
+            events, self._queued = self._queued, {}
+
+        try:
+            data_version = self.db.data_version()
+            conn = self.db.get_connection()
+            if data_version != self._data_version:
+                self._data_version = data_version
+                # كتابات لا تمس السجل (دفعات سجل النشاط مثلاً) تغير data_version أيضاً
+                for event, ids in self._read_changes(conn).items():
+                    events.setdefault(event, set()).update(ids)
+        except Exception as e:
+            logger.error(f"خطأ في قراءة سجل التغييرات: {str(e)}")
+
+        if events:
+            self._dispatch(events)
+        return bool(events)
+
+    def _read_changes(self, conn) -> Dict[str, Set[int]]:
+        """قراءة سجلات change_log الجديدة بعد المؤشر مع تخطي ما نُشر محلياً"""
+        last = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'change_log'").fetchone()
+        rows = []
+        if last and last[0] > self._cursor:
+            rows = conn.execute(
+                "SELECT id, event, entity_id FROM change_log WHERE id > ? ORDER BY id",
+                (self._cursor,)
+            ).fetchall()
+
+        events: Dict[str, Set[int]] = {}
+        with self._lock:
+            for change_id, event, entity_id in rows:
+                marks = self._published.get((event, entity_id))
+                # علامات أقدم من السجل الحالي لم تُكتب (تحديث دون تغيير فعلي مثلاً)
+                while marks and marks[0] < change_id:
+                    marks.pop(0)
+                if marks:
+                    marks.pop(0)
+                    continue
+                events.setdefault(event, set()).add(entity_id)
+            if rows:
+                self._cursor = rows[-1][0]
+            self._expire_published()
+        return events
+
+    def _expire_published(self):
+        """إهمال الأحداث المحلية التي تجاوزها المؤشر دون أن تظهر في السجل (مع القفل ممسوكاً)"""
+        for key in list(self._published):
+            marks = [mark for mark in self._published[key] if mark > self._cursor]
+            if marks:
+                self._published[key] = marks
+            else:
+                del self._published[key]
+
+    def _dispatch(self, events: Dict[str, Set[int]]):
+        """إبلاغ المشتركين بكل حدث مع مجموعة المعرفات المتأثرة"""
+        for event, ids in events.items():
+            entity_ids = frozenset(ids)
+            for subscribed, callback in list(self._subscribers):
+                if subscribed is not None and subscribed != event and not (
+                        subscribed.endswith('.') and event.startswith(subscribed)):
+                    continue
+                try:
+                    callback(event, entity_ids)
+                except Exception as e:
+                    logger.error(f"خطأ في إبلاغ مشترك الأحداث ({event}): {str(e)}")
+
+    def prune(self, retention_days: int = None) -> int:
+        """حذف سجلات التغيير الأقدم من فترة الاحتفاظ (كل العمليات المفتوحة قرأتها)"""
+        retention_days = retention_days or DATABASE_CONFIG.get('change_log_retention_days', 7)
+        cutoff = (datetime.now(timezone.utc) - timedelta(days=retention_days)).strftime("%Y-%m-%d %H:%M:%S")
+        try:
+            return self.db.execute_update("DELETE FROM change_log WHERE created_at < ?", (cutoff,))
+        except Exception as e:
+            logger.error(f"خطأ في حذف سجل التغييرات القديم: {str(e)}")
+            return 0
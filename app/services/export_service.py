@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+خدمة التصدير - Export Service
+
+تصدير متدفق للجداول والتقارير: كل استعلام يُقرأ من المؤشر على دفعات
+(fetchmany) وتُكتب كل دفعة مباشرة عبر كاتب الصيغة، فيبقى استهلاك الذاكرة
+ثابتاً مهما كان حجم الجدول. كل الجداول تُقرأ من لقطة قراءة واحدة.
+"""
+
+import zipfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+import logging
+
+from app.models.database import DatabaseManager
+from app.utils.date_range import day_range
+from app.utils.export_writers import create_writer
+
+logger = logging.getLogger(__name__)
+
+# عدد الصفوف في كل دفعة قراءة
+EXPORT_CHUNK_SIZE = 5000
+
+# عمود التاريخ المستخدم لتصفية الجداول الحركية بفترة زمنية
+DATE_COLUMNS = {
+    'sales': 'created_at',
+    'returns': 'created_at',
+    'stock_movements': 'created_at',
+    'purchases': 'created_at',
+    'repair_tickets': 'received_date',
+    'wallet_transfers': 'created_at',
+    'audit_logs': 'created_at',
+}
+
+# جداول لا تُصدر إلا باختيار صريح ممن يملك صلاحية manage_users:
+# بيانات الدخول والإعدادات، وجداول داخلية (عدادات وسجل تغييرات وتجميعات يعاد بناؤها)
+RESTRICTED_TABLES = frozenset({
+    'users',
+    'settings',
+    'change_log',
+    'change_generations',
+    'sales_daily_rollup',
+    'sales_payment_rollup',
+    'sales_item_rollup',
+})
+
+# أعمدة لا تُصدر أبداً حتى مع الجداول المقيدة
+SECRET_COLUMNS = {
+    'users': ('password_hash',),
+}
+
+ProgressCallback = Callable[[int, int], None]
+
+
+class ExportCancelled(Exception):
+    """أُلغي التصدير بطلب من المستخدم"""
+
+
+class ExportService:
+    """تصدير الجداول والتقارير بصيغ CSV و JSON Lines و XLSX"""
+
+    def __init__(self, db: DatabaseManager = None, chunk_size: int = EXPORT_CHUNK_SIZE):
+        self.db = db if db else DatabaseManager()
+        self.chunk_size = chunk_size
+
+    def get_exportable_tables(self, include_restricted: bool = False) -> List[str]:
+        """كل جداول البيانات (دون جداول SQLite والبحث النصي، ودون الجداول المقيدة ما لم تُطلب)"""
+        rows = self.db.execute_query("""
+            SELECT name FROM sqlite_master
+            WHERE type = 'table'
+            AND name NOT LIKE 'sqlite_%'
+            AND NOT EXISTS (
+                SELECT 1 FROM sqlite_master v
+                WHERE v.type = 'table' AND v.sql LIKE 'CREATE VIRTUAL TABLE%'
+                AND (sqlite_master.name = v.name OR sqlite_master.name LIKE v.name || '_%')
+            )
+            ORDER BY name
+        """)
+        return [row['name'] for row in rows
+                if include_restricted or row['name'] not in RESTRICTED_TABLES]
+
+    def _table_query(self, table: str, start_date: str = None,
+                     end_date: str = None) -> Tuple[str, tuple]:
+        """استعلام الجدول مع تصفية الفترة إن كان له عمود تاريخ (دون الأعمدة السرية)"""
+        columns = "*"
+        secret = SECRET_COLUMNS.get(table)
+        if secret:
+            names = [row['name'] for row in self.db.execute_query(f'PRAGMA table_info("{table}")')]
+            columns = ", ".join(f'"{name}"' for name in names if name not in secret)
+        query = f'SELECT {columns} FROM "{table}"'
+        params: tuple = ()
+        date_column = DATE_COLUMNS.get(table)
+        if date_column and start_date and end_date:
+            query += f" WHERE {date_column} >= ? AND {date_column} < ?"
+            params = day_range(start_date, end_date)
+        return query, params
+
+    def iter_chunks(self, query: str, params: tuple = ()) -> Iterator[Tuple[Sequence[str], List[tuple]]]:
+        """تنفيذ استعلام وإرجاع صفوفه على دفعات (الأعمدة، الصفوف)"""
+        cursor = self.db.get_connection().cursor()
+        try:
+            cursor.execute(query, params)
+            columns = [column[0] for column in cursor.description]
+            while True:
+                rows = cursor.fetchmany(self.chunk_size)
+                if not rows:
+                    break
+                yield columns, rows
+        finally:
+            cursor.close()
+
+    @contextmanager
+    def _streaming_snapshot(self) -> Iterator[None]:
+        """لقطة قراءة واحدة دون mmap حتى لا تُحسب صفحات الملف كله في ذاكرة العملية"""
+        conn = self.db.get_connection()
+        mmap_size = conn.execute("PRAGMA mmap_size").fetchone()[0]
+        conn.execute("PRAGMA mmap_size = 0")
+        try:
+            with self.db.read_transaction():
+                yield
+        finally:
+            conn.execute(f"PRAGMA mmap_size = {int(mmap_size)}")
+
+    def _count(self, query: str, params: tuple) -> int:
+        result = self.db.execute_query(f"SELECT COUNT(*) FROM ({query})", params)
+        return result[0][0] if result else 0
+
+    def _stream_query(self, writer, section: str, query: str, params: tuple,
+                      progress: Optional[ProgressCallback], done: int, total: int,
+                      cancelled: Optional[Callable[[], bool]]) -> int:
+        """كتابة نتيجة استعلام كقسم واحد وإرجاع عدد الصفوف المكتوبة حتى الآن"""
+        started = False
+        for columns, rows in self.iter_chunks(query, params):
+            if cancelled and cancelled():
+                raise ExportCancelled()
+            if not started:
+                writer.begin_section(section, columns)
+                started = True
+            writer.write_rows(rows)
+            done += len(rows)
+            if progress:
+                progress(done, total)
+
+        if not started:
+            # جدول فارغ: العناوين فقط
+            cursor = self.db.get_connection().execute(f"SELECT * FROM ({query}) LIMIT 0", params)
+            writer.begin_section(section, [column[0] for column in cursor.description])
+            cursor.close()
+        return done
+
+    def export_tables(self, output_path: str, export_format: str, tables: List[str] = None,
+                      start_date: str = None, end_date: str = None,
+                      progress: ProgressCallback = None,
+                      cancelled: Callable[[], bool] = None,
+                      include_restricted: bool = False) -> Optional[str]:
+        """تصدير جداول كاملة: ورقة لكل جدول في XLSX، أو أرشيف ZIP بملف لكل جدول
+        (الجداول المقيدة تُتخطى ما لم يُمرر include_restricted بعد التحقق من الصلاحية)"""
+        output_path = Path(output_path)
+        try:
+            tables = tables or self.get_exportable_tables(include_restricted)
+            if not include_restricted:
+                tables = [table for table in tables if table not in RESTRICTED_TABLES]
+            output_path.parent.mkdir(parents=True, exist_ok=True)
+
+            with self._streaming_snapshot():
+                queries = [(table, *self._table_query(table, start_date, end_date)) for table in tables]
+                total = sum(self._count(query, params) for _, query, params in queries)
+                done = 0
+
+                if export_format == 'xlsx':
+                    with open(output_path, 'wb') as stream, create_writer('xlsx', stream) as writer:
+                        for table, query, params in queries:
+                            done = self._stream_query(writer, table, query, params,
+                                                      progress, done, total, cancelled)
+                else:
+                    with zipfile.ZipFile(output_path, 'w', zipfile.ZIP_DEFLATED) as archive:
+                        for table, query, params in queries:
+                            with archive.open(f"{table}.{export_format}", 'w', force_zip64=True) as stream, \
+                                    create_writer(export_format, stream) as writer:
+                                done = self._stream_query(writer, table, query, params,
+                                                          progress, done, total, cancelled)
+
+            logger.info(f"تم تصدير {done} صف من {len(tables)} جدول إلى {output_path}")
+            return str(output_path)
+
+        except ExportCancelled:
+            logger.info("تم إلغاء التصدير")
+            output_path.unlink(missing_ok=True)
+            return None
+        except Exception as e:
+            logger.error(f"خطأ في تصدير الجداول: {str(e)}")
+            output_path.unlink(missing_ok=True)
+            return None
+
+    def export_query(self, output_path: str, export_format: str, query: str, params: tuple = (),
+                     section: str = 'data', progress: ProgressCallback = None,
+                     cancelled: Callable[[], bool] = None) -> Optional[str]:
+        """تصدير نتيجة استعلام واحد إلى ملف واحد"""
+        output_path = Path(output_path)
+        try:
+            with self._streaming_snapshot(), open(output_path, 'wb') as stream:
+                total = self._count(query, params) if progress else 0
+                with create_writer(export_format, stream) as writer:
+                    self._stream_query(writer, section, query, params, progress, 0, total, cancelled)
+            return str(output_path)
+
+        except ExportCancelled:
+            output_path.unlink(missing_ok=True)
+            return None
+        except Exception as e:
+            logger.error(f"خطأ في تصدير الاستعلام: {str(e)}")
+            output_path.unlink(missing_ok=True)
+            return None
+
+    @staticmethod
+    def report_sections(report: Dict[str, Any]) -> List[Tuple[str, List[str], List[tuple]]]:
+        """تحويل نتيجة تقرير إلى أقسام جدولية (القيم المفردة في قسم summary)"""
+        scalars: List[Tuple[str, Any]] = []
+        sections = []
+
+        def add_scalars(prefix: str, values: Dict[str, Any]):
+            for key, value in values.items():
+                name = f"{prefix}.{key}" if prefix else key
+                if isinstance(value, dict):
+                    add_scalars(name, value)
+                elif not isinstance(value, list):
+                    scalars.append((name, value))
+
+        add_scalars('', report)
+        if scalars:
+            sections.append(('summary', ['key', 'value'], scalars))
+
+        for name, value in report.items():
+            if isinstance(value, list) and value and isinstance(value[0], dict):
+                columns = list(value[0].keys())
+                sections.append((name, columns, [tuple(row.get(column) for column in columns)
+                                                 for row in value]))
+        return sections
+
+    def export_report(self, report: Dict[str, Any], output_path: str, export_format: str,
+                      progress: ProgressCallback = None) -> Optional[str]:
+        """تصدير نتيجة تقرير بقيمها الخام (دون تنسيق العرض) إلى ملف واحد"""
+        output_path = Path(output_path)
+        try:
+            sections = self.report_sections(report)
+            total = sum(len(rows) for _, _, rows in sections)
+            done = 0
+
+            with open(output_path, 'wb') as stream, \
+                    create_writer(export_format, stream, tag_sections=True) as writer:
+                for name, columns, rows in sections:
+                    writer.begin_section(name, columns)
+                    writer.write_rows(rows)
+                    done += len(rows)
+                    if progress:
+                        progress(done, total)
+            return str(output_path)
+
+        except Exception as e:
+            logger.error(f"خطأ في تصدير التقرير: {str(e)}")
+            output_path.unlink(missing_ok=True)
+            return None
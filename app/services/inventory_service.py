@@ -7,6 +7,9 @@
 from typing import Dict, List, Optional, Tuple
 from app.models.database import DatabaseManager
 from app.models.product import Product, Category
+from app.services.barcode_index import BarcodeIndex
+from app.services.event_bus import EventBus
+from app.utils.date_range import date_range_clause
 import logging
 
 logger = logging.getLogger(__name__)
@@ -19,6 +22,8 @@ class InventoryService:
         self.product_model = Product(self.db)
         self.category_model = Category(self.db)
         self.auth_service = auth_service
+        self.barcode_index = BarcodeIndex.for_db(self.db)
+        self.events = EventBus.for_db(self.db)
     
     def get_all_products(self) -> List[Dict]:
         """الحصول على جميع المنتجات"""
@@ -28,10 +33,23 @@ class InventoryService:
         """الحصول على منتج بالمعرف"""
         return self.product_model.get_product_by_id(product_id)
     
+    def get_products_by_ids(self, product_ids: List[int]) -> List[Dict]:
+        """الحصول على عدة منتجات بالمعرفات"""
+        return self.product_model.get_products_by_ids(product_ids)
+    
     def search_products(self, search_term: str) -> List[Dict]:
         """البحث عن المنتجات"""
         return self.product_model.search_products(search_term)
     
+    def find_by_barcode(self, barcode: str) -> Optional[Dict]:
+        """البحث عن منتج بالباركود المطابق تماماً من الفهرس في الذاكرة"""
+        try:
+            record = self.barcode_index.lookup(barcode)
+            return record._asdict() if record else None
+        except Exception as e:
+            logger.error(f"خطأ في البحث بالباركود: {str(e)}")
+            return None
+    
     def create_product(self, name: str, category_id: int, selling_price: float,
                       cost_price: float = 0, barcode: str = "", 
                       quantity: int = 0, minimum_stock: int = 5,
@@ -46,6 +64,10 @@ class InventoryService:
                 barcode, quantity, minimum_stock, description
             )
             
+            if product_id:
+                self.barcode_index.invalidate_products([product_id])
+                self.events.publish('product.updated', [product_id])
+            
             if product_id and self.auth_service:
                 current_user = self.auth_service.get_current_user()
                 if current_user:
@@ -68,6 +90,10 @@ class InventoryService:
         try:
             success = self.product_model.update_product(product_id, **kwargs)
             
+            if success:
+                self.barcode_index.invalidate_products([product_id])
+                self.events.publish('product.updated', [product_id])
+            
             if success and self.auth_service:
                 current_user = self.auth_service.get_current_user()
                 if current_user:
@@ -99,6 +125,10 @@ class InventoryService:
                 product_id, new_quantity, reason, user_id
             )
             
+            if success:
+                self.barcode_index.invalidate_products([product_id])
+                self.events.publish('stock.changed', [product_id])
+            
             if success and self.auth_service:
                 self.auth_service.log_user_activity(
                     user_id, 'adjust_stock', 'products', 
@@ -147,40 +177,19 @@ class InventoryService:
             return 0
     
     def get_inventory_summary(self) -> Dict:
-        """الحصول على ملخص المخزون"""
+        """الحصول على ملخص المخزون (مسح واحد بالتجميع الشرطي)"""
         try:
-            # إجمالي المنتجات
-            total_products = self.db.execute_query(
-                "SELECT COUNT(*) as count FROM products WHERE is_active = 1"
-            )
-            
-            # إجمالي قيمة المخزون
-            inventory_value = self.db.execute_query("""
+            result = self.db.execute_query("""
                 SELECT 
-                    SUM(quantity_in_stock * cost_price) as total_cost_value,
-                    SUM(quantity_in_stock * selling_price) as total_selling_value
+                    COUNT(*) as total_products,
+                    COALESCE(SUM(quantity_in_stock * cost_price), 0) as total_cost_value,
+                    COALESCE(SUM(quantity_in_stock * selling_price), 0) as total_selling_value,
+                    COUNT(CASE WHEN quantity_in_stock <= minimum_stock THEN 1 END) as low_stock_count,
+                    COUNT(CASE WHEN quantity_in_stock = 0 THEN 1 END) as out_of_stock_count
                 FROM products WHERE is_active = 1
             """)
             
-            # المنتجات منخفضة المخزون
-            low_stock_count = self.db.execute_query("""
-                SELECT COUNT(*) as count FROM products 
-                WHERE is_active = 1 AND quantity_in_stock <= minimum_stock
-            """)
-            
-            # المنتجات نفدت من المخزون
-            out_of_stock_count = self.db.execute_query("""
-                SELECT COUNT(*) as count FROM products 
-                WHERE is_active = 1 AND quantity_in_stock = 0
-            """)
-            
-            return {
-                'total_products': total_products[0]['count'] if total_products else 0,
-                'total_cost_value': inventory_value[0]['total_cost_value'] if inventory_value and inventory_value[0]['total_cost_value'] else 0,
-                'total_selling_value': inventory_value[0]['total_selling_value'] if inventory_value and inventory_value[0]['total_selling_value'] else 0,
-                'low_stock_count': low_stock_count[0]['count'] if low_stock_count else 0,
-                'out_of_stock_count': out_of_stock_count[0]['count'] if out_of_stock_count else 0
-            }
+            return dict(result[0])
             
         except Exception as e:
             logger.error(f"خطأ في الحصول على ملخص المخزون: {str(e)}")
@@ -200,13 +209,9 @@ class InventoryService:
             """
             params = []
             
-            if start_date:
-                query += " AND DATE(s.created_at) >= ?"
-                params.append(start_date)
-            
-            if end_date:
-                query += " AND DATE(s.created_at) <= ?"
-                params.append(end_date)
+            date_clause, date_params = date_range_clause('s.created_at', start_date, end_date)
+            query += date_clause
+            params.extend(date_params)
             
             query += """
                 GROUP BY p.id, p.name, p.selling_price
@@ -234,24 +239,33 @@ class InventoryService:
                 if current_user:
                     user_id = current_user['id']
             
-            for update in updates:
-                product_id = update.get('product_id')
-                new_price = update.get('new_price')
-                price_type = update.get('price_type', 'selling')  # selling or cost
-                
-                if product_id and new_price is not None:
-                    field = 'selling_price' if price_type == 'selling' else 'cost_price'
-                    
-                    self.db.execute_update(
-                        f"UPDATE products SET {field} = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
-                        (new_price, product_id)
-                    )
+            updated = []
+            
+            # كل التحديثات في معاملة واحدة
+            with self.db.transaction() as conn:
+                for update in updates:
+                    product_id = update.get('product_id')
+                    new_price = update.get('new_price')
+                    price_type = update.get('price_type', 'selling')  # selling or cost
                     
-                    if self.auth_service:
-                        self.auth_service.log_user_activity(
-                            user_id, 'bulk_update_prices', 'products', 
-                            product_id, f"تحديث سعر {price_type}: {new_price}"
+                    if product_id and new_price is not None:
+                        field = 'selling_price' if price_type == 'selling' else 'cost_price'
+                        
+                        conn.execute(
+                            f"UPDATE products SET {field} = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
+                            (new_price, product_id)
                         )
+                        updated.append((product_id, price_type, new_price))
+            
+            self.barcode_index.invalidate_products([product_id for product_id, _, _ in updated])
+            self.events.publish('product.updated', [product_id for product_id, _, _ in updated])
+            
+            if self.auth_service:
+                for product_id, price_type, new_price in updated:
+                    self.auth_service.log_user_activity(
+                        user_id, 'bulk_update_prices', 'products', 
+                        product_id, f"تحديث سعر {price_type}: {new_price}"
+                    )
             
             return True
             
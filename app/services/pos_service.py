@@ -8,6 +8,12 @@ from typing import Dict, List, Optional, Tuple
 from decimal import Decimal, ROUND_HALF_UP
 from app.models.database import DatabaseManager
 from app.models.sale import Sale, Customer
+from app.models.cart import Cart, CENT, to_decimal
+from app.models.sales_rollup import apply_sale
+from app.services.barcode_index import BarcodeIndex
+from app.services.event_bus import EventBus
+from app.services.settings_service import SettingsService
+from app.utils.date_range import date_range_clause
 import logging
 
 logger = logging.getLogger(__name__)
@@ -20,6 +26,9 @@ class POSService:
         self.sale_model = Sale(self.db)
         self.customer_model = Customer(self.db)
         self.auth_service = auth_service
+        self.barcode_index = BarcodeIndex.for_db(self.db)
+        self.events = EventBus.for_db(self.db)
+        self.settings = SettingsService.for_db(self.db)
     
     def create_sale(self, items: List[Dict], payment_method: str,
                    customer_info: Dict = None, discount_amount: float = 0,
@@ -33,20 +42,6 @@ class POSService:
             if not items:
                 raise ValueError("لا يمكن إنشاء فاتورة بدون عناصر")
             
-            # التحقق من توفر المخزون
-            for item in items:
-                product = self._get_product_info(item['product_id'])
-                if not product:
-                    raise ValueError(f"المنتج غير موجود: {item['product_id']}")
-                
-                if product['quantity_in_stock'] < item['quantity']:
-                    raise ValueError(f"المخزون غير كافٍ للمنتج: {product['name']}")
-            
-            # إنشاء/الحصول على معرف العميل
-            customer_id = None
-            if customer_info and (customer_info.get('name') or customer_info.get('phone')):
-                customer_id = self.customer_model.get_or_create_customer(**customer_info)
-            
             # الحصول على معرف المستخدم
             user_id = None
             if self.auth_service:
@@ -54,24 +49,45 @@ class POSService:
                 if current_user:
                     user_id = current_user['id']
             
-            # إنشاء الفاتورة
-            sale_id = self.sale_model.create_sale(
-                customer_id, items, payment_method, 
-                discount_amount, notes, user_id
-            )
-            
-            if sale_id:
+            # التحقق من المخزون والعميل والفاتورة وسجل النشاط في معاملة واحدة
+            with self.db.transaction():
+                # التحقق من توفر المخزون
+                products = self._get_products_info([item['product_id'] for item in items])
+                for item in items:
+                    product = products.get(item['product_id'])
+                    if not product:
+                        raise ValueError(f"المنتج غير موجود: {item['product_id']}")
+                    
+                    if product['quantity_in_stock'] < item['quantity']:
+                        raise ValueError(f"المخزون غير كافٍ للمنتج: {product['name']}")
+                
+                # إنشاء/الحصول على معرف العميل
+                customer_id = None
+                if customer_info and (customer_info.get('name') or customer_info.get('phone')):
+                    customer_id = self.customer_model.get_or_create_customer(**customer_info)
+                
+                # إنشاء الفاتورة
+                sale_id = self.sale_model.create_sale(
+                    customer_id, items, payment_method, 
+                    discount_amount, notes, user_id,
+                    tax_rate=self.get_tax_rate()
+                )
+                if not sale_id:
+                    raise ValueError("فشل في إنشاء الفاتورة")
+                
                 # تسجيل النشاط
                 if self.auth_service:
                     self.auth_service.log_user_activity(
                         user_id, 'create_sale', 'sales', sale_id,
                         f"إنشاء فاتورة مبيعات - المبلغ: {self._calculate_final_amount(items, discount_amount)}"
                     )
-                
-                # إرجاع بيانات الفاتورة
-                return self.get_sale_by_id(sale_id)
             
-            return None
+            self.barcode_index.invalidate_products(item['product_id'] for item in items)
+            self.events.publish('sale.created', [sale_id])
+            self.events.publish('stock.changed', [item['product_id'] for item in items])
+            
+            # إرجاع بيانات الفاتورة
+            return self.get_sale_by_id(sale_id)
             
         except Exception as e:
             logger.error(f"خطأ في إنشاء فاتورة المبيعات: {str(e)}")
@@ -106,13 +122,9 @@ class POSService:
                 search_pattern = f"%{search_term}%"
                 params.extend([search_pattern, search_pattern, search_term, search_pattern])
             
-            if start_date:
-                query += " AND DATE(s.created_at) >= ?"
-                params.append(start_date)
-            
-            if end_date:
-                query += " AND DATE(s.created_at) <= ?"
-                params.append(end_date)
+            date_clause, date_params = date_range_clause('s.created_at', start_date, end_date)
+            query += date_clause
+            params.extend(date_params)
             
             if payment_method:
                 query += " AND s.payment_method = ?"
@@ -167,6 +179,10 @@ class POSService:
                 sale_id, return_items, reason, user_id
             )
             
+            if return_id:
+                self.barcode_index.invalidate_products(item['product_id'] for item in return_items)
+                self.events.publish('stock.changed', [item['product_id'] for item in return_items])
+            
             if return_id and self.auth_service:
                 total_return = sum(item['quantity'] * item['unit_price'] for item in return_items)
                 self.auth_service.log_user_activity(
@@ -209,24 +225,33 @@ class POSService:
         }
         return names.get(method, method)
     
+    def get_tax_rate(self) -> Decimal:
+        """معدل الضريبة (نسبة مئوية) من الإعدادات المخزنة في الذاكرة"""
+        return to_decimal(self.settings.get('tax_rate', 0))
+    
+    def create_cart(self) -> Cart:
+        """إنشاء سلة جديدة بمعدل الضريبة الحالي"""
+        return Cart(self.get_tax_rate())
+    
     def calculate_sale_total(self, items: List[Dict], discount_amount: float = 0) -> Dict:
         """حساب إجمالي الفاتورة"""
         try:
-            subtotal = sum(item['quantity'] * item['price'] for item in items)
+            subtotal = sum((to_decimal(item['price']) * item['quantity'] for item in items), Decimal(0))
+            discount = to_decimal(discount_amount)
+            tax_rate = self.get_tax_rate()
             
             # حساب الضريبة
-            tax_rate = float(self.db.get_setting('tax_rate') or 0) / 100
-            tax_amount = (subtotal - discount_amount) * tax_rate
+            tax_amount = ((subtotal - discount) * tax_rate / 100).quantize(CENT, ROUND_HALF_UP)
             
             # المبلغ النهائي
-            final_amount = subtotal - discount_amount + tax_amount
+            final_amount = subtotal - discount + tax_amount
             
             return {
-                'subtotal': round(subtotal, 2),
-                'discount_amount': round(discount_amount, 2),
-                'tax_rate': tax_rate * 100,
-                'tax_amount': round(tax_amount, 2),
-                'final_amount': round(final_amount, 2)
+                'subtotal': float(subtotal.quantize(CENT, ROUND_HALF_UP)),
+                'discount_amount': float(discount.quantize(CENT, ROUND_HALF_UP)),
+                'tax_rate': float(tax_rate),
+                'tax_amount': float(tax_amount),
+                'final_amount': float(final_amount.quantize(CENT, ROUND_HALF_UP))
             }
             
         except Exception as e:
@@ -247,12 +272,19 @@ class POSService:
             logger.error(f"خطأ في الحصول على معلومات المنتج: {str(e)}")
             return None
     
+    def _get_products_info(self, product_ids: List[int]) -> Dict[int, Dict]:
+        """الحصول على معلومات عدة منتجات باستعلام واحد"""
+        unique_ids = list(dict.fromkeys(product_ids))
+        placeholders = ", ".join("?" * len(unique_ids))
+        result = self.db.execute_query(f"""
+            SELECT id, name, selling_price, quantity_in_stock, is_active
+            FROM products WHERE id IN ({placeholders}) AND is_active = 1
+        """, tuple(unique_ids))
+        return {row['id']: dict(row) for row in result}
+    
     def _calculate_final_amount(self, items: List[Dict], discount_amount: float = 0) -> float:
         """حساب المبلغ النهائي"""
-        subtotal = sum(item['quantity'] * item['price'] for item in items)
-        tax_rate = float(self.db.get_setting('tax_rate') or 0) / 100
-        tax_amount = (subtotal - discount_amount) * tax_rate
-        return round(subtotal - discount_amount + tax_amount, 2)
+        return self.calculate_sale_total(items, discount_amount).get('final_amount', 0)
     
     def search_customers(self, search_term: str) -> List[Dict]:
         """البحث عن العملاء"""
@@ -289,29 +321,40 @@ class POSService:
             if not sale or sale['status'] != 'completed':
                 return False
             
-            # إرجاع المخزون
-            for item in sale['items']:
-                self.db.execute_update("""
+            with self.db.transaction() as conn:
+                # تغيير الحالة أولاً وبشرطها: إلغاء متزامن أو ضغطة مزدوجة لا يُرجع
+                # المخزون ولا يطرح الفاتورة من التجميعات مرتين
+                updated = conn.execute(
+                    "UPDATE sales SET status = 'void', notes = ? WHERE id = ? AND status = 'completed'",
+                    (f"ملغاة: {reason}", sale_id)
+                ).rowcount
+                if updated == 0:
+                    return False
+                
+                # إرجاع المخزون
+                conn.executemany("""
                     UPDATE products 
                     SET quantity_in_stock = quantity_in_stock + ?,
                         updated_at = CURRENT_TIMESTAMP
                     WHERE id = ?
-                """, (item['quantity'], item['product_id']))
+                """, [(item['quantity'], item['product_id']) for item in sale['items']])
                 
-                # تسجيل حركة المخزون
-                self.db.execute_insert("""
+                # تسجيل حركات المخزون
+                conn.executemany("""
                     INSERT INTO stock_movements 
                     (product_id, movement_type, quantity, reference_id, 
                      reference_type, notes)
                     VALUES (?, ?, ?, ?, ?, ?)
-                """, (item['product_id'], 'in', item['quantity'], sale_id,
-                      'sale_void', f'إلغاء فاتورة #{sale_id}: {reason}'))
+                """, [(item['product_id'], 'in', item['quantity'], sale_id,
+                       'sale_void', f'إلغاء فاتورة #{sale_id}: {reason}')
+                      for item in sale['items']])
+                
+                # طرح الفاتورة من التجميعات اليومية
+                apply_sale(conn, sale_id, sign=-1)
             
-            # تغيير حالة الفاتورة
-            self.db.execute_update(
-                "UPDATE sales SET status = 'void', notes = ? WHERE id = ?",
-                (f"ملغاة: {reason}", sale_id)
-            )
+            self.barcode_index.invalidate_products(item['product_id'] for item in sale['items'])
+            self.events.publish('sale.updated', [sale_id])
+            self.events.publish('stock.changed', [item['product_id'] for item in sale['items']])
             
             # تسجيل النشاط
             if self.auth_service:
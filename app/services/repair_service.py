@@ -9,6 +9,9 @@ from datetime import datetime, date
 from app.models.database import DatabaseManager
 from app.models.repair import RepairTicket
 from app.models.sale import Customer
+from app.services.barcode_index import BarcodeIndex
+from app.services.event_bus import EventBus
+from app.utils.date_range import local_midnight_utc
 import logging
 
 logger = logging.getLogger(__name__)
@@ -21,6 +24,8 @@ class RepairService:
         self.repair_model = RepairTicket(self.db)
         self.customer_model = Customer(self.db)
         self.auth_service = auth_service
+        self.barcode_index = BarcodeIndex.for_db(self.db)
+        self.events = EventBus.for_db(self.db)
     
     def create_repair_ticket(self, customer_info: Dict, device_info: str,
                            problem_description: str, repair_type: str,
@@ -49,6 +54,9 @@ class RepairService:
                 estimated_cost, imei, technician_id, notes, user_id
             )
             
+            if ticket_id:
+                self.events.publish('repair.created', [ticket_id])
+            
             if ticket_id and self.auth_service:
                 self.auth_service.log_user_activity(
                     user_id, 'create_repair', 'repair_tickets', ticket_id,
@@ -88,6 +96,9 @@ class RepairService:
                 ticket_id, status, final_cost, completed_date, notes
             )
             
+            if success:
+                self.events.publish('repair.status_changed', [ticket_id])
+            
             if success and self.auth_service:
                 current_user = self.auth_service.get_current_user()
                 if current_user:
@@ -127,6 +138,10 @@ class RepairService:
                 ticket_id, product_id, quantity, unit_price
             )
             
+            if success:
+                self.barcode_index.invalidate_products([product_id])
+                self.events.publish('stock.changed', [product_id])
+            
             if success and self.auth_service:
                 current_user = self.auth_service.get_current_user()
                 if current_user:
@@ -148,8 +163,16 @@ class RepairService:
             return False
         
         try:
+            part = self.db.execute_query(
+                "SELECT product_id FROM repair_parts WHERE id = ?", (part_id,)
+            )
+            
             success = self.repair_model.remove_repair_part(part_id)
             
+            if success and part:
+                self.barcode_index.invalidate_products([part[0]['product_id']])
+                self.events.publish('stock.changed', [part[0]['product_id']])
+            
             if success and self.auth_service:
                 current_user = self.auth_service.get_current_user()
                 if current_user:
@@ -211,8 +234,8 @@ class RepairService:
                     COUNT(CASE WHEN status = 'completed' THEN 1 END) as completed_today_count
                 FROM repair_tickets 
                 WHERE technician_id = ? 
-                AND (status NOT IN ('delivered', 'cancelled') OR DATE(updated_at) = DATE('now'))
-            """, (technician_id,))
+                AND (status NOT IN ('delivered', 'cancelled') OR updated_at >= ?)
+            """, (technician_id, local_midnight_utc(date.today())))
             
             if result:
                 return dict(result[0])
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ذاكرة التقارير - Report Cache
+
+نتيجة كل تقرير تُحفظ بمفتاح (نوع التقرير، المعاملات) مع عدادات التغيير
+(change_generations) للجداول التي يقرأ منها وقت حسابه. عند الطلب التالي
+يكفي استعلام واحد صغير لمقارنة العدادات: إن لم يتغير أي جدول تُعاد النتيجة
+المحفوظة فوراً. الفترات المقفلة (انتهت قبل اليوم وسُجل تقفيل يومي لكل يوم
+فيها) تُقارن بعدادات <الجدول>_closed التي لا تزيد إلا عند تعديل صف في يوم
+مقفل، فمبيعات اليوم لا تبطلها بينما الإلغاء أو التعديل المتأخر يبطلها.
+الحجم الكلي محدود ويُطرد الأقدم استخداماً.
+"""
+
+import functools
+import inspect
+import os
+import sys
+import threading
+from collections import OrderedDict
+from datetime import date
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+import logging
+
+from app.models.database import DatabaseManager
+from config.settings import REPORTS_CONFIG
+
+logger = logging.getLogger(__name__)
+
+
+def estimate_size(value: Any) -> int:
+    """تقدير تقريبي لحجم نتيجة تقرير في الذاكرة بالبايت"""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        for key, item in value.items():
+            size += estimate_size(key) + estimate_size(item)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            size += estimate_size(item)
+    return size
+
+
+class _CacheEntry:
+    """نتيجة محفوظة مع عدادات الجداول وقت حسابها"""
+
+    __slots__ = ('value', 'tables', 'generations', 'closed', 'size')
+
+    def __init__(self, value: Any, tables: Tuple[str, ...], generations: Tuple[int, ...],
+                 closed: bool, size: int):
+        self.value = value
+        self.tables = tables
+        self.generations = generations
+        self.closed = closed
+        self.size = size
+
+
+class ReportCache:
+    """ذاكرة LRU لنتائج التقارير لكل قاعدة بيانات"""
+
+    _caches: Dict[str, 'ReportCache'] = {}
+    _caches_lock = threading.Lock()
+
+    def __init__(self, db: DatabaseManager, max_bytes: int = None):
+        self.db = db
+        self.enabled = REPORTS_CONFIG.get('cache_enabled', True)
+        self.max_bytes = max_bytes if max_bytes is not None else \
+            int(REPORTS_CONFIG.get('cache_max_mb', 32) * 1024 * 1024)
+        self._lock = threading.Lock()
+        self._entries: 'OrderedDict[Hashable, _CacheEntry]' = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def for_db(cls, db: DatabaseManager = None) -> 'ReportCache':
+        """الحصول على ذاكرة التقارير المشتركة لملف قاعدة البيانات"""
+        db = db if db else DatabaseManager()
+        key = os.path.abspath(db.db_path)
+        with cls._caches_lock:
+            cache = cls._caches.get(key)
+            if cache is None:
+                cache = cls(db)
+                cls._caches[key] = cache
+            return cache
+
+    def _read_state(self) -> Tuple[Dict[str, int], Optional[str]]:
+        """عدادات كل الجداول وآخر يوم مقفل باستعلام واحد"""
+        rows = self.db.execute_query("""
+            SELECT table_name, generation FROM change_generations
+            UNION ALL
+            SELECT NULL, MAX(close_date) FROM daily_closes
+        """)
+        generations = {}
+        closed_through = None
+        for row in rows:
+            if row[0] is None:
+                closed_through = row[1]
+            else:
+                generations[row[0]] = row[1]
+        return generations, closed_through
+
+    def _is_closed(self, period_start: Optional[str], period_end: Optional[str],
+                   closed_through: Optional[str]) -> bool:
+        """الفترة مقفلة إذا انتهت قبل اليوم وسُجل تقفيل يومي لكل يوم فيها"""
+        if not period_start or not period_end or not closed_through:
+            return False
+        period_start, period_end = str(period_start)[:10], str(period_end)[:10]
+        if period_end >= date.today().isoformat() or period_end > str(closed_through)[:10]:
+            return False
+        try:
+            days = (date.fromisoformat(period_end) - date.fromisoformat(period_start)).days + 1
+        except ValueError:
+            return False
+        if days <= 0:
+            return False
+        result = self.db.execute_query(
+            "SELECT COUNT(DISTINCT close_date) FROM daily_closes WHERE close_date BETWEEN ? AND ?",
+            (period_start, period_end)
+        )
+        return result[0][0] >= days
+
+    @staticmethod
+    def _closed_tables(tables: Tuple[str, ...], generations: Dict[str, int]) -> Tuple[str, ...]:
+        """عدادات الفترات المقفلة لكل جدول (العداد العادي إن لم يكن له عداد خاص)"""
+        return tuple(f"{table}_closed" if f"{table}_closed" in generations else table
+                     for table in tables)
+
+    def _lookup(self, key: Hashable, generations: Optional[Dict[str, int]]) -> Optional[_CacheEntry]:
+        """إرجاع المدخل إن كان صالحاً (generations=None لقراءتها عند الحاجة فقط)"""
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        if generations is None:
+            generations = self._read_state()[0]
+        if tuple(generations.get(table, 0) for table in entry.tables) != entry.generations:
+            return None
+
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+        return entry
+
+    def peek(self, report_type: str, params: Tuple = ()) -> Optional[Any]:
+        """النتيجة المحفوظة إن كانت ما تزال صالحة (دون حساب)"""
+        if not self.enabled:
+            return None
+        try:
+            entry = self._lookup((report_type, params), None)
+        except Exception as e:
+            logger.error(f"خطأ في قراءة ذاكرة التقارير: {str(e)}")
+            return None
+        if entry is None:
+            return None
+        self.hits += 1
+        return entry.value
+
+    def get_or_compute(self, report_type: str, params: Tuple, tables: Tuple[str, ...],
+                       compute: Callable[[], Any], period_start: str = None,
+                       period_end: str = None) -> Any:
+        """إرجاع النتيجة المحفوظة أو حسابها وحفظها"""
+        if not self.enabled:
+            return compute()
+
+        key = (report_type, params)
+        try:
+            generations, closed_through = self._read_state()
+        except Exception as e:
+            logger.error(f"خطأ في قراءة عدادات التغيير: {str(e)}")
+            return compute()
+
+        entry = self._lookup(key, generations)
+        if entry is not None:
+            # نتيجة صالحة لفترة أُقفلت بعد حسابها تُقارن بعدادات الفترات المقفلة من الآن
+            if not entry.closed and self._is_closed(period_start, period_end, closed_through):
+                tables = self._closed_tables(entry.tables, generations)
+                entry.tables = tables
+                entry.generations = tuple(generations.get(table, 0) for table in tables)
+                entry.closed = True
+            self.hits += 1
+            return entry.value
+
+        self.misses += 1
+        # العدادات قُرئت قبل الحساب: أي كتابة أثناءه تُبطل النتيجة في الطلب التالي
+        value = compute()
+        if value:
+            closed = self._is_closed(period_start, period_end, closed_through)
+            if closed:
+                tables = self._closed_tables(tables, generations)
+            self._store(key, _CacheEntry(
+                value, tables,
+                tuple(generations.get(table, 0) for table in tables),
+                closed, estimate_size(value)
+            ))
+        return value
+
+    def _store(self, key: Hashable, entry: _CacheEntry):
+        """حفظ مدخل وطرد الأقدم استخداماً حتى يعود الحجم تحت الحد"""
+        if entry.size > self.max_bytes:
+            return
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous.size
+            self._entries[key] = entry
+            self._bytes += entry.size
+
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.size
+
+    def invalidate(self):
+        """مسح كل النتائج المحفوظة"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """إحصائيات الذاكرة"""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+
+def cached_report(report_type: str, tables: Tuple[str, ...], period_start: Optional[str] = 'start_date',
+                  period_end: Optional[str] = 'end_date'):
+    """تخزين نتيجة دالة تقرير في ReportService.cache (period_start/period_end أسماء معاملات الفترة)"""
+    def decorator(method):
+        signature = inspect.signature(method)
+
+        def bind(self, *args, **kwargs) -> inspect.BoundArguments:
+            bound = signature.bind(self, *args, **kwargs)
+            bound.apply_defaults()
+            return bound
+
+        def cache_key(self, *args, **kwargs) -> Tuple:
+            """مفتاح المعاملات بعد إكمال القيم الافتراضية"""
+            return tuple(bind(self, *args, **kwargs).arguments.values())[1:]
+
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            bound = bind(self, *args, **kwargs)
+            return self.cache.get_or_compute(
+                report_type, tuple(bound.arguments.values())[1:], tables,
+                lambda: method(*bound.args, **bound.kwargs),
+                period_start=bound.arguments.get(period_start) if period_start else None,
+                period_end=bound.arguments.get(period_end) if period_end else None
+            )
+
+        wrapper.report_type = report_type
+        wrapper.cache_key = cache_key
+        return wrapper
+    return decorator
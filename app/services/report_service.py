@@ -7,6 +7,10 @@
 from typing import Dict, List, Optional
 from datetime import datetime, date, timedelta
 from app.models.database import DatabaseManager
+from app.models.sales_rollup import SalesRollup
+from app.services.event_bus import EventBus
+from app.services.report_cache import ReportCache, cached_report
+from app.utils.date_range import day_range, local_day
 import logging
 
 logger = logging.getLogger(__name__)
@@ -17,165 +21,151 @@ class ReportService:
     def __init__(self, auth_service=None):
         self.db = DatabaseManager()
         self.auth_service = auth_service
+        self.rollup = SalesRollup(self.db)
+        self.cache = ReportCache.for_db(self.db)
     
+    def get_cached_report(self, report_type: str, *params) -> Optional[Dict]:
+        """نتيجة تقرير محفوظة وما تزال صالحة (None إن لزم الحساب)"""
+        method = getattr(type(self), f"get_{report_type}_report", None)
+        if method is None or not hasattr(method, 'cache_key'):
+            return None
+        return self.cache.peek(method.report_type, method.cache_key(self, *params))
+    
+    @cached_report('sales', ('sales', 'returns', 'products'))
     def get_sales_report(self, start_date: str, end_date: str, 
                         group_by: str = 'day') -> Dict:
-        """تقرير المبيعات"""
+        """تقرير المبيعات (استعلام واحد على التجميعات اليومية)"""
         try:
-            # إجمالي المبيعات
-            total_result = self.db.execute_query("""
-                SELECT 
-                    COUNT(*) as total_transactions,
-                    SUM(final_amount) as total_sales,
-                    SUM(discount_amount) as total_discounts,
-                    SUM(tax_amount) as total_tax,
-                    AVG(final_amount) as avg_transaction
-                FROM sales 
-                WHERE DATE(created_at) BETWEEN ? AND ? 
-                AND status = 'completed'
-            """, (start_date, end_date))
-            
-            # المبيعات حسب وسيلة الدفع
-            payment_result = self.db.execute_query("""
-                SELECT 
-                    payment_method,
-                    COUNT(*) as transaction_count,
-                    SUM(final_amount) as total_amount
-                FROM sales 
-                WHERE DATE(created_at) BETWEEN ? AND ? 
-                AND status = 'completed'
-                GROUP BY payment_method
-                ORDER BY total_amount DESC
-            """, (start_date, end_date))
-            
-            # المبيعات اليومية/الشهرية
-            if group_by == 'day':
-                period_query = "DATE(created_at)"
-                period_format = "%Y-%m-%d"
-            elif group_by == 'month':
-                period_query = "strftime('%Y-%m', created_at)"
-                period_format = "%Y-%m"
-            else:
-                period_query = "DATE(created_at)"
-                period_format = "%Y-%m-%d"
-            
-            period_result = self.db.execute_query(f"""
-                SELECT 
-                    {period_query} as period,
-                    COUNT(*) as transactions,
-                    SUM(final_amount) as total_sales,
-                    SUM(discount_amount) as discounts
-                FROM sales 
-                WHERE DATE(created_at) BETWEEN ? AND ? 
-                AND status = 'completed'
-                GROUP BY {period_query}
-                ORDER BY period
-            """, (start_date, end_date))
-            
-            # أفضل المنتجات مبيعاً
-            top_products = self.db.execute_query("""
-                SELECT 
-                    p.name,
-                    SUM(si.quantity) as total_sold,
-                    SUM(si.total_amount) as total_revenue,
-                    AVG(si.unit_price) as avg_price
-                FROM sale_items si
-                JOIN sales s ON si.sale_id = s.id
-                JOIN products p ON si.product_id = p.id
-                WHERE DATE(s.created_at) BETWEEN ? AND ? 
-                AND s.status = 'completed'
-                GROUP BY p.id, p.name
-                ORDER BY total_sold DESC
-                LIMIT 10
-            """, (start_date, end_date))
+            breakdown = self.rollup.get_sales_breakdown(start_date, end_date, group_by, 10)
             
             return {
                 'period': {'start': start_date, 'end': end_date},
-                'summary': dict(total_result[0]) if total_result else {},
-                'by_payment_method': [dict(row) for row in payment_result],
-                'by_period': [dict(row) for row in period_result],
-                'top_products': [dict(row) for row in top_products]
+                **breakdown
             }
             
         except Exception as e:
             logger.error(f"خطأ في تقرير المبيعات: {str(e)}")
             return {}
     
+    @cached_report('inventory', ('products',), period_end=None)
     def get_inventory_report(self) -> Dict:
-        """تقرير المخزون"""
+        """تقرير المخزون (مسح واحد لجدول المنتجات)"""
         try:
-            # ملخص المخزون
-            summary = self.db.execute_query("""
+            # الملخص والفئات (GROUPING SETS عبر UNION ALL) ومنخفض المخزون وأعلى
+            # قيمة كلها من CTE واحد فوق المنتجات النشطة
+            result = self.db.execute_query("""
+                WITH active AS MATERIALIZED (
+                    SELECT 
+                        p.name,
+                        p.quantity_in_stock,
+                        p.minimum_stock,
+                        p.cost_price,
+                        p.selling_price,
+                        p.category_id,
+                        COALESCE(c.name, 'غير مصنف') as category_name,
+                        p.quantity_in_stock * p.cost_price as cost_value,
+                        p.quantity_in_stock * p.selling_price as selling_value
+                    FROM products p
+                    LEFT JOIN categories c ON p.category_id = c.id
+                    WHERE p.is_active = 1
+                )
                 SELECT 
-                    COUNT(*) as total_products,
+                    'summary' as section, NULL as name, NULL as category_name,
+                    COUNT(*) as product_count,
                     SUM(quantity_in_stock) as total_quantity,
-                    SUM(quantity_in_stock * cost_price) as total_cost_value,
-                    SUM(quantity_in_stock * selling_price) as total_selling_value,
+                    SUM(cost_value) as total_cost_value,
+                    SUM(selling_value) as total_selling_value,
                     COUNT(CASE WHEN quantity_in_stock <= minimum_stock THEN 1 END) as low_stock_count,
-                    COUNT(CASE WHEN quantity_in_stock = 0 THEN 1 END) as out_of_stock_count
-                FROM products 
-                WHERE is_active = 1
-            """)
-            
-            # المنتجات منخفضة المخزون
-            low_stock = self.db.execute_query("""
+                    COUNT(CASE WHEN quantity_in_stock = 0 THEN 1 END) as out_of_stock_count,
+                    NULL as quantity_in_stock, NULL as minimum_stock,
+                    NULL as cost_price, NULL as selling_price
+                FROM active
+                UNION ALL
                 SELECT 
-                    p.name,
-                    p.quantity_in_stock,
-                    p.minimum_stock,
-                    c.name as category_name,
-                    p.selling_price
-                FROM products p
-                LEFT JOIN categories c ON p.category_id = c.id
-                WHERE p.is_active = 1 
-                AND p.quantity_in_stock <= p.minimum_stock
-                ORDER BY p.quantity_in_stock ASC
-            """)
-            
-            # المخزون حسب الفئة
-            by_category = self.db.execute_query("""
+                    'category', NULL, category_name,
+                    COUNT(*), SUM(quantity_in_stock), SUM(cost_value), SUM(selling_value),
+                    NULL, NULL, NULL, NULL, NULL, NULL
+                FROM active
+                GROUP BY category_id, category_name
+                UNION ALL
                 SELECT 
-                    COALESCE(c.name, 'غير مصنف') as category_name,
-                    COUNT(p.id) as product_count,
-                    SUM(p.quantity_in_stock) as total_quantity,
-                    SUM(p.quantity_in_stock * p.cost_price) as total_cost_value,
-                    SUM(p.quantity_in_stock * p.selling_price) as total_selling_value
-                FROM products p
-                LEFT JOIN categories c ON p.category_id = c.id
-                WHERE p.is_active = 1
-                GROUP BY c.id, c.name
-                ORDER BY total_selling_value DESC
+                    'low_stock', name, category_name, NULL, NULL, NULL, selling_value,
+                    NULL, NULL, quantity_in_stock, minimum_stock, cost_price, selling_price
+                FROM active
+                WHERE quantity_in_stock <= minimum_stock
+                UNION ALL
+                SELECT * FROM (
+                    SELECT 
+                        'highest_value', name, category_name, NULL, NULL, NULL, selling_value,
+                        NULL, NULL, quantity_in_stock, minimum_stock, cost_price, selling_price
+                    FROM active
+                    WHERE quantity_in_stock > 0
+                    ORDER BY selling_value DESC
+                    LIMIT 10
+                )
             """)
             
-            # أعلى قيمة مخزون
-            highest_value = self.db.execute_query("""
-                SELECT 
-                    p.name,
-                    p.quantity_in_stock,
-                    p.cost_price,
-                    p.selling_price,
-                    (p.quantity_in_stock * p.selling_price) as total_value
-                FROM products p
-                WHERE p.is_active = 1 
-                AND p.quantity_in_stock > 0
-                ORDER BY total_value DESC
-                LIMIT 10
-            """)
+            summary = {}
+            by_category = []
+            low_stock = []
+            highest_value = []
+            for row in result:
+                section = row['section']
+                if section == 'summary':
+                    summary = {
+                        'total_products': row['product_count'],
+                        'total_quantity': row['total_quantity'],
+                        'total_cost_value': row['total_cost_value'],
+                        'total_selling_value': row['total_selling_value'],
+                        'low_stock_count': row['low_stock_count'],
+                        'out_of_stock_count': row['out_of_stock_count']
+                    }
+                elif section == 'category':
+                    by_category.append({
+                        'category_name': row['category_name'],
+                        'product_count': row['product_count'],
+                        'total_quantity': row['total_quantity'],
+                        'total_cost_value': row['total_cost_value'],
+                        'total_selling_value': row['total_selling_value']
+                    })
+                elif section == 'low_stock':
+                    low_stock.append({
+                        'name': row['name'],
+                        'quantity_in_stock': row['quantity_in_stock'],
+                        'minimum_stock': row['minimum_stock'],
+                        'category_name': row['category_name'],
+                        'selling_price': row['selling_price']
+                    })
+                else:
+                    highest_value.append({
+                        'name': row['name'],
+                        'quantity_in_stock': row['quantity_in_stock'],
+                        'cost_price': row['cost_price'],
+                        'selling_price': row['selling_price'],
+                        'total_value': row['total_selling_value']
+                    })
+            
+            by_category.sort(key=lambda item: item['total_selling_value'] or 0, reverse=True)
+            low_stock.sort(key=lambda item: item['quantity_in_stock'])
+            highest_value.sort(key=lambda item: item['total_value'], reverse=True)
             
             return {
-                'summary': dict(summary[0]) if summary else {},
-                'low_stock_products': [dict(row) for row in low_stock],
-                'by_category': [dict(row) for row in by_category],
-                'highest_value_products': [dict(row) for row in highest_value]
+                'summary': summary,
+                'low_stock_products': low_stock,
+                'by_category': by_category,
+                'highest_value_products': highest_value
             }
             
         except Exception as e:
             logger.error(f"خطأ في تقرير المخزون: {str(e)}")
             return {}
     
+    @cached_report('repair', ('repair_tickets',))
     def get_repair_report(self, start_date: str, end_date: str) -> Dict:
         """تقرير الصيانة"""
         try:
+            range_start, range_end = day_range(start_date, end_date)
+            
             # ملخص الصيانة
             summary = self.db.execute_query("""
                 SELECT 
@@ -189,8 +179,8 @@ class ReportService:
                         THEN julianday(completed_date) - julianday(received_date) 
                         END) as avg_completion_days
                 FROM repair_tickets 
-                WHERE DATE(received_date) BETWEEN ? AND ?
-            """, (start_date, end_date))
+                WHERE received_date >= ? AND received_date < ?
+            """, (range_start, range_end))
             
             # الصيانة حسب النوع
             by_type = self.db.execute_query("""
@@ -200,9 +190,9 @@ class ReportService:
                     SUM(CASE WHEN final_cost IS NOT NULL THEN final_cost ELSE estimated_cost END) as total_revenue,
                     AVG(CASE WHEN final_cost IS NOT NULL THEN final_cost ELSE estimated_cost END) as avg_cost
                 FROM repair_tickets 
-                WHERE DATE(received_date) BETWEEN ? AND ?
+                WHERE received_date >= ? AND received_date < ?
                 GROUP BY repair_type
-            """, (start_date, end_date))
+            """, (range_start, range_end))
             
             # أداء الفنيين
             technician_performance = self.db.execute_query("""
@@ -214,29 +204,27 @@ class ReportService:
                     AVG(CASE 
                         WHEN rt.completed_date IS NOT NULL AND rt.received_date IS NOT NULL 
                         THEN julianday(rt.completed_date) - julianday(rt.received_date) 
-                        END) as avg_completion_days NULL AND rt.received_date IS NOT NULL 
-                        THEN julianday(rt.completed_date) - julianday(rt.received_date) 
                         END) as avg_completion_days
                 FROM repair_tickets rt
                 LEFT JOIN users u ON rt.technician_id = u.id
-                WHERE DATE(rt.received_date) BETWEEN ? AND ?
+                WHERE rt.received_date >= ? AND rt.received_date < ?
                 AND rt.technician_id IS NOT NULL
                 GROUP BY rt.technician_id, u.full_name
                 ORDER BY completed_tickets DESC
-            """, (start_date, end_date))
+            """, (range_start, range_end))
             
             # الصيانة اليومية
-            daily_repairs = self.db.execute_query("""
+            daily_repairs = self.db.execute_query(f"""
                 SELECT 
-                    DATE(received_date) as date,
+                    {local_day('received_date')} as date,
                     COUNT(*) as tickets_received,
                     COUNT(CASE WHEN status = 'completed' THEN 1 END) as tickets_completed,
                     SUM(CASE WHEN final_cost IS NOT NULL THEN final_cost ELSE estimated_cost END) as daily_revenue
                 FROM repair_tickets 
-                WHERE DATE(received_date) BETWEEN ? AND ?
-                GROUP BY DATE(received_date)
+                WHERE received_date >= ? AND received_date < ?
+                GROUP BY {local_day('received_date')}
                 ORDER BY date
-            """, (start_date, end_date))
+            """, (range_start, range_end))
             
             return {
                 'period': {'start': start_date, 'end': end_date},
@@ -250,53 +238,31 @@ class ReportService:
             logger.error(f"خطأ في تقرير الصيانة: {str(e)}")
             return {}
     
+    @cached_report('profit_loss', ('sales', 'returns', 'repair_tickets'))
     def get_profit_loss_report(self, start_date: str, end_date: str) -> Dict:
         """تقرير الربح والخسارة"""
         try:
-            # إيرادات المبيعات
-            sales_revenue = self.db.execute_query("""
-                SELECT 
-                    SUM(final_amount) as total_sales,
-                    SUM(tax_amount) as total_tax,
-                    SUM(discount_amount) as total_discounts
-                FROM sales 
-                WHERE DATE(created_at) BETWEEN ? AND ? 
-                AND status = 'completed'
-            """, (start_date, end_date))
-            
-            # تكلفة البضاعة المباعة
-            cost_of_goods = self.db.execute_query("""
-                SELECT 
-                    SUM(si.quantity * p.cost_price) as total_cogs
-                FROM sale_items si
-                JOIN sales s ON si.sale_id = s.id
-                JOIN products p ON si.product_id = p.id
-                WHERE DATE(s.created_at) BETWEEN ? AND ? 
-                AND s.status = 'completed'
-            """, (start_date, end_date))
-            
-            # إيرادات الصيانة
-            repair_revenue = self.db.execute_query("""
-                SELECT 
-                    SUM(CASE WHEN final_cost IS NOT NULL THEN final_cost ELSE estimated_cost END) as total_repair_revenue
-                FROM repair_tickets 
-                WHERE DATE(received_date) BETWEEN ? AND ?
-                AND status IN ('completed', 'delivered')
-            """, (start_date, end_date))
-            
-            # المرتجعات
-            returns_data = self.db.execute_query("""
-                SELECT 
-                    SUM(total_amount) as total_returns
-                FROM returns 
-                WHERE DATE(created_at) BETWEEN ? AND ?
-            """, (start_date, end_date))
+            range_start, range_end = day_range(start_date, end_date)
+            
+            # لقطة قراءة واحدة حتى تتطابق أرقام المبيعات والصيانة
+            with self.db.read_transaction():
+                # إيرادات المبيعات وتكلفتها والمرتجعات من التجميعات اليومية
+                sales_summary = self.rollup.get_summary(start_date, end_date)
+                
+                # إيرادات الصيانة
+                repair_revenue = self.db.execute_query("""
+                    SELECT 
+                        SUM(CASE WHEN final_cost IS NOT NULL THEN final_cost ELSE estimated_cost END) as total_repair_revenue
+                    FROM repair_tickets 
+                    WHERE received_date >= ? AND received_date < ?
+                    AND status IN ('completed', 'delivered')
+                """, (range_start, range_end))
             
             # حساب الأرباح
-            sales_total = sales_revenue[0]['total_sales'] if sales_revenue and sales_revenue[0]['total_sales'] else 0
-            cogs_total = cost_of_goods[0]['total_cogs'] if cost_of_goods and cost_of_goods[0]['total_cogs'] else 0
+            sales_total = sales_summary['total_sales']
+            cogs_total = sales_summary['total_cogs']
             repair_total = repair_revenue[0]['total_repair_revenue'] if repair_revenue and repair_revenue[0]['total_repair_revenue'] else 0
-            returns_total = returns_data[0]['total_returns'] if returns_data and returns_data[0]['total_returns'] else 0
+            returns_total = sales_summary['total_returns']
             
             gross_profit = sales_total - cogs_total
             total_revenue = sales_total + repair_total - returns_total
@@ -329,9 +295,12 @@ class ReportService:
             logger.error(f"خطأ في تقرير الربح والخسارة: {str(e)}")
             return {}
     
+    @cached_report('customer', ('sales', 'repair_tickets', 'customers'))
     def get_customer_report(self, start_date: str, end_date: str) -> Dict:
         """تقرير العملاء"""
         try:
+            range_start, range_end = day_range(start_date, end_date)
+            
             # أفضل العملاء
             top_customers = self.db.execute_query("""
                 SELECT 
@@ -343,12 +312,12 @@ class ReportService:
                     MAX(s.created_at) as last_purchase
                 FROM customers c
                 JOIN sales s ON c.id = s.customer_id
-                WHERE DATE(s.created_at) BETWEEN ? AND ? 
+                WHERE s.created_at >= ? AND s.created_at < ? 
                 AND s.status = 'completed'
                 GROUP BY c.id, c.name, c.phone
                 ORDER BY total_spent DESC
                 LIMIT 20
-            """, (start_date, end_date))
+            """, (range_start, range_end))
             
             # عملاء الصيانة
             repair_customers = self.db.execute_query("""
@@ -360,11 +329,11 @@ class ReportService:
                     AVG(CASE WHEN rt.final_cost IS NOT NULL THEN rt.final_cost ELSE rt.estimated_cost END) as avg_repair_cost
                 FROM customers c
                 JOIN repair_tickets rt ON c.id = rt.customer_id
-                WHERE DATE(rt.received_date) BETWEEN ? AND ?
+                WHERE rt.received_date >= ? AND rt.received_date < ?
                 GROUP BY c.id, c.name, c.phone
                 ORDER BY total_repair_cost DESC
                 LIMIT 20
-            """, (start_date, end_date))
+            """, (range_start, range_end))
             
             # إحصائيات عامة
             customer_stats = self.db.execute_query("""
@@ -373,9 +342,9 @@ class ReportService:
                     COUNT(DISTINCT CASE WHEN s.id IS NOT NULL THEN c.id END) as purchasing_customers,
                     COUNT(DISTINCT CASE WHEN rt.id IS NOT NULL THEN c.id END) as repair_customers
                 FROM customers c
-                LEFT JOIN sales s ON c.id = s.customer_id AND DATE(s.created_at) BETWEEN ? AND ?
-                LEFT JOIN repair_tickets rt ON c.id = rt.customer_id AND DATE(rt.received_date) BETWEEN ? AND ?
-            """, (start_date, end_date, start_date, end_date))
+                LEFT JOIN sales s ON c.id = s.customer_id AND s.created_at >= ? AND s.created_at < ?
+                LEFT JOIN repair_tickets rt ON c.id = rt.customer_id AND rt.received_date >= ? AND rt.received_date < ?
+            """, (range_start, range_end, range_start, range_end))
             
             return {
                 'period': {'start': start_date, 'end': end_date},
@@ -388,6 +357,8 @@ class ReportService:
             logger.error(f"خطأ في تقرير العملاء: {str(e)}")
             return {}
     
+    @cached_report('daily_close', ('sales', 'returns', 'repair_tickets', 'daily_closes'),
+                   period_end=None)
     def get_daily_close_report(self, date: str) -> Dict:
         """تقرير التقفيل اليومي"""
         try:
@@ -400,38 +371,29 @@ class ReportService:
                 return dict(existing_close[0])
             
             # حساب البيانات للتقفيل الجديد
-            sales_summary = self.db.execute_query("""
-                SELECT 
-                    SUM(CASE WHEN payment_method = 'cash' THEN final_amount ELSE 0 END) as cash_sales,
-                    SUM(CASE WHEN payment_method = 'card' THEN final_amount ELSE 0 END) as card_sales,
-                    SUM(CASE WHEN payment_method IN ('vodafone_cash', 'etisalat_wallet', 'we_pay', 'insta_pay') 
-                        THEN final_amount ELSE 0 END) as wallet_sales,
-                    SUM(final_amount) as total_sales
-                FROM sales 
-                WHERE DATE(created_at) = ? AND status = 'completed'
-            """, (date,))
-            
-            returns_total = self.db.execute_query("""
-                SELECT COALESCE(SUM(total_amount), 0) as total_returns
-                FROM returns 
-                WHERE DATE(created_at) = ?
-            """, (date,))
-            
-            repair_revenue = self.db.execute_query("""
-                SELECT COALESCE(SUM(CASE WHEN final_cost IS NOT NULL THEN final_cost ELSE estimated_cost END), 0) as repair_revenue
-                FROM repair_tickets 
-                WHERE DATE(received_date) = ? AND status IN ('completed', 'delivered')
-            """, (date,))
+            range_start, range_end = day_range(date)
+            
+            with self.db.read_transaction():
+                by_method = self.rollup.get_daily_payment_totals(date)
+                returns_amount = self.rollup.get_summary(date, date)['total_returns']
+                
+                repair_revenue = self.db.execute_query("""
+                    SELECT COALESCE(SUM(CASE WHEN final_cost IS NOT NULL THEN final_cost ELSE estimated_cost END), 0) as repair_revenue
+                    FROM repair_tickets 
+                    WHERE received_date >= ? AND received_date < ? AND status IN ('completed', 'delivered')
+                """, (range_start, range_end))
             
             # إعداد البيانات
-            sales_data = dict(sales_summary[0]) if sales_summary else {}
-            returns_amount = returns_total[0]['total_returns'] if returns_total else 0
             repair_amount = repair_revenue[0]['repair_revenue'] if repair_revenue else 0
             
-            cash_sales = sales_data.get('cash_sales', 0) or 0
-            card_sales = sales_data.get('card_sales', 0) or 0
-            wallet_sales = sales_data.get('wallet_sales', 0) or 0
-            total_sales = sales_data.get('total_sales', 0) or 0
+            def method_total(methods=None) -> float:
+                return sum(row['total_amount'] for method, row in by_method.items()
+                           if methods is None or method in methods)
+            
+            cash_sales = method_total(('cash',))
+            card_sales = method_total(('card',))
+            wallet_sales = method_total(('vodafone_cash', 'etisalat_wallet', 'we_pay', 'insta_pay'))
+            total_sales = method_total()
             
             net_sales = total_sales - returns_amount
             total_revenue = net_sales + repair_amount
@@ -519,6 +481,8 @@ class ReportService:
                     user_id
                 ))
             
+            # التقفيل مرة يومياً: حذف سجل التغييرات الأقدم من فترة الاحتفاظ
+            EventBus.for_db(self.db).prune()
             return True
             
         except Exception as e:
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+مدير الجلسات - Session Manager
+
+كل تسجيل دخول كامل (كلمة مرور + bcrypt) يفتح جلسة تبقى في الذاكرة، ويمكن أن
+يُسجل معها رمز PIN قصير للتبديل السريع بين الكاشيرين على نفس الجهاز. الرمز
+لا يُحفظ: تُحفظ بصمته HMAC-SHA256 بمفتاح عشوائي خاص بالعملية وملح خاص
+بالجلسة، فالتحقق منه يستغرق أجزاء من الميلي ثانية، ولا قيمة للبصمة خارج
+العملية الحالية.
+
+الجلسة تنتهي بعد session_timeout_minutes دون نشاط، والمحاولات الفاشلة
+(كلمة مرور أو PIN) تُعد في الذاكرة: بعد max_login_attempts محاولة يُقفل
+الحساب أو الجلسة مدة login_lockout_seconds.
+"""
+
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+import time
+from typing import Dict, List, Optional
+import logging
+
+from app.models.database import DatabaseManager
+from config.settings import SYSTEM_CONFIG
+
+logger = logging.getLogger(__name__)
+
+
+class _Session:
+    """جلسة مستخدم مصادق عليه"""
+
+    __slots__ = ('session_id', 'user', 'pin_salt', 'pin_key', 'created_at', 'last_activity')
+
+    def __init__(self, session_id: str, user: Dict):
+        self.session_id = session_id
+        self.user = user
+        self.pin_salt: Optional[bytes] = None
+        self.pin_key: Optional[bytes] = None
+        self.created_at = time.time()
+        self.last_activity = time.monotonic()
+
+
+class _AttemptLimiter:
+    """عداد المحاولات الفاشلة لكل مفتاح مع قفل مؤقت بعد تجاوز الحد"""
+
+    def __init__(self, max_attempts: int, lockout_seconds: float):
+        self.max_attempts = max_attempts
+        self.lockout_seconds = lockout_seconds
+        self._failures: Dict[str, int] = {}
+        self._locked_until: Dict[str, float] = {}
+
+    def locked_for(self, key: str) -> float:
+        """الثواني المتبقية على القفل (0 إن لم يكن مقفلاً)"""
+        remaining = self._locked_until.get(key, 0) - time.monotonic()
+        if remaining <= 0 and key in self._locked_until:
+            del self._locked_until[key]
+            self._failures.pop(key, None)
+        return max(remaining, 0)
+
+    def failure(self, key: str):
+        count = self._failures.get(key, 0) + 1
+        self._failures[key] = count
+        if count >= self.max_attempts:
+            self._locked_until[key] = time.monotonic() + self.lockout_seconds
+            logger.warning(f"تم تجاوز عدد المحاولات المسموح ({key})")
+
+    def success(self, key: str):
+        self._failures.pop(key, None)
+        self._locked_until.pop(key, None)
+
+
+class SessionManager:
+    """الجلسات المفتوحة المشتركة لملف قاعدة بيانات واحد"""
+
+    _managers: Dict[str, 'SessionManager'] = {}
+    _managers_lock = threading.Lock()
+
+    def __init__(self, timeout_minutes: float = None, max_attempts: int = None,
+                 lockout_seconds: float = None):
+        timeout_minutes = timeout_minutes or SYSTEM_CONFIG.get('session_timeout_minutes', 60)
+        self.timeout = timeout_minutes * 60
+        self.limiter = _AttemptLimiter(
+            max_attempts or SYSTEM_CONFIG.get('max_login_attempts', 3),
+            lockout_seconds or SYSTEM_CONFIG.get('login_lockout_seconds', 60)
+        )
+        self._secret = secrets.token_bytes(32)
+        self._sessions: Dict[str, _Session] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_db(cls, db: DatabaseManager = None) -> 'SessionManager':
+        """الحصول على مدير الجلسات المشترك لملف قاعدة البيانات"""
+        db = db if db else DatabaseManager()
+        key = os.path.abspath(db.db_path)
+        with cls._managers_lock:
+            manager = cls._managers.get(key)
+            if manager is None:
+                manager = cls()
+                cls._managers[key] = manager
+            return manager
+
+    # ------------------------------------------------------------------
+    # فتح الجلسات وإغلاقها
+    # ------------------------------------------------------------------
+
+    def open_session(self, user: Dict, pin: str = None) -> str:
+        """فتح جلسة بعد تسجيل دخول كامل (تحل محل جلسة سابقة لنفس المستخدم)"""
+        session = _Session(secrets.token_hex(16), dict(user))
+        if pin:
+            self._set_pin(session, pin)
+
+        with self._lock:
+            for session_id, existing in list(self._sessions.items()):
+                if existing.user['id'] == user['id']:
+                    del self._sessions[session_id]
+            self._sessions[session.session_id] = session
+        return session.session_id
+
+    def _set_pin(self, session: _Session, pin: str):
+        session.pin_salt = secrets.token_bytes(16)
+        session.pin_key = self._derive(session.pin_salt, pin)
+
+    def _derive(self, salt: bytes, pin: str) -> bytes:
+        return hmac.new(self._secret, salt + pin.encode('utf-8'), hashlib.sha256).digest()
+
+    def set_pin(self, session_id: str, pin: str) -> bool:
+        """تسجيل رمز PIN لجلسة مفتوحة"""
+        with self._lock:
+            session = self._live_session(session_id)
+            if session is None:
+                return False
+            self._set_pin(session, pin)
+            return True
+
+    def close_session(self, session_id: str):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def close_user_sessions(self, user_id: int) -> int:
+        """إغلاق كل جلسات مستخدم (بعد تعطيله أو تغيير دوره أو كلمة مروره)"""
+        with self._lock:
+            session_ids = [session_id for session_id, session in self._sessions.items()
+                           if session.user['id'] == user_id]
+            for session_id in session_ids:
+                del self._sessions[session_id]
+        return len(session_ids)
+
+    # ------------------------------------------------------------------
+    # الانتهاء والنشاط
+    # ------------------------------------------------------------------
+
+    def _live_session(self, session_id: str) -> Optional[_Session]:
+        """الجلسة إن كانت مفتوحة ولم تنتهِ مدتها (مع قفل المدير ممسوكاً)"""
+        session = self._sessions.get(session_id)
+        if session is None:
+            return None
+        if time.monotonic() - session.last_activity > self.timeout:
+            del self._sessions[session_id]
+            logger.info(f"انتهت جلسة المستخدم {session.user['username']} لعدم النشاط")
+            return None
+        return session
+
+    def is_active(self, session_id: str) -> bool:
+        with self._lock:
+            return self._live_session(session_id) is not None
+
+    def touch(self, session_id: str):
+        """تسجيل نشاط في الجلسة"""
+        session = self._sessions.get(session_id)
+        if session is not None:
+            session.last_activity = time.monotonic()
+
+    def expire_idle(self) -> int:
+        """إغلاق كل الجلسات المنتهية وإرجاع عددها"""
+        with self._lock:
+            expired = [session_id for session_id in list(self._sessions)
+                       if self._live_session(session_id) is None]
+        return len(expired)
+
+    def get_sessions(self) -> List[Dict]:
+        """الجلسات المفتوحة التي يمكن التبديل إليها"""
+        self.expire_idle()
+        with self._lock:
+            return [
+                {
+                    'session_id': session.session_id,
+                    'user_id': session.user['id'],
+                    'username': session.user['username'],
+                    'full_name': session.user['full_name'],
+                    'has_pin': session.pin_key is not None
+                }
+                for session in self._sessions.values()
+            ]
+
+    # ------------------------------------------------------------------
+    # التحقق
+    # ------------------------------------------------------------------
+
+    def verify_pin(self, session_id: str, pin: str) -> Optional[Dict]:
+        """التحقق من رمز PIN لجلسة وإرجاع مستخدمها (None عند الفشل أو القفل)"""
+        key = f"session:{session_id}"
+        with self._lock:
+            if self.limiter.locked_for(key):
+                return None
+            session = self._live_session(session_id)
+            if session is None or session.pin_key is None:
+                return None
+
+            if hmac.compare_digest(self._derive(session.pin_salt, pin), session.pin_key):
+                self.limiter.success(key)
+                session.last_activity = time.monotonic()
+                return dict(session.user, session_id=session.session_id)
+
+            self.limiter.failure(key)
+            return None
+
+    def session_user(self, session_id: str) -> Optional[Dict]:
+        with self._lock:
+            session = self._live_session(session_id)
+            return dict(session.user, session_id=session_id) if session else None
+
+    def login_locked_for(self, username: str) -> float:
+        with self._lock:
+            return self.limiter.locked_for(f"user:{username}")
+
+    def record_login(self, username: str, success: bool):
+        """تسجيل نتيجة محاولة دخول بكلمة المرور"""
+        key = f"user:{username}"
+        with self._lock:
+            if success:
+                self.limiter.success(key)
+            else:
+                self.limiter.failure(key)
+
+    def locked_for(self, session_id: str) -> float:
+        with self._lock:
+            return self.limiter.locked_for(f"session:{session_id}")
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+خدمة الإعدادات - Settings Service
+
+مخزن إعدادات واحد مُنمّط: القيم الافتراضية من config/settings.py وفوقها قيم
+جدول settings. كل المفاتيح تُحمل باستعلام واحد عند أول قراءة، ثم تُقرأ من
+الذاكرة دون أي I/O. الكتابة عبر set() (أو DatabaseManager.set_setting الذي
+يمر بها) تحدث الذاكرة وتبلغ المشتركين.
+"""
+
+import os
+import threading
+from decimal import Decimal, InvalidOperation
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+import logging
+
+from app.models.database import DatabaseManager
+from config.settings import SHOP_DEFAULTS, DATABASE_CONFIG
+
+logger = logging.getLogger(__name__)
+
+
+class SettingDefinition(NamedTuple):
+    """تعريف إعداد: النوع والقيمة الافتراضية والوصف"""
+    type: type
+    default: Any
+    description: str
+
+
+# الإعدادات المعروفة (المفتاح في جدول settings ← التعريف)
+SETTING_DEFINITIONS: Dict[str, SettingDefinition] = {
+    'shop_name': SettingDefinition(str, SHOP_DEFAULTS['name'], "اسم المحل"),
+    'shop_address': SettingDefinition(str, SHOP_DEFAULTS['address'], "عنوان المحل"),
+    'shop_phone': SettingDefinition(str, SHOP_DEFAULTS['phone'], "هاتف المحل"),
+    'shop_email': SettingDefinition(str, SHOP_DEFAULTS['email'], "البريد الإلكتروني للمحل"),
+    'currency': SettingDefinition(str, SHOP_DEFAULTS['currency'], "العملة المستخدمة"),
+    'tax_rate': SettingDefinition(Decimal, Decimal(str(SHOP_DEFAULTS['tax_rate'])),
+                                  "معدل الضريبة المضافة (%)"),
+    'receipt_footer': SettingDefinition(str, SHOP_DEFAULTS['receipt_footer'], "نص أسفل الفاتورة"),
+    'auto_backup': SettingDefinition(bool, DATABASE_CONFIG['auto_backup_enabled'],
+                                     "النسخ الاحتياطي التلقائي (1=مفعل, 0=معطل)"),
+}
+
+_TRUE_VALUES = {'1', 'true', 'yes', 'on'}
+
+
+def _parse(value: Optional[str], definition: SettingDefinition) -> Any:
+    """تحويل النص المخزن إلى نوع الإعداد (القيمة الافتراضية عند الفشل)"""
+    if value is None:
+        return definition.default
+    try:
+        if definition.type is bool:
+            return str(value).strip().lower() in _TRUE_VALUES
+        if definition.type is Decimal:
+            return Decimal(str(value).strip())
+        return definition.type(value)
+    except (ValueError, TypeError, InvalidOperation):
+        logger.warning(f"قيمة غير صالحة للإعداد: {value}")
+        return definition.default
+
+
+def _serialize(value: Any) -> str:
+    """تحويل القيمة إلى نص للتخزين"""
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    return str(value)
+
+
+class SettingsService:
+    """خدمة إعدادات مخزنة في الذاكرة لكل قاعدة بيانات"""
+
+    _services: Dict[str, 'SettingsService'] = {}
+    _services_lock = threading.Lock()
+
+    def __init__(self, db: DatabaseManager):
+        self.db = db
+        self._lock = threading.RLock()
+        self._values: Optional[Dict[str, Any]] = None
+        self._subscribers: List[Tuple[Optional[str], Callable[[str, Any], None]]] = []
+
+    @classmethod
+    def for_db(cls, db: DatabaseManager = None) -> 'SettingsService':
+        """الحصول على خدمة الإعدادات المشتركة لملف قاعدة البيانات"""
+        db = db if db else DatabaseManager()
+        key = os.path.abspath(db.db_path)
+        with cls._services_lock:
+            service = cls._services.get(key)
+            if service is None:
+                service = cls(db)
+                cls._services[key] = service
+            return service
+
+    def _load(self) -> Dict[str, Any]:
+        """تحميل كل الإعدادات باستعلام واحد فوق القيم الافتراضية"""
+        values = {key: definition.default for key, definition in SETTING_DEFINITIONS.items()}
+
+        try:
+            rows = self.db.execute_query("SELECT key, value FROM settings")
+        except Exception as e:
+            logger.error(f"خطأ في تحميل الإعدادات: {str(e)}")
+            return values
+
+        for row in rows:
+            definition = SETTING_DEFINITIONS.get(row['key'])
+            values[row['key']] = _parse(row['value'], definition) if definition else row['value']
+
+        self._values = values
+        return values
+
+    def _ensure_loaded(self) -> Dict[str, Any]:
+        values = self._values
+        if values is None:
+            with self._lock:
+                values = self._values if self._values is not None else self._load()
+        return values
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """قراءة إعداد مُنمّط من الذاكرة"""
+        value = self._ensure_loaded().get(key)
+        return default if value is None else value
+
+    def get_all(self) -> Dict[str, Any]:
+        """نسخة من كل الإعدادات الحالية"""
+        return dict(self._ensure_loaded())
+
+    def set(self, key: str, value: Any, description: str = None) -> bool:
+        """حفظ إعداد في قاعدة البيانات وتحديث الذاكرة وإبلاغ المشتركين"""
+        definition = SETTING_DEFINITIONS.get(key)
+        stored = _serialize(value)
+        if description is None and definition:
+            description = definition.description
+
+        with self._lock:
+            if not self.db._write_setting(key, stored, description):
+                return False
+
+            typed_value = _parse(stored, definition) if definition else stored
+            if self._values is not None:
+                self._values[key] = typed_value
+
+        self._notify(key, typed_value)
+        return True
+
+    def invalidate(self):
+        """إلغاء الذاكرة لتُقرأ الإعدادات من جديد (بعد الاستعادة مثلاً)"""
+        with self._lock:
+            self._values = None
+        self._notify(None, None)
+
+    def subscribe(self, callback: Callable[[str, Any], None], key: str = None):
+        """الاشتراك في تغييرات إعداد معين (أو كل الإعدادات إذا كان key=None)"""
+        self._subscribers.append((key, callback))
+
+    def unsubscribe(self, callback: Callable[[str, Any], None]):
+        """إلغاء الاشتراك"""
+        self._subscribers = [(key, cb) for key, cb in self._subscribers if cb is not callback]
+
+    def _notify(self, key: Optional[str], value: Any):
+        """إبلاغ المشتركين (key=None يعني أن كل الإعدادات قد تغيرت)"""
+        for subscribed_key, callback in list(self._subscribers):
+            if key is None:
+                args = (subscribed_key, self.get(subscribed_key)) if subscribed_key else (None, None)
+            elif subscribed_key in (None, key):
+                args = (key, value)
+            else:
+                continue
+
+            try:
+                callback(*args)
+            except Exception as e:
+                logger.error(f"خطأ في إبلاغ مشترك الإعدادات: {str(e)}")
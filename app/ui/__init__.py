@@ -3,7 +3,7 @@
 """
 
 from .main_window import MainWindow
-from .login_dialog import LoginDialog
+from .login_dialog import LoginDialog, SwitchUserDialog
 from .dashboard import Dashboard
 from .pos_window import POSWindow
 from .inventory_window import InventoryWindow
@@ -15,6 +15,7 @@ from .daily_close_window import DailyCloseWindow
 __all__ = [
     'MainWindow',
     'LoginDialog',
+    'SwitchUserDialog',
     'Dashboard',
     'POSWindow',
     'InventoryWindow',
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+نموذج جدول السلة - Cart Table Model
+
+يعرض كائن Cart ويستمع لأحداثه: إضافة بند تُدرج صفاً واحداً، وتغيير الكمية
+يعيد رسم صف واحد، دون إعادة بناء الجدول أو إنشاء عناصر واجهة لكل صف.
+"""
+
+from PySide6.QtCore import Qt, QAbstractTableModel, QModelIndex
+from PySide6.QtWidgets import QStyledItemDelegate, QSpinBox
+
+from app.models import cart as cart_events
+from app.models.cart import Cart
+from app.ui.product_table_model import PRODUCT_ROLE
+
+QUANTITY_COLUMN = 2
+DELETE_COLUMN = 4
+
+_HEADERS = ["المنتج", "السعر", "الكمية", "المجموع", "حذف"]
+
+
+class CartTableModel(QAbstractTableModel):
+    """نموذج جدول فوق كائن السلة"""
+
+    def __init__(self, cart: Cart, parent=None):
+        super().__init__(parent)
+        self.cart = cart
+        cart.add_listener(self._on_cart_event)
+
+    def _on_cart_event(self, event, row):
+        if event == cart_events.ABOUT_TO_ADD:
+            self.beginInsertRows(QModelIndex(), row, row)
+        elif event == cart_events.ADDED:
+            self.endInsertRows()
+        elif event == cart_events.UPDATED:
+            self.dataChanged.emit(self.index(row, QUANTITY_COLUMN), self.index(row, 3))
+        elif event == cart_events.ABOUT_TO_REMOVE:
+            self.beginRemoveRows(QModelIndex(), row, row)
+        elif event == cart_events.REMOVED:
+            self.endRemoveRows()
+        elif event == cart_events.ABOUT_TO_RESET:
+            self.beginResetModel()
+        elif event == cart_events.RESET:
+            self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.cart)
+
+    def columnCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(_HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return _HEADERS[section]
+        return super().headerData(section, orientation, role)
+
+    def flags(self, index):
+        flags = super().flags(index)
+        if index.column() == QUANTITY_COLUMN:
+            flags |= Qt.ItemIsEditable
+        return flags
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+
+        line = self.cart.line_at(index.row())
+        column = index.column()
+
+        if role in (Qt.DisplayRole, Qt.EditRole):
+            if column == 0:
+                return line.name
+            if column == 1:
+                return f"{line.unit_price:.2f}"
+            if column == QUANTITY_COLUMN:
+                return line.quantity
+            if column == 3:
+                return f"{line.total:.2f}"
+            return None
+
+        if role == Qt.TextAlignmentRole and column in (1, QUANTITY_COLUMN, 3):
+            return int(Qt.AlignCenter)
+
+        if role == PRODUCT_ROLE:
+            return {'id': line.product_id, 'name': line.name,
+                    'quantity': line.quantity, 'max_quantity': line.max_quantity}
+
+        return None
+
+    def setData(self, index, value, role=Qt.EditRole) -> bool:
+        if role != Qt.EditRole or index.column() != QUANTITY_COLUMN:
+            return False
+
+        line = self.cart.line_at(index.row())
+        try:
+            self.cart.set_quantity(line.product_id, int(value))
+        except ValueError:
+            return False
+        return True
+
+
+class QuantityDelegate(QStyledItemDelegate):
+    """محرر كمية (QSpinBox) يُنشأ فقط أثناء التحرير ومحدود بالمخزون"""
+
+    def createEditor(self, parent, option, index):
+        product = index.data(PRODUCT_ROLE)
+        editor = QSpinBox(parent)
+        editor.setMinimum(1)
+        editor.setMaximum(max(1, product['max_quantity']))
+        editor.setAlignment(Qt.AlignCenter)
+        return editor
+
+    def setEditorData(self, editor, index):
+        editor.setValue(index.data(Qt.EditRole))
+
+    def setModelData(self, editor, model, index):
+        editor.interpretText()
+        model.setData(index, editor.value(), Qt.EditRole)
@@ -8,11 +8,13 @@ from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QGridLayout,
                               QLabel, QPushButton, QFrame, QScrollArea,
                               QTableWidget, QTableWidgetItem, QProgressBar,
                               QMessageBox)
-from PySide6.QtCore import Qt, QTimer
+from PySide6.QtCore import Qt, QThreadPool
 from PySide6.QtGui import QFont, QColor, QPalette
-from datetime import datetime, date, timedelta
+from datetime import datetime
 import logging
 
+from .job_thread import PoolJob
+
 logger = logging.getLogger(__name__)
 
 
@@ -101,8 +103,18 @@ class Dashboard(QWidget):
     def __init__(self, main_window):
         super().__init__()
         self.main_window = main_window
+
+        # خيط واحد دائم للقطات حتى يبقى اتصاله (و data_version) ثابتاً
+        self.snapshot_pool = QThreadPool(self)
+        self.snapshot_pool.setMaxThreadCount(1)
+        self.snapshot_pool.setExpiryTimeout(-1)
+        self._snapshot_job = None
+        self._refresh_queued = False
+
         self.setup_ui()
-        self.setup_refresh_timer()
+
+        # تحديث عند أي تغيير (من هذه الطرفية أو غيرها) بدلاً من مؤقت دوري
+        self.main_window.events.subscribe(self.on_data_changed)
 
     def setup_ui(self):
         """إعداد واجهة المستخدم"""
@@ -339,101 +351,90 @@ class Dashboard(QWidget):
         actions_layout.addLayout(buttons_grid)
         layout.addWidget(actions_frame)
 
-    def setup_refresh_timer(self):
-        """إعداد مؤقت التحديث التلقائي"""
-        self.refresh_timer = QTimer()
-        self.refresh_timer.timeout.connect(self.refresh_data)
-        self.refresh_timer.start(30000)  # تحديث كل 30 ثانية
+    def on_data_changed(self, event, entity_ids):
+        """تغيرت بيانات قد تظهر في اللوحة (اللوحة المخفية تُحدث عند عرضها)"""
+        if self.isVisible():
+            self.refresh_data()
 
     def darken_color(self, hex_color, factor=0.9):
         """تغميق اللون"""
         color = QColor(hex_color)
         return color.darker(int(100/factor)).name()
 
-    def refresh_data(self):
-        """تحديث بيانات اللوحة"""
-        try:
-            self.update_daily_stats()
-            self.update_alerts()
-            self.update_recent_activities()
-        except Exception as e:
-            logger.error(f"خطأ في تحديث بيانات اللوحة: {str(e)}")
-
-    def update_daily_stats(self):
+    def refresh_data(self, force: bool = False):
+        """تحديث بيانات اللوحة من لقطة تُقرأ في الخلفية (تُتخطى إن لم تتغير البيانات)"""
+        if self._snapshot_job is not None:
+            self._refresh_queued = True
+            return
+
+        dashboard_service = self.main_window.dashboard_service
+        self._snapshot_job = PoolJob(lambda: dashboard_service.snapshot(force))
+        self._snapshot_job.signals.finished.connect(self.on_snapshot_ready)
+        self._snapshot_job.signals.error.connect(self.on_snapshot_error)
+        self.snapshot_pool.start(self._snapshot_job)
+
+    def on_snapshot_ready(self, snapshot):
+        """عرض اللقطة الجديدة (None = لا تغيير)"""
+        self._snapshot_job = None
+        if snapshot:
+            try:
+                self.update_daily_stats(snapshot)
+                self.update_alerts(snapshot)
+                self.update_recent_activities(snapshot)
+            except Exception as e:
+                logger.error(f"خطأ في تحديث بيانات اللوحة: {str(e)}")
+
+        if self._refresh_queued:
+            self._refresh_queued = False
+            self.refresh_data()
+
+    def on_snapshot_error(self, error):
+        """فشل قراءة اللقطة"""
+        logger.error(f"خطأ في تحديث بيانات اللوحة: {error}")
+        self.on_snapshot_ready(None)
+
+    def update_daily_stats(self, snapshot):
         """تحديث الإحصائيات اليومية"""
-        try:
-            today = date.today().isoformat()
-
-            # إحصائيات المبيعات
-            sales_summary = self.main_window.pos_service.get_daily_sales_summary(today)
-            total_sales = sales_summary.get('total_amount', 0)
-            total_transactions = sales_summary.get('total_transactions', 0)
-
-            self.sales_widget.update_value(f"{total_sales:.0f} ر.س")
-            self.transactions_widget.update_value(str(total_transactions))
-
-            # إحصائيات الصيانة
-            repair_summary = self.main_window.repair_service.get_repair_summary(today, today)
-            open_tickets = repair_summary.get('received_tickets', 0) + repair_summary.get('in_progress_tickets', 0)
+        self.sales_widget.update_value(f"{snapshot['total_sales']:.0f} ر.س")
+        self.transactions_widget.update_value(str(snapshot['total_transactions']))
+        self.repair_tickets_widget.update_value(str(snapshot['open_repairs']))
+        self.low_stock_widget.update_value(str(snapshot['low_stock_count']))
 
-            self.repair_tickets_widget.update_value(str(open_tickets))
-
-            # المخزون المنخفض
-            low_stock = self.main_window.inventory_service.get_low_stock_products()
-            self.low_stock_widget.update_value(str(len(low_stock)))
-
-        except Exception as e:
-            from app.utils.logger import get_logger
-            logger = get_logger('dashboard')
-            logger.error(f"خطأ في تحديث الإحصائيات: {str(e)}")
-
-    def update_alerts(self):
+    def update_alerts(self, snapshot):
         """تحديث التنبيهات"""
-        try:
-            # مسح التنبيهات السابقة
-            for i in reversed(range(self.alerts_container.count())):
-                widget = self.alerts_container.itemAt(i).widget()
-                if widget:
-                    widget.setParent(None)
-
-            alerts = []
-
-            # تنبيهات المخزون المنخفض
-            low_stock = self.main_window.inventory_service.get_low_stock_products()
-            if low_stock:
-                alerts.append({
-                    'type': 'warning',
-                    'message': f"يوجد {len(low_stock)} منتج بمخزون منخفض",
-                    'action': self.main_window.show_inventory
-                })
-
-            # تنبيهات الصيانة المتأخرة
-            today = date.today()
-            week_ago = (today - timedelta(days=7)).isoformat()
-            old_repairs = self.main_window.repair_service.get_repair_tickets(
-                status='in_progress',
-                start_date=week_ago,
-                end_date=today.isoformat()
-            )
-
-            if old_repairs:
-                alerts.append({
-                    'type': 'error',
-                    'message': f"يوجد {len(old_repairs)} تذكرة صيانة متأخرة (أكثر من أسبوع)",
-                    'action': self.main_window.show_repair
-                })
-
-            # عرض التنبيهات
-            if not alerts:
-                no_alerts = QLabel("لا توجد تنبيهات")
-                no_alerts.setStyleSheet("color: #27ae60; font-style: italic;")
-                self.alerts_container.addWidget(no_alerts)
-            else:
-                for alert in alerts:
-                    self.add_alert(alert)
-
-        except Exception as e:
-            logger.error(f"خطأ في تحديث التنبيهات: {str(e)}")
+        # مسح التنبيهات السابقة
+        # deleteLater بدلاً من setParent(None): حذف الإطار فوراً أثناء التحديث المتكرر يسقط التطبيق
+        while self.alerts_container.count():
+            widget = self.alerts_container.takeAt(0).widget()
+            if widget:
+                widget.deleteLater()
+
+        alerts = []
+
+        # تنبيهات المخزون المنخفض
+        if snapshot['low_stock_count']:
+            alerts.append({
+                'type': 'warning',
+                'message': f"يوجد {snapshot['low_stock_count']} منتج بمخزون منخفض",
+                'action': self.main_window.show_inventory
+            })
+
+        # تنبيهات الصيانة المتأخرة
+        if snapshot['late_repairs_count']:
+            alerts.append({
+                'type': 'error',
+                'message': f"يوجد {snapshot['late_repairs_count']} تذكرة صيانة متأخرة (أكثر من أسبوع)",
+                'action': self.main_window.show_repair
+            })
+
+        # عرض التنبيهات
+        if not alerts:
+            no_alerts = QLabel("لا توجد تنبيهات")
+            no_alerts.setStyleSheet("color: #27ae60; font-style: italic;")
+            self.alerts_container.addWidget(no_alerts)
+        else:
+            for alert in alerts:
+                self.add_alert(alert)
 
     def add_alert(self, alert):
         """إضافة تنبيه"""
@@ -489,51 +490,29 @@ class Dashboard(QWidget):
 
         self.alerts_container.addWidget(alert_frame)
 
-    def update_recent_activities(self):
+    def update_recent_activities(self, snapshot):
         """تحديث الأنشطة الأخيرة"""
-        try:
-            # الحصول على آخر الأنشطة
-            activities = []
-
-            # آخر المبيعات
-            recent_sales = self.main_window.pos_service.get_recent_sales(5)
-            for sale in recent_sales:
-                activities.append({
-                    'time': sale['created_at'],
-                    'type': 'مبيعات',
-                    'details': f"فاتورة #{sale['id']} - {sale['final_amount']:.0f} ر.س"
-                })
-
-            # آخر تذاكر الصيانة
-            recent_repairs = self.main_window.repair_service.get_repair_tickets(limit=5)
-            for repair in recent_repairs:
-                activities.append({
-                    'time': repair['received_date'],
-                    'type': 'صيانة',
-                    'details': f"تذكرة #{repair['id']} - {repair['device_info']}"
-                })
-
-            # ترتيب حسب الوقت
-            activities.sort(key=lambda x: x['time'], reverse=True)
-            activities = activities[:10]  # أحدث 10 أنشطة
-
-            # تحديث الجدول
-            self.activities_table.setRowCount(len(activities))
-
-            for row, activity in enumerate(activities):
-                # تنسيق الوقت
-                try:
-                    time_obj = datetime.fromisoformat(activity['time'].replace('Z', '+00:00'))
-                    time_str = time_obj.strftime("%H:%M")
-                except:
-                    time_str = activity['time'][:10]
-
-                self.activities_table.setItem(row, 0, QTableWidgetItem(time_str))
-                self.activities_table.setItem(row, 1, QTableWidgetItem(activity['type']))
-                self.activities_table.setItem(row, 2, QTableWidgetItem(activity['details']))
-
-        except Exception as e:
-            logger.error(f"خطأ في تحديث الأنشطة: {str(e)}")
+        activities = snapshot['recent_activities']
+        self.activities_table.setRowCount(len(activities))
+
+        for row, activity in enumerate(activities):
+            # تنسيق الوقت
+            try:
+                time_obj = datetime.fromisoformat(activity['time'].replace('Z', '+00:00'))
+                time_str = time_obj.strftime("%H:%M")
+            except:
+                time_str = activity['time'][:10]
+
+            if activity['type'] == 'sale':
+                activity_type = 'مبيعات'
+                details = f"فاتورة #{activity['id']} - {activity['amount']:.0f} ر.س"
+            else:
+                activity_type = 'صيانة'
+                details = f"تذكرة #{activity['id']} - {activity['details']}"
+
+            self.activities_table.setItem(row, 0, QTableWidgetItem(time_str))
+            self.activities_table.setItem(row, 1, QTableWidgetItem(activity_type))
+            self.activities_table.setItem(row, 2, QTableWidgetItem(details))
 
     def add_product(self):
         """فتح نافذة إضافة منتج"""
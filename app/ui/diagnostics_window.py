@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+نافذة التشخيص - Diagnostics Window
+
+شاشة مخفية (Ctrl+Shift+D للمدير) تعرض إحصائيات الاستعلامات لكل بصمة
+وآخر الاستعلامات البطيئة مع خطط تنفيذها.
+"""
+
+from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel,
+                              QPushButton, QTableWidget, QTableWidgetItem,
+                              QTextEdit, QHeaderView, QAbstractItemView,
+                              QSplitter, QMessageBox)
+from PySide6.QtCore import Qt
+from PySide6.QtGui import QFont
+
+from app.models.database import DatabaseManager
+from app.models.query_stats import query_stats
+
+_QUERY_COLUMNS = [
+    ('query', "الاستعلام"),
+    ('count', "العدد"),
+    ('total_ms', "الإجمالي (ms)"),
+    ('p50_ms', "p50"),
+    ('p95_ms', "p95"),
+    ('p99_ms', "p99"),
+    ('max_ms', "الأقصى"),
+    ('avg_rows', "متوسط الصفوف"),
+]
+
+
+class DiagnosticsWindow(QWidget):
+    """عرض إحصائيات أداء قاعدة البيانات"""
+
+    def __init__(self, main_window):
+        super().__init__()
+        self.main_window = main_window
+        self.setup_ui()
+
+    def setup_ui(self):
+        """إعداد واجهة المستخدم"""
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(20, 20, 20, 20)
+
+        title_label = QLabel("تشخيص أداء قاعدة البيانات")
+        title_label.setFont(QFont("Segoe UI", 18, QFont.Bold))
+        layout.addWidget(title_label)
+
+        toolbar = QHBoxLayout()
+        self.summary_label = QLabel()
+        toolbar.addWidget(self.summary_label)
+        toolbar.addStretch()
+
+        refresh_btn = QPushButton("تحديث")
+        refresh_btn.clicked.connect(self.refresh_data)
+        toolbar.addWidget(refresh_btn)
+
+        dump_btn = QPushButton("حفظ في ملف")
+        dump_btn.clicked.connect(self.dump_stats)
+        toolbar.addWidget(dump_btn)
+
+        reset_btn = QPushButton("تصفير")
+        reset_btn.clicked.connect(self.reset_stats)
+        toolbar.addWidget(reset_btn)
+        layout.addLayout(toolbar)
+
+        splitter = QSplitter(Qt.Vertical)
+
+        self.queries_table = QTableWidget(0, len(_QUERY_COLUMNS))
+        self.queries_table.setHorizontalHeaderLabels([title for _, title in _QUERY_COLUMNS])
+        self.queries_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        self.queries_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.queries_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.queries_table.itemSelectionChanged.connect(self.show_selected_plan)
+        splitter.addWidget(self.queries_table)
+
+        self.details_text = QTextEdit()
+        self.details_text.setReadOnly(True)
+        self.details_text.setLayoutDirection(Qt.LeftToRight)
+        splitter.addWidget(self.details_text)
+
+        layout.addWidget(splitter)
+        self._queries = []
+
+    def refresh_data(self):
+        """تحديث البيانات"""
+        stats = DatabaseManager.get_query_stats()
+        self._queries = stats['queries']
+
+        self.queries_table.setSortingEnabled(False)
+        self.queries_table.setRowCount(len(self._queries))
+        for row, query in enumerate(self._queries):
+            for column, (field, _) in enumerate(_QUERY_COLUMNS):
+                item = QTableWidgetItem()
+                if field == 'query':
+                    item.setText(query[field])
+                    item.setData(Qt.UserRole, row)
+                else:
+                    item.setData(Qt.DisplayRole, query[field])
+                self.queries_table.setItem(row, column, item)
+        self.queries_table.setSortingEnabled(True)
+
+        if not stats['enabled']:
+            self.summary_label.setText("قياس الاستعلامات معطل (DEBUG_CONFIG['query_stats_enabled'])")
+            self.show_slow_queries([])
+            return
+
+        total_ms = sum(query['total_ms'] for query in self._queries)
+        self.summary_label.setText(
+            f"{len(self._queries)} استعلام مختلف - الإجمالي {total_ms:.0f} ms "
+            f"(عينة {stats['sample_rate']:.0%} من العبارات) - "
+            f"{len(stats['slow_queries'])} بطيء (أكثر من {stats['slow_query_ms']} ms)"
+        )
+        self.show_slow_queries(stats['slow_queries'])
+
+    def show_slow_queries(self, slow_queries):
+        """عرض آخر الاستعلامات البطيئة وخططها"""
+        lines = []
+        for entry in slow_queries:
+            lines.append(f"[{entry['time']}] {entry['duration_ms']} ms, {entry['rows']} rows")
+            lines.append(entry['query'])
+            lines.extend(f"    {step}" for step in entry['plan'])
+            lines.append("")
+        self.details_text.setPlainText("\n".join(lines) or "لا توجد استعلامات بطيئة")
+
+    def show_selected_plan(self):
+        """عرض خطة الاستعلام المحدد"""
+        items = self.queries_table.selectedItems()
+        query_items = [item for item in items if item.column() == 0]
+        if not query_items:
+            return
+
+        query = self._queries[query_items[0].data(Qt.UserRole)]
+        plan = "\n".join(f"    {step}" for step in query['plan']) or "    (لم تُحفظ خطة)"
+        self.details_text.setPlainText(f"{query['query']}\n\n{plan}")
+
+    def dump_stats(self):
+        """حفظ الإحصائيات في ملف JSON"""
+        path = query_stats.dump()
+        if path:
+            QMessageBox.information(self, "نجح", f"تم حفظ الإحصائيات في:\n{path}")
+        else:
+            QMessageBox.critical(self, "خطأ", "فشل في حفظ الإحصائيات")
+
+    def reset_stats(self):
+        """تصفير الإحصائيات"""
+        DatabaseManager.reset_query_stats()
+        self.refresh_data()
@@ -10,11 +10,14 @@ from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QGridLayout,
                               QDoubleSpinBox, QTextEdit, QFrame, QGroupBox,
                               QMessageBox, QDialog, QDialogButtonBox,
                               QTabWidget, QHeaderView, QAbstractItemView,
-                              QProgressBar, QSplitter)
+                              QProgressBar, QSplitter, QTableView)
 from PySide6.QtCore import Qt, QTimer
 from PySide6.QtGui import QFont, QColor
 import logging
 
+from app.ui.product_table_model import (ProductTableModel, ProductFilterProxyModel,
+                                        ActionButtonDelegate, INVENTORY_PRODUCT_COLUMNS)
+
 logger = logging.getLogger(__name__)
 
 
@@ -290,8 +293,12 @@ class InventoryWindow(QWidget):
     def __init__(self, main_window):
         super().__init__()
         self.main_window = main_window
+        self._changed_product_ids = set()
         self.setup_ui()
         
+        self.main_window.events.subscribe(self.on_products_changed, 'stock.changed')
+        self.main_window.events.subscribe(self.on_products_changed, 'product.updated')
+        
     def setup_ui(self):
         """إعداد واجهة المستخدم"""
         layout = QVBoxLayout(self)
@@ -414,13 +421,23 @@ class InventoryWindow(QWidget):
         tab = QWidget()
         layout = QVBoxLayout(tab)
         
-        # جدول المنتجات
-        self.products_table = QTableWidget()
-        self.products_table.setColumnCount(8)
-        self.products_table.setHorizontalHeaderLabels([
-            "الاسم", "الفئة", "الباركود", "سعر التكلفة", 
-            "سعر البيع", "المخزون", "الحد الأدنى", "العمليات"
-        ])
+        # جدول المنتجات (نموذج/عرض: لا يُرسم إلا الظاهر من الصفوف)
+        self.products_model = ProductTableModel(INVENTORY_PRODUCT_COLUMNS, self)
+        self.products_proxy = ProductFilterProxyModel(self)
+        self.products_proxy.setSourceModel(self.products_model)
+        
+        self.products_table = QTableView()
+        self.products_table.setModel(self.products_proxy)
+        self.products_table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        
+        operations_delegate = ActionButtonDelegate(
+            [('edit', "تعديل", "#3498db"), ('stock', "مخزون", "#e67e22")],
+            parent=self.products_table
+        )
+        operations_delegate.action_triggered.connect(self.on_product_action)
+        self.products_table.setItemDelegateForColumn(
+            len(INVENTORY_PRODUCT_COLUMNS) - 1, operations_delegate
+        )
         
         # تخصيص الجدول
         header = self.products_table.horizontalHeader()
@@ -631,6 +648,7 @@ class InventoryWindow(QWidget):
     
     def refresh_data(self):
         """تحديث البيانات"""
+        self._changed_product_ids.clear()
         self.load_products()
         self.load_low_stock_products()
         self.load_movements()
@@ -647,96 +665,46 @@ class InventoryWindow(QWidget):
     
     def display_products(self, products):
         """عرض المنتجات في الجدول"""
-        self.products_table.setRowCount(len(products))
-        
-        for row, product in enumerate(products):
-            # الاسم
-            self.products_table.setItem(row, 0, QTableWidgetItem(product['name']))
-            
-            # الفئة
-            category_name = product.get('category_name', 'غير مصنف')
-            self.products_table.setItem(row, 1, QTableWidgetItem(category_name))
-            
-            # الباركود
-            barcode = product.get('barcode', '')
-            self.products_table.setItem(row, 2, QTableWidgetItem(barcode))
-            
-            # سعر التكلفة
-            cost_item = QTableWidgetItem(f"{product.get('cost_price', 0):.2f}")
-            cost_item.setTextAlignment(Qt.AlignCenter)
-            self.products_table.setItem(row, 3, cost_item)
-            
-            # سعر البيع
-            price_item = QTableWidgetItem(f"{product['selling_price']:.2f}")
-            price_item.setTextAlignment(Qt.AlignCenter)
-            self.products_table.setItem(row, 4, price_item)
-            
-            # المخزون
-            stock_item = QTableWidgetItem(str(product['quantity_in_stock']))
-            stock_item.setTextAlignment(Qt.AlignCenter)
-            
-            # تلوين المخزون
-            if product['quantity_in_stock'] == 0:
-                stock_item.setBackground(QColor("#e74c3c"))
-                stock_item.setForeground(QColor("white"))
-            elif product['quantity_in_stock'] <= product['minimum_stock']:
-                stock_item.setBackground(QColor("#f39c12"))
-                stock_item.setForeground(QColor("white"))
-            
-            self.products_table.setItem(row, 5, stock_item)
-            
-            # الحد الأدنى
-            min_item = QTableWidgetItem(str(product['minimum_stock']))
-            min_item.setTextAlignment(Qt.AlignCenter)
-            self.products_table.setItem(row, 6, min_item)
-            
-            # أزرار العمليات
-            operations_widget = self.create_operations_widget(product)
-            self.products_table.setCellWidget(row, 7, operations_widget)
+        self.products_proxy.set_match_ids(None)
+        self.products_model.set_products(products)
     
-    def create_operations_widget(self, product):
-        """إنشاء أزرار العمليات للمنتج"""
-        widget = QWidget()
-        layout = QHBoxLayout(widget)
-        layout.setContentsMargins(5, 5, 5, 5)
-        
-        # زر التعديل
-        edit_btn = QPushButton("تعديل")
-        edit_btn.setStyleSheet("""
-            QPushButton {
-                background-color: #3498db;
-                color: white;
-                border: none;
-                border-radius: 3px;
-                padding: 5px 10px;
-                font-size: 10px;
-            }
-            QPushButton:hover {
-                background-color: #2980b9;
-            }
-        """)
-        edit_btn.clicked.connect(lambda: self.edit_product(product))
-        layout.addWidget(edit_btn)
-        
-        # زر تعديل المخزون
-        stock_btn = QPushButton("مخزون")
-        stock_btn.setStyleSheet("""
-            QPushButton {
-                background-color: #e67e22;
-                color: white;
-                border: none;
-                border-radius: 3px;
-                padding: 5px 10px;
-                font-size: 10px;
-            }
-            QPushButton:hover {
-                background-color: #d35400;
-            }
-        """)
-        stock_btn.clicked.connect(lambda: self.adjust_stock(product))
-        layout.addWidget(stock_btn)
+    def refresh_products(self, product_ids):
+        """تحديث صفوف منتجات محددة فقط دون إعادة تحميل الجدول"""
+        try:
+            products = self.main_window.inventory_service.get_products_by_ids(list(product_ids))
+            self.products_model.update_products(products)
+        except Exception as e:
+            logger.error(f"خطأ في تحديث المنتجات: {str(e)}")
+    
+    def refresh_product_views(self, product_ids):
+        """تحديث صفوف المنتجات والتبويبات المتأثرة بها بعد تعديلها"""
+        self.refresh_products(product_ids)
+        self.load_low_stock_products()
+        self.load_movements()
+        self.load_stats()
+    
+    def on_products_changed(self, event, product_ids):
+        """تغير منتجات من هذه الطرفية أو غيرها (النافذة المخفية تُحدث كاملة عند عرضها)"""
+        if not self.isVisible():
+            return
         
-        return widget
+        # تجميع أحداث الدورة نفسها في تحديث واحد
+        if not self._changed_product_ids:
+            QTimer.singleShot(0, self.apply_product_changes)
+        self._changed_product_ids.update(product_ids)
+    
+    def apply_product_changes(self):
+        """تحديث المنتجات المتغيرة المجمعة"""
+        product_ids, self._changed_product_ids = self._changed_product_ids, set()
+        if product_ids and self.isVisible():
+            self.refresh_product_views(product_ids)
+    
+    def on_product_action(self, action, product):
+        """تنفيذ زر العمليات المضغوط في جدول المنتجات"""
+        if action == 'edit':
+            self.edit_product(product)
+        elif action == 'stock':
+            self.adjust_stock(product)
     
     def load_low_stock_products(self):
         """تحميل المنتجات منخفضة المخزون"""
@@ -913,12 +881,13 @@ class InventoryWindow(QWidget):
         search_term = self.search_edit.text().strip()
         
         if not search_term:
-            self.load_products()
+            self.products_proxy.set_match_ids(None)
             return
         
         try:
             products = self.main_window.inventory_service.search_products(search_term)
-            self.display_products(products)
+            self.products_model.update_products(products)
+            self.products_proxy.set_match_ids(product['id'] for product in products)
         except Exception as e:
             logger.error(f"خطأ في البحث: {str(e)}")
     
@@ -962,6 +931,8 @@ class InventoryWindow(QWidget):
     def edit_product(self, product):
         """تعديل المنتج"""
         try:
+            # صف الجدول مضغوط، فتُقرأ بيانات المنتج الكاملة للتعديل
+            product = self.main_window.inventory_service.get_product_by_id(product['id']) or product
             categories = self.main_window.inventory_service.get_all_categories()
             dialog = ProductDialog(self, product, categories)
             
@@ -974,7 +945,6 @@ class InventoryWindow(QWidget):
                 
                 if success:
                     QMessageBox.information(self, "نجح", "تم تحديث المنتج بنجاح")
-                    self.refresh_data()
                 else:
                     QMessageBox.critical(self, "خطأ", "فشل في تحديث المنتج")
                     
@@ -998,7 +968,6 @@ class InventoryWindow(QWidget):
                 
                 if success:
                     QMessageBox.information(self, "نجح", "تم تعديل المخزون بنجاح")
-                    self.refresh_data()
                 else:
                     QMessageBox.critical(self, "خطأ", "فشل في تعديل المخزون")
                     
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+خيط المهام الخلفية - Background Job Thread
+"""
+
+from typing import Any, Callable, Optional
+
+from PySide6.QtCore import QObject, QRunnable, QThread, Signal
+
+
+class JobThread(QThread):
+    """خيط لتنفيذ مهمة طويلة (تصدير، نسخ احتياطي...) مع التقدم والإلغاء"""
+
+    finished = Signal(str)
+    error = Signal(str)
+    progress = Signal(int)
+
+    def __init__(self, job: Callable[..., Optional[str]],
+                 cancelled_message: str = "تم إلغاء العملية",
+                 failed_message: str = "فشلت العملية، راجع السجل للتفاصيل"):
+        """job(progress, cancelled) يعيد مسار الملف الناتج أو None عند الفشل أو الإلغاء"""
+        super().__init__()
+        self.job = job
+        self.cancelled_message = cancelled_message
+        self.failed_message = failed_message
+        self._percent = -1
+
+    def report_progress(self, done: int, total: int):
+        """تحويل التقدم إلى نسبة (إشارة فقط عند تغير النسبة)"""
+        percent = int(done * 100 / total) if total else 100
+        if percent != self._percent:
+            self._percent = percent
+            self.progress.emit(percent)
+
+    def run(self):
+        """تشغيل المهمة"""
+        try:
+            result = self.job(self.report_progress, self.isInterruptionRequested)
+            if result:
+                self.finished.emit(result)
+            elif self.isInterruptionRequested():
+                self.error.emit(self.cancelled_message)
+            else:
+                self.error.emit(self.failed_message)
+        except Exception as e:
+            self.error.emit(str(e))
+
+
+class _PoolJobSignals(QObject):
+    """إشارات PoolJob (QRunnable لا يرث QObject)"""
+
+    finished = Signal(object)
+    error = Signal(str)
+
+
+class PoolJob(QRunnable):
+    """مهمة قصيرة تُنفذ في QThreadPool وتُسلم نتيجتها لخيط الواجهة عبر الإشارات"""
+
+    def __init__(self, job: Callable[[], Any]):
+        super().__init__()
+        self.setAutoDelete(False)
+        self.job = job
+        self.signals = _PoolJobSignals()
+
+    def run(self):
+        """تشغيل المهمة"""
+        try:
+            result = self.job()
+        except Exception as e:
+            self.signals.error.emit(str(e))
+            return
+        self.signals.finished.emit(result)
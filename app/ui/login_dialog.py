@@ -6,11 +6,14 @@
 
 from PySide6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel, 
                               QLineEdit, QPushButton, QFrame, QMessageBox,
-                              QCheckBox, QApplication)
+                              QCheckBox, QApplication, QProgressBar, QComboBox,
+                              QDialogButtonBox)
 from PySide6.QtCore import Qt, QPropertyAnimation, QEasingCurve, QRect
 from PySide6.QtGui import QFont, QPixmap, QIcon
 
 from app.services.auth_service import AuthService
+from app.ui.job_thread import JobThread
+from config.settings import SYSTEM_CONFIG
 
 
 class LoginDialog(QDialog):
@@ -20,12 +23,13 @@ class LoginDialog(QDialog):
         super().__init__()
         self.auth_service = AuthService()
         self.current_user = None
+        self.login_thread = None
         self.setup_ui()
         
     def setup_ui(self):
         """إعداد واجهة المستخدم"""
         self.setWindowTitle("تسجيل الدخول - نظام إدارة محل الموبايلات")
-        self.setFixedSize(400, 500)
+        self.setFixedSize(400, 580)
         self.setWindowFlags(Qt.Dialog | Qt.WindowCloseButtonHint)
         self.setLayoutDirection(Qt.RightToLeft)
         
@@ -76,6 +80,19 @@ class LoginDialog(QDialog):
         password_layout.addWidget(self.password_edit)
         frame_layout.addLayout(password_layout)
         
+        # رمز PIN اختياري للتبديل السريع بين الكاشيرين دون كلمة المرور
+        pin_layout = QVBoxLayout()
+        pin_label = QLabel("رمز PIN للتبديل السريع (اختياري):")
+        pin_label.setObjectName("fieldLabel")
+        self.pin_edit = QLineEdit()
+        self.pin_edit.setPlaceholderText(f"{SYSTEM_CONFIG.get('pin_min_length', 4)} أرقام على الأقل")
+        self.pin_edit.setEchoMode(QLineEdit.Password)
+        self.pin_edit.setMaxLength(8)
+        self.pin_edit.setObjectName("inputField")
+        pin_layout.addWidget(pin_label)
+        pin_layout.addWidget(self.pin_edit)
+        frame_layout.addLayout(pin_layout)
+        
         # خيار تذكرني
         self.remember_checkbox = QCheckBox("تذكرني")
         self.remember_checkbox.setObjectName("rememberCheckbox")
@@ -96,6 +113,14 @@ class LoginDialog(QDialog):
         buttons_layout.addWidget(self.cancel_button)
         frame_layout.addLayout(buttons_layout)
         
+        # مؤشر الانشغال أثناء التحقق من كلمة المرور
+        self.busy_indicator = QProgressBar()
+        self.busy_indicator.setRange(0, 0)
+        self.busy_indicator.setTextVisible(False)
+        self.busy_indicator.setMaximumHeight(6)
+        self.busy_indicator.hide()
+        frame_layout.addWidget(self.busy_indicator)
+        
         # معلومات تجريبية
         info_layout = QVBoxLayout()
         info_label = QLabel("بيانات تجريبية:")
@@ -120,6 +145,7 @@ class LoginDialog(QDialog):
         # ربط Enter بتسجيل الدخول
         self.username_edit.returnPressed.connect(self.password_edit.setFocus)
         self.password_edit.returnPressed.connect(self.login)
+        self.pin_edit.returnPressed.connect(self.login)
         
         # التركيز على حقل اسم المستخدم
         self.username_edit.setFocus()
@@ -235,6 +261,7 @@ class LoginDialog(QDialog):
         """محاولة تسجيل الدخول"""
         username = self.username_edit.text().strip()
         password = self.password_edit.text()
+        pin = self.pin_edit.text().strip()
         
         if not username or not password:
             QMessageBox.warning(
@@ -243,32 +270,65 @@ class LoginDialog(QDialog):
             )
             return
         
-        # تعطيل الأزرار أثناء المعالجة
-        self.login_button.setEnabled(False)
-        self.login_button.setText("جاري التحقق...")
+        if pin and not AuthService.is_valid_pin(pin):
+            QMessageBox.warning(
+                self, "رمز PIN غير صالح",
+                f"رمز PIN يجب أن يكون {SYSTEM_CONFIG.get('pin_min_length', 4)} أرقام على الأقل"
+            )
+            return
         
-        # محاولة تسجيل الدخول
-        user = self.auth_service.login(username, password)
+        if self.login_thread and self.login_thread.isRunning():
+            return
         
-        if user:
-            self.current_user = user
-            QMessageBox.information(
-                self, "نجح تسجيل الدخول",
-                f"مرحباً {user['full_name']}"
-            )
-            self.accept()
-        else:
-            QMessageBox.critical(
-                self, "فشل تسجيل الدخول",
-                "اسم المستخدم أو كلمة المرور غير صحيحة"
-            )
-            # إعادة تفعيل الأزرار
-            self.login_button.setEnabled(True)
-            self.login_button.setText("تسجيل الدخول")
-            
-            # مسح كلمة المرور
-            self.password_edit.clear()
-            self.password_edit.setFocus()
+        # تعطيل الأزرار أثناء المعالجة
+        self.set_busy(True)
+        
+        # التحقق من كلمة المرور (bcrypt) في خيط خلفي حتى لا تتجمد النافذة
+        self.login_thread = JobThread(
+            lambda progress, cancelled: (self.auth_service.login(username, password, pin) or {}).get('username'),
+            failed_message="اسم المستخدم أو كلمة المرور غير صحيحة"
+        )
+        self.login_thread.finished.connect(self.on_login_finished)
+        self.login_thread.error.connect(self.on_login_failed)
+        self.login_thread.start()
+    
+    def set_busy(self, busy: bool):
+        """تعطيل الحقول والأزرار وإظهار مؤشر الانشغال أثناء التحقق"""
+        self.login_button.setEnabled(not busy)
+        self.login_button.setText("جاري التحقق..." if busy else "تسجيل الدخول")
+        self.username_edit.setEnabled(not busy)
+        self.password_edit.setEnabled(not busy)
+        self.pin_edit.setEnabled(not busy)
+        self.busy_indicator.setVisible(busy)
+    
+    def on_login_finished(self, username: str):
+        """نجاح تسجيل الدخول"""
+        self.set_busy(False)
+        user = self.auth_service.get_current_user()
+        self.current_user = user
+        QMessageBox.information(
+            self, "نجح تسجيل الدخول",
+            f"مرحباً {user['full_name']}"
+        )
+        self.accept()
+    
+    def on_login_failed(self, message: str):
+        """فشل تسجيل الدخول"""
+        self.set_busy(False)
+        locked_for = self.auth_service.sessions.login_locked_for(self.username_edit.text().strip())
+        if locked_for:
+            message = f"تم تجاوز عدد المحاولات المسموح. حاول مرة أخرى بعد {locked_for:.0f} ثانية"
+        QMessageBox.critical(self, "فشل تسجيل الدخول", message)
+        
+        # مسح كلمة المرور
+        self.password_edit.clear()
+        self.password_edit.setFocus()
+    
+    def reject(self):
+        """الإلغاء بعد انتهاء أي تحقق جارٍ"""
+        if self.login_thread and self.login_thread.isRunning():
+            self.login_thread.wait()
+        super().reject()
     
     def get_current_user(self):
         """الحصول على بيانات المستخدم المسجل"""
@@ -280,3 +340,114 @@ class LoginDialog(QDialog):
             self.reject()
         else:
             super().keyPressEvent(event)
+
+
+class SwitchUserDialog(QDialog):
+    """تبديل الكاشير برمز PIN لجلسة مفتوحة أو بتسجيل دخول كامل"""
+    
+    def __init__(self, auth_service: AuthService, parent=None, locked: bool = False):
+        super().__init__(parent)
+        self.auth_service = auth_service
+        self.locked = locked
+        self.current_user = None
+        self.exit_requested = False
+        self.setup_ui()
+    
+    def setup_ui(self):
+        """إعداد واجهة النافذة"""
+        self.setWindowTitle("انتهت الجلسة - تسجيل الدخول" if self.locked else "تبديل المستخدم")
+        self.setModal(True)
+        self.setFixedSize(380, 240)
+        self.setLayoutDirection(Qt.RightToLeft)
+        
+        layout = QVBoxLayout(self)
+        
+        if self.locked:
+            notice = QLabel("انتهت الجلسة لعدم النشاط. اختر مستخدماً وأدخل رمز PIN أو سجل الدخول")
+            notice.setWordWrap(True)
+            notice.setStyleSheet("color: #e74c3c; font-weight: bold;")
+            layout.addWidget(notice)
+        
+        layout.addWidget(QLabel("المستخدم:"))
+        self.session_combo = QComboBox()
+        for session in self.auth_service.get_open_sessions():
+            if session['has_pin']:
+                self.session_combo.addItem(
+                    f"{session['full_name']} ({session['username']})", session['session_id']
+                )
+        layout.addWidget(self.session_combo)
+        
+        layout.addWidget(QLabel("رمز PIN:"))
+        self.pin_edit = QLineEdit()
+        self.pin_edit.setEchoMode(QLineEdit.Password)
+        self.pin_edit.setMaxLength(8)
+        self.pin_edit.returnPressed.connect(self.switch)
+        layout.addWidget(self.pin_edit)
+        
+        buttons = QDialogButtonBox()
+        self.switch_button = buttons.addButton("تبديل", QDialogButtonBox.AcceptRole)
+        self.switch_button.clicked.connect(self.switch)
+        password_button = buttons.addButton("دخول بكلمة المرور", QDialogButtonBox.ActionRole)
+        password_button.clicked.connect(self.full_login)
+        if self.locked:
+            exit_button = buttons.addButton("خروج من النظام", QDialogButtonBox.RejectRole)
+            exit_button.clicked.connect(self.request_exit)
+        else:
+            cancel_button = buttons.addButton("إلغاء", QDialogButtonBox.RejectRole)
+            cancel_button.clicked.connect(self.reject)
+        layout.addWidget(buttons)
+        
+        if self.session_combo.count() == 0:
+            self.session_combo.addItem("لا توجد جلسات برمز PIN", None)
+            self.session_combo.setEnabled(False)
+            self.pin_edit.setEnabled(False)
+            self.switch_button.setEnabled(False)
+        else:
+            self.pin_edit.setFocus()
+    
+    def switch(self):
+        """التبديل إلى الجلسة المختارة برمز PIN"""
+        session_id = self.session_combo.currentData()
+        pin = self.pin_edit.text().strip()
+        if not session_id or not pin:
+            return
+        
+        user = self.auth_service.switch_user(session_id, pin)
+        self.pin_edit.clear()
+        if not user:
+            locked_for = self.auth_service.sessions.locked_for(session_id)
+            QMessageBox.warning(
+                self, "فشل التبديل",
+                f"تم تجاوز عدد المحاولات المسموح. حاول مرة أخرى بعد {locked_for:.0f} ثانية"
+                if locked_for else "رمز PIN غير صحيح أو انتهت الجلسة"
+            )
+            return
+        
+        self.current_user = user
+        self.accept()
+    
+    def full_login(self):
+        """تسجيل دخول كامل لمستخدم جديد (يفتح له جلسة)"""
+        login_dialog = LoginDialog()
+        if login_dialog.exec() != QDialog.Accepted:
+            return
+        
+        self.current_user = self.auth_service.resume_session(
+            login_dialog.get_current_user()['session_id']
+        )
+        if self.current_user:
+            self.accept()
+    
+    def request_exit(self):
+        """الخروج من النظام بدلاً من تسجيل الدخول"""
+        self.exit_requested = True
+        super().reject()
+    
+    def reject(self):
+        """لا يمكن إغلاق نافذة الجلسة المنتهية دون دخول أو خروج"""
+        if not self.locked:
+            super().reject()
+    
+    def get_current_user(self):
+        """المستخدم بعد التبديل"""
+        return self.current_user
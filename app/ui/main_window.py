@@ -7,9 +7,10 @@
 import os
 from PySide6.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
                               QStackedWidget, QMenuBar, QStatusBar, QLabel,
-                              QToolBar, QPushButton, QMessageBox, QSplitter)
-from PySide6.QtCore import Qt, QTimer, QSize
-from PySide6.QtGui import QAction, QIcon, QFont
+                              QToolBar, QPushButton, QMessageBox, QSplitter,
+                              QInputDialog, QProgressDialog, QApplication)
+from PySide6.QtCore import Qt, QTimer, QSize, QEvent
+from PySide6.QtGui import QAction, QIcon, QFont, QKeySequence, QShortcut
 
 from .dashboard import Dashboard
 from .pos_window import POSWindow
@@ -18,6 +19,9 @@ from .repair_window import RepairWindow
 from .reports_window import ReportsWindow
 from .settings_window import SettingsWindow
 from .daily_close_window import DailyCloseWindow
+from .diagnostics_window import DiagnosticsWindow
+from .job_thread import JobThread
+from .login_dialog import SwitchUserDialog
 
 from app.services.auth_service import AuthService
 from app.services.inventory_service import InventoryService
@@ -25,6 +29,10 @@ from app.services.pos_service import POSService
 from app.services.repair_service import RepairService
 from app.services.report_service import ReportService
 from app.services.backup_service import BackupService
+from app.services.dashboard_service import DashboardService
+from app.services.audit_archive import AuditArchive
+from app.services.event_bus import EventBus
+from config.settings import DATABASE_CONFIG
 
 
 class MainWindow(QMainWindow):
@@ -33,20 +41,29 @@ class MainWindow(QMainWindow):
     def __init__(self, current_user):
         super().__init__()
         self.current_user = current_user
+        self._closing = False
+        self._exit_confirmed = False
+        self._session_dialog_open = False
         self.setup_services()
         self.setup_ui()
         self.setup_timer()
         
+        # كل ضغطة مفتاح أو فأرة تؤخر انتهاء الجلسة
+        QApplication.instance().installEventFilter(self)
+        
     def setup_services(self):
         """إعداد الخدمات"""
         self.auth_service = AuthService()
-        self.auth_service._current_user = self.current_user
+        if not self.auth_service.resume_session(self.current_user.get('session_id')):
+            self.auth_service._current_user = self.current_user
         
         self.inventory_service = InventoryService(self.auth_service)
         self.pos_service = POSService(self.auth_service)
         self.repair_service = RepairService(self.auth_service)
         self.report_service = ReportService(self.auth_service)
         self.backup_service = BackupService(self.auth_service)
+        self.dashboard_service = DashboardService(self.auth_service)
+        self.events = EventBus.for_db(self.dashboard_service.db)
     
     def setup_ui(self):
         """إعداد واجهة المستخدم"""
@@ -87,8 +104,19 @@ class MainWindow(QMainWindow):
         restore_action.triggered.connect(self.restore_backup)
         file_menu.addAction(restore_action)
         
+        # تصدير البيانات
+        export_action = QAction("تصدير البيانات", self)
+        export_action.triggered.connect(self.export_data)
+        file_menu.addAction(export_action)
+        
         file_menu.addSeparator()
         
+        # تبديل الكاشير برمز PIN
+        switch_user_action = QAction("تبديل المستخدم", self)
+        switch_user_action.setShortcut(QKeySequence("Ctrl+L"))
+        switch_user_action.triggered.connect(self.switch_user)
+        file_menu.addAction(switch_user_action)
+        
         # خروج
         exit_action = QAction("خروج", self)
         exit_action.triggered.connect(self.close)
@@ -103,10 +131,10 @@ class MainWindow(QMainWindow):
         system_menu.addAction(settings_action)
         
         # إدارة المستخدمين (للمدير فقط)
-        if self.current_user['role'] == 'Admin':
-            users_action = QAction("إدارة المستخدمين", self)
-            users_action.triggered.connect(self.show_user_management)
-            system_menu.addAction(users_action)
+        self.users_action = QAction("إدارة المستخدمين", self)
+        self.users_action.triggered.connect(self.show_user_management)
+        self.users_action.setVisible(self.auth_service.has_permission('manage_users'))
+        system_menu.addAction(self.users_action)
         
         # قائمة المساعدة
         help_menu = menubar.addMenu("مساعدة")
@@ -179,6 +207,11 @@ class MainWindow(QMainWindow):
         
         layout.addWidget(self.stacked_widget)
         
+        # شاشة التشخيص المخفية (تُنشأ عند أول فتح)
+        self.diagnostics_window = None
+        diagnostics_shortcut = QShortcut(QKeySequence("Ctrl+Shift+D"), self)
+        diagnostics_shortcut.activated.connect(self.show_diagnostics)
+        
         # عرض لوحة التحكم بشكل افتراضي
         self.show_dashboard()
     
@@ -320,14 +353,69 @@ class MainWindow(QMainWindow):
         """إعداد مؤقت تحديث الوقت"""
         self.timer = QTimer()
         self.timer.timeout.connect(self.update_time)
+        self.timer.timeout.connect(self.check_session)
         self.timer.start(1000)  # تحديث كل ثانية
+        
+        # التغييرات من الطرفيات الأخرى: فحص data_version ثم قراءة سجل التغييرات إن تغير
+        self.events_timer = QTimer(self)
+        self.events_timer.timeout.connect(self.events.poll)
+        self.events_timer.start(DATABASE_CONFIG.get('change_poll_interval_ms', 1000))
+        self._today = None
         self.update_time()
     
     def update_time(self):
         """تحديث عرض الوقت"""
         from datetime import datetime
-        current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        self.time_label.setText(f"الوقت: {current_time}")
+        now = datetime.now()
+        self.time_label.setText(f"الوقت: {now.strftime('%Y-%m-%d %H:%M:%S')}")
+        
+        # مؤشرات اليوم في اللوحة تبدأ من الصفر بعد منتصف الليل دون أي كتابة
+        if self._today is not None and now.date() != self._today:
+            self.dashboard.refresh_data()
+        self._today = now.date()
+    
+    # الجلسات وتبديل المستخدم
+    def eventFilter(self, watched, event):
+        """تسجيل نشاط المستخدم الحالي"""
+        if event.type() in (QEvent.KeyPress, QEvent.MouseButtonPress):
+            self.auth_service.touch_session()
+        return super().eventFilter(watched, event)
+    
+    def check_session(self):
+        """قفل النافذة عند انتهاء الجلسة لعدم النشاط"""
+        if self._session_dialog_open or self._closing:
+            return
+        if self.auth_service.is_session_expired():
+            self.open_session_dialog(locked=True)
+    
+    def switch_user(self):
+        """تبديل الكاشير دون إغلاق النافذة"""
+        self.open_session_dialog(locked=False)
+    
+    def open_session_dialog(self, locked: bool):
+        """نافذة التبديل برمز PIN (إلزامية عند انتهاء الجلسة)"""
+        self._session_dialog_open = True
+        try:
+            dialog = SwitchUserDialog(self.auth_service, self, locked=locked)
+            dialog.exec()
+        finally:
+            self._session_dialog_open = False
+        
+        if dialog.exit_requested:
+            self._exit_confirmed = True
+            self.close()
+        elif dialog.get_current_user():
+            self.apply_user(dialog.get_current_user())
+    
+    def apply_user(self, user):
+        """تحديث النافذة للمستخدم الجديد بعد التبديل"""
+        self.current_user = user
+        self.user_label.setText(f"المستخدم: {user['full_name']} ({user['role']})")
+        self.users_action.setVisible(self.auth_service.has_permission('manage_users'))
+        
+        if (self.stacked_widget.currentWidget() is self.diagnostics_window
+                and not self.auth_service.has_permission('view_diagnostics')):
+            self.show_dashboard()
     
     # وظائف التنقل
     def show_dashboard(self):
@@ -380,6 +468,16 @@ class MainWindow(QMainWindow):
         self.stacked_widget.setCurrentWidget(self.settings_window)
         self.settings_window.refresh_data()
     
+    def show_diagnostics(self):
+        """عرض شاشة تشخيص أداء قاعدة البيانات (للمدير فقط)"""
+        if not self.auth_service.has_permission('view_diagnostics'):
+            return
+        if self.diagnostics_window is None:
+            self.diagnostics_window = DiagnosticsWindow(self)
+            self.stacked_widget.addWidget(self.diagnostics_window)
+        self.stacked_widget.setCurrentWidget(self.diagnostics_window)
+        self.diagnostics_window.refresh_data()
+    
     def show_permission_denied(self):
         """عرض رسالة عدم وجود صلاحية"""
         QMessageBox.warning(
@@ -389,66 +487,153 @@ class MainWindow(QMainWindow):
     
     # وظائف النسخ الاحتياطي
     def create_backup(self):
-        """إنشاء نسخة احتياطية"""
-        try:
-            backup_path = self.backup_service.create_backup()
-            if backup_path:
-                QMessageBox.information(
-                    self, "نجح", 
-                    f"تم إنشاء النسخة الاحتياطية بنجاح:\n{backup_path}"
-                )
-            else:
-                QMessageBox.critical(
-                    self, "خطأ", 
-                    "فشل في إنشاء النسخة الاحتياطية"
-                )
-        except Exception as e:
-            QMessageBox.critical(
-                self, "خطأ", 
-                f"حدث خطأ في إنشاء النسخة الاحتياطية:\n{str(e)}"
-            )
+        """إنشاء نسخة احتياطية في الخلفية دون إيقاف المبيعات"""
+        self.backup_progress = QProgressDialog("جاري إنشاء النسخة الاحتياطية...", "إلغاء", 0, 100, self)
+        self.backup_progress.setWindowModality(Qt.WindowModal)
+        self.backup_progress.setMinimumDuration(0)
+        
+        self.backup_thread = JobThread(
+            lambda progress, cancelled: self.backup_service.create_backup(
+                progress=progress, cancelled=cancelled
+            ),
+            cancelled_message="تم إلغاء النسخة الاحتياطية",
+            failed_message="فشل في إنشاء النسخة الاحتياطية"
+        )
+        self.backup_thread.progress.connect(self.backup_progress.setValue)
+        self.backup_thread.finished.connect(self.on_backup_finished)
+        self.backup_thread.error.connect(self.on_backup_error)
+        self.backup_progress.canceled.connect(self.backup_thread.requestInterruption)
+        self.backup_thread.start()
+    
+    def on_backup_finished(self, backup_path):
+        """عند انتهاء النسخة الاحتياطية"""
+        self.backup_progress.reset()
+        QMessageBox.information(
+            self, "نجح", 
+            f"تم إنشاء النسخة الاحتياطية بنجاح:\n{backup_path}"
+        )
+    
+    def on_backup_error(self, error):
+        """عند فشل النسخة الاحتياطية أو إلغائها"""
+        self.backup_progress.reset()
+        QMessageBox.warning(self, "النسخ الاحتياطي", error)
     
     def restore_backup(self):
-        """استعادة نسخة احتياطية"""
+        """استعادة نسخة احتياطية في الخلفية ثم إعادة تشغيل التطبيق"""
         from PySide6.QtWidgets import QFileDialog
         
-        try:
-            file_path, _ = QFileDialog.getOpenFileName(
-                self, "اختر ملف النسخة الاحتياطية", 
-                "backup", "ملفات النسخ الاحتياطية (*.zip)"
-            )
-            
-            if file_path:
-                reply = QMessageBox.question(
-                    self, "تأكيد", 
-                    "هل أنت متأكد من استعادة هذه النسخة الاحتياطية؟\n"
-                    "سيتم استبدال البيانات الحالية.",
-                    QMessageBox.Yes | QMessageBox.No
-                )
-                
-                if reply == QMessageBox.Yes:
-                    success = self.backup_service.restore_backup(file_path)
-                    if success:
-                        QMessageBox.information(
-                            self, "نجح", 
-                            "تم استعادة النسخة الاحتياطية بنجاح.\n"
-                            "سيتم إعادة تشغيل التطبيق."
-                        )
-                        # إعادة تشغيل التطبيق
-                        import sys
-                        import subprocess
-                        subprocess.Popen([sys.executable] + sys.argv)
-                        self.close()
-                    else:
-                        QMessageBox.critical(
-                            self, "خطأ", 
-                            "فشل في استعادة النسخة الاحتياطية"
-                        )
-        except Exception as e:
-            QMessageBox.critical(
-                self, "خطأ", 
-                f"حدث خطأ في استعادة النسخة الاحتياطية: {str(e)}"
-            )
+        file_path, _ = QFileDialog.getOpenFileName(
+            self, "اختر ملف النسخة الاحتياطية", 
+            "backup", "ملفات النسخ الاحتياطية (*.zip)"
+        )
+        if not file_path:
+            return
+        
+        reply = QMessageBox.question(
+            self, "تأكيد", 
+            "هل أنت متأكد من استعادة هذه النسخة الاحتياطية؟\n"
+            "سيتم استبدال البيانات الحالية.",
+            QMessageBox.Yes | QMessageBox.No
+        )
+        if reply != QMessageBox.Yes:
+            return
+        
+        # لا مؤقتات تقرأ قاعدة البيانات أثناء استبدال ملفها
+        self.timer.stop()
+        self.events_timer.stop()
+        
+        self.backup_progress = QProgressDialog("جاري استعادة النسخة الاحتياطية...", "إلغاء", 0, 100, self)
+        self.backup_progress.setWindowModality(Qt.WindowModal)
+        self.backup_progress.setMinimumDuration(0)
+        
+        self.backup_thread = JobThread(
+            lambda progress, cancelled: self.backup_service.restore_backup(
+                file_path, progress=progress, cancelled=cancelled
+            ) and file_path,
+            cancelled_message="تم إلغاء استعادة النسخة الاحتياطية",
+            failed_message="فشل في استعادة النسخة الاحتياطية"
+        )
+        self.backup_thread.progress.connect(self.backup_progress.setValue)
+        self.backup_thread.finished.connect(self.on_restore_finished)
+        self.backup_thread.error.connect(self.on_restore_error)
+        self.backup_progress.canceled.connect(self.backup_thread.requestInterruption)
+        self.backup_thread.start()
+    
+    def on_restore_finished(self, file_path):
+        """عند انتهاء الاستعادة: إعادة تشغيل التطبيق على البيانات المستعادة"""
+        self.backup_progress.reset()
+        QMessageBox.information(
+            self, "نجح", 
+            "تم استعادة النسخة الاحتياطية بنجاح.\n"
+            "سيتم إعادة تشغيل التطبيق."
+        )
+        # إعادة تشغيل التطبيق
+        import sys
+        import subprocess
+        subprocess.Popen([sys.executable] + sys.argv)
+        self._exit_confirmed = True
+        self.close()
+    
+    def on_restore_error(self, error):
+        """عند فشل الاستعادة أو إلغائها: البيانات الحالية لم تُستبدل"""
+        self.backup_progress.reset()
+        self.timer.start(1000)
+        self.events_timer.start(DATABASE_CONFIG.get('change_poll_interval_ms', 1000))
+        QMessageBox.critical(self, "خطأ", error)
+    
+    def export_data(self):
+        """تصدير كل الجداول في الخلفية مع شريط تقدم وإمكانية الإلغاء"""
+        formats = {
+            "Excel (xlsx)": 'xlsx',
+            "CSV (أرشيف zip)": 'csv',
+            "JSON Lines (أرشيف zip)": 'jsonl',
+        }
+        # تفريغ SQL يشمل كل الجداول (ومنها المستخدمون)
+        if self.auth_service.has_permission('manage_users'):
+            formats["SQL"] = 'sql'
+        choice, ok = QInputDialog.getItem(
+            self, "تصدير البيانات", "صيغة التصدير:", list(formats.keys()), 0, False
+        )
+        if not ok:
+            return
+        
+        export_type = formats[choice]
+        include_restricted = False
+        if export_type != 'sql' and self.auth_service.has_permission('manage_users'):
+            include_restricted = QMessageBox.question(
+                self, "تصدير البيانات",
+                "هل تريد تضمين المستخدمين والإعدادات والجداول الداخلية؟\n"
+                "(لا تُصدر كلمات المرور)",
+                QMessageBox.Yes | QMessageBox.No, QMessageBox.No
+            ) == QMessageBox.Yes
+        
+        self.export_progress = QProgressDialog("جاري تصدير البيانات...", "إلغاء", 0, 100, self)
+        self.export_progress.setWindowModality(Qt.WindowModal)
+        self.export_progress.setMinimumDuration(0)
+        
+        self.export_thread = JobThread(
+            lambda progress, cancelled: self.backup_service.export_data(
+                export_type, progress=progress, cancelled=cancelled,
+                include_restricted=include_restricted
+            ),
+            cancelled_message="تم إلغاء التصدير",
+            failed_message="فشل التصدير، راجع السجل للتفاصيل"
+        )
+        self.export_thread.progress.connect(self.export_progress.setValue)
+        self.export_thread.finished.connect(self.on_export_finished)
+        self.export_thread.error.connect(self.on_export_error)
+        self.export_progress.canceled.connect(self.export_thread.requestInterruption)
+        self.export_thread.start()
+    
+    def on_export_finished(self, file_path):
+        """عند انتهاء تصدير البيانات"""
+        self.export_progress.reset()
+        QMessageBox.information(self, "نجح", f"تم تصدير البيانات إلى:\n{file_path}")
+    
+    def on_export_error(self, error):
+        """عند فشل تصدير البيانات أو إلغائه"""
+        self.export_progress.reset()
+        QMessageBox.warning(self, "تصدير البيانات", error)
     
     def show_user_management(self):
         """عرض إدارة المستخدمين"""
@@ -470,22 +655,54 @@ class MainWindow(QMainWindow):
     
     def closeEvent(self, event):
         """التعامل مع إغلاق النافذة"""
-        reply = QMessageBox.question(
-            self, "تأكيد الخروج",
-            "هل أنت متأكد من الخروج من النظام؟",
-            QMessageBox.Yes | QMessageBox.No
-        )
+        if self._closing:
+            event.accept()
+            return
         
-        if reply == QMessageBox.Yes:
-            # تسجيل خروج المستخدم
-            self.auth_service.logout()
-            
-            # إجراء نسخة احتياطية تلقائية
-            try:
-                self.backup_service.auto_backup()
-            except Exception:
-                pass  # تجاهل أخطاء النسخ الاحتياطي عند الخروج
+        if not self._exit_confirmed:
+            reply = QMessageBox.question(
+                self, "تأكيد الخروج",
+                "هل أنت متأكد من الخروج من النظام؟",
+                QMessageBox.Yes | QMessageBox.No
+            )
             
+            if reply != QMessageBox.Yes:
+                event.ignore()
+                return
+        
+        # تسجيل خروج المستخدم
+        self.auth_service.logout()
+        
+        # النسخة التلقائية تعمل في الخلفية ثم تُغلق النافذة عند انتهائها
+        try:
+            needs_backup = self.backup_service.needs_auto_backup()
+        except Exception:
+            needs_backup = False  # تجاهل أخطاء النسخ الاحتياطي عند الخروج
+        
+        if not needs_backup:
             event.accept()
-        else:
-            event.ignore()
+            return
+        
+        event.ignore()
+        self.backup_progress = QProgressDialog("جاري النسخ الاحتياطي التلقائي...", "تخطي", 0, 100, self)
+        self.backup_progress.setWindowModality(Qt.WindowModal)
+        self.backup_progress.setMinimumDuration(0)
+        
+        self.backup_thread = JobThread(self.run_close_jobs)
+        self.backup_thread.progress.connect(self.backup_progress.setValue)
+        self.backup_progress.canceled.connect(self.backup_thread.requestInterruption)
+        self.backup_thread.finished.connect(self.finish_close)
+        self.backup_thread.error.connect(self.finish_close)
+        self.backup_thread.start()
+    
+    def run_close_jobs(self, progress, cancelled) -> str:
+        """مهام الإغلاق اليومية في الخلفية: حذف سجل التغييرات القديم وأرشفة سجل النشاط ثم النسخة التلقائية"""
+        self.events.prune()
+        AuditArchive.for_db(self.backup_service.db).run_retention()
+        return self.backup_service.auto_backup(progress, cancelled) and "ok"
+    
+    def finish_close(self, *args):
+        """إغلاق النافذة بعد انتهاء النسخة التلقائية"""
+        self.backup_progress.reset()
+        self._closing = True
+        self.close()
@@ -9,13 +9,20 @@ from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QGridLayout,
                               QTableWidget, QTableWidgetItem, QSpinBox,
                               QDoubleSpinBox, QTextEdit, QFrame, QGroupBox,
                               QMessageBox, QDialog, QDialogButtonBox,
-                              QCompleter, QHeaderView, QAbstractItemView)
-from PySide6.QtCore import Qt, QStringListModel, Signal
+                              QCompleter, QHeaderView, QAbstractItemView,
+                              QTableView)
+from PySide6.QtCore import Qt, QStringListModel, Signal, QTimer
 from PySide6.QtGui import QFont, QDoubleValidator, QIntValidator , QColor
 from datetime import datetime
 import logging
 
 from app.utils.pdf_generator import PDFGenerator
+from app.ui.product_table_model import (ProductTableModel, ProductFilterProxyModel,
+                                        ActionButtonDelegate, POS_PRODUCT_COLUMNS)
+from app.ui.cart_table_model import (CartTableModel, QuantityDelegate,
+                                     QUANTITY_COLUMN, DELETE_COLUMN)
+from app.models.cart import TOTALS_CHANGED
+from config.settings import POS_CONFIG
 
 logger = logging.getLogger(__name__)
 
@@ -92,11 +99,19 @@ class POSWindow(QWidget):
     def __init__(self, main_window):
         super().__init__()
         self.main_window = main_window
-        self.cart_items = []
+        self.cart = self.main_window.pos_service.create_cart()
+        self.cart.add_listener(self.on_cart_event)
+        self.main_window.pos_service.settings.subscribe(
+            lambda key, value: self.cart.set_tax_rate(value), 'tax_rate'
+        )
         self.current_customer = None
         self.pdf_generator = PDFGenerator()
+        self._changed_product_ids = set()
         self.setup_ui()
         
+        self.main_window.events.subscribe(self.on_products_changed, 'stock.changed')
+        self.main_window.events.subscribe(self.on_products_changed, 'product.updated')
+        
     def setup_ui(self):
         """إعداد واجهة المستخدم"""
         layout = QHBoxLayout(self)
@@ -162,7 +177,15 @@ class POSWindow(QWidget):
                 background-color: #f8f9fa;
             }
         """)
-        self.search_edit.textChanged.connect(self.search_products)
+        # تأجيل البحث حتى يتوقف الإدخال حتى لا يُبحث مع كل حرف يرسله القارئ
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(200)
+        self.search_timer.timeout.connect(self.search_products)
+        self.search_edit.textChanged.connect(self.search_timer.start)
+        if POS_CONFIG.get('barcode_scanner_enabled', True):
+            # قارئ الباركود يرسل Enter بعد الرمز
+            self.search_edit.returnPressed.connect(self.scan_barcode)
         search_layout.addWidget(self.search_edit)
         
         search_button = QPushButton("بحث")
@@ -189,12 +212,22 @@ class POSWindow(QWidget):
         
         layout.addLayout(search_layout)
         
-        # جدول المنتجات
-        self.products_table = QTableWidget()
-        self.products_table.setColumnCount(5)
-        self.products_table.setHorizontalHeaderLabels([
-            "الاسم", "الفئة", "السعر", "المخزون", "إضافة"
-        ])
+        # جدول المنتجات (نموذج/عرض: لا يُرسم إلا الظاهر من الصفوف)
+        self.products_model = ProductTableModel(POS_PRODUCT_COLUMNS, self)
+        self.products_proxy = ProductFilterProxyModel(self)
+        self.products_proxy.setSourceModel(self.products_model)
+        
+        self.products_table = QTableView()
+        self.products_table.setModel(self.products_proxy)
+        self.products_table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        
+        add_delegate = ActionButtonDelegate(
+            [('add', "إضافة", "#3498db")],
+            is_enabled=lambda product: product['quantity_in_stock'] > 0,
+            parent=self.products_table
+        )
+        add_delegate.action_triggered.connect(lambda action, product: self.add_to_cart(product))
+        self.products_table.setItemDelegateForColumn(len(POS_PRODUCT_COLUMNS) - 1, add_delegate)
         
         # تخصيص الجدول
         header = self.products_table.horizontalHeader()
@@ -244,12 +277,22 @@ class POSWindow(QWidget):
         
         layout.addWidget(customer_group)
         
-        # جدول السلة
-        self.cart_table = QTableWidget()
-        self.cart_table.setColumnCount(6)
-        self.cart_table.setHorizontalHeaderLabels([
-            "المنتج", "السعر", "الكمية", "المجموع", "حذف", ""
-        ])
+        # جدول السلة (يعاد رسم الصف المتغير فقط)
+        self.cart_model = CartTableModel(self.cart, self)
+        self.cart_table = QTableView()
+        self.cart_table.setModel(self.cart_model)
+        self.cart_table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.cart_table.setEditTriggers(
+            QAbstractItemView.DoubleClicked | QAbstractItemView.SelectedClicked |
+            QAbstractItemView.EditKeyPressed
+        )
+        self.cart_table.setItemDelegateForColumn(QUANTITY_COLUMN, QuantityDelegate(self.cart_table))
+        
+        delete_delegate = ActionButtonDelegate([('delete', "حذف", "#e74c3c")], parent=self.cart_table)
+        delete_delegate.action_triggered.connect(
+            lambda action, line: self.remove_from_cart(line['id'])
+        )
+        self.cart_table.setItemDelegateForColumn(DELETE_COLUMN, delete_delegate)
         
         # تخصيص جدول السلة
         cart_header = self.cart_table.horizontalHeader()
@@ -274,7 +317,7 @@ class POSWindow(QWidget):
         self.discount_spin = QDoubleSpinBox()
         self.discount_spin.setMaximum(9999.99)
         self.discount_spin.setSuffix(" ر.س")
-        self.discount_spin.valueChanged.connect(self.calculate_total)
+        self.discount_spin.valueChanged.connect(self.cart.set_discount)
         summary_layout.addWidget(self.discount_spin, 1, 1)
         
         # الضريبة
@@ -362,6 +405,7 @@ class POSWindow(QWidget):
     
     def refresh_data(self):
         """تحديث البيانات"""
+        self._changed_product_ids.clear()
         self.load_products()
         self.clear_cart()
     
@@ -376,177 +420,96 @@ class POSWindow(QWidget):
     
     def display_products(self, products):
         """عرض المنتجات في الجدول"""
-        self.products_table.setRowCount(len(products))
+        self.products_proxy.set_match_ids(None)
+        self.products_model.set_products(products)
+    
+    def refresh_products(self, product_ids):
+        """تحديث صفوف منتجات محددة فقط (بعد البيع مثلاً)"""
+        try:
+            products = self.main_window.inventory_service.get_products_by_ids(list(product_ids))
+            self.products_model.update_products(products)
+        except Exception as e:
+            logger.error(f"خطأ في تحديث المنتجات: {str(e)}")
+    
+    def on_products_changed(self, event, product_ids):
+        """تغير مخزون أو بيانات منتجات من هذه الطرفية أو غيرها"""
+        if not self.isVisible():
+            return
         
-        for row, product in enumerate(products):
-            # الاسم
-            self.products_table.setItem(row, 0, QTableWidgetItem(product['name']))
-            
-            # الفئة
-            category_name = product.get('category_name', 'غير مصنف')
-            self.products_table.setItem(row, 1, QTableWidgetItem(category_name))
-            
-            # السعر
-            price_item = QTableWidgetItem(f"{product['selling_price']:.2f}")
-            price_item.setTextAlignment(Qt.AlignCenter)
-            self.products_table.setItem(row, 2, price_item)
-            
-            # المخزون
-            stock_item = QTableWidgetItem(str(product['quantity_in_stock']))
-            stock_item.setTextAlignment(Qt.AlignCenter)
-            
-            # تلوين المخزون حسب الحالة
-            if product['quantity_in_stock'] == 0:
-                stock_item.setBackground(QColor("#e74c3c"))
-                stock_item.setForeground(QColor("white"))
-            elif product['quantity_in_stock'] <= product['minimum_stock']:
-                stock_item.setBackground(QColor("#f39c12"))
-                stock_item.setForeground(QColor("white"))
-            
-            self.products_table.setItem(row, 3, stock_item)
-            
-            # زر الإضافة
-            add_button = QPushButton("إضافة")
-            add_button.setEnabled(product['quantity_in_stock'] > 0)
-            add_button.clicked.connect(
-                lambda checked, p=product: self.add_to_cart(p)
-            )
-            self.products_table.setCellWidget(row, 4, add_button)
+        # عدة أحداث في الدورة نفسها تُطبق باستعلام واحد
+        if not self._changed_product_ids:
+            QTimer.singleShot(0, self.apply_product_changes)
+        self._changed_product_ids.update(product_ids)
+    
+    def apply_product_changes(self):
+        """تحديث صفوف المنتجات المتغيرة المجمعة"""
+        product_ids, self._changed_product_ids = self._changed_product_ids, set()
+        if product_ids and self.isVisible():
+            self.refresh_products(product_ids)
     
     def search_products(self):
         """البحث عن المنتجات"""
         search_term = self.search_edit.text().strip()
         
         if not search_term:
-            self.load_products()
+            self.products_proxy.set_match_ids(None)
             return
         
         try:
             products = self.main_window.inventory_service.search_products(search_term)
-            self.display_products(products)
+            self.products_model.update_products(products)
+            self.products_proxy.set_match_ids(product['id'] for product in products)
         except Exception as e:
             logger.error(f"خطأ في البحث: {str(e)}")
     
-    def add_to_cart(self, product):
-        """إضافة منتج للسلة"""
-        # التحقق من وجود المنتج في السلة
-        for item in self.cart_items:
-            if item['product_id'] == product['id']:
-                if item['quantity'] < product['quantity_in_stock']:
-                    item['quantity'] += 1
-                    self.update_cart_display()
-                    return
-                else:
-                    QMessageBox.warning(
-                        self, "تحذير",
-                        "الكمية المطلوبة تتجاوز المخزون المتاح"
-                    )
-                    return
-        
-        # إضافة منتج جديد للسلة
-        cart_item = {
-            'product_id': product['id'],
-            'name': product['name'],
-            'price': product['selling_price'],
-            'quantity': 1,
-            'max_quantity': product['quantity_in_stock']
-        }
+    def scan_barcode(self):
+        """إضافة منتج للسلة مباشرة عند مطابقة الباركود تماماً"""
+        self.search_timer.stop()
+        barcode = self.search_edit.text().strip()
+        if not barcode:
+            return
         
-        self.cart_items.append(cart_item)
-        self.update_cart_display()
-    
-    def update_cart_display(self):
-        """تحديث عرض السلة"""
-        self.cart_table.setRowCount(len(self.cart_items))
+        product = self.main_window.inventory_service.find_by_barcode(barcode)
+        if not product:
+            self.search_products()
+            return
         
-        for row, item in enumerate(self.cart_items):
-            # اسم المنتج
-            self.cart_table.setItem(row, 0, QTableWidgetItem(item['name']))
-            
-            # السعر
-            price_item = QTableWidgetItem(f"{item['price']:.2f}")
-            price_item.setTextAlignment(Qt.AlignCenter)
-            self.cart_table.setItem(row, 1, price_item)
-            
-            # الكمية
-            quantity_spin = QSpinBox()
-            quantity_spin.setMinimum(1)
-            quantity_spin.setMaximum(item['max_quantity'])
-            quantity_spin.setValue(item['quantity'])
-            quantity_spin.valueChanged.connect(
-                lambda value, r=row: self.update_quantity(r, value)
-            )
-            self.cart_table.setCellWidget(row, 2, quantity_spin)
-            
-            # المجموع
-            total = item['price'] * item['quantity']
-            total_item = QTableWidgetItem(f"{total:.2f}")
-            total_item.setTextAlignment(Qt.AlignCenter)
-            self.cart_table.setItem(row, 3, total_item)
-            
-            # زر الحذف
-            delete_button = QPushButton("حذف")
-            delete_button.setStyleSheet("""
-                QPushButton {
-                    background-color: #e74c3c;
-                    color: white;
-                    border: none;
-                    border-radius: 3px;
-                    padding: 5px;
-                }
-                QPushButton:hover {
-                    background-color: #c0392b;
-                }
-            """)
-            delete_button.clicked.connect(
-                lambda checked, r=row: self.remove_from_cart(r)
-            )
-            self.cart_table.setCellWidget(row, 4, delete_button)
+        if product['quantity_in_stock'] <= 0:
+            QMessageBox.warning(self, "تحذير", f"المنتج غير متوفر في المخزون: {product['name']}")
+        else:
+            self.add_to_cart(product)
         
-        self.calculate_total()
+        # تجهيز الحقل للمسح التالي
+        self.search_edit.clear()
     
-    def update_quantity(self, row, quantity):
-        """تحديث كمية المنتج"""
-        if row < len(self.cart_items):
-            self.cart_items[row]['quantity'] = quantity
-            self.update_cart_display()
+    def add_to_cart(self, product):
+        """إضافة منتج للسلة"""
+        try:
+            row = self.cart.add_product(product)
+            self.cart_table.scrollTo(self.cart_model.index(row, 0))
+        except ValueError as e:
+            QMessageBox.warning(self, "تحذير", str(e))
     
-    def remove_from_cart(self, row):
+    def remove_from_cart(self, product_id):
         """حذف منتج من السلة"""
-        if row < len(self.cart_items):
-            del self.cart_items[row]
-            self.update_cart_display()
+        self.cart.remove(product_id)
+    
+    def on_cart_event(self, event, row):
+        """تحديث ملخص الفاتورة عند تغير مجاميع السلة"""
+        if event == TOTALS_CHANGED:
+            self.calculate_total()
     
     def calculate_total(self):
-        """حساب الإجمالي"""
-        if not self.cart_items:
-            self.subtotal_label.setText("0.00 ر.س")
-            self.tax_label.setText("0.00 ر.س")
-            self.total_label.setText("0.00 ر.س")
-            self.complete_button.setEnabled(False)
-            return
-        
-        # حساب المجموع الفرعي
-        subtotal = sum(item['price'] * item['quantity'] for item in self.cart_items)
-        
-        # الخصم
-        discount = self.discount_spin.value()
-        
-        # حساب الضريبة
-        taxable_amount = subtotal - discount
-        tax_rate = float(self.main_window.db.get_setting('tax_rate') or 0) / 100
-        tax_amount = taxable_amount * tax_rate
-        
-        # المجموع النهائي
-        total = taxable_amount + tax_amount
+        """عرض الإجمالي من المجاميع المتراكمة في السلة"""
+        totals = self.cart.totals()
         
         # تحديث العرض
-        self.subtotal_label.setText(f"{subtotal:.2f} ر.س")
-        self.tax_label.setText(f"{tax_amount:.2f} ر.س")
-        self.total_label.setText(f"{total:.2f} ر.س")
+        self.subtotal_label.setText(f"{totals['subtotal']:.2f} ر.س")
+        self.tax_label.setText(f"{totals['tax_amount']:.2f} ر.س")
+        self.total_label.setText(f"{totals['final_amount']:.2f} ر.س")
         
         # تفعيل زر الإتمام
-        self.complete_button.setEnabled(total > 0)
+        self.complete_button.setEnabled(bool(self.cart) and totals['final_amount'] > 0)
     
     def select_customer(self):
         """اختيار العميل"""
@@ -563,28 +526,21 @@ class POSWindow(QWidget):
     
     def clear_cart(self):
         """مسح السلة"""
-        self.cart_items.clear()
+        self.cart.clear()
         self.current_customer = None
         self.customer_label.setText("لا يوجد عميل محدد")
         self.discount_spin.setValue(0)
         self.notes_edit.clear()
-        self.update_cart_display()
     
     def complete_sale(self):
         """إتمام البيع"""
-        if not self.cart_items:
+        if not self.cart:
             QMessageBox.warning(self, "تحذير", "السلة فارغة")
             return
         
         try:
             # إعداد بيانات الفاتورة
-            items = []
-            for cart_item in self.cart_items:
-                items.append({
-                    'product_id': cart_item['product_id'],
-                    'quantity': cart_item['quantity'],
-                    'price': cart_item['price']
-                })
+            items = self.cart.sale_items()
             
             payment_method = self.payment_combo.currentData()
             discount_amount = self.discount_spin.value()
@@ -615,12 +571,9 @@ class POSWindow(QWidget):
                 if reply == QMessageBox.Yes:
                     self.print_invoice(sale)
                 
-                # مسح السلة
+                # صفوف المنتجات المباعة تُحدث عبر حدث stock.changed
                 self.clear_cart()
                 
-                # تحديث المنتجات
-                self.load_products()
-                
             else:
                 QMessageBox.critical(
                     self, "خطأ",
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+نموذج جدول المنتجات - Product Table Model
+
+طبقة نموذج/عرض مشتركة لجداول المنتجات في نقاط البيع والمخزون: المنتجات
+تُخزن كصفوف مضغوطة (tuple) ولا يُرسم إلا الظاهر منها، وأزرار العمليات تُرسم
+بالمفوض بدلاً من إنشاء QPushButton لكل صف.
+"""
+
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from PySide6.QtCore import (Qt, QAbstractTableModel, QModelIndex, QSortFilterProxyModel,
+                            QEvent, QRect, QSize, Signal)
+from PySide6.QtGui import QColor, QPainter
+from PySide6.QtWidgets import QStyledItemDelegate
+
+# الحقول المحفوظة لكل منتج بترتيب الصف المضغوط
+PRODUCT_FIELDS = ('id', 'name', 'category_name', 'barcode', 'cost_price',
+                  'selling_price', 'quantity_in_stock', 'minimum_stock')
+_FIELD_INDEX = {field: i for i, field in enumerate(PRODUCT_FIELDS)}
+
+PRODUCT_ID_ROLE = Qt.UserRole + 1
+SORT_ROLE = Qt.UserRole + 2
+PRODUCT_ROLE = Qt.UserRole + 3
+
+_OUT_OF_STOCK_COLOR = QColor("#e74c3c")
+_LOW_STOCK_COLOR = QColor("#f39c12")
+_WHITE = QColor("white")
+_DISABLED_BUTTON_COLOR = QColor("#bdc3c7")
+
+
+class ProductColumn(NamedTuple):
+    """تعريف عمود: الحقل، العنوان، النوع (text/money/int/stock/action)"""
+    field: str
+    title: str
+    kind: str = 'text'
+
+
+POS_PRODUCT_COLUMNS = [
+    ProductColumn('name', "الاسم"),
+    ProductColumn('category_name', "الفئة"),
+    ProductColumn('selling_price', "السعر", 'money'),
+    ProductColumn('quantity_in_stock', "المخزون", 'stock'),
+    ProductColumn('id', "إضافة", 'action'),
+]
+
+INVENTORY_PRODUCT_COLUMNS = [
+    ProductColumn('name', "الاسم"),
+    ProductColumn('category_name', "الفئة"),
+    ProductColumn('barcode', "الباركود"),
+    ProductColumn('cost_price', "سعر التكلفة", 'money'),
+    ProductColumn('selling_price', "سعر البيع", 'money'),
+    ProductColumn('quantity_in_stock', "المخزون", 'stock'),
+    ProductColumn('minimum_stock', "الحد الأدنى", 'int'),
+    ProductColumn('id', "العمليات", 'action'),
+]
+
+
+class ProductTableModel(QAbstractTableModel):
+    """نموذج جدول منتجات فوق مخزن صفوف مضغوط"""
+
+    def __init__(self, columns: List[ProductColumn], parent=None):
+        super().__init__(parent)
+        self._columns = list(columns)
+        self._field_indexes = [_FIELD_INDEX[column.field] for column in self._columns]
+        self._rows: List[Tuple] = []
+        self._row_by_id: Dict[int, int] = {}
+
+    @staticmethod
+    def _pack(product: Dict) -> Tuple:
+        """تحويل قاموس المنتج إلى صف مضغوط"""
+        return (
+            product['id'],
+            product.get('name') or '',
+            product.get('category_name') or 'غير مصنف',
+            product.get('barcode') or '',
+            product.get('cost_price') or 0,
+            product.get('selling_price') or 0,
+            product.get('quantity_in_stock') or 0,
+            product.get('minimum_stock') or 0,
+        )
+
+    def set_products(self, products: Iterable[Dict]):
+        """استبدال كل المنتجات (إعادة ضبط واحدة للنموذج)"""
+        self.beginResetModel()
+        self._rows = [self._pack(product) for product in products]
+        self._row_by_id = {row[0]: i for i, row in enumerate(self._rows)}
+        self.endResetModel()
+
+    def update_products(self, products: Iterable[Dict]):
+        """تحديث منتجات محددة بإشارات dataChanged، وإلحاق الجديد منها"""
+        new_rows = []
+        last_column = len(self._columns) - 1
+
+        for product in products:
+            packed = self._pack(product)
+            row = self._row_by_id.get(packed[0])
+            if row is None:
+                new_rows.append(packed)
+            elif self._rows[row] != packed:
+                self._rows[row] = packed
+                self.dataChanged.emit(self.index(row, 0), self.index(row, last_column))
+
+        if new_rows:
+            first = len(self._rows)
+            self.beginInsertRows(QModelIndex(), first, first + len(new_rows) - 1)
+            for i, packed in enumerate(new_rows, first):
+                self._rows.append(packed)
+                self._row_by_id[packed[0]] = i
+            self.endInsertRows()
+
+    def product_at(self, row: int) -> Dict:
+        """قاموس المنتج في الصف"""
+        return dict(zip(PRODUCT_FIELDS, self._rows[row]))
+
+    def product_id_at(self, row: int) -> int:
+        """معرف المنتج في الصف"""
+        return self._rows[row][0]
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._columns)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return self._columns[section].title
+        return super().headerData(section, orientation, role)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+
+        row = self._rows[index.row()]
+        kind = self._columns[index.column()].kind
+        value = row[self._field_indexes[index.column()]]
+
+        if role == Qt.DisplayRole:
+            if kind == 'action':
+                return None
+            if kind == 'money':
+                return f"{value:.2f}"
+            return str(value)
+
+        if role == Qt.TextAlignmentRole:
+            if kind in ('money', 'int', 'stock'):
+                return int(Qt.AlignCenter)
+            return None
+
+        if kind == 'stock' and role in (Qt.BackgroundRole, Qt.ForegroundRole):
+            minimum_stock = row[_FIELD_INDEX['minimum_stock']]
+            if value == 0:
+                return _OUT_OF_STOCK_COLOR if role == Qt.BackgroundRole else _WHITE
+            if value <= minimum_stock:
+                return _LOW_STOCK_COLOR if role == Qt.BackgroundRole else _WHITE
+            return None
+
+        if role == SORT_ROLE:
+            return value
+        if role == PRODUCT_ID_ROLE:
+            return row[0]
+        if role == PRODUCT_ROLE:
+            return dict(zip(PRODUCT_FIELDS, row))
+
+        return None
+
+
+class ProductFilterProxyModel(QSortFilterProxyModel):
+    """فرز المنتجات وتصفيتها بمجموعة معرفات (نتائج البحث) دون إعادة تحميل النموذج"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._match_ids = None
+        self.setSortRole(SORT_ROLE)
+
+    def set_match_ids(self, product_ids: Optional[Iterable[int]]):
+        """عرض المنتجات المحددة فقط (None = عرض الكل)"""
+        if product_ids is None and self._match_ids is None:
+            return
+        self._match_ids = None if product_ids is None else frozenset(product_ids)
+        self.invalidateFilter()
+
+    def filterAcceptsRow(self, source_row, source_parent) -> bool:
+        if self._match_ids is None:
+            return True
+        return self.sourceModel().product_id_at(source_row) in self._match_ids
+
+
+class ActionButtonDelegate(QStyledItemDelegate):
+    """مفوض يرسم أزرار العمليات داخل الخلية ويحوّل النقر إلى إشارة"""
+
+    action_triggered = Signal(str, dict)
+
+    BUTTON_WIDTH = 70
+    MARGIN = 4
+
+    def __init__(self, actions: List[Tuple[str, str, str]],
+                 is_enabled: Callable[[Dict], bool] = None, parent=None):
+        """actions: قائمة (المفتاح، النص، اللون)"""
+        super().__init__(parent)
+        self._actions = [(key, label, QColor(color)) for key, label, color in actions]
+        self._is_enabled = is_enabled
+
+    def _button_rects(self, rect: QRect) -> List[QRect]:
+        """تقسيم الخلية إلى مستطيلات الأزرار"""
+        count = len(self._actions)
+        inner = rect.adjusted(self.MARGIN, self.MARGIN, -self.MARGIN, -self.MARGIN)
+        width = max(1, (inner.width() - self.MARGIN * (count - 1)) // count)
+        return [
+            QRect(inner.left() + i * (width + self.MARGIN), inner.top(), width, inner.height())
+            for i in range(count)
+        ]
+
+    def _enabled(self, index) -> bool:
+        if not self._is_enabled:
+            return True
+        return self._is_enabled(index.data(PRODUCT_ROLE))
+
+    def paint(self, painter, option, index):
+        enabled = self._enabled(index)
+
+        painter.save()
+        painter.setRenderHint(QPainter.Antialiasing)
+        for (key, label, color), rect in zip(self._actions, self._button_rects(option.rect)):
+            painter.setPen(Qt.NoPen)
+            painter.setBrush(color if enabled else _DISABLED_BUTTON_COLOR)
+            painter.drawRoundedRect(rect, 3, 3)
+            painter.setPen(_WHITE)
+            painter.drawText(rect, Qt.AlignCenter, label)
+        painter.restore()
+
+    def sizeHint(self, option, index) -> QSize:
+        return QSize(len(self._actions) * self.BUTTON_WIDTH, 30)
+
+    def editorEvent(self, event, model, option, index) -> bool:
+        if event.type() != QEvent.MouseButtonRelease or event.button() != Qt.LeftButton:
+            return False
+
+        if not self._enabled(index):
+            return True
+
+        position = event.position().toPoint()
+        for (key, label, color), rect in zip(self._actions, self._button_rects(option.rect)):
+            if rect.contains(position):
+                self.action_triggered.emit(key, index.data(PRODUCT_ROLE))
+                return True
+
+        return False
@@ -282,8 +282,11 @@ class RepairWindow(QWidget):
         super().__init__()
         self.main_window = main_window
         self.pdf_generator = PDFGenerator()
+        self._tickets_changed = False
         self.setup_ui()
         
+        self.main_window.events.subscribe(self.on_tickets_changed, 'repair.')
+        
     def setup_ui(self):
         """إعداد واجهة المستخدم"""
         layout = QVBoxLayout(self)
@@ -586,10 +589,25 @@ class RepairWindow(QWidget):
     
     def refresh_data(self):
         """تحديث البيانات"""
+        self._tickets_changed = False
         self.load_tickets()
         self.update_technician_stats()
         self.generate_report()
     
+    def on_tickets_changed(self, event, ticket_ids):
+        """إنشاء تذكرة أو تغيير حالتها من هذه الطرفية أو غيرها"""
+        if not self.isVisible() or self._tickets_changed:
+            return
+        
+        self._tickets_changed = True
+        QTimer.singleShot(0, self.apply_ticket_changes)
+    
+    def apply_ticket_changes(self):
+        """إعادة تحميل التذاكر مرة واحدة لكل دفعة أحداث"""
+        if self._tickets_changed and self.isVisible():
+            self.refresh_data()
+        self._tickets_changed = False
+    
     def load_tickets(self):
         """تحميل التذاكر"""
         try:
@@ -776,7 +794,6 @@ class RepairWindow(QWidget):
                         self, "نجح", 
                         f"تم إنشاء التذكرة بنجاح\nرقم التذكرة: {ticket_id}"
                     )
-                    self.refresh_data()
                 else:
                     QMessageBox.critical(self, "خطأ", "فشل في إنشاء التذكرة")
                     
@@ -951,7 +968,6 @@ IMEI: {full_ticket.get('imei', 'غير محدد')}
                 
                 if success:
                     QMessageBox.information(self, "نجح", "تم تحديث حالة التذكرة بنجاح")
-                    self.refresh_data()
                 else:
                     QMessageBox.critical(self, "خطأ", "فشل في تحديث حالة التذكرة")
                     
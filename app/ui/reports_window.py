@@ -14,10 +14,12 @@ from PySide6.QtCore import Qt, QDate, QThread, Signal
 from PySide6.QtGui import QFont, QColor 
 from datetime import datetime, date, timedelta
 import json
-import csv
 import logging
 
+from app.services.export_service import ExportService
+from app.utils.export_writers import EXPORT_FORMATS
 from app.utils.pdf_generator import PDFGenerator
+from .job_thread import JobThread
 
 logger = logging.getLogger(__name__)
 
@@ -70,6 +72,7 @@ class ReportsWindow(QWidget):
         self.pdf_generator = PDFGenerator()
         self.current_report_data = None
         self.report_thread = None
+        self.export_thread = None
         self.setup_ui()
         
     def setup_ui(self):
@@ -625,7 +628,14 @@ class ReportsWindow(QWidget):
         """بدء إنتاج التقرير في خيط منفصل"""
         start_date = self.global_start_date.date().toString("yyyy-MM-dd")
         end_date = self.global_end_date.date().toString("yyyy-MM-dd")
-        
+
+        # نتيجة محفوظة وما تزال صالحة: عرض فوري دون خيط
+        params = () if report_type == 'inventory' else (start_date, end_date)
+        cached = self.main_window.report_service.get_cached_report(report_type, *params)
+        if cached is not None:
+            self.on_report_finished(cached)
+            return
+
         self.progress_bar.setVisible(True)
         self.progress_bar.setValue(0)
         
@@ -887,57 +897,54 @@ class ReportsWindow(QWidget):
             QMessageBox.critical(self, "خطأ", f"حدث خطأ في التصدير:\n{str(e)}")
     
     def export_excel(self):
-        """تصدير التقرير إلى Excel"""
+        """تصدير بيانات التقرير الخام إلى Excel أو CSV أو JSON Lines"""
         if not self.current_report_data:
             QMessageBox.warning(self, "تحذير", "لا يوجد تقرير لتصديره")
             return
         
         try:
-            file_path, _ = QFileDialog.getSaveFileName(
+            file_path, selected_filter = QFileDialog.getSaveFileName(
                 self, "حفظ التقرير", 
-                f"report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
-                "ملفات CSV (*.csv)"
+                f"report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
+                ";;".join(EXPORT_FORMATS.values())
             )
             
-            if file_path:
-                current_tab = self.tab_widget.currentIndex()
-                
-                # تحديد الجدول المناسب
-                if current_tab == 0:  # المبيعات
-                    table = self.sales_details_table
-                elif current_tab == 1:  # المخزون
-                    table = self.inventory_details_table
-                elif current_tab == 2:  # الصيانة
-                    table = self.repair_details_table
-                elif current_tab == 4:  # العملاء
-                    table = self.customer_details_table
-                else:
-                    QMessageBox.warning(self, "تحذير", "هذا التقرير لا يدعم التصدير إلى Excel")
-                    return
-                
-                # تصدير البيانات
-                with open(file_path, 'w', newline='', encoding='utf-8') as csvfile:
-                    writer = csv.writer(csvfile)
-                    
-                    # كتابة العناوين
-                    headers = []
-                    for col in range(table.columnCount()):
-                        headers.append(table.horizontalHeaderItem(col).text())
-                    writer.writerow(headers)
-                    
-                    # كتابة البيانات
-                    for row in range(table.rowCount()):
-                        row_data = []
-                        for col in range(table.columnCount()):
-                            item = table.item(row, col)
-                            row_data.append(item.text() if item else '')
-                        writer.writerow(row_data)
-                
-                QMessageBox.information(
-                    self, "نجح",
-                    f"تم حفظ التقرير في:\n{file_path}"
-                )
+            if not file_path:
+                return
+            
+            export_format = next(
+                (fmt for fmt, title in EXPORT_FORMATS.items() if title == selected_filter), 'xlsx'
+            )
+            if not file_path.lower().endswith(f".{export_format}"):
+                file_path += f".{export_format}"
+            
+            report_data = self.current_report_data
+            export_service = ExportService()
+            
+            self.progress_bar.setVisible(True)
+            self.progress_bar.setValue(0)
+            
+            self.export_thread = JobThread(
+                lambda progress, cancelled: export_service.export_report(
+                    report_data, file_path, export_format, progress
+                ),
+                failed_message="فشل التصدير، راجع السجل للتفاصيل"
+            )
+            self.export_thread.progress.connect(self.progress_bar.setValue)
+            self.export_thread.finished.connect(self.on_export_finished)
+            self.export_thread.error.connect(self.on_export_error)
+            self.export_thread.start()
                 
         except Exception as e:
             logger.error(f"خطأ في تصدير Excel: {str(e)}")
             QMessageBox.critical(self, "خطأ", f"حدث خطأ في التصدير:\n{str(e)}")
+    
+    def on_export_finished(self, file_path):
+        """عند انتهاء التصدير"""
+        self.progress_bar.setVisible(False)
+        QMessageBox.information(self, "نجح", f"تم حفظ التقرير في:\n{file_path}")
+    
+    def on_export_error(self, error):
+        """عند فشل التصدير"""
+        self.progress_bar.setVisible(False)
+        QMessageBox.critical(self, "خطأ", f"حدث خطأ في التصدير:\n{error}")
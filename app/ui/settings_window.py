@@ -313,6 +313,9 @@ class MainWindow(QMainWindow):
             users_tab = self.create_users_tab()
             self.tab_widget.addTab(users_tab, "إدارة المستخدمين")
 
+            activity_tab = self.create_activity_tab()
+            self.tab_widget.addTab(activity_tab, "سجل النشاط")
+
         layout.addWidget(self.tab_widget)
 
         return settings_window
@@ -539,6 +542,76 @@ class MainWindow(QMainWindow):
 
         return users_tab
 
+    def create_activity_tab(self):
+        """إنشاء تبويب سجل النشاط (صفحات بمؤشر آخر صف)"""
+        activity_tab = QWidget()
+        layout = QVBoxLayout(activity_tab)
+        layout.setContentsMargins(20, 20, 20, 20)
+        layout.setSpacing(15)
+
+        title_label = QLabel("سجل النشاط")
+        title_label.setFont(QFont("Segoe UI", 20, QFont.Bold))
+        title_label.setStyleSheet("color: #2c3e50; margin-bottom: 15px;")
+        layout.addWidget(title_label)
+
+        self.activity_table = QTableWidget()
+        self.activity_table.setColumnCount(5)
+        self.activity_table.setHorizontalHeaderLabels(["التاريخ", "المستخدم", "العملية", "الجدول", "التفاصيل"])
+        self.activity_table.setAlternatingRowColors(True)
+        self.activity_table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.activity_table.setFont(QFont("Segoe UI", 10))
+        self.activity_table.horizontalHeader().setStretchLastSection(True)
+        self.activity_table.verticalHeader().setVisible(False)
+        layout.addWidget(self.activity_table)
+
+        # التنقل: مؤشر بداية كل صفحة معروضة للرجوع إليها
+        navigation_layout = QHBoxLayout()
+        self.activity_newer_btn = QPushButton("الأحدث")
+        self.activity_newer_btn.clicked.connect(self.show_newer_activity)
+        self.activity_older_btn = QPushButton("الأقدم")
+        self.activity_older_btn.clicked.connect(self.show_older_activity)
+        navigation_layout.addWidget(self.activity_newer_btn)
+        navigation_layout.addStretch()
+        navigation_layout.addWidget(self.activity_older_btn)
+        layout.addLayout(navigation_layout)
+
+        self.activity_page_cursors = [None]
+        self.activity_next_cursor = None
+        self.load_activity_page()
+
+        return activity_tab
+
+    def load_activity_page(self):
+        """تحميل صفحة سجل النشاط التي تبدأ بعد آخر مؤشر في المكدس"""
+        try:
+            page = self.auth_service.get_user_activity_page(limit=50, before=self.activity_page_cursors[-1])
+            rows = page['rows']
+            self.activity_next_cursor = page['next_cursor']
+
+            self.activity_table.setRowCount(len(rows))
+            for row, entry in enumerate(rows):
+                self.activity_table.setItem(row, 0, QTableWidgetItem(str(entry.get('created_at') or '')))
+                self.activity_table.setItem(row, 1, QTableWidgetItem(entry.get('user_name') or ''))
+                self.activity_table.setItem(row, 2, QTableWidgetItem(entry.get('action') or ''))
+                self.activity_table.setItem(row, 3, QTableWidgetItem(entry.get('table_name') or ''))
+                self.activity_table.setItem(row, 4, QTableWidgetItem(entry.get('new_values') or ''))
+
+            self.activity_newer_btn.setEnabled(len(self.activity_page_cursors) > 1)
+            self.activity_older_btn.setEnabled(self.activity_next_cursor is not None)
+
+        except Exception as e:
+            logger.error(f"خطأ في تحميل سجل النشاط: {str(e)}")
+
+    def show_older_activity(self):
+        if self.activity_next_cursor is not None:
+            self.activity_page_cursors.append(self.activity_next_cursor)
+            self.load_activity_page()
+
+    def show_newer_activity(self):
+        if len(self.activity_page_cursors) > 1:
+            self.activity_page_cursors.pop()
+            self.load_activity_page()
+
     def refresh_users_list(self):
         """تحديث قائمة المستخدمين"""
         try:
@@ -1023,36 +1096,21 @@ class MainWindow(QMainWindow):
                     QMessageBox.critical(self, "خطأ", f"فشل في استعادة النسخة الاحتياطية:\n{str(e)}")
 
     def refresh_backups_list(self):
-        """تحديث قائمة النسخ الاحتياطية"""
+        """تحديث قائمة النسخ الاحتياطية من فهرس النسخ"""
         try:
             from app.services.backup_service import BackupService
-            import os
             from datetime import datetime
 
-            backup_service = BackupService()
-            backup_dir = backup_service.backup_dir
-
-            if not backup_dir.exists():
-                self.backups_table.setRowCount(0)
-                return
-
             backups = []
-            for file_path in backup_dir.glob("*.backup"):
-                try:
-                    stat = file_path.stat()
-                    backups.append({
-                        'name': file_path.name,
-                        'path': str(file_path),
-                        'date': datetime.fromtimestamp(stat.st_mtime),
-                        'size': stat.st_size
-                    })
-                except OSError:
-                    # تخطي الملفات التي لا يمكن الوصول إليها
-                    continue
-
-
-            # ترتيب حسب التاريخ
-            backups.sort(key=lambda x: x['date'], reverse=True)
+            for entry in BackupService().get_backup_list():
+                backups.append({
+                    'name': entry['file'],
+                    'path': entry['file_path'],
+                    'type': entry['type'],
+                    'point': entry['name'],
+                    'date': datetime.fromisoformat(entry['created_at']),
+                    'size': entry['size']
+                })
 
             self.backups_table.setRowCount(len(backups))
 
@@ -1097,7 +1155,7 @@ class MainWindow(QMainWindow):
                 background-color: #d35400;
             }
         """)
-        restore_btn.clicked.connect(lambda: self.restore_specific_backup(backup['path']))
+        restore_btn.clicked.connect(lambda: self.restore_specific_backup(backup))
         layout.addWidget(restore_btn)
 
         # زر الحذف
@@ -1116,15 +1174,16 @@ class MainWindow(QMainWindow):
             }
         """)
         delete_btn.clicked.connect(lambda: self.delete_backup(backup['path']))
+        delete_btn.setEnabled(backup['type'] == 'full')
         layout.addWidget(delete_btn)
 
         return widget
 
-    def restore_specific_backup(self, backup_path):
-        """استعادة نسخة احتياطية محددة"""
+    def restore_specific_backup(self, backup):
+        """استعادة نسخة احتياطية محددة (أرشيف كامل أو نقطة في سلسلة النسخ)"""
         reply = QMessageBox.question(
             self, "تأكيد",
-            f"هل أنت متأكد من استعادة النسخة الاحتياطية:\n{backup_path}؟"
+            f"هل أنت متأكد من استعادة النسخة الاحتياطية:\n{backup['path']}؟"
         )
 
         if reply == QMessageBox.Yes:
@@ -1132,7 +1191,10 @@ class MainWindow(QMainWindow):
                 from app.services.backup_service import BackupService
                 backup_service = BackupService()
 
-                success = backup_service.restore_backup(backup_path)
+                if backup['type'] == 'full':
+                    success = backup_service.restore_backup(backup['path'])
+                else:
+                    success = backup_service.restore_chain_point(backup['point'])
                 if success:
                     QMessageBox.information(
                         self, "نجح", 
@@ -1155,8 +1217,9 @@ class MainWindow(QMainWindow):
 
         if reply == QMessageBox.Yes:
             try:
-                import os
-                os.remove(backup_path)
+                from app.services.backup_service import BackupService
+                if not BackupService().delete_backup(backup_path):
+                    raise Exception("النسخة الاحتياطية غير موجودة")
                 QMessageBox.information(self, "نجاح", "تم حذف النسخة الاحتياطية بنجاح")
                 self.refresh_backups_list()
 
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+توحيد النص العربي للبحث - Arabic Text Normalization
+
+نفس قواعد التوحيد تُطبق على النص المفهرس (داخل مشغلات SQLite عبر REPLACE)
+وعلى نص البحث (في بايثون)، حتى يطابق "احمد" كلمة "أحمد" و"شاشه" كلمة "شاشة".
+"""
+
+import re
+from typing import List, Tuple
+
+# التشكيل والتطويل تُحذف
+_DIACRITICS = [
+    "ً", "ٌ", "ٍ", "َ", "ُ",
+    "ِ", "ّ", "ْ", "ٰ", "ـ",
+]
+
+# (الحرف الأصلي، الحرف الموحد)
+ARABIC_FOLDS: List[Tuple[str, str]] = [
+    ("أ", "ا"), ("إ", "ا"), ("آ", "ا"), ("ٱ", "ا"),
+    ("ؤ", "و"), ("ئ", "ي"), ("ى", "ي"), ("ة", "ه"),
+] + [(mark, "") for mark in _DIACRITICS]
+
+_FOLD_TABLE = str.maketrans({source: target for source, target in ARABIC_FOLDS})
+
+# كل ما ليس حرفاً أو رقماً يفصل بين الكلمات
+_TOKEN_SPLIT = re.compile(r"[^\w]+", re.UNICODE)
+
+
+def normalize_arabic(text: str) -> str:
+    """توحيد أشكال الألف والهمزة والتاء المربوطة وحذف التشكيل"""
+    if not text:
+        return ""
+    return str(text).translate(_FOLD_TABLE)
+
+
+def normalize_sql(expression: str) -> str:
+    """تعبير SQL يطبق normalize_arabic على عمود (للاستخدام في المشغلات)"""
+    sql = f"COALESCE({expression}, '')"
+    for source, target in ARABIC_FOLDS:
+        sql = f"REPLACE({sql}, '{source}', '{target}')"
+    return sql
+
+
+def fts_prefix_query(search_term: str) -> str:
+    """تحويل نص البحث إلى استعلام FTS5 بمطابقة البادئة لكل كلمة (فارغ إن لم توجد كلمات)"""
+    tokens = [token for token in _TOKEN_SPLIT.split(normalize_arabic(search_term).replace("_", " "))
+              if token]
+    return " ".join(f'"{token}"*' for token in tokens)
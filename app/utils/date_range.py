@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+نطاقات التاريخ في الاستعلامات - Date Range Query Builder
+
+الطوابع الزمنية تُخزن بتوقيت UTC (CURRENT_TIMESTAMP) بينما يختار المستخدم
+أياماً بالتوقيت المحلي. القاعدة الموحدة: حدود الأيام تُفسر بالتوقيت المحلي
+وتُحول إلى نطاق UTC نصف مفتوح (col >= بداية AND col < نهاية) دون تغليف
+العمود بدالة، حتى يستطيع SQLite استخدام الفهرس.
+"""
+
+from datetime import date, datetime, time, timedelta, timezone
+from typing import List, Optional, Tuple, Union
+
+DayLike = Union[str, date]
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def _to_date(day: DayLike) -> date:
+    """تحويل نص YYYY-MM-DD أو كائن تاريخ إلى date"""
+    if isinstance(day, datetime):
+        return day.date()
+    if isinstance(day, date):
+        return day
+    return date.fromisoformat(str(day)[:10])
+
+
+def local_midnight_utc(day: DayLike) -> str:
+    """بداية اليوم المحلي كطابع زمني UTC بصيغة التخزين"""
+    local_start = datetime.combine(_to_date(day), time.min)
+    return local_start.astimezone(timezone.utc).strftime(TIMESTAMP_FORMAT)
+
+
+def day_range(start_date: DayLike, end_date: Optional[DayLike] = None) -> Tuple[str, str]:
+    """تحويل أيام محلية (شاملة) إلى نطاق UTC نصف مفتوح [بداية، نهاية)"""
+    end_day = _to_date(end_date if end_date is not None else start_date)
+    return local_midnight_utc(start_date), local_midnight_utc(end_day + timedelta(days=1))
+
+
+def date_range_clause(column: str, start_date: Optional[DayLike] = None,
+                      end_date: Optional[DayLike] = None) -> Tuple[str, List[str]]:
+    """بناء شرط " AND col >= ? AND col < ?" مع معاملاته (أي حد فارغ يُهمل)"""
+    clause = ""
+    params: List[str] = []
+
+    if start_date:
+        clause += f" AND {column} >= ?"
+        params.append(local_midnight_utc(start_date))
+
+    if end_date:
+        clause += f" AND {column} < ?"
+        params.append(local_midnight_utc(_to_date(end_date) + timedelta(days=1)))
+
+    return clause, params
+
+
+def local_day(column: str) -> str:
+    """تعبير SQL لليوم المحلي للعمود (للتجميع والعرض فقط، لا للتصفية)"""
+    return f"DATE({column}, 'localtime')"
+
+
+def local_month(column: str) -> str:
+    """تعبير SQL للشهر المحلي للعمود (للتجميع والعرض فقط، لا للتصفية)"""
+    return f"strftime('%Y-%m', {column}, 'localtime')"
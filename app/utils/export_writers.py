@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+كتّاب التصدير - Export Writers
+
+كتّاب متدفقون لصيغ CSV و JSON Lines و XLSX: كل صف يُكتب إلى الملف فور
+وصوله فلا يحتفظ الكاتب بأي صفوف في الذاكرة. ملف XLSX يُبنى مباشرة كأرشيف
+ZIP بصيغة SpreadsheetML (دون مكتبات خارجية) وكل ورقة تُكتب كتدفق واحد.
+"""
+
+import csv
+import io
+import json
+import math
+import re
+import zipfile
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, BinaryIO, Iterable, List, Optional, Sequence
+from xml.sax.saxutils import escape
+
+EXPORT_FORMATS = {
+    'csv': "ملفات CSV (*.csv)",
+    'jsonl': "ملفات JSON Lines (*.jsonl)",
+    'xlsx': "ملفات Excel (*.xlsx)",
+}
+
+# الحد الأقصى لصفوف ورقة Excel (مع صف العناوين)
+XLSX_MAX_ROWS = 1_048_576
+
+_XML_ILLEGAL = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]')
+_SHEET_NAME_ILLEGAL = re.compile(r'[\[\]:*?/\\]')
+
+
+def _json_default(value: Any):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, bytes):
+        return value.hex()
+    return str(value)
+
+
+class _ExportWriter:
+    """أساس الكتّاب: close() عند النجاح و abort() عند الخطأ مع with"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
+
+    def abort(self):
+        """إغلاق التدفق دون إكمال الملف (يُحذف لاحقاً)"""
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+class CsvExportWriter(_ExportWriter):
+    """كاتب CSV (UTF-8 مع BOM حتى يعرض Excel النص العربي بشكل صحيح)"""
+
+    extension = 'csv'
+
+    def __init__(self, stream: BinaryIO):
+        self._text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+        self._writer = csv.writer(self._text)
+        self._sections = 0
+
+    def begin_section(self, name: str, columns: Sequence[str]):
+        """بدء قسم جديد (الأقسام التالية تُفصل بسطر فارغ وعنوان)"""
+        if self._sections:
+            self._writer.writerow([])
+            self._writer.writerow([name])
+        self._sections += 1
+        self._writer.writerow(columns)
+
+    def write_rows(self, rows: Iterable[Sequence[Any]]):
+        self._writer.writerows(rows)
+
+    def close(self):
+        self._text.flush()
+        self._text.detach()
+
+
+class JsonLinesExportWriter(_ExportWriter):
+    """كاتب JSON Lines: كائن واحد لكل سطر (مع اسم القسم عند تعدد الأقسام)"""
+
+    extension = 'jsonl'
+
+    def __init__(self, stream: BinaryIO, tag_sections: bool = False):
+        self._text = io.TextIOWrapper(stream, encoding='utf-8', newline='\n')
+        self._tag_sections = tag_sections
+        self._section: Optional[str] = None
+        self._columns: List[str] = []
+
+    def begin_section(self, name: str, columns: Sequence[str]):
+        self._section = name
+        self._columns = list(columns)
+
+    def write_rows(self, rows: Iterable[Sequence[Any]]):
+        columns = self._columns
+        write = self._text.write
+        for row in rows:
+            record = dict(zip(columns, row))
+            if self._tag_sections:
+                record = {'section': self._section, **record}
+            write(json.dumps(record, ensure_ascii=False, default=_json_default))
+            write('\n')
+
+    def close(self):
+        self._text.flush()
+        self._text.detach()
+
+
+class XlsxExportWriter(_ExportWriter):
+    """كاتب XLSX متدفق: ورقة لكل قسم (تُقسم تلقائياً عند تجاوز حد الصفوف)"""
+
+    extension = 'xlsx'
+
+    def __init__(self, stream: BinaryIO):
+        self._zip = zipfile.ZipFile(stream, 'w', zipfile.ZIP_DEFLATED)
+        self._sheets: List[str] = []
+        self._sheet: Optional[io.TextIOWrapper] = None
+        self._section = ''
+        self._header: List[str] = []
+        self._rows = 0
+
+    def begin_section(self, name: str, columns: Sequence[str]):
+        self._section = name
+        self._header = [str(column) for column in columns]
+        self._open_sheet(name)
+
+    def _sheet_title(self, name: str) -> str:
+        """اسم ورقة صالح (31 حرفاً دون رموز محظورة) وغير مكرر"""
+        base = _SHEET_NAME_ILLEGAL.sub('_', str(name)).strip("'")[:31] or 'Sheet'
+        title, counter = base, 2
+        existing = {sheet.lower() for sheet in self._sheets}
+        while title.lower() in existing:
+            suffix = f" ({counter})"
+            title = base[:31 - len(suffix)] + suffix
+            counter += 1
+        return title
+
+    def _open_sheet(self, name: str):
+        self._close_sheet()
+        self._sheets.append(self._sheet_title(name))
+        entry = self._zip.open(f"xl/worksheets/sheet{len(self._sheets)}.xml", 'w', force_zip64=True)
+        self._sheet = io.TextIOWrapper(entry, encoding='utf-8')
+        self._sheet.write(
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+            '<sheetData>'
+        )
+        self._rows = 0
+        self._write_row(self._header, bold=True)
+
+    def _close_sheet(self):
+        if self._sheet is not None:
+            self._sheet.write('</sheetData></worksheet>')
+            self._sheet.close()
+            self._sheet = None
+
+    @staticmethod
+    def _cell(value: Any, style: str) -> str:
+        if value is None or value == '':
+            return ''
+        if isinstance(value, bool):
+            return f'<c t="b"{style}><v>{int(value)}</v></c>'
+        if isinstance(value, (int, float, Decimal)) and math.isfinite(value):
+            return f'<c{style}><v>{value}</v></c>'
+        if isinstance(value, bytes):
+            value = value.hex()
+        text = escape(_XML_ILLEGAL.sub('', str(value)))
+        return f'<c t="inlineStr"{style}><is><t xml:space="preserve">{text}</t></is></c>'
+
+    def _write_row(self, row: Sequence[Any], bold: bool = False):
+        style = ' s="1"' if bold else ''
+        self._rows += 1
+        cell = self._cell
+        self._sheet.write(f'<row r="{self._rows}">{"".join(cell(value, style) for value in row)}</row>')
+
+    def write_rows(self, rows: Iterable[Sequence[Any]]):
+        for row in rows:
+            if self._rows >= XLSX_MAX_ROWS:
+                self._open_sheet(self._section)
+            self._write_row(row)
+
+    def abort(self):
+        try:
+            self._close_sheet()
+        finally:
+            self._zip.close()
+
+    def close(self):
+        self._close_sheet()
+        if not self._sheets:
+            self.begin_section('Sheet', [])
+            self._close_sheet()
+
+        sheets = self._sheets
+        self._zip.writestr('[Content_Types].xml', (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/xl/workbook.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+            '<Override PartName="/xl/styles.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+            + ''.join(
+                f'<Override PartName="/xl/worksheets/sheet{index}.xml" '
+                'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+                for index in range(1, len(sheets) + 1)
+            ) +
+            '</Types>'
+        ))
+        self._zip.writestr('_rels/.rels', (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            '<Relationship Id="rId1" '
+            'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+            'Target="xl/workbook.xml"/>'
+            '</Relationships>'
+        ))
+        self._zip.writestr('xl/workbook.xml', (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+            'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+            '<sheets>'
+            + ''.join(
+                f'<sheet name="{escape(title, {chr(34): "&quot;"})}" sheetId="{index}" r:id="rId{index}"/>'
+                for index, title in enumerate(sheets, 1)
+            ) +
+            '</sheets></workbook>'
+        ))
+        self._zip.writestr('xl/_rels/workbook.xml.rels', (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            + ''.join(
+                f'<Relationship Id="rId{index}" '
+                'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+                f'Target="worksheets/sheet{index}.xml"/>'
+                for index in range(1, len(sheets) + 1)
+            ) +
+            f'<Relationship Id="rId{len(sheets) + 1}" '
+            'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+            'Target="styles.xml"/>'
+            '</Relationships>'
+        ))
+        self._zip.writestr('xl/styles.xml', (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+            '<fonts count="2"><font><sz val="11"/><name val="Arial"/></font>'
+            '<font><b/><sz val="11"/><name val="Arial"/></font></fonts>'
+            '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+            '<fill><patternFill patternType="gray125"/></fill></fills>'
+            '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+            '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+            '<cellXfs count="2"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+            '<xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/></cellXfs>'
+            '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+            '</styleSheet>'
+        ))
+        self._zip.close()
+
+
+def create_writer(export_format: str, stream: BinaryIO, tag_sections: bool = False):
+    """إنشاء كاتب للصيغة المطلوبة فوق تدفق ثنائي مفتوح"""
+    if export_format == 'csv':
+        return CsvExportWriter(stream)
+    if export_format == 'jsonl':
+        return JsonLinesExportWriter(stream, tag_sections)
+    if export_format == 'xlsx':
+        return XlsxExportWriter(stream)
+    raise ValueError(f"صيغة تصدير غير مدعومة: {export_format}")
@@ -189,6 +189,38 @@ def setup_audit_logger() -> logging.Logger:
     return audit_logger
 
 
+def setup_slow_query_logger() -> logging.Logger:
+    """إعداد مسجل الاستعلامات البطيئة"""
+    slow_logger = get_logger('slow_queries')
+    
+    logs_dir = Path("logs")
+    logs_dir.mkdir(exist_ok=True)
+    slow_log_file = logs_dir / "slow_queries.log"
+    
+    # تجنب إضافة معالجات متعددة
+    if not any(isinstance(h, logging.handlers.RotatingFileHandler) 
+               and h.baseFilename == str(slow_log_file.absolute()) 
+               for h in slow_logger.handlers):
+        
+        slow_handler = logging.handlers.RotatingFileHandler(
+            slow_log_file,
+            maxBytes=5*1024*1024,  # 5MB
+            backupCount=3,
+            encoding='utf-8'
+        )
+        
+        slow_formatter = logging.Formatter(
+            fmt='%(asctime)s - SLOW - %(message)s',
+            datefmt='%Y-%m-%d %H:%M:%S'
+        )
+        
+        slow_handler.setFormatter(slow_formatter)
+        slow_handler.setLevel(logging.WARNING)
+        slow_logger.addHandler(slow_handler)
+    
+    return slow_logger
+
+
 def log_user_activity(user_id: int, action: str, details: str = ""):
     """
     تسجيل نشاط المستخدم
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+قياس أداء سجل النشاط - Audit Log Benchmark
+
+يقارن زمن استدعاء تسجيل حدث واحد من وجهة نظر المستدعي (مثل إتمام بيع):
+    before  INSERT مع commit لكل حدث (الطريقة القديمة)
+    after   وضع الحدث في طابور AuditWriter (الكتابة على دفعات في الخلفية)
+ثم يطبع الزمن الكلي حتى تُكتب كل الأحداث فعلياً في الحالتين.
+
+الاستخدام:
+    python benchmarks/audit_bench.py [عدد_الأحداث]
+"""
+
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.models.audit_writer import AuditWriter
+from app.models.database import DatabaseManager
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return (statistics.median(samples) * 1000,
+            samples[int(len(samples) * 0.99) - 1] * 1000,
+            samples[-1] * 1000)
+
+
+def run(label: str, log, finish, events_count: int):
+    samples = []
+    started = time.perf_counter()
+    for n in range(events_count):
+        call_started = time.perf_counter()
+        log(1, 'create_sale', 'sales', n, f"فاتورة رقم {n}")
+        samples.append(time.perf_counter() - call_started)
+    finish()
+    total = time.perf_counter() - started
+    p50, p99, worst = percentiles(samples)
+    print(f"{label:<8} p50={p50:7.3f}ms  p99={p99:7.3f}ms  max={worst:7.2f}ms  "
+          f"total={total:6.2f}s")
+
+
+def main():
+    events_count = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+
+    workdir = tempfile.mkdtemp(prefix="audit_bench_")
+    os.chdir(workdir)
+
+    db = DatabaseManager()
+    db.initialize_database()
+    print(f"{events_count:,} حدث — {workdir}")
+
+    def legacy_log(user_id, action, table_name, record_id, notes):
+        db.execute_insert("""
+            INSERT INTO audit_logs (user_id, action, table_name, record_id, new_values)
+            VALUES (?, ?, ?, ?, ?)
+        """, (user_id, action, table_name, record_id, notes))
+
+    writer = AuditWriter.for_db(db)
+    run("before", legacy_log, lambda: None, events_count)
+    run("after", writer.log, writer.shutdown, events_count)
+
+    written = db.execute_query("SELECT COUNT(*) FROM audit_logs")[0][0]
+    print(f"audit_logs: {written:,} صف، {writer.get_stats()}")
+
+    DatabaseManager.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+قياس أداء إتمام البيع - Checkout Benchmark
+
+يقارن مسار البيع القديم (تثبيت لكل عبارة) بالمسار الذري الحالي
+(معاملة واحدة مع executemany) من حيث عدد عمليات التثبيت لكل فاتورة
+وزمن الاستجابة p50/p99.
+
+الاستخدام:
+    python benchmarks/checkout_bench.py [عدد_الفواتير] [عدد_البنود]
+"""
+
+import os
+import sys
+import random
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.models.database import DatabaseManager
+from app.services.auth_service import AuthService
+from app.services.pos_service import POSService
+
+
+class CommitCounter:
+    """عداد عبارات COMMIT المنفذة على اتصال الخيط الحالي"""
+
+    def __init__(self, db: DatabaseManager):
+        self.count = 0
+        db.get_connection().set_trace_callback(self._trace)
+
+    def _trace(self, statement: str):
+        if statement.strip().upper().startswith("COMMIT"):
+            self.count += 1
+
+
+def legacy_create_sale(db: DatabaseManager, items, user_id):
+    """إعادة إنتاج مسار البيع القديم: كل عبارة في اتصال وتثبيت مستقلين"""
+    for item in items:
+        db.execute_query(
+            "SELECT id, name, selling_price, quantity_in_stock, is_active "
+            "FROM products WHERE id = ? AND is_active = 1",
+            (item['product_id'],)
+        )
+
+    total_amount = sum(item['quantity'] * item['price'] for item in items)
+    tax_rate = float(db.get_setting('tax_rate') or 0) / 100
+    tax_amount = total_amount * tax_rate
+    sale_id = db.execute_insert("""
+        INSERT INTO sales (customer_id, total_amount, discount_amount, tax_amount,
+                           final_amount, payment_method, notes, user_id)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    """, (None, total_amount, 0, tax_amount, total_amount + tax_amount,
+          'cash', '', user_id))
+
+    for item in items:
+        db.execute_insert("""
+            INSERT INTO sale_items (sale_id, product_id, quantity, unit_price, total_amount)
+            VALUES (?, ?, ?, ?, ?)
+        """, (sale_id, item['product_id'], item['quantity'], item['price'],
+              item['quantity'] * item['price']))
+        db.execute_update("""
+            UPDATE products SET quantity_in_stock = quantity_in_stock + ?,
+                   updated_at = CURRENT_TIMESTAMP WHERE id = ?
+        """, (-item['quantity'], item['product_id']))
+        db.execute_insert("""
+            INSERT INTO stock_movements (product_id, movement_type, quantity,
+                                         reference_id, reference_type, user_id)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, (item['product_id'], 'out', item['quantity'], sale_id, 'sale', user_id))
+
+    db.execute_insert("""
+        INSERT INTO audit_logs (user_id, action, table_name, record_id, new_values)
+        VALUES (?, ?, ?, ?, ?)
+    """, (user_id, 'create_sale', 'sales', sale_id, ''))
+    return sale_id
+
+
+def percentile(samples, pct):
+    """حساب المئين من عينات مرتبة"""
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def run(label, checkout, db, sales_count, lines_per_sale, product_ids):
+    """تشغيل سيناريو وطباعة النتائج"""
+    counter = CommitCounter(db)
+    latencies = []
+    for _ in range(sales_count):
+        items = [{'product_id': pid, 'quantity': 1, 'price': 10.0}
+                 for pid in random.sample(product_ids, lines_per_sale)]
+        started = time.perf_counter()
+        checkout(items)
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    print(f"{label:<8} commits/sale={counter.count / sales_count:6.1f}  "
+          f"p50={percentile(latencies, 50):7.2f}ms  "
+          f"p99={percentile(latencies, 99):7.2f}ms")
+
+
+def main():
+    sales_count = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    lines_per_sale = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+
+    workdir = tempfile.mkdtemp(prefix="checkout_bench_")
+    os.chdir(workdir)
+
+    db = DatabaseManager()
+    db.initialize_database()
+    db.execute_many(
+        "INSERT INTO products (name, barcode, selling_price, quantity_in_stock) "
+        "VALUES (?, ?, ?, ?)",
+        [(f"منتج {i}", f"{i:013d}", 10.0, 1_000_000) for i in range(500)]
+    )
+    product_ids = [row['id'] for row in db.execute_query("SELECT id FROM products")]
+
+    auth_service = AuthService()
+    auth_service._current_user = {'id': 1, 'username': 'admin', 'role': 'Admin'}
+    pos_service = POSService(auth_service)
+
+    print(f"{sales_count} فاتورة × {lines_per_sale} بنود — {workdir}")
+    run("before", lambda items: legacy_create_sale(db, items, 1),
+        db, sales_count, lines_per_sale, product_ids)
+    run("after", lambda items: pos_service.create_sale(items, 'cash'),
+        db, sales_count, lines_per_sale, product_ids)
+
+    DatabaseManager.shutdown()
+
+
+if __name__ == "__main__":
+    main()
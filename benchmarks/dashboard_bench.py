@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+قياس أداء لوحة التحكم - Dashboard Benchmark
+
+يقارن زمن تحديث لوحة التحكم على قاعدة بيانات اصطناعية:
+    before     استدعاءات الخدمات القديمة (ملخص المبيعات والصيانة، قائمة المخزون
+               المنخفض مرتين، تذاكر قيد العمل، آخر المبيعات وآخر التذاكر)
+    snapshot   DashboardService.snapshot(force=True) (معاملة قراءة واحدة بأعداد COUNT)
+    unchanged  snapshot() دون تغيير في البيانات (فحص data_version فقط)
+    audit-only snapshot() بعد كتابة في سجل النشاط فقط (فحص عدادات التغيير)
+
+الاستخدام:
+    python benchmarks/dashboard_bench.py [عدد_الفواتير] [عدد_المنتجات] [عدد_التذاكر]
+"""
+
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.models.database import DatabaseManager
+from app.models.sales_rollup import SalesRollup
+from app.services.dashboard_service import DashboardService
+from app.services.inventory_service import InventoryService
+from app.services.pos_service import POSService
+from app.services.repair_service import RepairService
+from report_bench import build_database, compare
+
+
+def build_repairs(db: DatabaseManager, tickets_count: int, days: int):
+    """تذاكر صيانة موزعة على الفترة بحالات مختلفة"""
+    with db.transaction() as conn:
+        conn.execute("""
+            WITH RECURSIVE seq(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM seq WHERE n < :count)
+            INSERT INTO repair_tickets (device_info, problem_description, repair_type,
+                                        estimated_cost, status, received_date)
+            SELECT 'جهاز ' || n, 'عطل', 'hardware', 100 + n % 300,
+                   CASE n % 4 WHEN 0 THEN 'received' WHEN 1 THEN 'in_progress'
+                              WHEN 2 THEN 'completed' ELSE 'delivered' END,
+                   datetime('now', '-' || :days || ' days',
+                            '+' || (n * (:days * 86400 / :count)) || ' seconds')
+            FROM seq
+        """, {'count': tickets_count, 'days': days})
+
+
+def legacy_refresh(pos_service: POSService, repair_service: RepairService,
+                   inventory_service: InventoryService):
+    """استدعاءات Dashboard.refresh_data قبل اللقطة الموحدة"""
+    today = date.today()
+    pos_service.get_daily_sales_summary(today.isoformat())
+    repair_service.get_repair_summary(today.isoformat(), today.isoformat())
+    len(inventory_service.get_low_stock_products())
+    len(inventory_service.get_low_stock_products())
+    repair_service.get_repair_tickets(status='in_progress',
+                                      start_date=(today - timedelta(days=7)).isoformat(),
+                                      end_date=today.isoformat())
+    pos_service.get_recent_sales(5)
+    repair_service.get_repair_tickets(limit=5)
+
+
+def main():
+    sales_count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    products_count = int(sys.argv[2]) if len(sys.argv) > 2 else 20_000
+    tickets_count = int(sys.argv[3]) if len(sys.argv) > 3 else 50_000
+    days = 365
+
+    workdir = tempfile.mkdtemp(prefix="dashboard_bench_")
+    os.chdir(workdir)
+
+    db = DatabaseManager()
+    db.initialize_database()
+    build_database(db, sales_count, products_count, days)
+    build_repairs(db, tickets_count, days)
+    SalesRollup(db).rebuild()
+    print(f"{sales_count:,} فاتورة، {products_count:,} منتج، {tickets_count:,} تذكرة — {workdir}")
+
+    pos_service, repair_service, inventory_service = POSService(), RepairService(), InventoryService()
+    dashboard_service = DashboardService()
+
+    compare("refresh", lambda: legacy_refresh(pos_service, repair_service, inventory_service),
+            lambda: dashboard_service.snapshot(force=True))
+    compare("refresh (unchanged)", lambda: legacy_refresh(pos_service, repair_service, inventory_service),
+            dashboard_service.snapshot)
+
+    # كتابة من خيط آخر (اتصال آخر) في جدول لا تقرأ منه اللوحة: يتغير data_version فقط
+    samples = []
+    for _ in range(5):
+        writer = threading.Thread(target=lambda: db.execute_insert(
+            "INSERT INTO audit_logs (user_id, action) VALUES (1, 'bench')"))
+        writer.start()
+        writer.join()
+        started = time.perf_counter()
+        skipped = dashboard_service.snapshot() is None
+        samples.append((time.perf_counter() - started) * 1000)
+    print(f"{'refresh (audit only)':<22} after={statistics.median(samples):8.2f}ms  skipped={skipped}")
+
+    snapshot = dashboard_service.snapshot(force=True)
+    print(f"snapshot: { {key: value for key, value in snapshot.items() if key != 'recent_activities'} }")
+
+    DatabaseManager.shutdown()
+
+
+if __name__ == "__main__":
+    main()
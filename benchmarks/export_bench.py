@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+قياس أداء التصدير - Export Benchmark
+
+يبني جدول stock_movements اصطناعياً (افتراضياً 5 ملايين حركة) ثم يصدره
+بصيغ CSV و JSON Lines و XLSX ويطبع الزمن وحجم الملف وأقصى استهلاك للذاكرة
+(RSS) قبل التصدير وبعده: التصدير المتدفق يجب ألا يرفع الذاكرة مع عدد الصفوف.
+
+الاستخدام:
+    python benchmarks/export_bench.py [عدد_الحركات]
+"""
+
+import os
+import resource
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.models.database import DatabaseManager
+from app.services.export_service import ExportService
+
+
+def peak_rss_mb() -> float:
+    """أقصى RSS للعملية حتى الآن بالميغابايت (ru_maxrss بالكيلوبايت على لينكس)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def build_database(db: DatabaseManager, movements_count: int):
+    """تعبئة المنتجات وحركات المخزون بعبارات SQL مجمعة"""
+    with db.transaction() as conn:
+        conn.execute("""
+            WITH RECURSIVE seq(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM seq WHERE n < 1000)
+            INSERT INTO products (name, barcode, cost_price, selling_price, quantity_in_stock)
+            SELECT 'منتج ' || n, printf('%013d', n), 10, 15, 100 FROM seq
+        """)
+        conn.execute("""
+            WITH RECURSIVE seq(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM seq WHERE n < ?)
+            INSERT INTO stock_movements (product_id, movement_type, quantity, reference_id,
+                                         reference_type, notes)
+            SELECT 1 + n % 1000, CASE n % 3 WHEN 0 THEN 'in' ELSE 'out' END, 1 + n % 5, n,
+                   'sale', 'حركة رقم ' || n
+            FROM seq
+        """, (movements_count,))
+
+
+def main():
+    movements_count = int(sys.argv[1]) if len(sys.argv) > 1 else 5_000_000
+
+    workdir = tempfile.mkdtemp(prefix="export_bench_")
+    os.chdir(workdir)
+
+    db = DatabaseManager()
+    db.initialize_database()
+
+    started = time.perf_counter()
+    build_database(db, movements_count)
+    print(f"{movements_count:,} حركة — {workdir} ({time.perf_counter() - started:.1f}s)")
+
+    exporter = ExportService(db)
+    for export_format in ('csv', 'jsonl', 'xlsx'):
+        output = Path(workdir) / f"stock_movements.{export_format}"
+        rss_before = peak_rss_mb()
+        started = time.perf_counter()
+        exporter.export_query(str(output), export_format, "SELECT * FROM stock_movements",
+                              section='stock_movements')
+        elapsed = time.perf_counter() - started
+        print(f"{export_format:<6} {elapsed:7.1f}s  {output.stat().st_size / 1e6:8.1f} MB  "
+              f"peak RSS {rss_before:6.1f} -> {peak_rss_mb():6.1f} MB")
+        output.unlink()
+
+    DatabaseManager.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+قياس زمن تسجيل الدخول - Login Benchmark
+
+يقيس لكل تكلفة bcrypt زمن التشفير (إنشاء مستخدم أو تغيير كلمة المرور)
+وزمن تسجيل الدخول الكامل عبر User.authenticate، ثم زمن أول دخول بعد تغيير
+التكلفة (تحقق بالتكلفة القديمة مع إعادة تشفير بالجديدة). شغّله على جهاز
+نقطة البيع نفسه واختر أعلى تكلفة يبقى زمن دخولها مقبولاً
+(SECURITY_CONFIG['bcrypt_rounds']).
+
+الاستخدام:
+    python benchmarks/login_bench.py [أقل_تكلفة] [أعلى_تكلفة]
+"""
+
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.models.database import DatabaseManager
+from app.models.user import User, hash_password, password_rounds
+from config.settings import SECURITY_CONFIG
+
+REPEATS = 5
+PASSWORD = "till-password-123"
+
+
+def measure(func) -> float:
+    """الوسيط بالميلي ثانية لعدة تشغيلات"""
+    samples = []
+    for _ in range(REPEATS):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    min_rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    max_rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 14
+
+    workdir = tempfile.mkdtemp(prefix="login_bench_")
+    os.chdir(workdir)
+
+    db = DatabaseManager()
+    db.initialize_database()
+    users = User(db)
+    configured = SECURITY_CONFIG.get('bcrypt_rounds', 12)
+    print(f"bcrypt_rounds الحالية: {configured} — {workdir}")
+
+    for rounds in range(min_rounds, max_rounds + 1):
+        SECURITY_CONFIG['bcrypt_rounds'] = rounds
+        username = f"bench_{rounds}"
+        users.create_user(username, PASSWORD, username)
+
+        hash_ms = measure(lambda: hash_password(PASSWORD))
+        login_ms = measure(lambda: users.authenticate(username, PASSWORD))
+
+        # أول دخول بعد رفع التكلفة درجة: تحقق بالقديمة ثم إعادة تشفير بالجديدة
+        SECURITY_CONFIG['bcrypt_rounds'] = rounds + 1
+        started = time.perf_counter()
+        users.authenticate(username, PASSWORD)
+        rehash_ms = (time.perf_counter() - started) * 1000
+        stored = db.execute_query("SELECT password_hash FROM users WHERE username = ?", (username,))
+        marker = " *" if rounds == configured else ""
+
+        print(f"rounds={rounds:<3} hash={hash_ms:9.1f}ms  login={login_ms:9.1f}ms  "
+              f"login+rehash={rehash_ms:9.1f}ms  (stored cost -> {password_rounds(stored[0][0])}){marker}")
+
+    DatabaseManager.shutdown()
+
+
+if __name__ == "__main__":
+    main()
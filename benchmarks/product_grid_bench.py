@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+قياس أداء جدول المنتجات - Product Grid Benchmark
+
+يقارن التعبئة القديمة (QTableWidgetItem لكل خلية وQPushButton لكل صف)
+بالنموذج الافتراضي (ProductTableModel + مفوض الأزرار) من حيث زمن التحديث
+والذاكرة المقيمة RSS عند 1k و10k و100k صف. كل قياس يعمل في عملية مستقلة
+حتى لا تختلط أرقام الذاكرة.
+
+الاستخدام:
+    QT_QPA_PLATFORM=offscreen python benchmarks/product_grid_bench.py [أحجام...]
+"""
+
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+
+
+def current_rss_mb() -> float:
+    """الذاكرة المقيمة الحالية بالميجابايت"""
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def make_products(count: int):
+    """منتجات وهمية بنفس شكل get_all_products"""
+    return [
+        {
+            'id': i, 'name': f"منتج تجريبي {i}", 'category_name': "إكسسوارات",
+            'barcode': f"{600000000000 + i}", 'cost_price': 10.0 + i % 50,
+            'selling_price': 15.0 + i % 50, 'quantity_in_stock': i % 20,
+            'minimum_stock': 5,
+        }
+        for i in range(1, count + 1)
+    ]
+
+
+def legacy_fill(table, products):
+    """إعادة إنتاج display_products القديمة في نافذة نقاط البيع"""
+    from PySide6.QtCore import Qt
+    from PySide6.QtGui import QColor
+    from PySide6.QtWidgets import QPushButton, QTableWidgetItem
+
+    table.setRowCount(len(products))
+    for row, product in enumerate(products):
+        table.setItem(row, 0, QTableWidgetItem(product['name']))
+        table.setItem(row, 1, QTableWidgetItem(product.get('category_name', 'غير مصنف')))
+
+        price_item = QTableWidgetItem(f"{product['selling_price']:.2f}")
+        price_item.setTextAlignment(Qt.AlignCenter)
+        table.setItem(row, 2, price_item)
+
+        stock_item = QTableWidgetItem(str(product['quantity_in_stock']))
+        stock_item.setTextAlignment(Qt.AlignCenter)
+        if product['quantity_in_stock'] == 0:
+            stock_item.setBackground(QColor("#e74c3c"))
+            stock_item.setForeground(QColor("white"))
+        elif product['quantity_in_stock'] <= product['minimum_stock']:
+            stock_item.setBackground(QColor("#f39c12"))
+            stock_item.setForeground(QColor("white"))
+        table.setItem(row, 3, stock_item)
+
+        add_button = QPushButton("إضافة")
+        add_button.setEnabled(product['quantity_in_stock'] > 0)
+        add_button.clicked.connect(lambda checked, p=product: None)
+        table.setCellWidget(row, 4, add_button)
+
+
+def run_child(mode: str, count: int):
+    """قياس نمط واحد بحجم واحد وطباعة النتيجة كسطر واحد"""
+    from PySide6.QtWidgets import QApplication, QTableView, QTableWidget, QHeaderView
+    from app.ui.product_table_model import (ProductTableModel, ProductFilterProxyModel,
+                                            ActionButtonDelegate, POS_PRODUCT_COLUMNS)
+
+    app = QApplication.instance() or QApplication([])
+    products = make_products(count)
+    rss_before = current_rss_mb()
+
+    if mode == "legacy":
+        view = QTableWidget()
+        view.setColumnCount(5)
+        view.resize(1000, 700)
+        view.show()
+        start = time.perf_counter()
+        legacy_fill(view, products)
+        app.processEvents()
+        refresh_ms = (time.perf_counter() - start) * 1000
+    else:
+        model = ProductTableModel(POS_PRODUCT_COLUMNS)
+        proxy = ProductFilterProxyModel()
+        proxy.setSourceModel(model)
+        view = QTableView()
+        view.setModel(proxy)
+        view.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        view.setItemDelegateForColumn(
+            len(POS_PRODUCT_COLUMNS) - 1,
+            ActionButtonDelegate([('add', "إضافة", "#3498db")], parent=view)
+        )
+        view.resize(1000, 700)
+        view.show()
+        start = time.perf_counter()
+        model.set_products(products)
+        app.processEvents()
+        refresh_ms = (time.perf_counter() - start) * 1000
+
+    rss_delta = current_rss_mb() - rss_before
+    print(f"{refresh_ms:.1f} {rss_delta:.1f}")
+
+
+def main():
+    if len(sys.argv) == 4 and sys.argv[1] == "--child":
+        run_child(sys.argv[2], int(sys.argv[3]))
+        return
+
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+    env = dict(os.environ)
+    env.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+    print(f"{'الصفوف':>8} | {'النمط':>8} | {'التحديث (ms)':>12} | {'RSS (MB)':>9}")
+    for count in sizes:
+        for mode in ("legacy", "model"):
+            output = subprocess.run(
+                [sys.executable, __file__, "--child", mode, str(count)],
+                capture_output=True, text=True, env=env, check=True
+            ).stdout.split()
+            refresh_ms, rss_mb = output[-2], output[-1]
+            print(f"{count:>8} | {mode:>8} | {refresh_ms:>12} | {rss_mb:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+قياس أداء التقارير - Reports Benchmark
+
+يبني قاعدة بيانات اصطناعية (افتراضياً مليون فاتورة على مدى سنة وبندين لكل
+فاتورة) ثم يقارن الزمن الفعلي لتقرير المبيعات وتقرير المخزون وملخص المخزون:
+    before  الاستعلامات المنفصلة القديمة (مسح sales/products لكل قسم)
+    after   الاستعلام الموحد الحالي (مسح واحد لكل جدول)
+
+الاستخدام:
+    python benchmarks/report_bench.py [عدد_الفواتير] [عدد_المنتجات]
+"""
+
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.models.database import DatabaseManager
+from app.models.sales_rollup import SalesRollup
+from app.services.inventory_service import InventoryService
+from app.services.report_service import ReportService
+from app.utils.date_range import day_range, local_day
+
+REPEATS = 5
+
+
+def build_database(db: DatabaseManager, sales_count: int, products_count: int, days: int):
+    """تعبئة المنتجات والفواتير والبنود بعبارات SQL مجمعة"""
+    with db.transaction() as conn:
+        conn.execute("""
+            WITH RECURSIVE seq(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM seq WHERE n < ?)
+            INSERT INTO products (name, barcode, category_id, cost_price, selling_price,
+                                  quantity_in_stock, minimum_stock)
+            SELECT 'منتج ' || n, printf('%013d', n),
+                   1 + n % (SELECT COUNT(*) FROM categories), 10 + n % 90,
+                   15 + n % 120, n % 40, 5
+            FROM seq
+        """, (products_count,))
+
+        conn.execute("""
+            WITH RECURSIVE seq(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM seq WHERE n < :count)
+            INSERT INTO sales (total_amount, discount_amount, tax_amount, final_amount,
+                               payment_method, status, user_id, created_at)
+            SELECT 100 + n % 400, n % 7, (100 + n % 400) * 0.15,
+                   (100 + n % 400) * 1.15 - n % 7,
+                   CASE n % 4 WHEN 0 THEN 'cash' WHEN 1 THEN 'card'
+                              WHEN 2 THEN 'vodafone_cash' ELSE 'insta_pay' END,
+                   CASE WHEN n % 50 = 0 THEN 'void' ELSE 'completed' END,
+                   1,
+                   datetime('now', '-' || :days || ' days',
+                            '+' || (n * (:days * 86400 / :count)) || ' seconds')
+            FROM seq
+        """, {'count': sales_count, 'days': days})
+
+        conn.execute("""
+            INSERT INTO sale_items (sale_id, product_id, quantity, unit_price,
+                                    total_amount, unit_cost)
+            SELECT s.id, 1 + (s.id * 7 + k.k) % :products, 1 + k.k, 50, 50 * (1 + k.k), 30
+            FROM sales s, (SELECT 0 AS k UNION ALL SELECT 1) k
+        """, {'products': products_count})
+
+
+def legacy_sales_report(db: DatabaseManager, start_date: str, end_date: str):
+    """تقرير المبيعات القديم: أربعة استعلامات منفصلة على الجداول الخام"""
+    range_start, range_end = day_range(start_date, end_date)
+    params = (range_start, range_end)
+    db.execute_query("""
+        SELECT COUNT(*), SUM(final_amount), SUM(discount_amount), SUM(tax_amount),
+               AVG(final_amount)
+        FROM sales WHERE created_at >= ? AND created_at < ? AND status = 'completed'
+    """, params)
+    db.execute_query("""
+        SELECT payment_method, COUNT(*), SUM(final_amount) as total_amount
+        FROM sales WHERE created_at >= ? AND created_at < ? AND status = 'completed'
+        GROUP BY payment_method ORDER BY total_amount DESC
+    """, params)
+    db.execute_query(f"""
+        SELECT {local_day('created_at')} as period, COUNT(*), SUM(final_amount),
+               SUM(discount_amount)
+        FROM sales WHERE created_at >= ? AND created_at < ? AND status = 'completed'
+        GROUP BY {local_day('created_at')} ORDER BY period
+    """, params)
+    db.execute_query("""
+        SELECT p.name, SUM(si.quantity) as total_sold, SUM(si.total_amount),
+               AVG(si.unit_price)
+        FROM sale_items si
+        JOIN sales s ON si.sale_id = s.id
+        JOIN products p ON si.product_id = p.id
+        WHERE s.created_at >= ? AND s.created_at < ? AND s.status = 'completed'
+        GROUP BY p.id, p.name ORDER BY total_sold DESC LIMIT 10
+    """, params)
+
+
+def legacy_inventory_report(db: DatabaseManager):
+    """تقرير المخزون القديم: أربعة استعلامات منفصلة على المنتجات"""
+    db.execute_query("""
+        SELECT COUNT(*), SUM(quantity_in_stock), SUM(quantity_in_stock * cost_price),
+               SUM(quantity_in_stock * selling_price),
+               COUNT(CASE WHEN quantity_in_stock <= minimum_stock THEN 1 END),
+               COUNT(CASE WHEN quantity_in_stock = 0 THEN 1 END)
+        FROM products WHERE is_active = 1
+    """)
+    db.execute_query("""
+        SELECT p.name, p.quantity_in_stock, p.minimum_stock, c.name, p.selling_price
+        FROM products p LEFT JOIN categories c ON p.category_id = c.id
+        WHERE p.is_active = 1 AND p.quantity_in_stock <= p.minimum_stock
+        ORDER BY p.quantity_in_stock ASC
+    """)
+    db.execute_query("""
+        SELECT COALESCE(c.name, 'غير مصنف'), COUNT(p.id), SUM(p.quantity_in_stock),
+               SUM(p.quantity_in_stock * p.cost_price),
+               SUM(p.quantity_in_stock * p.selling_price) as total_selling_value
+        FROM products p LEFT JOIN categories c ON p.category_id = c.id
+        WHERE p.is_active = 1 GROUP BY c.id, c.name ORDER BY total_selling_value DESC
+    """)
+    db.execute_query("""
+        SELECT name, quantity_in_stock, cost_price, selling_price,
+               quantity_in_stock * selling_price as total_value
+        FROM products WHERE is_active = 1 AND quantity_in_stock > 0
+        ORDER BY total_value DESC LIMIT 10
+    """)
+
+
+def legacy_inventory_summary(db: DatabaseManager):
+    """ملخص المخزون القديم: أربعة استعلامات COUNT/SUM"""
+    db.execute_query("SELECT COUNT(*) FROM products WHERE is_active = 1")
+    db.execute_query("""
+        SELECT SUM(quantity_in_stock * cost_price), SUM(quantity_in_stock * selling_price)
+        FROM products WHERE is_active = 1
+    """)
+    db.execute_query("""
+        SELECT COUNT(*) FROM products WHERE is_active = 1 AND quantity_in_stock <= minimum_stock
+    """)
+    db.execute_query("SELECT COUNT(*) FROM products WHERE is_active = 1 AND quantity_in_stock = 0")
+
+
+def measure(func) -> float:
+    """الوسيط بالميلي ثانية لعدة تشغيلات بعد تشغيل إحماء"""
+    func()
+    samples = []
+    for _ in range(REPEATS):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def compare(label: str, before, after):
+    before_ms = measure(before)
+    after_ms = measure(after)
+    print(f"{label:<22} before={before_ms:10.1f}ms  after={after_ms:8.1f}ms  "
+          f"x{before_ms / max(after_ms, 0.001):,.0f}")
+
+
+def main():
+    sales_count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    products_count = int(sys.argv[2]) if len(sys.argv) > 2 else 5_000
+    days = 365
+
+    workdir = tempfile.mkdtemp(prefix="report_bench_")
+    os.chdir(workdir)
+
+    db = DatabaseManager()
+    db.initialize_database()
+
+    started = time.perf_counter()
+    build_database(db, sales_count, products_count, days)
+    print(f"{sales_count:,} فاتورة، {products_count:,} منتج — {workdir} "
+          f"({time.perf_counter() - started:.1f}s)")
+
+    started = time.perf_counter()
+    SalesRollup(db).rebuild()
+    print(f"{'rollup rebuild':<22} {(time.perf_counter() - started) * 1000:10.1f}ms")
+
+    report_service = ReportService()
+    inventory_service = InventoryService()
+    end_date = date.today().isoformat()
+    start_date = (date.today() - timedelta(days=days)).isoformat()
+    month_start = (date.today() - timedelta(days=30)).isoformat()
+
+    compare("sales report (year)",
+            lambda: legacy_sales_report(db, start_date, end_date),
+            lambda: report_service.get_sales_report(start_date, end_date))
+    compare("sales report (month)",
+            lambda: legacy_sales_report(db, month_start, end_date),
+            lambda: report_service.get_sales_report(month_start, end_date))
+    compare("inventory report",
+            lambda: legacy_inventory_report(db),
+            report_service.get_inventory_report)
+    compare("inventory summary",
+            lambda: legacy_inventory_summary(db),
+            inventory_service.get_inventory_summary)
+
+    DatabaseManager.shutdown()
+
+
+if __name__ == "__main__":
+    main()
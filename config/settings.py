@@ -26,7 +26,32 @@ DATABASE_CONFIG = {
     'backup_path': BASE_DIR / 'backup',
     'backup_retention_days': 30,
     'auto_backup_enabled': True,
-    'auto_backup_interval_hours': 24
+    'auto_backup_interval_hours': 24,
+    # إعدادات اتصالات SQLite الدائمة (لكل خيط اتصال واحد)
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size_kb': 20000,
+    'mmap_size_mb': 256,
+    'busy_timeout_ms': 5000,
+    # النسخ الاحتياطي المباشر: عدد الصفحات في كل خطوة والانتظار بين الخطوات
+    'backup_step_pages': 1024,
+    'backup_step_sleep_ms': 5,
+    # سلسلة النسخ التلقائية: نسخة كاملة كل N نسخ وعدد السلاسل المحتفظ بها
+    'backup_full_every': 7,
+    'backup_chains_kept': 2,
+    # سجل النشاط: فترة الكتابة الخلفية وحجم الدفعة والحد الأقصى للطابور
+    'audit_flush_interval_ms': 200,
+    'audit_flush_batch': 500,
+    'audit_queue_max': 10000,
+    # الاحتفاظ بسجل النشاط: الأيام في قاعدة البيانات الرئيسية، ثم أرشيف شهري
+    # (0 = الاحتفاظ بالأرشيف دائماً)، وضغط الملف عند تجاوز نسبة الصفحات الفارغة
+    'audit_retention_days': 180,
+    'audit_archive_keep_months': 0,
+    'audit_archive_batch': 5000,
+    'audit_compact_free_ratio': 0.25,
+    # سجل التغييرات بين العمليات: فترة فحص data_version وأيام الاحتفاظ بالسجل
+    'change_poll_interval_ms': 1000,
+    'change_log_retention_days': 7
 }
 
 # إعدادات واجهة المستخدم
@@ -48,6 +73,8 @@ SYSTEM_CONFIG = {
     'log_backup_count': 5,
     'session_timeout_minutes': 60,
     'max_login_attempts': 3,
+    'login_lockout_seconds': 60,
+    'pin_min_length': 4,
     'password_min_length': 6
 }
 
@@ -81,7 +108,10 @@ REPORTS_CONFIG = {
     'monthly_reports_path': BASE_DIR / 'reports' / 'monthly',
     'export_formats': ['PDF', 'Excel', 'CSV'],
     'auto_generate_daily': True,
-    'report_retention_days': 365
+    'report_retention_days': 365,
+    # ذاكرة نتائج التقارير (LRU محدودة الحجم)
+    'cache_enabled': True,
+    'cache_max_mb': 32
 }
 
 # إعدادات الأمان
@@ -219,20 +249,28 @@ MESSAGES = {
 DEBUG_CONFIG = {
     'debug_mode': False,
     'show_sql_queries': False,
-    'enable_profiling': False,
+    'enable_profiling': False,  # حفظ خطة EXPLAIN لكل استعلام وليس البطيء فقط
     'mock_data_enabled': False,
-    'test_mode': False
+    'test_mode': False,
+    # قياس زمن الاستعلامات وسجل الاستعلامات البطيئة: عينة من العبارات تُقاس كاملة
+    # (مع جلب الصفوف) والبقية يُقاس تنفيذها فقط لالتقاط البطيء منها؛
+    # تُحفظ الإحصائيات في query_stats_file عند الإيقاف
+    'query_stats_enabled': True,
+    'slow_query_ms': 100,  # 0 = بلا سجل استعلامات بطيئة
+    'query_stats_sample_rate': 0.05,  # نسبة العبارات المقاسة في الإحصائيات (1 = كلها، 0 = لا شيء)
+    'query_stats_samples': 1000,  # عدد الأزمنة المحفوظة لكل استعلام لحساب النسب المئوية
+    'query_stats_file': PATHS['logs'] / 'query_stats.json'
 }
 
 def get_setting(key: str, default=None):
-    """الحصول على إعداد من النظام"""
-    # يمكن توسيع هذه الدالة لقراءة الإعدادات من قاعدة البيانات
-    return default
+    """الحصول على إعداد من النظام (من ذاكرة خدمة الإعدادات)"""
+    from app.services.settings_service import SettingsService
+    return SettingsService.for_db().get(key, default)
 
 def update_setting(key: str, value):
     """تحديث إعداد في النظام"""
-    # يمكن توسيع هذه الدالة لحفظ الإعدادات في قاعدة البيانات
-    pass
+    from app.services.settings_service import SettingsService
+    return SettingsService.for_db().set(key, value)
 
 def create_required_directories():
     """إنشاء المجلدات المطلوبة"""
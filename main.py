@@ -16,6 +16,7 @@ from PySide6.QtGui import QIcon
 app_path = Path(__file__).parent
 sys.path.insert(0, str(app_path))
 
+from app.models.audit_writer import install_crash_handlers
 from app.models.database import DatabaseManager
 from app.ui.login_dialog import LoginDialog
 from app.ui.main_window import MainWindow
@@ -69,6 +70,9 @@ def main():
     logger = setup_logger()
     logger.info("بدء تشغيل التطبيق")
     
+    # إفراغ طابور سجل النشاط عند إنهاء العملية بإشارة أو خطأ غير معالج
+    install_crash_handlers()
+    
     try:
         # إعداد المجلدات
         setup_directories()
@@ -92,7 +96,11 @@ def main():
             logger.info(f"تم تسجيل دخول المستخدم: {current_user['username']}")
             
             # تشغيل التطبيق
-            return app.exec()
+            exit_code = app.exec()
+            
+            # إغلاق اتصالات قاعدة البيانات بشكل نظيف
+            DatabaseManager.shutdown()
+            return exit_code
         else:
             logger.info("تم إلغاء تسجيل الدخول")
             return 0
@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+"""
+تجهيزات الاختبارات - Test Fixtures
+
+كل اختبار يعمل على قاعدة بيانات جديدة في مجلد مؤقت (المسار الافتراضي
+data/shop.db نسبة إلى مجلد العمل)، فالكائنات المشتركة لكل ملف (for_db)
+لا تتشارك بين الاختبارات.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.models.database import DatabaseManager
+from config.settings import DEBUG_CONFIG
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """قاعدة بيانات مهيأة بكل الترحيلات"""
+    monkeypatch.chdir(tmp_path)
+    # إحصائيات الاستعلامات تُحفظ عند الإيقاف؛ لا تُكتب في مجلد المشروع
+    monkeypatch.setitem(DEBUG_CONFIG, 'query_stats_file', tmp_path / 'query_stats.json')
+    database = DatabaseManager()
+    database.initialize_database()
+    yield database
+    DatabaseManager.shutdown()
+
+
+@pytest.fixture
+def make_product(db):
+    """إنشاء منتج نشط وإرجاع معرفه"""
+    def make(name="منتج", price=10.0, quantity=20, minimum_stock=5, barcode=None):
+        return db.execute_insert("""
+            INSERT INTO products (name, barcode, cost_price, selling_price, quantity_in_stock, minimum_stock)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, (name, barcode, price / 2, price, quantity, minimum_stock))
+    return make
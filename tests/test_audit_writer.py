@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+"""اختبارات كاتب سجل النشاط"""
+
+from app.models.audit_writer import AuditWriter
+
+
+def test_invalid_event_does_not_block_batch(db):
+    writer = AuditWriter(db, flush_interval_ms=60000)
+    for index in range(5):
+        # مستخدم غير موجود يخالف المفتاح الأجنبي audit_logs.user_id
+        writer.log(9999 if index == 2 else None, f'action_{index}')
+
+    assert writer.flush()
+    stats = writer.get_stats()
+    assert stats['pending'] == 0
+    assert stats['written'] == 4
+    assert stats['dropped'] == 1
+
+    actions = [row[0] for row in db.execute_query("SELECT action FROM audit_logs ORDER BY id")]
+    assert actions == ['action_0', 'action_1', 'action_3', 'action_4']
+
+    writer.log(None, 'after')
+    writer.shutdown()
+    assert writer.get_stats()['written'] == 5
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""اختبارات سلسلة النسخ التزايدية"""
+
+import json
+import sqlite3
+
+import pytest
+
+from app.services.backup_chain import BackupChain, ChainError, file_sha256
+
+
+def _snapshot(path, rows):
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE IF NOT EXISTS items (value TEXT)")
+    conn.executemany("INSERT INTO items VALUES (?)", [(f"row {i}",) for i in range(rows)])
+    conn.commit()
+    conn.close()
+    return path
+
+
+def test_points_in_same_second_get_unique_names(tmp_path):
+    chain = BackupChain(tmp_path / "chain")
+    snapshot = _snapshot(tmp_path / "snapshot.db", 10)
+
+    first = chain.add_snapshot(snapshot, name="20240101_120000")
+    _snapshot(snapshot, 500)
+    second = chain.add_snapshot(snapshot, name="20240101_120000")
+
+    assert first['name'] == "20240101_120000"
+    assert second['name'] == "20240101_120000_2"
+    assert second['parent'] == first['name']
+    assert second['file'] != first['file']
+
+    restored = chain.materialize(second['name'], tmp_path / "restored.db")
+    assert file_sha256(restored) == file_sha256(snapshot)
+
+
+def test_cycle_in_manifest_raises(tmp_path):
+    chain = BackupChain(tmp_path / "chain")
+    chain.chain_dir.mkdir()
+    entries = [
+        {'name': 'a', 'type': 'incremental', 'parent': 'b'},
+        {'name': 'b', 'type': 'incremental', 'parent': 'a'},
+    ]
+    chain.manifest_path.write_text(json.dumps({'version': 1, 'entries': entries}), encoding='utf-8')
+
+    with pytest.raises(ChainError):
+        chain.chain_to('a')
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+"""اختبارات استعادة النسخ الاحتياطية"""
+
+import threading
+from decimal import Decimal
+
+from app.models.audit_writer import AuditWriter
+from app.services.backup_service import BackupService
+from app.services.barcode_index import BarcodeIndex
+from app.services.event_bus import EventBus
+from app.services.settings_service import SettingsService
+
+
+def test_restore_resets_shared_state(db, make_product):
+    backup_service = BackupService()
+    backup_path = backup_service.create_backup("before", include_reports=False)
+    assert backup_path
+
+    settings = SettingsService.for_db(db)
+    index = BarcodeIndex.for_db(db)
+    bus = EventBus.for_db(db)
+    settings.set('tax_rate', '5')
+    make_product(barcode="123")
+    assert settings.get('tax_rate') == Decimal('5')
+    assert index.lookup("123") is not None
+    AuditWriter.for_db(db).log(None, 'test')
+
+    assert backup_service.restore_backup(backup_path)
+
+    assert settings.get('tax_rate') == Decimal('15')
+    assert index.lookup("123") is None
+    # مؤشر الناقل عند نهاية سجل الملف المستعاد: لا أحداث قديمة ولا أحداث ضائعة
+    assert not bus.poll()
+    # تغيير من اتصال آخر (data_version لا يتغير بكتابات الاتصال نفسه)
+    product_ids = []
+    writer = threading.Thread(target=lambda: product_ids.append(make_product(barcode="456")))
+    writer.start()
+    writer.join()
+    received = []
+    bus.subscribe(lambda event, ids: received.append((event, ids)))
+    assert bus.poll()
+    assert ('product.updated', frozenset(product_ids)) in received
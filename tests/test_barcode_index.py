@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""اختبارات فهرس الباركود"""
+
+import threading
+
+from app.models.audit_writer import AuditWriter
+from app.services.barcode_index import BarcodeIndex
+
+
+def _in_thread(target):
+    """تنفيذ كتابة من اتصال خيط آخر (تغير data_version لاتصال الاختبار)"""
+    thread = threading.Thread(target=target)
+    thread.start()
+    thread.join()
+
+
+def _count_reloads(index, monkeypatch):
+    reloads = []
+    reload = index._reload
+
+    def counting_reload(conn):
+        reloads.append(1)
+        reload(conn)
+
+    monkeypatch.setattr(index, '_reload', counting_reload)
+    return reloads
+
+
+def test_audit_flush_does_not_reload(db, make_product, monkeypatch):
+    make_product(barcode="111")
+    index = BarcodeIndex.for_db(db)
+    assert index.lookup("111") is not None
+    reloads = _count_reloads(index, monkeypatch)
+
+    writer = AuditWriter.for_db(db)
+    writer.log(None, 'test')
+    _in_thread(writer.flush)
+    assert writer.pending() == 0
+
+    assert index.lookup("111") is not None
+    assert reloads == []
+
+
+def test_external_product_change_refreshes_only_that_product(db, make_product, monkeypatch):
+    product_id = make_product(price=10, barcode="222")
+    index = BarcodeIndex.for_db(db)
+    assert index.lookup("222").selling_price == 10
+    reloads = _count_reloads(index, monkeypatch)
+
+    _in_thread(lambda: db.execute_update(
+        "UPDATE products SET selling_price = 12 WHERE id = ?", (product_id,)))
+    _in_thread(lambda: make_product(barcode="333"))
+
+    assert index.lookup("222").selling_price == 12
+    assert index.lookup("333") is not None
+    assert reloads == []
+
+
+def test_pruned_changes_reload(db, make_product, monkeypatch):
+    index = BarcodeIndex.for_db(db)
+    assert index.lookup("444") is None
+    reloads = _count_reloads(index, monkeypatch)
+
+    def add_and_prune():
+        make_product(barcode="444")
+        db.execute_update("DELETE FROM change_log")
+
+    _in_thread(add_and_prune)
+    assert index.lookup("444") is not None
+    assert reloads == [1]
@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+"""اختبارات لقطة لوحة التحكم"""
+
+from datetime import date, timedelta
+
+from app.services import dashboard_service
+from app.services.dashboard_service import DashboardService
+
+
+class _Tomorrow(date):
+    @classmethod
+    def today(cls):
+        return date.today() + timedelta(days=1)
+
+
+def test_snapshot_skipped_without_changes(db):
+    service = DashboardService()
+    assert service.snapshot() is not None
+    assert service.snapshot() is None
+
+
+def test_new_day_refreshes_snapshot(db, monkeypatch):
+    service = DashboardService()
+    assert service.snapshot() is not None
+
+    monkeypatch.setattr(dashboard_service, 'date', _Tomorrow)
+    assert service.snapshot() is not None
+
+
+def test_data_version_key_changes_with_connection(db):
+    serial, _ = db.data_version()
+    assert db.close_connections()
+    assert db.data_version()[0] != serial
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+"""اختبارات ناقل أحداث التغيير"""
+
+import threading
+
+from app.services.event_bus import EventBus
+
+
+def _in_thread(target):
+    """تنفيذ كتابة من اتصال خيط آخر (تغير data_version لاتصال الناقل)"""
+    thread = threading.Thread(target=target)
+    thread.start()
+    thread.join()
+
+
+def test_unwritten_local_event_does_not_hide_later_change(db, make_product):
+    product_id = make_product()
+    bus = EventBus.for_db(db)
+    received = []
+    bus.subscribe(lambda event, ids: received.append((event, ids)), 'product.updated')
+    bus.poll()
+
+    # نشر محلي دون سجل في change_log (تحديث دون تغيير فعلي مثلاً)
+    bus.publish('product.updated', [product_id])
+    assert received == [('product.updated', frozenset({product_id}))]
+
+    _in_thread(lambda: db.execute_update(
+        "UPDATE products SET name = 'اسم جديد' WHERE id = ?", (product_id,)))
+    assert bus.poll()
+    assert received[-1] == ('product.updated', frozenset({product_id}))
+    assert len(received) == 2
+    assert bus._published == {}
+
+
+def test_local_event_from_worker_is_delivered_once(db, make_product):
+    product_id = make_product()
+    bus = EventBus.for_db(db)
+    received = []
+    bus.subscribe(lambda event, ids: received.append((event, ids)), 'product.updated')
+    bus.poll()
+
+    def update_and_publish():
+        db.execute_update("UPDATE products SET name = 'اسم جديد' WHERE id = ?", (product_id,))
+        bus.publish('product.updated', [product_id])
+
+    _in_thread(update_and_publish)
+    assert bus.poll()
+    assert received == [('product.updated', frozenset({product_id}))]
+    assert bus._published == {}
+    assert not bus.poll()
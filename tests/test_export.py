@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+"""اختبارات تصدير الجداول"""
+
+import zipfile
+
+from app.services.backup_service import BackupService
+from app.services.export_service import RESTRICTED_TABLES, ExportService
+
+
+def test_default_export_skips_restricted_tables(db, tmp_path):
+    assert not RESTRICTED_TABLES & set(ExportService(db).get_exportable_tables())
+
+    output = ExportService(db).export_tables(str(tmp_path / "export.zip"), 'csv')
+    with zipfile.ZipFile(output) as archive:
+        names = set(archive.namelist())
+    assert 'products.csv' in names
+    assert not {f"{table}.csv" for table in RESTRICTED_TABLES} & names
+
+
+def test_restricted_export_never_writes_password_hashes(db, tmp_path):
+    output = ExportService(db).export_tables(
+        str(tmp_path / "export.zip"), 'csv', include_restricted=True)
+    with zipfile.ZipFile(output) as archive:
+        users = archive.read('users.csv').decode('utf-8-sig')
+    assert 'admin' in users
+    assert 'password_hash' not in users
+    assert '$2b$' not in users
+
+
+def test_restricted_export_requires_manage_users(db):
+    assert BackupService().export_data('csv', include_restricted=True) is None
+    assert BackupService().export_data('sql') is None
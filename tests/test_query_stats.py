@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""اختبارات قياس الاستعلامات"""
+
+import sqlite3
+
+import pytest
+
+from app.models.query_stats import InstrumentedConnection, query_stats
+
+
+@pytest.fixture
+def conn(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # سجل الاستعلامات البطيئة في logs/ نسبة إلى مجلد العمل
+    monkeypatch.setattr(query_stats, 'sample_rate', 1.0)
+    connection = sqlite3.connect(str(tmp_path / "stats.db"), factory=InstrumentedConnection)
+    connection.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)")
+    connection.executemany("INSERT INTO items (name) VALUES (?)", [(f"item {i}",) for i in range(25)])
+    query_stats.reset()
+    yield connection
+    connection.close()
+    query_stats.reset()
+
+
+def _stats_for(sql_prefix):
+    return [entry for entry in query_stats.snapshot() if entry['query'].startswith(sql_prefix)]
+
+
+def test_iterating_cursor_records_rows(conn):
+    names = [row[0] for row in conn.execute("SELECT name FROM items WHERE id > ?", (5,))]
+
+    assert len(names) == 20
+    [entry] = _stats_for("SELECT name FROM items")
+    assert entry['count'] == 1
+    assert entry['rows'] == 20
+
+
+def test_fetchall_and_iteration_record_the_same(conn):
+    conn.execute("SELECT id FROM items").fetchall()
+    for _ in conn.execute("SELECT id FROM items"):
+        pass
+
+    [entry] = _stats_for("SELECT id FROM items")
+    assert entry['count'] == 2
+    assert entry['rows'] == 50
+
+
+def test_unsampled_statements_only_log_slow_queries(conn, monkeypatch):
+    monkeypatch.setattr(query_stats, 'sample_rate', 0.0)
+    monkeypatch.setattr(query_stats, 'slow_query_ms', 1000)
+    conn.execute("SELECT name FROM items").fetchall()
+    assert query_stats.snapshot() == []
+    assert query_stats.slow_queries() == []
+
+    monkeypatch.setattr(query_stats, 'slow_query_ms', 1e-9)
+    conn.execute("SELECT name FROM items WHERE id = ?", (3,)).fetchall()
+    assert query_stats.snapshot() == []
+    [entry] = query_stats.slow_queries()
+    assert entry['query'] == "SELECT name FROM items WHERE id = ?"
+    assert entry['plan']
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""اختبارات ذاكرة التقارير للفترات المقفلة"""
+
+from app.models.sales_rollup import SalesRollup
+from app.services.pos_service import POSService
+from app.services.report_service import ReportService
+
+
+def _backdated_sale(db, make_product, days_ago):
+    product_id = make_product(price=50, quantity=10)
+    sale = POSService().create_sale([{'product_id': product_id, 'quantity': 1, 'price': 50}], 'cash')
+    assert sale
+    db.execute_update(
+        "UPDATE sales SET created_at = datetime('now', ?) WHERE id = ?",
+        (f"-{days_ago} days", sale['id'])
+    )
+    SalesRollup(db).rebuild()
+    day = db.execute_query("SELECT DATE(created_at, 'localtime') FROM sales WHERE id = ?", (sale['id'],))
+    return sale['id'], day[0][0]
+
+
+def _close_day(db, day):
+    db.execute_insert("INSERT INTO daily_closes (close_date) VALUES (?)", (day,))
+
+
+def test_void_in_closed_period_changes_report(db, make_product):
+    sale_id, day = _backdated_sale(db, make_product, 3)
+    _close_day(db, day)
+    report_service = ReportService()
+
+    report = report_service.get_sales_report(day, day)
+    assert report['summary']['total_transactions'] == 1
+
+    # مبيعات اليوم لا تبطل نتيجة الفترة المقفلة
+    _backdated_sale(db, make_product, 0)
+    hits = report_service.cache.hits
+    assert report_service.get_sales_report(day, day) == report
+    assert report_service.cache.hits == hits + 1
+
+    assert POSService().void_sale(sale_id, "تعديل متأخر")
+    report = report_service.get_sales_report(day, day)
+    assert not report['summary'].get('total_transactions')
+
+
+def test_period_with_open_day_is_not_closed(db, make_product):
+    open_sale_id, open_day = _backdated_sale(db, make_product, 3)
+    _, closed_day = _backdated_sale(db, make_product, 2)
+    _close_day(db, closed_day)
+    report_service = ReportService()
+
+    report = report_service.get_sales_report(open_day, closed_day)
+    assert report['summary']['total_transactions'] == 2
+
+    assert POSService().void_sale(open_sale_id, "تعديل متأخر")
+    report = report_service.get_sales_report(open_day, closed_day)
+    assert report['summary']['total_transactions'] == 1
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""اختبارات الجلسات والتبديل برمز PIN"""
+
+import pytest
+
+from app.models.user import hash_password
+from app.services.auth_service import AuthService
+
+
+@pytest.fixture
+def cashier_session(db):
+    """كاشير مسجل الدخول مع رمز PIN (معرف المستخدم، معرف الجلسة)"""
+    user_id = db.execute_insert(
+        "INSERT INTO users (username, password_hash, full_name, role) VALUES (?, ?, ?, ?)",
+        ("cashier2", hash_password("secret", rounds=4), "كاشير", "Cashier")
+    )
+    user = AuthService().login("cashier2", "secret", pin="1234")
+    assert user
+    return user_id, user['session_id']
+
+
+def test_deactivated_user_cannot_switch_by_pin(db, cashier_session):
+    user_id, session_id = cashier_session
+    # تعطيل من خارج هذه الخدمة (عملية أخرى مثلاً)
+    db.execute_update("UPDATE users SET is_active = 0 WHERE id = ?", (user_id,))
+
+    auth_service = AuthService()
+    assert auth_service.switch_user(session_id, "1234") is None
+    assert auth_service.resume_session(session_id) is None
+    assert auth_service.get_open_sessions() == []
+
+
+def test_switch_uses_current_role(db, cashier_session):
+    user_id, session_id = cashier_session
+    db.execute_update("UPDATE users SET role = 'Admin' WHERE id = ?", (user_id,))
+
+    user = AuthService().switch_user(session_id, "1234")
+    assert user['role'] == 'Admin'
+
+
+def test_delete_user_closes_sessions(db, cashier_session):
+    user_id, session_id = cashier_session
+    admin_service = AuthService()
+    assert admin_service.login("admin", "admin123")
+
+    assert admin_service.delete_user(user_id)
+    assert session_id not in {session['session_id'] for session in admin_service.get_open_sessions()}
+    assert AuthService().switch_user(session_id, "1234") is None
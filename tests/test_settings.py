@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+"""اختبارات خدمة الإعدادات"""
+
+from decimal import Decimal
+
+from app.models.sale import Sale
+from app.services.settings_service import SettingsService
+
+
+def test_set_setting_updates_service_cache_and_subscribers(db):
+    settings = SettingsService.for_db(db)
+    assert settings.get('tax_rate') == Decimal('15')  # تحميل الذاكرة أولاً
+
+    received = []
+    settings.subscribe(lambda key, value: received.append((key, value)), 'tax_rate')
+
+    assert db.set_setting('tax_rate', '5')
+    assert settings.get('tax_rate') == Decimal('5')
+    assert received == [('tax_rate', Decimal('5'))]
+    assert db.get_setting('tax_rate') == '5'
+
+
+def test_sale_uses_cached_tax_rate(db, make_product):
+    product_id = make_product(price=100)
+    sale_model = Sale(db)
+    db.set_setting('tax_rate', '10')
+
+    sale_id = sale_model.create_sale(None, [{'product_id': product_id, 'quantity': 1, 'price': 100}], 'cash')
+    sale = sale_model.get_sale_by_id(sale_id)
+    assert sale['tax_amount'] == 10
+    assert sale['final_amount'] == 110
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""اختبارات إلغاء الفواتير"""
+
+import threading
+
+from app.services.pos_service import POSService
+
+
+def _rollups(db):
+    return {
+        table: [tuple(row) for row in db.execute_query(f"SELECT * FROM {table} ORDER BY 1, 2")]
+        for table in ('sales_daily_rollup', 'sales_payment_rollup', 'sales_item_rollup')
+    }
+
+
+def _stock(db, product_id):
+    return db.execute_query("SELECT quantity_in_stock FROM products WHERE id = ?", (product_id,))[0][0]
+
+
+def _make_sale(db, make_product):
+    product_id = make_product(price=50, quantity=10)
+    sale = POSService().create_sale([{'product_id': product_id, 'quantity': 3, 'price': 50}], 'cash')
+    assert sale
+    return sale['id'], product_id
+
+
+def test_second_void_changes_nothing(db, make_product):
+    sale_id, product_id = _make_sale(db, make_product)
+    pos_service = POSService()
+
+    assert pos_service.void_sale(sale_id, "خطأ")
+    rollups, stock = _rollups(db), _stock(db, product_id)
+    assert stock == 10
+
+    assert not pos_service.void_sale(sale_id, "مرة ثانية")
+    assert _rollups(db) == rollups
+    assert _stock(db, product_id) == stock
+
+
+def test_concurrent_voids_apply_once(db, make_product):
+    sale_id, product_id = _make_sale(db, make_product)
+    results = []
+    barrier = threading.Barrier(2)
+
+    def void():
+        pos_service = POSService()
+        read_sale = pos_service.sale_model.get_sale_by_id
+
+        def read_then_wait(sale_id):
+            # الخيطان يقرآن الفاتورة مكتملة قبل أن يكتب أي منهما
+            sale = read_sale(sale_id)
+            barrier.wait()
+            return sale
+
+        pos_service.sale_model.get_sale_by_id = read_then_wait
+        results.append(pos_service.void_sale(sale_id))
+
+    threads = [threading.Thread(target=void) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(results) == [False, True]
+    assert _stock(db, product_id) == 10
+    daily = db.execute_query("SELECT transactions, final_amount FROM sales_daily_rollup")
+    assert all(row['transactions'] == 0 and row['final_amount'] == 0 for row in daily)
+
+
+def test_void_after_category_change_nets_rollup(db, make_product):
+    old_category, new_category = (
+        db.execute_insert("INSERT INTO categories (name) VALUES (?)", (name,))
+        for name in ("قديم", "جديد")
+    )
+    product_id = make_product(price=50, quantity=10)
+    db.execute_update("UPDATE products SET category_id = ? WHERE id = ?", (old_category, product_id))
+    sale = POSService().create_sale([{'product_id': product_id, 'quantity': 3, 'price': 50}], 'cash')
+    assert sale
+
+    # تغيير التصنيف بعد البيع ثم الإلغاء: الطرح تحت مفتاح البيع نفسه
+    db.execute_update("UPDATE products SET category_id = ? WHERE id = ?", (new_category, product_id))
+    assert POSService().void_sale(sale['id'], "خطأ")
+
+    items = db.execute_query("SELECT category_id, quantity, revenue FROM sales_item_rollup")
+    assert [row['category_id'] for row in items] == [old_category]
+    assert items[0]['quantity'] == 0 and items[0]['revenue'] == 0